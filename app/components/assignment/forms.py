@@ -52,4 +52,64 @@ def assignment_form(action_url, method="post", assignment=None, crews=None, rout
         Button("Submit", type="submit"),
         action=action_url,
         method=method
-    )
\ No newline at end of file
+    )
+
+def optimize_form(action_url, method="post", assignment_date=""):
+    """Generates a form for planning a day's assignments automatically."""
+    return Form(
+        Div(
+            Label("Assignment Date:", For="doc"),
+            Input(name="doc", type="date", value=assignment_date, required=True, id="doc")
+        ),
+        Button("Plan Assignments", type="submit"),
+        action=action_url,
+        method=method
+    )
+
+def clone_form(action_url, method="post", source_date="", target_date=""):
+    """Generates a form for copying a day's or week's assignments to later dates."""
+    return Form(
+        Div(
+            Label("Copy:", For="mode"),
+            Select(
+                Option("One day", value="day", selected=True),
+                Option("Whole week", value="week"),
+                name="mode", id="mode"
+            )
+        ),
+        Div(
+            Label("From Date:", For="source_date"),
+            Input(name="source_date", type="date", value=source_date, required=True, id="source_date")
+        ),
+        Div(
+            Label("To Date:", For="target_date"),
+            Input(name="target_date", type="date", value=target_date, required=True, id="target_date")
+        ),
+        Div(
+            Label("Copies (consecutive days or weeks):", For="copies"),
+            Input(name="copies", type="number", value="1", min="1", max="52", id="copies")
+        ),
+        Button("Copy Assignments", type="submit"),
+        action=action_url,
+        method=method
+    )
+
+def completion_form(action_url, assignment, method="post"):
+    """Generates a form for recording when an assignment finished and the weight collected."""
+    return Form(
+        Div(
+            Label("End Time:", For=f"end_time_{assignment.id}"),
+            Input(name="end_time", type="time", id=f"end_time_{assignment.id}", required=True,
+                  value=assignment.end_time.strftime("%H:%M") if assignment.end_time else "")
+        ),
+        Div(
+            Label("Collected Weight (kg):", For=f"collected_kg_{assignment.id}"),
+            Input(name="collected_kg", type="number", min="0", step="any", id=f"collected_kg_{assignment.id}",
+                  value="" if assignment.collected_kg is None else str(assignment.collected_kg))
+        ),
+        Input(type="hidden", name="assignment_id", value=assignment.id),
+        Button("Submit", type="submit", cls="button"),
+        action=action_url,
+        method=method,
+        cls="form"
+    )
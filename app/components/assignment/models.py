@@ -1,5 +1,6 @@
 # components/assignment/models.py
 
+import ast
 from dataclasses import dataclass, field
 from datetime import datetime, date, time
 from fastlite import Database
@@ -24,6 +25,7 @@ class Assignment:
     attendance_confirmed: bool = field(default=False)  # Attendance confirmation
     ppe_compliance: bool = field(default=False)        # PPE compliance confirmation
     status_updates: dict = field(default_factory=lambda: {"11AM": None, "1PM": None, "3PM": None, "EOD": None})
+    collected_kg: float | None = field(default=None)  # Weight collected, recorded at completion
 
     # Table name in the database
     __tablename__ = 'assignments'
@@ -47,24 +49,102 @@ class Assignment:
             completion_time REAL,
             attendance_confirmed BOOLEAN NOT NULL,
             ppe_compliance BOOLEAN NOT NULL,
-            status_updates TEXT
+            status_updates TEXT,
+            collected_kg REAL
         )
         '''
         db.execute(query)
 
+        # Add columns introduced after the table was first created
+        existing_columns = {row['name'] for row in db.q(f"PRAGMA table_info({cls.__tablename__})")}
+        if 'collected_kg' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN collected_kg REAL")
+        # Daily lookups and rollups filter on the collection date
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.__tablename__}_doc ON {cls.__tablename__} (doc)")
+
     @classmethod
     def find_all_for_date(cls, assignment_date: date):
         """Fetches all assignments for a specific date."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE doc = ?"
-        rows = db.q(query, (assignment_date.format(),))  # Ensure date is in string format
-        return [cls(**row) for row in rows]
+        rows = db.q(query, (assignment_date.isoformat(),))
+        return [cls._from_row(row) for row in rows]
 
     @classmethod
     def find_by_id(cls, assignment_id: int):
         """Fetches an assignment by its ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.q(query, (assignment_id,))
-        return cls(**row) if row else None
+        rows = db.q(query, (assignment_id,))
+        return cls._from_row(rows[0]) if rows else None
+
+    @classmethod
+    def _from_row(cls, row: dict):
+        """Builds an assignment from a database row, converting the columns stored as text back."""
+        row = dict(row)
+        row['doc'] = date.fromisoformat(row['doc'])
+        row['start_time'] = time.fromisoformat(row['start_time'])
+        row['end_time'] = time.fromisoformat(row['end_time']) if row['end_time'] else None
+        row['attendance_confirmed'] = bool(row['attendance_confirmed'])
+        row['ppe_compliance'] = bool(row['ppe_compliance'])
+        if row['status_updates']:
+            row['status_updates'] = ast.literal_eval(row['status_updates'])
+        else:
+            del row['status_updates']
+        return cls(**row)
+
+    @classmethod
+    def insert_many(cls, assignments: list):
+        """Inserts new assignments in one transaction and sets their IDs."""
+        query = f'''
+        INSERT INTO {cls.__tablename__} (crew_id, route_id, client_id, zone_id, week_number, doc, dow, week_type,
+                                         start_time, end_time, completion_time, attendance_confirmed, ppe_compliance, status_updates,
+                                         collected_kg)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        with db.conn:
+            cursor = db.conn.cursor()
+            for assignment in assignments:
+                cursor.execute(query, (
+                    assignment.crew_id, assignment.route_id, assignment.client_id, assignment.zone_id,
+                    assignment.week_number, assignment.doc.isoformat(), assignment.dow, assignment.week_type,
+                    assignment.start_time.strftime("%H:%M:%S"),
+                    assignment.end_time.strftime("%H:%M:%S") if assignment.end_time else None,
+                    assignment.completion_time, int(assignment.attendance_confirmed), int(assignment.ppe_compliance),
+                    str(assignment.status_updates), assignment.collected_kg
+                ))
+                assignment.id = db.conn.last_insert_rowid()
+
+    @classmethod
+    def clone_days(cls, date_pairs: list) -> list:
+        """
+        Copies the assignments of each source date to its target date with one INSERT ... SELECT,
+        given (source, target) date pairs. Copies get the target's week number and weekday,
+        and start out as regular work with no end time, status, attendance or weight recorded.
+        Routes the target date already has an assignment for are skipped. Returns the new IDs.
+        """
+        if not date_pairs:
+            return []
+        mapping = ", ".join(["(?, ?, ?, ?)"] * len(date_pairs))
+        params = [value for source, target in date_pairs
+                  for value in (source.isoformat(), target.isoformat(), target.isocalendar()[1], target.strftime("%A"))]
+        status_updates = str(cls().status_updates)
+        query = f'''
+        WITH mapping (source_doc, target_doc, week_number, dow) AS (VALUES {mapping})
+        INSERT INTO {cls.__tablename__} (crew_id, route_id, client_id, zone_id, week_number, doc, dow, week_type,
+                                         start_time, end_time, completion_time, attendance_confirmed, ppe_compliance,
+                                         status_updates, collected_kg)
+        SELECT s.crew_id, s.route_id, s.client_id, s.zone_id, m.week_number, m.target_doc, m.dow, 'Regular',
+               s.start_time, NULL, 0, 0, 0, ?, NULL
+        FROM {cls.__tablename__} s JOIN mapping m ON s.doc = m.source_doc
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {cls.__tablename__} t WHERE t.doc = m.target_doc AND t.route_id = s.route_id
+        )
+        ORDER BY m.target_doc, s.start_time, s.id
+        '''
+        with db.conn:
+            before = db.q(f"SELECT COALESCE(MAX(id), 0) AS last FROM {cls.__tablename__}")[0]['last']
+            db.execute(query, (*params, status_updates))
+            rows = db.q(f"SELECT id FROM {cls.__tablename__} WHERE id > ? ORDER BY id", (before,))
+        return [row['id'] for row in rows]
 
     def save(self):
         """Inserts or updates the assignment in the database."""
@@ -72,22 +152,26 @@ class Assignment:
             # Insert new assignment
             query = f'''
             INSERT INTO {self.__tablename__} (crew_id, route_id, client_id, zone_id, week_number, doc, dow, week_type,
-                                              start_time, end_time, completion_time, attendance_confirmed, ppe_compliance, status_updates)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                              start_time, end_time, completion_time, attendance_confirmed, ppe_compliance, status_updates,
+                                              collected_kg)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             '''
             params = (
                 self.crew_id, self.route_id, self.client_id, self.zone_id, self.week_number, self.doc.isoformat(),
                 self.dow, self.week_type, self.start_time.strftime("%H:%M:%S"),
                 self.end_time.strftime("%H:%M:%S") if self.end_time else None,
-                self.completion_time, int(self.attendance_confirmed), int(self.ppe_compliance), str(self.status_updates)
+                self.completion_time, int(self.attendance_confirmed), int(self.ppe_compliance), str(self.status_updates),
+                self.collected_kg
             )
-            self.id = db.insert(query, params)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing assignment
             query = f'''
             UPDATE {self.__tablename__}
             SET crew_id = ?, route_id = ?, client_id = ?, zone_id = ?, week_number = ?, doc = ?, dow = ?, week_type = ?,
-                start_time = ?, end_time = ?, completion_time = ?, attendance_confirmed = ?, ppe_compliance = ?, status_updates = ?
+                start_time = ?, end_time = ?, completion_time = ?, attendance_confirmed = ?, ppe_compliance = ?, status_updates = ?,
+                collected_kg = ?
             WHERE id = ?
             '''
             params = (
@@ -95,7 +179,7 @@ class Assignment:
                 self.dow, self.week_type, self.start_time.strftime("%H:%M:%S"),
                 self.end_time.strftime("%H:%M:%S") if self.end_time else None,
                 self.completion_time, int(self.attendance_confirmed), int(self.ppe_compliance),
-                str(self.status_updates), self.id
+                str(self.status_updates), self.collected_kg, self.id
             )
             db.execute(query, params)
 
@@ -116,12 +200,18 @@ class Assignment:
             self.status_updates[time_label] = status
             self.save()
 
-    def mark_completion(self, end_time: time):
-        """Marks the assignment as completed and calculates completion time."""
+    def record_completion(self, end_time: time, collected_kg: float | None = None):
+        """Sets the end time, completion time and weight collected without saving."""
         self.end_time = end_time
+        if collected_kg is not None:
+            self.collected_kg = collected_kg
         start_datetime = datetime.combine(self.doc, self.start_time)
         end_datetime = datetime.combine(self.doc, end_time)
         self.completion_time = (end_datetime - start_datetime).total_seconds() / 3600  # In hours
+
+    def mark_completion(self, end_time: time, collected_kg: float | None = None):
+        """Marks the assignment as completed, calculates completion time and records the weight collected."""
+        self.record_completion(end_time, collected_kg)
         self.save()
 
     def __ft__(self):
@@ -7,7 +7,7 @@ from starlette.responses import RedirectResponse
 # Import views
 from app.components.assignment.views import (
     assignment_list_view, assignment_add_view, assignment_edit_view, assignment_delete_view,
-    attendance_view, status_update_view
+    attendance_view, status_update_view, assignment_optimize_view, assignment_clone_view, completion_view
 )
 from app.components.dashboard.views import admin_dashboard_view, supervisor_dashboard_view, dispatch_dashboard_view
 
@@ -53,6 +53,16 @@ def setup_routes(app):
     async def add_assignment(req):
         return await assignment_add_view(req)
 
+    @app.route("/assignments/optimize", methods=["GET", "POST"])
+    @requires(["Admin"], redirect="/auth/login")
+    async def optimize_assignments(req):
+        return await assignment_optimize_view(req)
+
+    @app.route("/assignments/clone", methods=["GET", "POST"])
+    @requires(["Admin"], redirect="/auth/login")
+    async def clone_assignments(req):
+        return await assignment_clone_view(req)
+
     @app.route("/assignments/edit/{assignment_id}", methods=["GET", "POST"])
     @requires(["Admin"], redirect="/auth/login")
     async def edit_assignment(req, assignment_id):
@@ -68,6 +78,11 @@ def setup_routes(app):
     async def attendance(req):
         return await attendance_view(req)
 
+    @app.route("/assignments/complete", methods=["GET", "POST"])
+    @requires(["Dispatch"], redirect="/auth/login")
+    async def complete_assignments(req):
+        return await completion_view(req)
+
     @app.route("/assignments/status/update/{time_label}", methods=["GET", "POST"])
     @requires(["Dispatch"], redirect="/auth/login")
     async def status_update(req, time_label):
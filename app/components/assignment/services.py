@@ -1,6 +1,18 @@
 # components/assignment/services.py
 
-from app.components.assignment.models import Assignment
+from datetime import date, datetime, time, timedelta
+from typing import List
+from app.components.assignment.models import Assignment, db
+from app.components.crew.models import Crew
+from app.components.report.services import refresh_daily_rollups
+from app.service.conflict_service import BookingIndex, assignment_bookings, describe_conflicts
+from app.service.optimizer_service import plan_assignments, AssignmentPlan
+from app.components.event.models import Event
+from app.components.event.services import plan_event_impact
+from app.service.event_impact_service import EventImpactEngine
+import logging
+
+logger = logging.getLogger(__name__)
 
 def get_assignments_for_date(assignment_date):
     """Fetches all assignments for a specific date."""
@@ -10,31 +22,208 @@ def get_assignment_by_id(assignment_id):
     """Fetches an assignment by its ID."""
     return Assignment.find_by_id(assignment_id)
 
+def bookings_for_assignment(assignment, assignment_id=None):
+    """Work bookings of an assignment's crew, driver, truck and loaders."""
+    crew = Crew.find_by_id(assignment.crew_id)
+    return assignment_bookings(
+        assignment_id, assignment.doc, assignment.start_time, assignment.end_time, assignment.crew_id,
+        crew.driver_id if crew else None, crew.truck_id if crew else None, crew.loaders if crew else []
+    )
+
+def save_with_bookings(assignment):
+    """
+    Saves an assignment and its bookings in one transaction.
+    Raises:
+        ValueError: If the crew, driver, truck or a loader is already booked at that time.
+    """
+    with db.conn:
+        bookings = BookingIndex(db)
+        conflicts = bookings.check(bookings_for_assignment(assignment, assignment.id))
+        if conflicts:
+            raise ValueError(describe_conflicts(conflicts))
+        assignment.save()
+        bookings.book(bookings_for_assignment(assignment, assignment.id))
+
 def create_assignment(data):
-    """Creates a new assignment."""
+    """
+    Creates a new assignment.
+    Raises:
+        ValueError: If the crew, driver, truck or a loader is already booked at that time.
+    """
+    doc = datetime.strptime(data.get('doc'), '%Y-%m-%d').date()
     new_assignment = Assignment(
         crew_id=int(data.get('crew_id')),
         route_id=int(data.get('route_id')),
         client_id=int(data.get('client_id')),
         zone_id=int(data.get('zone_id')),
-        doc=datetime.strptime(data.get('doc'), '%Y-%m-%d').date(),
+        week_number=doc.isocalendar()[1],
+        doc=doc,
+        dow=doc.strftime("%A"),
         week_type=data.get('week_type', 'Regular')
     )
-    new_assignment.save()
+    save_with_bookings(new_assignment)
+    refresh_daily_rollups(new_assignment.doc)
 
 def update_assignment(assignment_id, data):
     """Updates an existing assignment."""
     assignment = get_assignment_by_id(assignment_id)
+    previous_doc = assignment.doc
     assignment.crew_id = int(data.get('crew_id'))
     assignment.route_id = int(data.get('route_id'))
     assignment.client_id = int(data.get('client_id'))
     assignment.zone_id = int(data.get('zone_id'))
     assignment.doc = datetime.strptime(data.get('doc'), '%Y-%m-%d').date()
+    assignment.week_number = assignment.doc.isocalendar()[1]
+    assignment.dow = assignment.doc.strftime("%A")
     assignment.week_type = data.get('week_type', 'Regular')
-    assignment.save()
+    save_with_bookings(assignment)
+    refresh_daily_rollups(assignment.doc)
+    if previous_doc != assignment.doc:
+        refresh_daily_rollups(previous_doc)
 
 def delete_assignment(assignment_id):
     """Deletes an existing assignment."""
     assignment = get_assignment_by_id(assignment_id)
     if assignment:
-        assignment.delete()
\ No newline at end of file
+        with db.conn:
+            assignment.delete()
+            BookingIndex(db).release(Assignment.__tablename__, [assignment.id])
+        refresh_daily_rollups(assignment.doc)
+
+def complete_assignment(assignment_id, data):
+    """
+    Records the end of an assignment's collection and the weight its crew brought in;
+    the weight feeds the tonnage estimates used when allocating trucks.
+    Raises:
+        ValueError: If the assignment does not exist, the end time or weight is invalid, or the
+            hours worked overlap another booking of the crew.
+    """
+    assignment = get_assignment_by_id(assignment_id)
+    if not assignment:
+        raise ValueError(f"Assignment {assignment_id} not found.")
+    end_time = datetime.strptime(data.get('end_time'), '%H:%M').time()
+    if end_time <= assignment.start_time:
+        raise ValueError("End time must be after the start time.")
+    collected_kg = float(data.get('collected_kg')) if data.get('collected_kg') else None
+    if collected_kg is not None and collected_kg < 0:
+        raise ValueError("Collected weight cannot be negative.")
+    assignment.record_completion(end_time, collected_kg)
+    # The crew's bookings are resized from the default shift to the hours actually worked
+    save_with_bookings(assignment)
+    refresh_daily_rollups(assignment.doc)
+    return assignment
+
+def create_optimized_assignments(day) -> AssignmentPlan:
+    """
+    Plans assignments for every unassigned route of the day and writes them in one
+    transaction. Planned work whose driver, truck or loaders turn out to be booked
+    elsewhere is left out and reported as unassigned. Returns the plan as written.
+    """
+    plan = plan_assignments(day)
+    if not plan.assignments:
+        return plan
+    crews = {crew.id: crew for crew in Crew.find_all()}
+    week_number, dow = day.isocalendar()[1], day.strftime("%A")
+
+    def bookings_for(planned, assignment_id=None):
+        crew = crews.get(planned.crew_id)
+        return assignment_bookings(
+            assignment_id, day, planned.start_time, planned.end_time, planned.crew_id,
+            crew.driver_id if crew else None, crew.truck_id if crew else None, crew.loaders if crew else []
+        )
+
+    with db.conn:
+        bookings = BookingIndex(db)
+        proposed = [b for planned in plan.assignments for b in bookings_for(planned)]
+        clashing = {(c.booking.day, c.booking.start_min, c.booking.resource_kind, c.booking.resource_id)
+                    for c in bookings.check_many(proposed)}
+        accepted = []
+        for planned in plan.assignments:
+            if any((b.day, b.start_min, b.resource_kind, b.resource_id) in clashing for b in bookings_for(planned)):
+                plan.unassigned.append(planned.route_id)
+            else:
+                accepted.append(planned)
+        plan.assignments = accepted
+
+        assignments = [
+            Assignment(
+                crew_id=planned.crew_id, route_id=planned.route_id, client_id=planned.client_id,
+                zone_id=planned.zone_id, week_number=week_number, doc=day, dow=dow,
+                week_type=planned.week_type, start_time=planned.start_time
+            )
+            for planned in accepted
+        ]
+        Assignment.insert_many(assignments)
+        bookings.book(b for planned, assignment in zip(accepted, assignments)
+                      for b in bookings_for(planned, assignment.id))
+    refresh_daily_rollups(day)
+    logger.info(f"Created {len(accepted)} optimized assignments for {day}; {len(plan.unassigned)} routes unassigned.")
+    return plan
+
+# Most conflicts listed when a clone is rejected
+MAX_CLONE_CONFLICTS_SHOWN = 5
+
+def clone_assignments(date_pairs) -> List[int]:
+    """
+    Copies the assignments of source dates to target dates, given (source, target) pairs, in one
+    transaction: the rows with a single INSERT ... SELECT, then their bookings, then any events
+    covering the target dates so holidays shift the copies as well. Returns the new IDs.
+    Raises:
+        ValueError: If a copy would double-book a crew, driver, truck or loader.
+    """
+    date_pairs = sorted(set(date_pairs))
+    if not date_pairs:
+        return []
+    first, last = min(t for _, t in date_pairs), max(t for _, t in date_pairs)
+    with db.conn:
+        new_ids = Assignment.clone_days(date_pairs)
+        if not new_ids:
+            return []
+        rows = db.q('''
+            SELECT a.id, a.doc, a.start_time, a.crew_id, c.driver_id, c.truck_id, c.loaders
+            FROM assignments a LEFT JOIN crews c ON c.id = a.crew_id
+            WHERE a.id BETWEEN ? AND ?
+        ''', (new_ids[0], new_ids[-1]))
+        proposed = []
+        for row in rows:
+            loader_ids = [int(i) for i in row['loaders'].split(",") if i] if row['loaders'] else []
+            proposed.extend(assignment_bookings(
+                row['id'], date.fromisoformat(row['doc']), time.fromisoformat(row['start_time']), None,
+                row['crew_id'], row['driver_id'], row['truck_id'], loader_ids
+            ))
+        bookings = BookingIndex(db)
+        conflicts = bookings.check_many(proposed)
+        if conflicts:
+            more = len(conflicts) - MAX_CLONE_CONFLICTS_SHOWN
+            raise ValueError(describe_conflicts(conflicts[:MAX_CLONE_CONFLICTS_SHOWN]) +
+                             (f" ({more} more conflicts.)" if more > 0 else ""))
+        bookings.book(proposed)
+
+        engine = EventImpactEngine(db)
+        rows = db.q(f"SELECT * FROM {Event.__tablename__} WHERE start_date <= ? AND end_date >= ?",
+                    (last.isoformat(), first.isoformat()))
+        # Holidays can shift copies past the last target date
+        refreshed = [first, last]
+        for row in rows:
+            impact = plan_event_impact(Event(**Event._parse_row(row)), engine)
+            engine.apply(impact)
+            refreshed.extend(impact.affected_days())
+    refresh_daily_rollups(min(refreshed), max(refreshed))
+    logger.info(f"Cloned {len(new_ids)} assignments onto {len(date_pairs)} days from {first} to {last}.")
+    return new_ids
+
+def clone_day(source: date, targets: List[date]) -> List[int]:
+    """Copies one day's assignments to each of the target dates."""
+    return clone_assignments([(source, target) for target in targets if target != source])
+
+def clone_week(source: date, target: date, weeks: int = 1) -> List[int]:
+    """Copies the week containing `source` onto the week containing `target` and the weeks after it."""
+    source_monday = source - timedelta(days=source.weekday())
+    target_monday = target - timedelta(days=target.weekday())
+    if source_monday == target_monday:
+        raise ValueError("The target week must differ from the source week.")
+    return clone_assignments([
+        (source_monday + timedelta(days=day), target_monday + timedelta(weeks=week, days=day))
+        for week in range(weeks) for day in range(7)
+        if target_monday + timedelta(weeks=week) != source_monday
+    ])
@@ -1,9 +1,10 @@
 # components/assignment/views.py
 
 from fasthtml.common import *
-from .forms import assignment_form
+from .forms import assignment_form, optimize_form, clone_form, completion_form
 from .services import (
-    get_assignments_for_date, get_assignment_by_id, create_assignment, update_assignment, delete_assignment
+    get_assignments_for_date, get_assignment_by_id, create_assignment, update_assignment, delete_assignment,
+    create_optimized_assignments, clone_day, clone_week, complete_assignment
 )
 from app.components.common.base import base_component
 from app.components.common.page import page_view
@@ -11,9 +12,12 @@ from app.components.crew.services import get_all_crews
 from app.components.route.services import get_all_routes
 from app.components.client.services import get_all_clients
 from app.components.zone.services import get_all_zones
-from datetime import date
+from datetime import date, datetime, timedelta
 from starlette.responses import RedirectResponse
 from starlette.requests import Request
+import logging
+
+logger = logging.getLogger(__name__)
 
 async def assignment_list_view(req: Request):
     """Renders the assignment list view for a specific date."""
@@ -47,7 +51,11 @@ async def assignment_list_view(req: Request):
             ),
             cls="table-responsive"
         ),
-        A("Add New Assignment", href=f"/assignments/add?date={assignment_date}", cls="button")
+        A("Add New Assignment", href=f"/assignments/add?date={assignment_date}", cls="button"),
+        " ",
+        A("Plan Automatically", href=f"/assignments/optimize?date={assignment_date}", cls="button"),
+        " ",
+        A("Copy to Other Dates", href=f"/assignments/clone?date={assignment_date}", cls="button")
     ]
     return page_view(req, "Assignment List", content)
 
@@ -64,9 +72,80 @@ async def assignment_add_view(req: Request):
         return page_view(req, "Add Assignment", content)
     elif req.method == "POST":
         data = await req.form()
-        create_assignment(data)
+        try:
+            create_assignment(data)
+        except ValueError as e:
+            logger.error(f"Error creating assignment: {e}")
+            content = [
+                P(str(e), style="color:red"),
+                assignment_form("/assignments/add", crews=get_all_crews(), routes=get_all_routes(),
+                                clients=get_all_clients(), zones=get_all_zones())
+            ]
+            return page_view(req, "Add Assignment", content)
         return RedirectResponse("/assignments", status_code=303)
 
+async def assignment_optimize_view(req: Request):
+    """Plans and creates assignments for every unassigned route of a day."""
+    if req.method == "GET":
+        content = [
+            optimize_form("/assignments/optimize", assignment_date=req.query_params.get("date", str(date.today())))
+        ]
+        return page_view(req, "Plan Assignments", content)
+    elif req.method == "POST":
+        data = await req.form()
+        try:
+            assignment_date = datetime.strptime(data.get('doc'), '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return page_view(req, "Plan Assignments", [P("Invalid date.", style="color:red"), optimize_form("/assignments/optimize")])
+        plan = create_optimized_assignments(assignment_date)
+        content = [
+            H1(f"Planned Assignments for {assignment_date}"),
+            P(f"{len(plan.assignments)} routes assigned, {len(plan.unassigned)} left unassigned, "
+              f"{len(plan.skipped)} suspended by events."),
+            Table(
+                Thead(Tr(Th("Crew"), Th("Planned Hours"))),
+                Tbody(*[Tr(Td(str(crew_id)), Td(f"{hours:.1f}")) for crew_id, hours in sorted(plan.crew_hours.items())]),
+                cls="table-responsive"
+            ),
+            P(f"Unassigned routes: {', '.join(map(str, plan.unassigned))}") if plan.unassigned else "",
+            A("View Assignments", href=f"/assignments?date={assignment_date}", cls="button")
+        ]
+        return page_view(req, "Plan Assignments", content)
+
+async def assignment_clone_view(req: Request):
+    """Copies a day's or a week's assignments onto later dates in one go."""
+    if req.method == "GET":
+        source_date = req.query_params.get("date", str(date.today()))
+        content = [clone_form("/assignments/clone", source_date=source_date)]
+        return page_view(req, "Copy Assignments", content)
+    elif req.method == "POST":
+        data = await req.form()
+        try:
+            source = datetime.strptime(data.get('source_date'), '%Y-%m-%d').date()
+            target = datetime.strptime(data.get('target_date'), '%Y-%m-%d').date()
+            copies = max(1, min(52, int(data.get('copies') or 1)))
+        except (TypeError, ValueError):
+            return page_view(req, "Copy Assignments", [P("Invalid dates or number of copies.", style="color:red"),
+                                                       clone_form("/assignments/clone")])
+        try:
+            if data.get('mode') == "week":
+                new_ids = clone_week(source, target, copies)
+            else:
+                new_ids = clone_day(source, [target + timedelta(days=i) for i in range(copies)])
+        except ValueError as e:
+            logger.error(f"Error copying assignments: {e}")
+            content = [
+                P(str(e), style="color:red"),
+                clone_form("/assignments/clone", source_date=str(source), target_date=str(target))
+            ]
+            return page_view(req, "Copy Assignments", content)
+        content = [
+            H1("Assignments Copied"),
+            P(f"{len(new_ids)} assignments created from {source}."),
+            A("View Assignments", href=f"/assignments?date={target}", cls="button")
+        ]
+        return page_view(req, "Copy Assignments", content)
+
 async def assignment_edit_view(req: Request, assignment_id: int):
     """Handles editing an existing assignment."""
     assignment = get_assignment_by_id(assignment_id)
@@ -85,7 +164,16 @@ async def assignment_edit_view(req: Request, assignment_id: int):
         return page_view(req, "Edit Assignment", content)
     elif req.method == "POST":
         data = await req.form()
-        update_assignment(assignment_id, data)
+        try:
+            update_assignment(assignment_id, data)
+        except ValueError as e:
+            logger.error(f"Error updating assignment: {e}")
+            content = [
+                P(str(e), style="color:red"),
+                assignment_form(f"/assignments/edit/{assignment_id}", assignment=assignment, crews=get_all_crews(),
+                                routes=get_all_routes(), clients=get_all_clients(), zones=get_all_zones())
+            ]
+            return page_view(req, "Edit Assignment", content)
         return RedirectResponse("/assignments", status_code=303)
 
 async def assignment_delete_view(req: Request, assignment_id: int):
@@ -188,4 +276,37 @@ async def attendance_view(req: Request):
         assignment = get_assignment_by_id(assignment_id)
         if assignment:
             assignment.mark_attendance(attendance, ppe_compliance)
-        return RedirectResponse("/assignments/attendance", status_code=303)
\ No newline at end of file
+        return RedirectResponse("/assignments/attendance", status_code=303)
+
+async def completion_view(req: Request):
+    """Records the end time and collected weight of today's assignments."""
+    if req.method == "POST":
+        data = await req.form()
+        try:
+            complete_assignment(int(data.get("assignment_id")), data)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error completing assignment: {e}")
+            return page_view(req, "Complete Assignments", [
+                P("Invalid assignment, end time or weight.", style="color:red"),
+                A("Back", href="/assignments/complete", cls="button")
+            ])
+        return RedirectResponse("/assignments/complete", status_code=303)
+
+    assignments = get_assignments_for_date(str(date.today()))
+    content = [
+        H1("Complete Assignments"),
+        Div(
+            cls="grid",
+            children=[
+                Div(
+                    cls="card",
+                    children=[
+                        H2(f"Crew {assignment.crew_id}"),
+                        P(f"Assignment ID: {assignment.id}, Route {assignment.route_id}"),
+                        completion_form("/assignments/complete", assignment)
+                    ]
+                ) for assignment in assignments
+            ]
+        )
+    ]
+    return page_view(req, "Complete Assignments", content)
@@ -12,6 +12,9 @@ def registration_form(action_url, zone=None):
             Label("Username:", For="username"),
             Input(type="text", name="username", id="username", required=True, placeholder="Enter username"),
 
+            Label("Email:", For="email"),
+            Input(type="email", name="email", id="email", placeholder="Where supervisor alerts are sent"),
+
             Label("Password:", For="password"),
             Input(type="password", name="password", id="password", required=True, placeholder="Enter password"),
 
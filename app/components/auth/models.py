@@ -17,6 +17,7 @@ class User:
     username: str = field(default="")
     password_hash: str = field(default="")  # Store hashed passwords
     role: str = field(default="")            # Role of the user, e.g., Admin, Supervisor, Dispatch
+    email: str = field(default="")           # Where alerts for the user's role are sent
 
     __tablename__ = 'users'
 
@@ -28,11 +29,16 @@ class User:
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT NOT NULL UNIQUE,
             password_hash TEXT NOT NULL,
-            role TEXT NOT NULL
+            role TEXT NOT NULL,
+            email TEXT NOT NULL DEFAULT ''
         )
         '''
         try:
             db.execute(query)
+            # Add columns introduced after the table was first created
+            existing_columns = {row['name'] for row in db.execute(f"PRAGMA table_info({cls.__tablename__})").fetchall()}
+            if 'email' not in existing_columns:
+                db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN email TEXT NOT NULL DEFAULT ''")
             db.commit()
             logger.info(f"Table '{cls.__tablename__}' ensured in database.")
         except Exception as e:
@@ -50,6 +56,17 @@ class User:
             logger.exception(f"Error fetching users")
             return None
 
+    @classmethod
+    def find_by_role(cls, role: str) -> List['User']:
+        """Fetches the users with a role, e.g. every Supervisor."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE role = ?"
+        try:
+            rows = db.execute(query, (role,)).fetchall()
+            return [cls(**row) for row in rows]
+        except Exception as e:
+            logger.exception(f"Error fetching users with role '{role}': {e}")
+            return []
+
     @classmethod
     def find_by_username(cls, username: str) -> Optional['User']:
         """Finds a user by their username."""
@@ -85,10 +102,10 @@ class User:
         if self.id is None:
             # Insert new user
             query = f'''
-            INSERT INTO {self.__tablename__} (username, password_hash, role)
-            VALUES (?, ?, ?)
+            INSERT INTO {self.__tablename__} (username, password_hash, role, email)
+            VALUES (?, ?, ?, ?)
             '''
-            params = (self.username, self.password_hash, self.role)
+            params = (self.username, self.password_hash, self.role, self.email)
             try:
                 db.execute(query, params)
                 self.id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
@@ -101,10 +118,10 @@ class User:
             # Update existing user
             query = f'''
             UPDATE {self.__tablename__}
-            SET username = ?, password_hash = ?, role = ?
+            SET username = ?, password_hash = ?, role = ?, email = ?
             WHERE id = ?
             '''
-            params = (self.username, self.password_hash, self.role, self.id)
+            params = (self.username, self.password_hash, self.role, self.email, self.id)
             try:
                 db.execute(query, params)
                 db.commit()
@@ -115,7 +115,7 @@ def register_user(data):
     """
     Registers a new user in the system.
     Args:
-        data (dict): User data including username, password, confirm_password, and role.
+        data (dict): User data including username, password, confirm_password, role and an optional email.
     Raises:
         ValueError: If validation fails or username already exists.
     """
@@ -123,6 +123,7 @@ def register_user(data):
     password = data.get('password')
     confirm_password = data.get('confirm_password')
     role = data.get('role')
+    email = (data.get('email') or "").strip()
 
     # Validation
     if not username or not password or not confirm_password or not role:
@@ -137,7 +138,7 @@ def register_user(data):
 
     try:
         hashed_password = hash_password(password)
-        new_user = User(username=username, role=role)
+        new_user = User(username=username, role=role, email=email)
         new_user.password_hash = hashed_password  # Set the password_hash directly
         new_user.save()
         logger.info(f"New user registered: {username}")
@@ -1,10 +1,14 @@
 # app/components/auth/utils.py
 
+import logging
 from typing import Optional
 from starlette.requests import Request
+from starlette.websockets import WebSocket
 from app.components.auth.models import User
 from app.components.auth.services import decode_token
 
+logger = logging.getLogger(__name__)
+
 def get_current_user(req: Request) -> Optional[User]:
     """
     Retrieves the current user from the session using the access token.
@@ -15,4 +19,18 @@ def get_current_user(req: Request) -> Optional[User]:
         if decoded_token:
             user_id = decoded_token.get('user_id')
             return User.find_by_id(user_id)
-    return None
\ No newline at end of file
+    return None
+
+def requires_websocket(roles):
+    """
+    Decorator to require specific user roles for a websocket endpoint.
+    Unauthorized connections are closed before the handshake is accepted, which rejects them with a 403.
+    """
+    def decorator(func):
+        async def wrapper(websocket: WebSocket):
+            if websocket.session.get("user_role") in roles:
+                return await func(websocket)
+            logger.warning(f"Rejected unauthorized WebSocket connection to {websocket.url.path}")
+            await websocket.close(code=1008)
+        return wrapper
+    return decorator
@@ -1,8 +1,6 @@
 # app/components/common/header.py
 
 from fasthtml.common import *
-from app.components.auth.models import User
-from app.components.auth.services import decode_token
 
 def genereate_submenu(title, item_list):
     if type(title) is not str:
@@ -98,6 +96,9 @@ def header_component(req):
 
 def get_current_user(req):
     """Helper function to get the current user."""
+    # Imported here to prevent circular dependencies
+    from app.components.auth.models import User
+    from app.components.auth.services import decode_token
     access_token = req.session.get('access_token')
     if access_token:
         decoded_token = decode_token(access_token)
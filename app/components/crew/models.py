@@ -42,8 +42,8 @@ class Crew:
     def find_by_id(cls, crew_id: int) -> Optional['Crew']:
         """Finds a crew by ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.fetch_one(query, (crew_id,))
-        return cls(**cls._parse_row(row)) if row else None
+        rows = db.q(query, (crew_id,))
+        return cls(**cls._parse_row(rows[0])) if rows else None
 
     def save(self) -> None:
         """Inserts or updates the crew in the database."""
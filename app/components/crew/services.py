@@ -1,6 +1,8 @@
 # components/crew/services.py
 
-from app.components.crew.models import Crew
+from datetime import date, time
+from app.components.crew.models import Crew, db
+from app.service.conflict_service import BookingIndex, assignment_bookings, describe_conflicts
 
 def get_all_crews():
     """Fetches all crews."""
@@ -21,14 +23,42 @@ def create_crew(data):
     crew.save()
 
 def update_crew(crew_id, data):
-    """Updates an existing crew."""
+    """
+    Updates an existing crew. Assignments book the crew's driver, truck and loaders as they
+    were when booked, so the crew's assignments from today on are rebooked in the same transaction.
+    Raises:
+        ValueError: If a new member is already booked during one of those assignments.
+    """
     crew = get_crew_by_id(crew_id)
     if crew:
         loaders = data.getlist('loaders')
         crew.driver_id = int(data.get('driver_id'))
         crew.truck_id = int(data.get('truck_id'))
         crew.loaders = list(map(int, loaders))
-        crew.save()
+        with db.conn:
+            crew.save()
+            rebook_crew_assignments(crew)
+
+def rebook_crew_assignments(crew, since=None):
+    """
+    Replaces the bookings of the crew's assignments from `since` (today by default) with
+    bookings of its current members, checked as one batch.
+    Raises:
+        ValueError: If a member is already booked during one of the assignments.
+    """
+    since = since or date.today()
+    rows = db.q("SELECT id, doc, start_time, end_time FROM assignments WHERE crew_id = ? AND doc >= ?",
+                (crew.id, since.isoformat()))
+    bookings = [booking for row in rows for booking in assignment_bookings(
+        row['id'], date.fromisoformat(row['doc']), time.fromisoformat(row['start_time']),
+        time.fromisoformat(row['end_time']) if row['end_time'] else None,
+        crew.id, crew.driver_id, crew.truck_id, crew.loaders
+    )]
+    index = BookingIndex(db)
+    conflicts = index.check_many(bookings)
+    if conflicts:
+        raise ValueError(describe_conflicts(conflicts))
+    index.book(bookings)
 
 def delete_crew(crew_id):
     """Deletes an existing crew."""
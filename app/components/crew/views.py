@@ -65,7 +65,14 @@ async def crew_edit_view(req: Request, crew_id: int):
         return page_view(req, "Edit Crew", content)
     elif req.method == "POST":
         data = await req.form()
-        update_crew(crew_id, data)
+        try:
+            update_crew(crew_id, data)
+        except ValueError as e:
+            content = [
+                P(str(e), style="color:red"),
+                crew_form(f"/crews/edit/{crew_id}", crew=crew)
+            ]
+            return page_view(req, "Edit Crew", content)
         return RedirectResponse("/crews", status_code=303)
 
 async def crew_delete_view(req: Request, crew_id: int):
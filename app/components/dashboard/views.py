@@ -103,8 +103,11 @@ async def supervisor_dashboard_view(req: Request):
         from app.components.schedule.models import Schedule
         from app.components.assignment.models import Assignment
 
+        from app.components.report.services import get_completion_trend
+
         schedules = Schedule.find_all()
         assignments = Assignment.find_all_for_date(date.today())
+        trend = get_completion_trend(days=14)
     except Exception as e:
         logger.error(f"Error fetching data for supervisor dashboard: {e}")
         return page_view(req, "Error", [Div("An error occurred while loading the dashboard.")])
@@ -136,6 +139,19 @@ async def supervisor_dashboard_view(req: Request):
                 Div(A("View Assignment", href=f"/assignments/view/{assignment.id}"))
             ) for assignment in assignments
         ]) if assignments else P("No assignments for today."),
+        H2("Completion Trend (Last 14 Days)"),
+        Table(
+            Thead(Tr(Th("Date"), Th("Assignments"), Th("Completed"), Th("Hours"))),
+            Tbody(*[
+                Tr(
+                    Td(day['stat_date']),
+                    Td(str(day['assignments'])),
+                    Td(str(day['completed'])),
+                    Td(str(day['completion_hours']))
+                ) for day in trend
+            ]),
+            cls="table-responsive"
+        ) if trend else P("No rollup data available yet."),
     ]
     return page_view(req, "Supervisor Dashboard", content)
 
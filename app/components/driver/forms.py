@@ -50,6 +50,17 @@ def driver_form(action_url, method="post", driver=None):
                 max=str(date.today())
             )
         ),
+        Div(
+            Label("Email:", For="email"),
+            Input(
+                name="email",
+                type="email",
+                id="email",
+                value=driver.email if driver else "",
+                placeholder="Where schedule notifications are sent",
+                required=False
+            )
+        ),
         Button("Submit", type="submit"),
         action=action_url,
         method=method
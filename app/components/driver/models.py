@@ -15,6 +15,7 @@ class Driver:
     license_number: str = field(default="")
     license_expiry: Optional[date] = field(default=None)
     last_medical_check: Optional[date] = field(default=None)
+    email: str = field(default="")  # Where schedule notifications are sent
 
     __tablename__ = 'drivers'
 
@@ -27,11 +28,17 @@ class Driver:
             name TEXT NOT NULL,
             license_number TEXT NOT NULL UNIQUE,
             license_expiry DATE NOT NULL,
-            last_medical_check DATE
+            last_medical_check DATE,
+            email TEXT NOT NULL DEFAULT ''
         )
         '''
         db.execute(query)
 
+        # Add columns introduced after the table was first created
+        existing_columns = {row['name'] for row in db.q(f"PRAGMA table_info({cls.__tablename__})")}
+        if 'email' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN email TEXT NOT NULL DEFAULT ''")
+
     @classmethod
     def find_all(cls) -> List['Driver']:
         """Fetches all drivers from the database."""
@@ -43,33 +50,48 @@ class Driver:
     def find_by_id(cls, driver_id: int) -> Optional['Driver']:
         """Finds a driver by ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.fetch_one(query, (driver_id,))
-        return cls(**cls._parse_row(row)) if row else None
+        rows = db.q(query, (driver_id,))
+        return cls(**cls._parse_row(rows[0])) if rows else None
+
+    @classmethod
+    def find_by_ids(cls, driver_ids: List[int]) -> List['Driver']:
+        """Fetches the drivers with the given IDs in one query."""
+        if not driver_ids:
+            return []
+        placeholders = ",".join("?" * len(driver_ids))
+        query = f"SELECT * FROM {cls.__tablename__} WHERE id IN ({placeholders})"
+        rows = db.q(query, tuple(driver_ids))
+        return [cls(**cls._parse_row(row)) for row in rows]
 
     @classmethod
     def find_by_license_number(cls, license_number: str) -> Optional['Driver']:
         """Finds a driver by their license number."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE license_number = ?"
-        row = db.q(query, (license_number,))
-        return cls(**cls._parse_row(row)) if row else None
+        rows = db.q(query, (license_number,))
+        return cls(**cls._parse_row(rows[0])) if rows else None
 
     def save(self) -> None:
         """Inserts or updates the driver in the database."""
+        # Dates are stored as ISO text
+        license_expiry = str(self.license_expiry) if self.license_expiry else None
+        last_medical_check = str(self.last_medical_check) if self.last_medical_check else None
         if self.id is None:
             # Insert new driver
             query = f'''
-            INSERT INTO {self.__tablename__} (name, license_number, license_expiry, last_medical_check)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO {self.__tablename__} (name, license_number, license_expiry, last_medical_check, email)
+            VALUES (?, ?, ?, ?, ?)
             '''
-            self.id = db.t.drivers.insert(name=self.name, license_number=self.license_number, license_expiry=self.license_expiry, last_medical_check=self.last_medical_check)
+            params = (self.name, self.license_number, license_expiry, last_medical_check, self.email)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing driver
             query = f'''
             UPDATE {self.__tablename__}
-            SET name = ?, license_number = ?, license_expiry = ?, last_medical_check = ?
+            SET name = ?, license_number = ?, license_expiry = ?, last_medical_check = ?, email = ?
             WHERE id = ?
             '''
-            params = (self.name, self.license_number, self.license_expiry, self.last_medical_check, self.id)
+            params = (self.name, self.license_number, license_expiry, last_medical_check, self.email, self.id)
             db.execute(query, params)
 
     def delete(self) -> None:
@@ -85,7 +107,8 @@ class Driver:
             'name': row['name'],
             'license_number': row['license_number'],
             'license_expiry': row['license_expiry'],
-            'last_medical_check': row['last_medical_check']
+            'last_medical_check': row['last_medical_check'],
+            'email': row['email']
         }
 
     def __ft__(self):
@@ -97,6 +120,7 @@ class Driver:
             Div(f"License Number: {self.license_number}"),
             Div(f"License Expiry: {self.license_expiry}"),
             Div(f"Last Medical Check: {self.last_medical_check}"),
+            Div(f"Email: {self.email or 'Not set - schedule notifications cannot be sent'}"),
             Div(
                 A("Edit", href=f"/drivers/edit/{self.id}"),
                 " | ",
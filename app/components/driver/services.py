@@ -22,6 +22,7 @@ def create_driver(data):
     license_number = data.get('license_number')
     license_expiry = data.get('license_expiry')
     last_medical_check = data.get('last_medical_check', None)
+    email = (data.get('email') or "").strip()
 
     # Input Validation
     if not name or not license_number or not license_expiry:
@@ -53,7 +54,8 @@ def create_driver(data):
         name=name,
         license_number=license_number,
         license_expiry=license_expiry_date,
-        last_medical_check=last_medical_check_date
+        last_medical_check=last_medical_check_date,
+        email=email
     )
     new_driver.save()
 
@@ -71,6 +73,7 @@ def update_driver(driver_id: int, data):
     license_number = data.get('license_number')
     license_expiry = data.get('license_expiry')
     last_medical_check = data.get('last_medical_check', None)
+    email = (data.get('email') or "").strip()
 
     # Input Validation
     if not name or not license_number or not license_expiry:
@@ -103,6 +106,7 @@ def update_driver(driver_id: int, data):
     driver.license_number = license_number
     driver.license_expiry = license_expiry_date
     driver.last_medical_check = last_medical_check_date
+    driver.email = email
     driver.save()
 
 def delete_driver(driver_id: int):
@@ -83,6 +83,8 @@ def event_form(action_url, method="post", event=None):
             )(event.additional_info if event else "")
         ),
         Button("Submit", type="submit"),
+        " ",
+        Button("Preview Impact", type="submit", name="preview", value="1", cls="secondary"),
         action=action_url,
         method=method
     )
\ No newline at end of file
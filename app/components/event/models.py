@@ -50,20 +50,23 @@ class Event:
     def find_by_id(cls, event_id: int):
         """Finds an event by ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.q(query, (event_id,))
-        return cls(**cls._parse_row(row)) if row else None
+        rows = db.q(query, (event_id,))
+        return cls(**cls._parse_row(rows[0])) if rows else None
 
     def save(self):
         """Inserts or updates the event in the database."""
         affected_clients_str = ','.join(map(str, self.affected_clients))
+        start_date = self.start_date.isoformat() if isinstance(self.start_date, date) else self.start_date
+        end_date = self.end_date.isoformat() if isinstance(self.end_date, date) else self.end_date
         if self.id is None:
             # Insert new event
             query = f'''
             INSERT INTO {self.__tablename__} (name, description, start_date, end_date, affected_clients, event_type, additional_info)
             VALUES (?, ?, ?, ?, ?, ?, ?)
             '''
-            params = (self.name, self.description, self.start_date, self.end_date, affected_clients_str, self.event_type, self.additional_info)
-            self.id = db.insert(query, params)
+            params = (self.name, self.description, start_date, end_date, affected_clients_str, self.event_type, self.additional_info)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing event
             query = f'''
@@ -71,7 +74,7 @@ class Event:
             SET name = ?, description = ?, start_date = ?, end_date = ?, affected_clients = ?, event_type = ?, additional_info = ?
             WHERE id = ?
             '''
-            params = (self.name, self.description, self.start_date, self.end_date, affected_clients_str, self.event_type, self.additional_info, self.id)
+            params = (self.name, self.description, start_date, end_date, affected_clients_str, self.event_type, self.additional_info, self.id)
             db.execute(query, params)
 
     def delete(self):
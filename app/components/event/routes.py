@@ -5,7 +5,7 @@ from starlette.responses import RedirectResponse
 
 # Import views
 from app.components.event.views import (
-    event_list_view, event_add_view, event_edit_view, event_delete_view
+    event_list_view, event_add_view, event_edit_view, event_delete_view, event_impact_view
 )
 from app.components.dashboard.views import (
     admin_dashboard_view, supervisor_dashboard_view, dispatch_dashboard_view
@@ -61,6 +61,11 @@ def setup_routes(app):
     async def delete_event(req, event_id):
         return await event_delete_view(req, event_id)
 
+    @app.route("/events/impact/{event_id:int}", methods=["GET", "POST"])
+    @requires(["Admin"], redirect="/auth/login")
+    async def event_impact(req, event_id):
+        return await event_impact_view(req, event_id)
+
     # Error handling
     @app.exception_handler(404)
     async def not_found(req, exc):
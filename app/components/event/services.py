@@ -1,8 +1,10 @@
 # components/event/services.py
 
-from app.components.event.models import Event
-from datetime import datetime
-from typing import List
+from app.components.event.models import Event, db
+from app.components.report.services import refresh_daily_rollups
+from app.service.event_impact_service import EventImpactEngine, EventImpact
+from datetime import date, datetime
+from typing import List, Optional
 
 def get_all_events() -> List[Event]:
     """Fetches all events."""
@@ -12,9 +14,9 @@ def get_event_by_id(event_id: int) -> Event:
     """Fetches an event by its ID."""
     return Event.find_by_id(event_id)
 
-def create_event(data):
+def parse_event_data(data) -> dict:
     """
-    Creates a new event.
+    Validates event form data and returns the event's fields.
     Raises:
         ValueError: If validation fails.
     """
@@ -41,7 +43,7 @@ def create_event(data):
 
     affected_clients_list = list(map(int, affected_clients)) if affected_clients else []
 
-    new_event = Event(
+    return dict(
         name=name,
         description=description,
         start_date=start_date_obj,
@@ -50,52 +52,94 @@ def create_event(data):
         event_type=event_type,
         additional_info=additional_info
     )
-    new_event.save()
 
-def update_event(event_id: int, data):
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def plan_event_impact(event: Event, engine: Optional[EventImpactEngine] = None) -> EventImpact:
+    """Dry run: the assignment changes applying the event would make, undoing its earlier ones first."""
+    engine = engine or EventImpactEngine(db)
+    return engine.plan(event.id, _as_date(event.start_date), _as_date(event.end_date),
+                       event.affected_clients, event.event_type)
+
+def refresh_impact_rollups(impact: EventImpact):
+    """Re-aggregates the daily rollups over the days an applied impact moved assignments from and to."""
+    days = impact.affected_days()
+    if days:
+        refresh_daily_rollups(days[0], days[-1])
+
+def create_event(data) -> EventImpact:
     """
-    Updates an existing event.
+    Creates a new event and reschedules the assignments it affects.
     Raises:
-        ValueError: If validation fails.
+        ValueError: If validation fails or a moved assignment would double-book its crew's members.
+    """
+    new_event = Event(**parse_event_data(data))
+    # The event and the assignments it moves commit together
+    with db.conn:
+        new_event.save()
+        engine = EventImpactEngine(db)
+        impact = plan_event_impact(new_event, engine)
+        engine.apply(impact)
+    refresh_impact_rollups(impact)
+    return impact
+
+def update_event(event_id: int, data) -> EventImpact:
+    """
+    Updates an existing event, undoing its earlier rescheduling and applying the new one.
+    Raises:
+        ValueError: If validation fails or a moved assignment would double-book its crew's members.
     """
     event = get_event_by_id(event_id)
     if not event:
         raise ValueError("Event not found.")
 
-    name = data.get('name')
-    description = data.get('description', "")
-    event_type = data.get('event_type')
-    start_date = data.get('start_date')
-    end_date = data.get('end_date')
-    affected_clients = data.getlist('affected_clients')
-    additional_info = data.get('additional_info', "")
-
-    # Input Validation
-    if not name or not event_type or not start_date or not end_date:
-        raise ValueError("Event Name, Event Type, Start Date, and End Date are required.")
-
-    # Date Validation
-    try:
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-        if start_date_obj > end_date_obj:
-            raise ValueError("Start Date cannot be after End Date.")
-    except ValueError:
-        raise ValueError("Invalid date format.")
+    for name, value in parse_event_data(data).items():
+        setattr(event, name, value)
+    with db.conn:
+        event.save()
+        engine = EventImpactEngine(db)
+        impact = plan_event_impact(event, engine)
+        engine.apply(impact)
+    refresh_impact_rollups(impact)
+    return impact
 
-    affected_clients_list = list(map(int, affected_clients)) if affected_clients else []
+def preview_event_impact(data, event_id: Optional[int] = None) -> EventImpact:
+    """
+    Dry run of creating or editing an event from form data. Nothing is written.
+    Raises:
+        ValueError: If validation fails.
+    """
+    return plan_event_impact(Event(id=event_id, **parse_event_data(data)))
 
-    event.name = name
-    event.description = description
-    event.start_date = start_date_obj
-    event.end_date = end_date_obj
-    event.affected_clients = affected_clients_list
-    event.event_type = event_type
-    event.additional_info = additional_info
-    event.save()
+def reapply_event(event_id: int) -> EventImpact:
+    """
+    Applies an existing event again, e.g. to assignments created after it.
+    Raises:
+        ValueError: If the event does not exist or a moved assignment would double-book its crew's members.
+    """
+    event = get_event_by_id(event_id)
+    if not event:
+        raise ValueError("Event not found.")
+    with db.conn:
+        engine = EventImpactEngine(db)
+        impact = plan_event_impact(event, engine)
+        engine.apply(impact)
+    refresh_impact_rollups(impact)
+    return impact
 
 def delete_event(event_id: int):
-    """Deletes an existing event."""
+    """
+    Deletes an existing event, putting the assignments it moved back where they were.
+    Raises:
+        ValueError: If an assignment's crew members were booked elsewhere at its original time since.
+    """
     event = get_event_by_id(event_id)
     if event:
-        event.delete()
\ No newline at end of file
+        with db.conn:
+            engine = EventImpactEngine(db)
+            impact = engine.plan(event.id, None, None, [], event.event_type)
+            engine.apply(impact)
+            engine.forget(event.id)
+            event.delete()
+        refresh_impact_rollups(impact)
@@ -3,8 +3,10 @@
 from fasthtml.common import *
 from app.components.event.forms import event_form
 from app.components.event.services import (
-    get_all_events, get_event_by_id, create_event, update_event, delete_event
+    get_all_events, get_event_by_id, create_event, update_event, delete_event,
+    parse_event_data, preview_event_impact, plan_event_impact, reapply_event
 )
+from app.components.event.models import Event
 from app.components.common.page import page_view
 from starlette.responses import RedirectResponse
 from starlette.requests import Request
@@ -12,6 +14,36 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def impact_table(impact, title="Impact on Assignments"):
+    """Renders the assignment changes of an event as a before/after diff."""
+    def describe(state):
+        times = state.start_time.strftime("%H:%M") + (f"-{state.end_time.strftime('%H:%M')}" if state.end_time else "")
+        return f"{state.doc} {times} ({state.week_type})"
+
+    return Div(
+        H2(title),
+        P(f"{impact.count('shift')} to shift, {impact.count('mark')} to mark as event work, "
+          f"{impact.count('revert')} to put back."),
+        Table(
+            Thead(Tr(Th("Assignment"), Th("Crew"), Th("Route"), Th("Client"), Th("Change"), Th("Before"), Th("After"))),
+            Tbody(
+                *[
+                    Tr(
+                        Td(str(change.assignment_id)),
+                        Td(str(change.crew_id)),
+                        Td(str(change.route_id)),
+                        Td(str(change.client_id)),
+                        Td(change.action.capitalize()),
+                        Td(describe(change.before)),
+                        Td(describe(change.after))
+                    ) for change in impact.changes
+                ]
+            ),
+            cls="table-responsive"
+        ),
+        *[P(warning, style="color:orange") for warning in impact.warnings]
+    )
+
 async def event_list_view(req: Request):
     """Generates the event list view."""
     events = get_all_events()
@@ -28,10 +60,12 @@ async def event_list_view(req: Request):
                     Tr(
                         Td(str(event.id)),
                         Td(event.name),
-                        Td(event.date.isoformat()),
+                        Td(f"{event.start_date} to {event.end_date}"),
                         Td(
                             A("Edit", href=f"/events/edit/{event.id}", cls="button small"),
                             " ",
+                            A("Impact", href=f"/events/impact/{event.id}", cls="button small"),
+                            " ",
                             A("Delete", href=f"/events/delete/{event.id}", cls="button small danger")
                         )
                     ) for event in events
@@ -53,6 +87,12 @@ async def event_add_view(req: Request):
     elif req.method == "POST":
         data = await req.form()
         try:
+            if data.get("preview"):
+                content = [
+                    impact_table(preview_event_impact(data)),
+                    event_form("/events/add", event=Event(**parse_event_data(data)))
+                ]
+                return page_view(req, "Add Event", content)
             create_event(data)
             return RedirectResponse("/events", status_code=303)
         except ValueError as e:
@@ -77,6 +117,12 @@ async def event_edit_view(req: Request, event_id: int):
     elif req.method == "POST":
         data = await req.form()
         try:
+            if data.get("preview"):
+                content = [
+                    impact_table(preview_event_impact(data, event_id)),
+                    event_form(f"/events/edit/{event_id}", event=Event(id=event_id, **parse_event_data(data)))
+                ]
+                return page_view(req, "Edit Event", content)
             update_event(event_id, data)
             return RedirectResponse("/events", status_code=303)
         except ValueError as e:
@@ -94,7 +140,15 @@ async def event_delete_view(req: Request, event_id: int):
         return page_view(req, "Error", [Div("Event not found.")])
 
     if req.method == "POST":
-        delete_event(event_id)
+        try:
+            delete_event(event_id)
+        except ValueError as e:
+            logger.error(f"Error deleting event: {e}")
+            content = [
+                P(str(e), style="color:red"),
+                A("Back to Events", href="/events", cls="button")
+            ]
+            return page_view(req, "Delete Event", content)
         return RedirectResponse("/events", status_code=303)
     else:
         content = [
@@ -105,4 +159,39 @@ async def event_delete_view(req: Request, event_id: int):
                 method="post"
             )
         ]
-        return page_view(req, "Delete Event", content)
\ No newline at end of file
+        return page_view(req, "Delete Event", content)
+
+async def event_impact_view(req: Request, event_id: int):
+    """Shows what applying an event changes (dry run), and applies it again on confirmation."""
+    event = get_event_by_id(event_id)
+    if not event:
+        return page_view(req, "Error", [Div("Event not found.")])
+
+    if req.method == "POST":
+        try:
+            impact = reapply_event(event_id)
+        except ValueError as e:
+            logger.error(f"Error applying event: {e}")
+            content = [
+                P(str(e), style="color:red"),
+                A("Back to Events", href="/events", cls="button")
+            ]
+            return page_view(req, "Event Impact", content)
+        content = [
+            H1(f"Applied '{event.name}'"),
+            impact_table(impact, title="Changes Made"),
+            A("Back to Events", href="/events", cls="button")
+        ]
+        return page_view(req, "Event Impact", content)
+    impact = plan_event_impact(event)
+    content = [
+        H1(f"Impact of '{event.name}'"),
+        P(f"{event.event_type}, {event.start_date} to {event.end_date}"),
+        impact_table(impact),
+        Form(
+            Button("Apply Changes", type="submit", cls="button"),
+            action=f"/events/impact/{event_id}",
+            method="post"
+        ) if impact.changes else P("The event's assignments are up to date.")
+    ]
+    return page_view(req, "Event Impact", content)
@@ -190,4 +190,16 @@ def truck_form(action_url, method="post", truck=None):
         Button("Submit", type="submit"),
         action=action_url,
         method=method
-    )
\ No newline at end of file
+    )
+
+def allocation_form(action_url, method="get", allocation_date=""):
+    """Generates a form for choosing the day to allocate trucks for."""
+    return Form(
+        Div(
+            Label("Collection Date:", For="date"),
+            Input(name="date", type="date", value=allocation_date, required=True, id="date")
+        ),
+        Button("Allocate Trucks", type="submit"),
+        action=action_url,
+        method=method
+    )
@@ -5,7 +5,7 @@ from starlette.responses import RedirectResponse
 
 # Import views
 from app.components.fleet.views import (
-    fleet_list_view, fleet_add_view, fleet_edit_view, fleet_delete_view, fleet_view
+    fleet_list_view, fleet_add_view, fleet_edit_view, fleet_delete_view, fleet_view, fleet_allocation_view
 )
 from app.components.dashboard.views import (
     admin_dashboard_view, supervisor_dashboard_view, dispatch_dashboard_view
@@ -66,6 +66,11 @@ def setup_routes(app):
     async def view_fleet(req, truck_id):
         return await fleet_view(req, truck_id)
 
+    @app.route("/fleet/allocate", methods=["GET"])
+    @requires(["Admin", "Supervisor"], redirect="/auth/login")
+    async def allocate_fleet(req):
+        return await fleet_allocation_view(req)
+
     # Error handling
     @app.exception_handler(404)
     async def not_found(req, exc):
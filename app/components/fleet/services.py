@@ -1,7 +1,8 @@
 # app/components/fleet/services.py
 
 from app.components.fleet.models import Truck
-from datetime import datetime
+from app.service.allocation_service import plan_truck_allocation, AllocationPlan
+from datetime import date, datetime
 from typing import List
 
 def get_all_trucks() -> List[Truck]:
@@ -158,4 +159,8 @@ def parse_date(date_str, default=None):
             return datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
             raise ValueError(f"Invalid date format for {date_str}. Expected YYYY-MM-DD.")
-    return default
\ No newline at end of file
+    return default
+
+def get_truck_allocation(day: date) -> AllocationPlan:
+    """Plans which trucks collect which routes on a day, from estimated route tonnage."""
+    return plan_truck_allocation(day)
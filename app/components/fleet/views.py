@@ -1,10 +1,11 @@
 # components/fleet/views.py
 
 from fasthtml.common import *
-from app.components.fleet.forms import truck_form
+from app.components.fleet.forms import truck_form, allocation_form
 from app.components.fleet.services import (
-    get_all_trucks, get_truck_by_id, create_truck, update_truck, delete_truck
+    get_all_trucks, get_truck_by_id, create_truck, update_truck, delete_truck, get_truck_allocation
 )
+from datetime import date, datetime
 from app.components.common.page import page_view
 from starlette.responses import RedirectResponse
 from starlette.requests import Request
@@ -42,7 +43,9 @@ async def fleet_list_view(req: Request):
             ),
             cls="table-responsive"
         ),
-        A("Add New Truck", href="/fleet/add", cls="button")
+        A("Add New Truck", href="/fleet/add", cls="button"),
+        " ",
+        A("Allocate Trucks", href="/fleet/allocate", cls="button")
     ]
     return page_view(req, "Fleet Status", content)
 
@@ -133,4 +136,39 @@ async def fleet_view(req: Request, truck_id: int):
         A("Edit Truck", href=f"/fleet/edit/{truck.id}", cls="button"),
         A("Delete Truck", href=f"/fleet/delete/{truck.id}", cls="button danger")
     ]
-    return page_view(req, f"Truck {truck.truck_number}", content)
\ No newline at end of file
+    return page_view(req, f"Truck {truck.truck_number}", content)
+
+async def fleet_allocation_view(req: Request):
+    """Shows which trucks should collect which routes on a day."""
+    allocation_date = req.query_params.get("date", str(date.today()))
+    try:
+        day = datetime.strptime(allocation_date, "%Y-%m-%d").date()
+    except ValueError:
+        return page_view(req, "Truck Allocation", [P("Invalid date.", style="color:red"), allocation_form("/fleet/allocate")])
+    plan = get_truck_allocation(day)
+    content = [
+        H1(f"Truck Allocation for {day}"),
+        allocation_form("/fleet/allocate", allocation_date=allocation_date),
+        P(f"{plan.trucks_dispatched} trucks dispatched, {plan.overloaded_runs} overloaded runs, "
+          f"{len(plan.skipped)} routes suspended by events."),
+        Table(
+            Thead(Tr(Th("Truck"), Th("Capacity"), Th("Run"), Th("Routes"), Th("Planned Load"))),
+            Tbody(
+                *[
+                    Tr(
+                        Td(allocation.truck_number),
+                        Td(f"{allocation.capacity} kg"),
+                        Td(str(run_number)),
+                        Td(", ".join(map(str, routes))),
+                        Td(f"{load:.0f} kg", style="color:red" if load > allocation.capacity else None)
+                    )
+                    for allocation in plan.allocations
+                    for run_number, (routes, load) in enumerate(zip(allocation.runs, allocation.run_loads), start=1)
+                ]
+            ),
+            cls="table-responsive"
+        ),
+        P(f"Trucks overdue for inspection or brake check: {', '.join(map(str, plan.excluded_trucks))}") if plan.excluded_trucks else "",
+        P(f"Routes without a truck: {', '.join(map(str, plan.unallocated))}") if plan.unallocated else ""
+    ]
+    return page_view(req, "Truck Allocation", content)
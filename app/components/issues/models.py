@@ -38,6 +38,8 @@ class Issue:
         )
         '''
         db.execute(query)
+        # Date-range reports and rollups filter on the report timestamp
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.__tablename__}_date_reported ON {cls.__tablename__} (date_reported)")
 
     @classmethod
     def find_all(cls) -> List['Issue']:
@@ -89,7 +91,8 @@ class Issue:
                 self.crew_id, self.route_id, self.address, self.description, self.issue_type,
                 self.date_reported.strftime("%Y-%m-%d %H:%M:%S"), int(self.repeat_offender)
             )
-            self.id = db.insert(query, params)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing issue
             query = f'''
@@ -118,8 +121,7 @@ class Issue:
         FROM {self.__tablename__}
         WHERE address = ?
         '''
-        row = db.fetch_one(query, (self.address,))
-        count = row['occurrences']
+        count = db.q(query, (self.address,))[0]['occurrences']
         self.repeat_offender = count > 1
 
         # Update the issue with the repeat offender status if necessary
@@ -1,6 +1,7 @@
 # components/issues/services.py
 
 from app.components.issues.models import Issue
+from app.components.report.services import refresh_daily_rollups
 from datetime import datetime
 from typing import List
 
@@ -41,6 +42,8 @@ def create_issue(data):
         date_reported=date_reported
     )
     new_issue.save()
+    refresh_daily_rollups(new_issue.date_reported.date())
+    return new_issue
 
 def update_issue(issue_id: int, data):
     """
@@ -51,6 +54,7 @@ def update_issue(issue_id: int, data):
     issue = get_issue_by_id(issue_id)
     if not issue:
         raise ValueError("Issue not found.")
+    previous_date = issue.date_reported.date()
 
     try:
         crew_id = int(data['crew_id'])
@@ -73,9 +77,13 @@ def update_issue(issue_id: int, data):
     issue.issue_type = issue_type
     issue.date_reported = date_reported
     issue.save()
+    refresh_daily_rollups(issue.date_reported.date())
+    if previous_date != issue.date_reported.date():
+        refresh_daily_rollups(previous_date)
 
 def delete_issue(issue_id: int):
     """Deletes an existing issue."""
     issue = get_issue_by_id(issue_id)
     if issue:
-        issue.delete()
\ No newline at end of file
+        issue.delete()
+        refresh_daily_rollups(issue.date_reported.date())
\ No newline at end of file
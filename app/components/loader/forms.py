@@ -28,6 +28,17 @@ def loader_form(action_url, method="post", loader=None):
                 required=True
             )
         ),
+        Div(
+            Label("Email:", For="email"),
+            Input(
+                name="email",
+                type="email",
+                id="email",
+                value=loader.email if loader else "",
+                placeholder="Where schedule notifications are sent",
+                required=False
+            )
+        ),
         Button("Submit", type="submit"),
         action=action_url,
         method=method
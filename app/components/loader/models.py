@@ -2,7 +2,7 @@
 # models.py
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Optional, List
 from fastlite import Database
 
 # Initialize the FastLite database
@@ -13,6 +13,7 @@ class Loader:
     id: int = field(default=None)
     name: str = field(default="")
     pickup_spot: str = field(default="")
+    email: str = field(default="")  # Where schedule notifications are sent
 
     # Table name in the database
     __tablename__ = 'loaders'
@@ -24,11 +25,17 @@ class Loader:
         CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL UNIQUE,
-            pickup_spot TEXT NOT NULL
+            pickup_spot TEXT NOT NULL,
+            email TEXT NOT NULL DEFAULT ''
         )
         '''
         db.execute(query)
 
+        # Add columns introduced after the table was first created
+        existing_columns = {row['name'] for row in db.q(f"PRAGMA table_info({cls.__tablename__})")}
+        if 'email' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN email TEXT NOT NULL DEFAULT ''")
+
     @classmethod
     def find_all(cls):
         """Fetches all loaders from the database."""
@@ -40,38 +47,45 @@ class Loader:
     def find_by_id(cls, loader_id: int) -> Optional['Loader']:
         """Finds a loader by ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.fetch_one(query, (loader_id,))
-        if row:
-            return cls(**row)
-        return None
+        rows = db.q(query, (loader_id,))
+        return cls(**rows[0]) if rows else None
+
+    @classmethod
+    def find_by_ids(cls, loader_ids: List[int]) -> List['Loader']:
+        """Fetches the loaders with the given IDs in one query."""
+        if not loader_ids:
+            return []
+        placeholders = ",".join("?" * len(loader_ids))
+        query = f"SELECT * FROM {cls.__tablename__} WHERE id IN ({placeholders})"
+        rows = db.q(query, tuple(loader_ids))
+        return [cls(**row) for row in rows]
 
     @classmethod
     def find_by_name(cls, name: str) -> Optional['Loader']:
         """Finds a loader by name."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE name = ?"
-        row = db.q(query, (name,))
-        if row:
-            return cls(**row)
-        return None
+        rows = db.q(query, (name,))
+        return cls(**rows[0]) if rows else None
 
     def save(self):
         """Inserts or updates the loader in the database."""
         if self.id is None:
             # Insert new loader
             query = f'''
-            INSERT INTO {self.__tablename__} (name, pickup_spot)
-            VALUES (?, ?)
+            INSERT INTO {self.__tablename__} (name, pickup_spot, email)
+            VALUES (?, ?, ?)
             '''
-            params = (self.name, self.pickup_spot)
-            self.id = db.insert(query, params)
+            params = (self.name, self.pickup_spot, self.email)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing loader
             query = f'''
             UPDATE {self.__tablename__}
-            SET name = ?, pickup_spot = ?
+            SET name = ?, pickup_spot = ?, email = ?
             WHERE id = ?
             '''
-            params = (self.name, self.pickup_spot, self.id)
+            params = (self.name, self.pickup_spot, self.email, self.id)
             db.execute(query, params)
 
     def delete(self):
@@ -86,6 +100,7 @@ class Loader:
             Div(f"Loader ID: {self.id}"),
             Div(f"Name: {self.name}"),
             Div(f"Pickup Spot: {self.pickup_spot}"),
+            Div(f"Email: {self.email or 'Not set - schedule notifications cannot be sent'}"),
             Div(
                 A("Edit", href=f"/loaders/edit/{self.id}"),
                 " | ",
@@ -20,6 +20,7 @@ def create_loader(data):
     """
     name = data.get('name')
     pickup_spot = data.get('pickup_spot')
+    email = (data.get('email') or "").strip()
 
     # Input Validation
     if not name or not pickup_spot:
@@ -31,7 +32,8 @@ def create_loader(data):
 
     new_loader = Loader(
         name=name,
-        pickup_spot=pickup_spot
+        pickup_spot=pickup_spot,
+        email=email
     )
     new_loader.save()
 
@@ -47,6 +49,7 @@ def update_loader(loader_id: int, data):
 
     name = data.get('name')
     pickup_spot = data.get('pickup_spot')
+    email = (data.get('email') or "").strip()
 
     # Input Validation
     if not name or not pickup_spot:
@@ -59,6 +62,7 @@ def update_loader(loader_id: int, data):
 
     loader.name = name
     loader.pickup_spot = pickup_spot
+    loader.email = email
     loader.save()
 
 def delete_loader(loader_id: int):
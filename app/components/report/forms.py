@@ -4,14 +4,23 @@
 from fasthtml.common import *
 import json
 
-def report_form(action_url, method="post", report_types=None):
+def report_form(action_url, method="post", report_types=None, export_formats=None):
     """Generates a form for creating or generating a report."""
+    if export_formats is None:
+        export_formats = [
+            ("csv", "CSV"),
+            ("csv.gz", "CSV (gzip)"),
+            ("ndjson", "NDJSON"),
+            ("columnar", "Columnar (binary)")
+        ]
     if report_types is None:
         report_types = [
             ("End of Day", "End of Day"),
             ("Issue Report", "Issue Report"),
             ("Schedule Report", "Schedule Report"),
             ("Attendance Report", "Attendance Report"),
+            ("Weekly Summary", "Weekly Summary"),
+            ("Monthly Summary", "Monthly Summary"),
             ("Custom Report", "Custom Report")
         ]
 
@@ -25,6 +34,14 @@ def report_form(action_url, method="post", report_types=None):
                 required=True
             )
         ),
+        Div(
+            Label("Export Format:", For="export_format"),
+            Select(
+                *[Option(label, value=value) for value, label in export_formats],
+                name="export_format",
+                id="export_format"
+            )
+        ),
         Div(
             Label("Parameters (JSON format):", For="parameters"),
             Textarea(
@@ -37,4 +54,24 @@ def report_form(action_url, method="post", report_types=None):
         Button("Generate Report", type="submit"),
         action=action_url,
         method=method
-    )
\ No newline at end of file
+    )
+def batch_report_form(action_url, method="post"):
+    """Generates a form for generating a batch of reports as one archive."""
+    return Form(
+        Div(
+            Label("Month-End Batch (YYYY-MM):", For="month"),
+            Input(name="month", type="month", id="month", required=False)
+        ),
+        Div(
+            Label("Or Report Specs (JSON list):", For="specs"),
+            Textarea(
+                name="specs",
+                id="specs",
+                placeholder='[{"report_type": "End of Day", "parameters": {"date": "2024-10-01"}, "export_format": "csv"}]',
+                required=False
+            )
+        ),
+        Button("Generate Batch", type="submit"),
+        action=action_url,
+        method=method
+    )
@@ -3,7 +3,7 @@
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from fastlite import Database
 import json
 
@@ -17,6 +17,9 @@ class Report:
     parameters: Optional[dict] = field(default_factory=dict)  # Parameters used to generate the report
     generated_at: datetime = field(default_factory=datetime.now)  # Date and time the report was generated
     file_path: str = field(default="")            # Path to the report file (PDF or CSV)
+    export_format: str = field(default="csv")     # e.g., "csv", "csv.gz", "ndjson", "columnar"
+    file_size: int = field(default=0)             # Size of the report file in bytes
+    last_accessed_at: Optional[datetime] = field(default=None)  # Last download, used for LRU eviction
 
     # Table name in the database
     __tablename__ = 'reports'
@@ -30,25 +33,74 @@ class Report:
             report_type TEXT NOT NULL,
             parameters TEXT,
             generated_at DATETIME NOT NULL,
-            file_path TEXT NOT NULL
+            file_path TEXT NOT NULL,
+            export_format TEXT NOT NULL DEFAULT 'csv',
+            file_size INTEGER NOT NULL DEFAULT 0,
+            last_accessed_at DATETIME
         )
         '''
         db.execute(query)
 
+        # Add columns introduced after the table was first created
+        existing_columns = {row['name'] for row in db.q(f"PRAGMA table_info({cls.__tablename__})")}
+        if 'export_format' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN export_format TEXT NOT NULL DEFAULT 'csv'")
+        if 'file_size' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN file_size INTEGER NOT NULL DEFAULT 0")
+        if 'last_accessed_at' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN last_accessed_at DATETIME")
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.__tablename__}_generated_at ON {cls.__tablename__} (generated_at)")
+
     @classmethod
-    def find_all(cls):
-        """Fetches all reports from the database."""
+    def find_all(cls, limit: Optional[int] = None, offset: int = 0):
+        """Fetches reports from the database, newest first, optionally one page at a time."""
         query = f"SELECT * FROM {cls.__tablename__} ORDER BY generated_at DESC"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params = (limit, offset)
+        rows = db.q(query, params)
+        return [cls(**cls._parse_row(row)) for row in rows]
+
+    @classmethod
+    def find_generated_before(cls, report_type: str, cutoff: datetime) -> List['Report']:
+        """Fetches reports of a type generated before the cutoff."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE report_type = ? AND generated_at < ?"
+        rows = db.q(query, (report_type, cutoff.strftime("%Y-%m-%d %H:%M:%S")))
+        return [cls(**cls._parse_row(row)) for row in rows]
+
+    @classmethod
+    def find_least_recently_used(cls) -> List['Report']:
+        """Fetches all reports ordered from least to most recently downloaded."""
+        query = f"SELECT * FROM {cls.__tablename__} ORDER BY COALESCE(last_accessed_at, generated_at) ASC"
         rows = db.q(query)
         return [cls(**cls._parse_row(row)) for row in rows]
 
+    @classmethod
+    def total_file_size(cls) -> int:
+        """Returns the combined size in bytes of all report files."""
+        rows = db.q(f"SELECT COALESCE(SUM(file_size), 0) AS total FROM {cls.__tablename__}")
+        return rows[0]['total']
+
+    @classmethod
+    def all_file_paths(cls) -> set:
+        """Returns the file paths referenced by the reports table."""
+        rows = db.q(f"SELECT file_path FROM {cls.__tablename__}")
+        return {row['file_path'] for row in rows}
+
+    def touch(self):
+        """Records that the report was just downloaded."""
+        self.last_accessed_at = datetime.now()
+        query = f"UPDATE {self.__tablename__} SET last_accessed_at = ? WHERE id = ?"
+        db.execute(query, (self.last_accessed_at.strftime("%Y-%m-%d %H:%M:%S"), self.id))
+
     @classmethod
     def find_by_id(cls, report_id: int) -> Optional['Report']:
         """Finds a report by ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.fetch_one(query, (report_id,))
-        if row:
-            return cls(**cls._parse_row(row))
+        rows = db.q(query, (report_id,))
+        if rows:
+            return cls(**cls._parse_row(rows[0]))
         return None
 
     def save(self):
@@ -57,19 +109,22 @@ class Report:
         if self.id is None:
             # Insert new report
             query = f'''
-            INSERT INTO {self.__tablename__} (report_type, parameters, generated_at, file_path)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO {self.__tablename__} (report_type, parameters, generated_at, file_path, export_format, file_size)
+            VALUES (?, ?, ?, ?, ?, ?)
             '''
-            params = (self.report_type, parameters_json, self.generated_at.strftime("%Y-%m-%d %H:%M:%S"), self.file_path)
-            self.id = db.insert(query, params)
+            params = (self.report_type, parameters_json, self.generated_at.strftime("%Y-%m-%d %H:%M:%S"), self.file_path,
+                      self.export_format, self.file_size)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing report
             query = f'''
             UPDATE {self.__tablename__}
-            SET report_type = ?, parameters = ?, generated_at = ?, file_path = ?
+            SET report_type = ?, parameters = ?, generated_at = ?, file_path = ?, export_format = ?, file_size = ?
             WHERE id = ?
             '''
-            params = (self.report_type, parameters_json, self.generated_at.strftime("%Y-%m-%d %H:%M:%S"), self.file_path, self.id)
+            params = (self.report_type, parameters_json, self.generated_at.strftime("%Y-%m-%d %H:%M:%S"), self.file_path,
+                      self.export_format, self.file_size, self.id)
             db.execute(query, params)
 
     def delete(self):
@@ -85,7 +140,10 @@ class Report:
             'report_type': row['report_type'],
             'parameters': json.loads(row['parameters']) if row['parameters'] else {},
             'generated_at': datetime.strptime(row['generated_at'], "%Y-%m-%d %H:%M:%S"),
-            'file_path': row['file_path']
+            'file_path': row['file_path'],
+            'export_format': row['export_format'],
+            'file_size': row['file_size'],
+            'last_accessed_at': datetime.strptime(row['last_accessed_at'], "%Y-%m-%d %H:%M:%S") if row['last_accessed_at'] else None
         }
 
     def __ft__(self):
@@ -96,10 +154,179 @@ class Report:
             Div(f"Report Type: {self.report_type}"),
             Div(f"Generated At: {self.generated_at.strftime('%Y-%m-%d %H:%M:%S')}"),
             Div(f"File Path: {self.file_path}"),
+            Div(f"Format: {self.export_format} ({self.file_size} bytes)"),
             Div(
                 A("View", href=f"/reports/view/{self.id}"),
                 " | ",
                 A("Delete", href=f"/reports/delete/{self.id}", hx_post=f"/reports/delete/{self.id}",
                   hx_confirm="Are you sure?", hx_target="#report-list")
             )
-        )
\ No newline at end of file
+        )
+
+
+@dataclass
+class DailyZoneStats:
+    stat_date: str = field(default="")             # Day the stats cover (YYYY-MM-DD)
+    zone_id: int = field(default=None)
+    assignments: int = field(default=0)            # Assignments scheduled in the zone that day
+    completed: int = field(default=0)              # Assignments with a recorded end time
+    total_completion_hours: float = field(default=0.0)
+    attendance_confirmed: int = field(default=0)
+    ppe_compliant: int = field(default=0)
+
+    # Table name in the database
+    __tablename__ = 'daily_zone_stats'
+
+    @classmethod
+    def create_table(cls):
+        """Creates the daily_zone_stats table if it doesn't exist."""
+        query = f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            stat_date DATE NOT NULL,
+            zone_id INTEGER NOT NULL,
+            assignments INTEGER NOT NULL,
+            completed INTEGER NOT NULL,
+            total_completion_hours REAL NOT NULL,
+            attendance_confirmed INTEGER NOT NULL,
+            ppe_compliant INTEGER NOT NULL,
+            PRIMARY KEY (stat_date, zone_id)
+        )
+        '''
+        db.execute(query)
+
+    @classmethod
+    def rebuild(cls, start_date: str, end_date: str):
+        """Recomputes the rows for the given date range from the assignments table."""
+        db.execute(f"DELETE FROM {cls.__tablename__} WHERE stat_date BETWEEN ? AND ?", (start_date, end_date))
+        query = f'''
+        INSERT INTO {cls.__tablename__} (
+            stat_date, zone_id, assignments, completed, total_completion_hours, attendance_confirmed, ppe_compliant
+        )
+        SELECT doc, zone_id, COUNT(*),
+               SUM(CASE WHEN end_time IS NOT NULL THEN 1 ELSE 0 END),
+               COALESCE(SUM(completion_time), 0),
+               SUM(attendance_confirmed), SUM(ppe_compliance)
+        FROM assignments
+        WHERE doc BETWEEN ? AND ?
+        GROUP BY doc, zone_id
+        '''
+        db.execute(query, (start_date, end_date))
+
+    @classmethod
+    def find_between(cls, start_date: str, end_date: str) -> List['DailyZoneStats']:
+        """Fetches the rollup rows for a date range."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE stat_date BETWEEN ? AND ? ORDER BY stat_date, zone_id"
+        rows = db.q(query, (start_date, end_date))
+        return [cls(**row) for row in rows]
+
+
+@dataclass
+class DailyCrewStats:
+    stat_date: str = field(default="")             # Day the stats cover (YYYY-MM-DD)
+    crew_id: int = field(default=None)
+    assignments: int = field(default=0)            # Assignments worked by the crew that day
+    completed: int = field(default=0)              # Assignments with a recorded end time
+    total_completion_hours: float = field(default=0.0)
+    attendance_confirmed: int = field(default=0)
+    ppe_compliant: int = field(default=0)
+
+    # Table name in the database
+    __tablename__ = 'daily_crew_stats'
+
+    @classmethod
+    def create_table(cls):
+        """Creates the daily_crew_stats table if it doesn't exist."""
+        query = f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            stat_date DATE NOT NULL,
+            crew_id INTEGER NOT NULL,
+            assignments INTEGER NOT NULL,
+            completed INTEGER NOT NULL,
+            total_completion_hours REAL NOT NULL,
+            attendance_confirmed INTEGER NOT NULL,
+            ppe_compliant INTEGER NOT NULL,
+            PRIMARY KEY (stat_date, crew_id)
+        )
+        '''
+        db.execute(query)
+
+    @classmethod
+    def rebuild(cls, start_date: str, end_date: str):
+        """Recomputes the rows for the given date range from the assignments table."""
+        db.execute(f"DELETE FROM {cls.__tablename__} WHERE stat_date BETWEEN ? AND ?", (start_date, end_date))
+        query = f'''
+        INSERT INTO {cls.__tablename__} (
+            stat_date, crew_id, assignments, completed, total_completion_hours, attendance_confirmed, ppe_compliant
+        )
+        SELECT doc, crew_id, COUNT(*),
+               SUM(CASE WHEN end_time IS NOT NULL THEN 1 ELSE 0 END),
+               COALESCE(SUM(completion_time), 0),
+               SUM(attendance_confirmed), SUM(ppe_compliance)
+        FROM assignments
+        WHERE doc BETWEEN ? AND ?
+        GROUP BY doc, crew_id
+        '''
+        db.execute(query, (start_date, end_date))
+
+    @classmethod
+    def find_between(cls, start_date: str, end_date: str) -> List['DailyCrewStats']:
+        """Fetches the rollup rows for a date range."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE stat_date BETWEEN ? AND ? ORDER BY stat_date, crew_id"
+        rows = db.q(query, (start_date, end_date))
+        return [cls(**row) for row in rows]
+
+
+@dataclass
+class DailyIssueStats:
+    stat_date: str = field(default="")             # Day the stats cover (YYYY-MM-DD)
+    route_id: int = field(default=None)
+    issue_type: str = field(default="")
+    issues: int = field(default=0)                 # Issues reported on the route that day
+    repeat_offenders: int = field(default=0)       # Of which flagged as repeat offenders
+
+    # Table name in the database
+    __tablename__ = 'daily_issue_stats'
+
+    @classmethod
+    def create_table(cls):
+        """Creates the daily_issue_stats table if it doesn't exist."""
+        query = f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            stat_date DATE NOT NULL,
+            route_id INTEGER NOT NULL,
+            issue_type TEXT NOT NULL,
+            issues INTEGER NOT NULL,
+            repeat_offenders INTEGER NOT NULL,
+            PRIMARY KEY (stat_date, route_id, issue_type)
+        )
+        '''
+        db.execute(query)
+
+    @classmethod
+    def rebuild(cls, start_date: str, end_date: str):
+        """Recomputes the rows for the given date range from the issues table."""
+        db.execute(f"DELETE FROM {cls.__tablename__} WHERE stat_date BETWEEN ? AND ?", (start_date, end_date))
+        # date_reported is a full timestamp, so bound it by the day after end_date
+        query = f'''
+        INSERT INTO {cls.__tablename__} (stat_date, route_id, issue_type, issues, repeat_offenders)
+        SELECT date(date_reported), route_id, issue_type, COUNT(*), SUM(repeat_offender)
+        FROM issues
+        WHERE date_reported >= ? AND date_reported < date(?, '+1 day')
+        GROUP BY date(date_reported), route_id, issue_type
+        '''
+        db.execute(query, (start_date, end_date))
+
+    @classmethod
+    def find_between(cls, start_date: str, end_date: str) -> List['DailyIssueStats']:
+        """Fetches the rollup rows for a date range."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE stat_date BETWEEN ? AND ? ORDER BY stat_date, route_id"
+        rows = db.q(query, (start_date, end_date))
+        return [cls(**row) for row in rows]
+
+
+def rebuild_daily_rollups(start_date: str, end_date: str):
+    """Rebuilds every daily rollup table for a date range in a single transaction."""
+    with db.conn:
+        DailyZoneStats.rebuild(start_date, end_date)
+        DailyCrewStats.rebuild(start_date, end_date)
+        DailyIssueStats.rebuild(start_date, end_date)
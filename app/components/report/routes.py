@@ -6,7 +6,8 @@ from starlette.responses import RedirectResponse
 
 # Import views
 from app.components.report.views import (
-    report_list_view, generate_report_view, view_report_view, download_report_view, delete_report_view
+    report_list_view, generate_report_view, batch_report_view, view_report_view, download_report_view,
+    delete_report_view
 )
 from app.components.dashboard.views import (
     admin_dashboard_view, supervisor_dashboard_view, dispatch_dashboard_view
@@ -52,6 +53,11 @@ def setup_routes(app):
     async def generate_report(req):
         return await generate_report_view(req)
 
+    @app.route("/reports/batch", methods=["GET", "POST"])
+    @requires(["Admin", "Supervisor"], redirect="/auth/login")
+    async def generate_report_batch(req):
+        return await batch_report_view(req)
+
     @app.route("/reports/view/{report_id:int}", methods=["GET"])
     @requires(["Admin", "Supervisor"], redirect="/auth/login")
     async def view_report(req, report_id: int):
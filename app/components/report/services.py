@@ -3,52 +3,69 @@
 # services.py
 
 import json
-from app.components.report.models import Report
-from datetime import datetime
-import csv
+from app.components.report.models import Report, rebuild_daily_rollups
+from app.service.export_service import export_rows
+from datetime import datetime, date, timedelta
 import os
-from typing import Optional
+import re
+import logging
+import multiprocessing
+import shutil
+import tempfile
+import zipfile
+import calendar
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
 from fastlite import Database
 
+logger = logging.getLogger(__name__)
+
 db = Database('app_data.db')
 
-def generate_report(report_type: str, parameters: Optional[dict] = None) -> Report:
+# Days re-aggregated by the nightly rollup to pick up late edits
+ROLLUP_LOOKBACK_DAYS = 2
+
+# Directory holding generated report files
+REPORTS_DIR = 'reports'
+
+# Days a report is kept, per report type; types not listed use the default
+REPORT_RETENTION_DAYS = {
+    "End of Day": 30,
+    "Issue Report": 90,
+    "Schedule Report": 60,
+    "Attendance Report": 90,
+    "Weekly Summary": 180,
+    "Monthly Summary": 730,
+    "Custom Report": 14,
+    "Batch": 60,
+}
+DEFAULT_RETENTION_DAYS = 90
+
+# Total disk space report files may use before least recently downloaded ones are evicted
+REPORTS_DISK_QUOTA_BYTES = 2 * 1024 ** 3
+
+# Files without a report row are only treated as orphans once they are this old, since
+# reports are written to disk before their row is saved and a batch can take a while
+ORPHAN_GRACE_PERIOD_SECONDS = 6 * 60 * 60
+
+def generate_report(report_type: str, parameters: Optional[dict] = None, export_format: str = "csv") -> Report:
     """
-    Generates a report of the given type and stores it.
+    Generates a report of the given type and stores it in the requested export format.
     Raises:
         ValueError: If validation fails.
     """
-    report_data = []
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    file_name = f"{report_type.lower().replace(' ', '_')}_{timestamp}.csv"
-    file_path = os.path.join('reports', file_name)
+    file_name = f"{report_type.lower().replace(' ', '_')}_{timestamp}"
+    file_path_base = os.path.join(REPORTS_DIR, file_name)
 
     # Ensure the reports directory exists
-    os.makedirs('reports', exist_ok=True)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
 
-    # Fetch data based on report type
-    if report_type == "End of Day":
-        report_data = get_end_of_day_report(parameters)
-    elif report_type == "Issue Report":
-        report_data = get_issue_report(parameters)
-    elif report_type == "Schedule Report":
-        report_data = get_schedule_report(parameters)
-    elif report_type == "Attendance Report":
-        report_data = get_attendance_report(parameters)
-    elif report_type == "Custom Report":
-        report_data = get_custom_report(parameters)
-    else:
-        raise ValueError("Invalid report type.")
+    report_data = fetch_report_data(report_type, parameters)
 
-    # Write report data to CSV
+    # Write report data in the requested format
     if report_data:
-        with open(file_path, mode='w', newline='') as csv_file:
-            writer = csv.writer(csv_file)
-            # Write headers
-            writer.writerow(report_data[0].keys())
-            # Write data
-            for row in report_data:
-                writer.writerow(row.values())
+        file_path = export_rows(report_data, file_path_base, export_format)
     else:
         raise ValueError("No data found for the given parameters.")
 
@@ -57,16 +74,46 @@ def generate_report(report_type: str, parameters: Optional[dict] = None) -> Repo
         report_type=report_type,
         parameters=parameters,
         generated_at=datetime.now(),
-        file_path=file_path
+        file_path=file_path,
+        export_format=export_format,
+        file_size=os.path.getsize(file_path)
     )
     new_report.save()
+
+    # Keep the reports directory within its disk quota
+    enforce_disk_quota()
     return new_report
 
+def fetch_report_data(report_type: str, parameters: Optional[dict] = None):
+    """
+    Fetches the rows for a report type.
+    Raises:
+        ValueError: If the report type is unknown or parameters are invalid.
+    """
+    parameters = parameters or {}
+    if report_type == "End of Day":
+        report_data = get_end_of_day_report(parameters)
+    elif report_type == "Issue Report":
+        report_data = get_issue_report(parameters)
+    elif report_type == "Schedule Report":
+        report_data = get_schedule_report(parameters)
+    elif report_type == "Attendance Report":
+        report_data = get_attendance_report(parameters)
+    elif report_type == "Weekly Summary":
+        report_data = get_weekly_summary_report(parameters)
+    elif report_type == "Monthly Summary":
+        report_data = get_monthly_summary_report(parameters)
+    elif report_type == "Custom Report":
+        report_data = get_custom_report(parameters)
+    else:
+        raise ValueError("Invalid report type.")
+    return report_data
+
 def get_end_of_day_report(parameters: dict):
     """Fetches data for the End of Day report."""
     date = parameters.get('date', datetime.now().strftime('%Y-%m-%d'))
     query = "SELECT * FROM assignments WHERE doc = ?"
-    rows = db.fetch_all(query, (date,))
+    rows = db.q(query, (date,))
     return rows
 
 def get_issue_report(parameters: dict):
@@ -76,7 +123,7 @@ def get_issue_report(parameters: dict):
     if not start_date or not end_date:
         raise ValueError("Start date and end date are required for Issue Report.")
     query = "SELECT * FROM issues WHERE date_reported BETWEEN ? AND ?"
-    rows = db.fetch_all(query, (start_date, end_date))
+    rows = db.q(query, (start_date, end_date))
     return rows
 
 def get_schedule_report(parameters: dict):
@@ -85,13 +132,13 @@ def get_schedule_report(parameters: dict):
     if not week_number:
         raise ValueError("Week number is required for Schedule Report.")
     query = "SELECT * FROM schedules WHERE week_number = ?"
-    rows = db.fetch_all(query, (week_number,))
+    rows = db.q(query, (week_number,))
     return rows
 
 def get_attendance_report(parameters: dict):
     """Fetches data for the Attendance Report."""
     query = "SELECT * FROM schedules WHERE attendance_marked = 1"
-    rows = db.fetch_all(query)
+    rows = db.q(query)
     return rows
 
 def get_custom_report(parameters: dict):
@@ -99,5 +146,268 @@ def get_custom_report(parameters: dict):
     query = parameters.get('query')
     if not query:
         raise ValueError("Custom query is required for Custom Report.")
-    rows = db.fetch_all(query)
-    return rows
\ No newline at end of file
+    rows = db.q(query)
+    return rows
+
+def get_weekly_summary_report(parameters: dict):
+    """Fetches per-zone totals for a week from the daily rollup tables."""
+    week_start = parameters.get('week_start')
+    if not week_start:
+        raise ValueError("Week start date is required for Weekly Summary.")
+    start = datetime.strptime(week_start, '%Y-%m-%d').date()
+    return get_zone_summary(start.isoformat(), (start + timedelta(days=6)).isoformat())
+
+def get_monthly_summary_report(parameters: dict):
+    """Fetches per-zone totals for a month (YYYY-MM) from the daily rollup tables."""
+    month = parameters.get('month')
+    if not month:
+        raise ValueError("Month (YYYY-MM) is required for Monthly Summary.")
+    start = datetime.strptime(month, '%Y-%m').date()
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return get_zone_summary(start.isoformat(), (next_month - timedelta(days=1)).isoformat())
+
+def get_zone_summary(start_date: str, end_date: str):
+    """Combines the daily zone and issue rollups into one row per zone."""
+    query = """
+    SELECT z.zone_id,
+           SUM(z.assignments) AS assignments,
+           SUM(z.completed) AS completed,
+           ROUND(SUM(z.total_completion_hours) / MAX(SUM(z.completed), 1), 2) AS avg_completion_hours,
+           SUM(z.attendance_confirmed) AS attendance_confirmed,
+           SUM(z.ppe_compliant) AS ppe_compliant,
+           (SELECT COALESCE(SUM(i.issues), 0)
+              FROM daily_issue_stats i JOIN routes r ON r.id = i.route_id
+             WHERE r.zone_id = z.zone_id AND i.stat_date BETWEEN ? AND ?) AS issues
+    FROM daily_zone_stats z
+    WHERE z.stat_date BETWEEN ? AND ?
+    GROUP BY z.zone_id
+    ORDER BY z.zone_id
+    """
+    return db.q(query, (start_date, end_date, start_date, end_date))
+
+def get_completion_trend(days: int = 14):
+    """Fetches fleet-wide daily totals for the last `days` days for dashboard charts."""
+    start = (date.today() - timedelta(days=days - 1)).isoformat()
+    query = """
+    SELECT stat_date,
+           SUM(assignments) AS assignments,
+           SUM(completed) AS completed,
+           ROUND(SUM(total_completion_hours), 2) AS completion_hours
+    FROM daily_zone_stats
+    WHERE stat_date >= ?
+    GROUP BY stat_date
+    ORDER BY stat_date
+    """
+    return db.q(query, (start,))
+
+def refresh_daily_rollups(start_date: Union[date, str], end_date: Union[date, str, None] = None):
+    """
+    Re-aggregates the daily rollup tables for a date range (a single day by default).
+    Called after assignments or issues change and by the nightly rollup.
+    """
+    start = start_date.isoformat() if isinstance(start_date, date) else start_date
+    end = end_date.isoformat() if isinstance(end_date, date) else (end_date or start)
+    rebuild_daily_rollups(start, end)
+    logger.debug(f"Daily rollups refreshed for {start} to {end}")
+
+def run_nightly_rollup(lookback_days: int = ROLLUP_LOOKBACK_DAYS):
+    """Refreshes the rollups for the last few days so late edits are picked up."""
+    today = date.today()
+    refresh_daily_rollups(today - timedelta(days=lookback_days), today)
+    logger.info(f"Nightly rollup completed for the last {lookback_days} days.")
+
+def backfill_daily_rollups() -> bool:
+    """
+    Builds the rollups for all existing history when the rollup tables are still empty,
+    e.g. on the first start after they were introduced. Returns whether a backfill ran.
+    """
+    if db.q("SELECT 1 FROM daily_zone_stats LIMIT 1") or db.q("SELECT 1 FROM daily_issue_stats LIMIT 1"):
+        return False
+    bounds = db.q("""
+    SELECT MIN(first_day) AS first_day, MAX(last_day) AS last_day FROM (
+        SELECT MIN(doc) AS first_day, MAX(doc) AS last_day FROM assignments
+        UNION ALL
+        SELECT MIN(date(date_reported)), MAX(date(date_reported)) FROM issues
+    )
+    """)[0]
+    if bounds['first_day'] is None:
+        return False
+    end = max(bounds['last_day'], date.today().isoformat())
+    refresh_daily_rollups(bounds['first_day'], end)
+    logger.info(f"Daily rollups backfilled for {bounds['first_day']} to {end}.")
+    return True
+
+def delete_report_file(report: Report):
+    """Deletes a report's file and its database row."""
+    if os.path.exists(report.file_path):
+        os.remove(report.file_path)
+    report.delete()
+
+def expire_reports(now: Optional[datetime] = None) -> int:
+    """Deletes reports older than their type's retention period. Returns the number removed."""
+    now = now or datetime.now()
+    removed = 0
+    report_types = [row['report_type'] for row in db.q("SELECT DISTINCT report_type FROM reports")]
+    for report_type in report_types:
+        cutoff = now - timedelta(days=REPORT_RETENTION_DAYS.get(report_type, DEFAULT_RETENTION_DAYS))
+        for report in Report.find_generated_before(report_type, cutoff):
+            delete_report_file(report)
+            removed += 1
+    return removed
+
+def enforce_disk_quota(quota_bytes: int = REPORTS_DISK_QUOTA_BYTES) -> int:
+    """Evicts least recently downloaded reports until the total size fits the quota. Returns the number removed."""
+    total = Report.total_file_size()
+    removed = 0
+    if total <= quota_bytes:
+        return removed
+    for report in Report.find_least_recently_used():
+        if total <= quota_bytes:
+            break
+        delete_report_file(report)
+        total -= report.file_size
+        removed += 1
+    return removed
+
+def reconcile_report_files(now: Optional[datetime] = None,
+                           grace_seconds: int = ORPHAN_GRACE_PERIOD_SECONDS) -> tuple:
+    """
+    Removes files in the reports directory that no report references and report rows
+    whose file has disappeared. Files younger than the grace period are left alone, as
+    they may belong to a report still being generated.
+    Returns (orphan files removed, dangling rows removed).
+    """
+    cutoff = (now or datetime.now()).timestamp() - grace_seconds
+    known_paths = Report.all_file_paths()
+    orphan_files = 0
+    if os.path.isdir(REPORTS_DIR):
+        for entry in os.scandir(REPORTS_DIR):
+            if entry.is_file() and entry.path not in known_paths and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                orphan_files += 1
+
+    dangling_rows = 0
+    for path in known_paths:
+        if not os.path.exists(path):
+            db.execute("DELETE FROM reports WHERE file_path = ?", (path,))
+            dangling_rows += 1
+    return orphan_files, dangling_rows
+
+def sweep_reports() -> dict:
+    """Runs one retention pass: TTL expiry, quota eviction and orphan reconciliation."""
+    summary = {"expired": expire_reports(), "evicted": enforce_disk_quota()}
+    summary["orphan_files"], summary["dangling_rows"] = reconcile_report_files()
+    logger.info(f"Report retention sweep completed: {summary}")
+    return summary
+
+def month_end_report_specs(month: str, export_format: str = "csv") -> List[dict]:
+    """Builds the month-end closing batch: an End of Day report per day plus Issue and Attendance reports."""
+    start = datetime.strptime(month, '%Y-%m').date()
+    days_in_month = calendar.monthrange(start.year, start.month)[1]
+    end = start.replace(day=days_in_month)
+    specs = [
+        {"report_type": "End of Day", "parameters": {"date": (start + timedelta(days=i)).isoformat()},
+         "export_format": export_format}
+        for i in range(days_in_month)
+    ]
+    specs.append({"report_type": "Issue Report",
+                  "parameters": {"start_date": start.isoformat(), "end_date": f"{end.isoformat()} 23:59:59"},
+                  "export_format": export_format})
+    specs.append({"report_type": "Attendance Report", "parameters": {}, "export_format": export_format})
+    return specs
+
+def generate_report_batch(specs: List[dict], max_workers: Optional[int] = None) -> Report:
+    """
+    Generates several reports concurrently in a process pool and bundles them into one zip archive.
+    Every worker reads from the same point-in-time snapshot of the database, so all reports in
+    the batch are consistent with each other and the live database is not held open by workers.
+    Raises:
+        ValueError: If no specs are given or no report in the batch produced data.
+    """
+    if not specs:
+        raise ValueError("At least one report spec is required.")
+
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="report_batch_")
+    try:
+        snapshot_path = os.path.join(work_dir, "snapshot.db")
+        _snapshot_database(snapshot_path)
+
+        # Spawned rather than forked: forking the threaded server can copy locks held by other threads
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_batch_worker, initargs=(snapshot_path,)) as executor:
+            futures = [
+                executor.submit(_build_batch_entry, index, spec, work_dir)
+                for index, spec in enumerate(specs)
+            ]
+            results = [future.result() for future in futures]
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        archive_path = os.path.join(REPORTS_DIR, f"batch_{timestamp}.zip")
+        skipped = []
+        with zipfile.ZipFile(archive_path, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for spec, (file_path, error) in zip(specs, results):
+                if file_path:
+                    archive.write(file_path, arcname=os.path.basename(file_path))
+                else:
+                    skipped.append({"report_type": spec.get("report_type") if isinstance(spec, dict) else None,
+                                    "error": error})
+        if len(skipped) == len(specs):
+            os.remove(archive_path)
+            raise ValueError("No data found for any report in the batch.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    batch_report = Report(
+        report_type="Batch",
+        parameters={"specs": specs, "skipped": skipped},
+        generated_at=datetime.now(),
+        file_path=archive_path,
+        export_format="zip",
+        file_size=os.path.getsize(archive_path)
+    )
+    batch_report.save()
+    enforce_disk_quota()
+    logger.info(f"Batch of {len(specs)} reports generated ({len(skipped)} skipped): {archive_path}")
+    return batch_report
+
+def _snapshot_database(snapshot_path: str):
+    """Copies the module's database into a standalone snapshot file using SQLite's online backup."""
+    target = Database(snapshot_path)
+    try:
+        with target.conn.backup("main", db.conn, "main") as backup:
+            backup.step()
+    finally:
+        target.conn.close()
+
+def _init_batch_worker(snapshot_path: str):
+    """Points this worker process's report queries at the shared snapshot."""
+    global db
+    db = Database(snapshot_path)
+
+def _slugify(value: str, max_length: int = 60) -> str:
+    """Reduces a request value to lowercase letters, digits, hyphens and underscores, safe for an archive entry name."""
+    slug = re.sub(r"[^a-z0-9-]+", "_", str(value).lower()).strip("_-")
+    return slug[:max_length].rstrip("_-")
+
+def _build_batch_entry(index: int, spec: dict, work_dir: str) -> tuple:
+    """
+    Builds one report of a batch in a worker process. Returns (file path, error message);
+    any failure is reported as that entry's error so the rest of the batch still completes.
+    """
+    try:
+        if not isinstance(spec, dict):
+            raise ValueError("Each report spec must be an object with a report_type.")
+        report_type = spec.get("report_type", "")
+        rows = fetch_report_data(report_type, spec.get("parameters"))
+        if not rows:
+            return None, "No data found for the given parameters."
+        # Parameter values come straight from the request; separators and dots never reach the file name
+        label = _slugify("_".join(str(value) for value in (spec.get("parameters") or {}).values()))
+        file_name = f"{index:03d}_{_slugify(report_type)}_{label}".rstrip("_")
+        return export_rows(rows, os.path.join(work_dir, file_name), spec.get("export_format", "csv")), None
+    except ValueError as e:
+        return None, str(e)
+    except Exception as e:
+        logger.exception(f"Report {index} of the batch failed")
+        return None, f"{type(e).__name__}: {e}"
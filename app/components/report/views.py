@@ -1,27 +1,40 @@
 # components/report/views.py
 
 from fasthtml.common import *
-from app.components.report.forms import report_form
-from app.components.report.services import generate_report
+from app.components.report.forms import report_form, batch_report_form
+from app.components.report.services import (
+    generate_report, delete_report_file, generate_report_batch, month_end_report_specs
+)
 from app.components.report.models import Report
+from app.service.export_service import media_type_for
 from app.components.common.page import page_view
 from starlette.responses import RedirectResponse, FileResponse
+from starlette.staticfiles import NotModifiedResponse
 from starlette.requests import Request
+from email.utils import parsedate
+import asyncio
 import json
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Reports shown per page in the report list
+REPORTS_PER_PAGE = 50
+
 async def report_list_view(req: Request):
-    """Generates the list view of all reports."""
-    reports = Report.find_all()
+    """Generates the paginated list view of reports."""
+    try:
+        page = max(int(req.query_params.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    reports = Report.find_all(limit=REPORTS_PER_PAGE, offset=(page - 1) * REPORTS_PER_PAGE)
     content = [
         H1("Generated Reports"),
         Table(
             Thead(
                 Tr(
-                    Th("ID"), Th("Report Type"), Th("Generated At"), Th("Actions")
+                    Th("ID"), Th("Report Type"), Th("Generated At"), Th("Format"), Th("Size"), Th("Actions")
                 )
             ),
             Tbody(
@@ -30,6 +43,8 @@ async def report_list_view(req: Request):
                         Td(str(report.id)),
                         Td(report.report_type),
                         Td(report.generated_at.strftime('%Y-%m-%d %H:%M:%S')),
+                        Td(report.export_format),
+                        Td(f"{report.file_size / 1024:.1f} KB"),
                         Td(
                             A("View", href=f"/reports/view/{report.id}", cls="button small"),
                             " ",
@@ -42,7 +57,14 @@ async def report_list_view(req: Request):
             ),
             cls="table-responsive"
         ),
-        A("Generate New Report", href="/reports/generate", cls="button")
+        Div(
+            A("Previous", href=f"/reports?page={page - 1}", cls="button small") if page > 1 else "",
+            " ",
+            A("Next", href=f"/reports?page={page + 1}", cls="button small") if len(reports) == REPORTS_PER_PAGE else ""
+        ),
+        A("Generate New Report", href="/reports/generate", cls="button"),
+        " ",
+        A("Generate Batch", href="/reports/batch", cls="button")
     ]
     return page_view(req, "Report List", content)
 
@@ -57,6 +79,7 @@ async def generate_report_view(req: Request):
         data = await req.form()
         report_type = data.get('report_type')
         parameters_str = data.get('parameters', '{}')
+        export_format = data.get('export_format', 'csv')
         try:
             parameters = json.loads(parameters_str)
         except json.JSONDecodeError as e:
@@ -67,7 +90,7 @@ async def generate_report_view(req: Request):
             ]
             return page_view(req, "Generate Report", content)
         try:
-            report = generate_report(report_type, parameters)
+            report = generate_report(report_type, parameters, export_format)
             return RedirectResponse(f"/reports/view/{report.id}", status_code=303)
         except ValueError as e:
             logger.error(f"Error generating report: {e}")
@@ -77,6 +100,28 @@ async def generate_report_view(req: Request):
             ]
             return page_view(req, "Generate Report", content)
 
+async def batch_report_view(req: Request):
+    """Handles generating several reports at once into a single archive."""
+    if req.method == "GET":
+        return page_view(req, "Generate Report Batch", [batch_report_form("/reports/batch")])
+
+    data = await req.form()
+    try:
+        if data.get('month'):
+            specs = month_end_report_specs(data.get('month'))
+        else:
+            specs = json.loads(data.get('specs') or '[]')
+        # The process pool blocks, so keep it off the event loop
+        report = await asyncio.to_thread(generate_report_batch, specs)
+        return RedirectResponse(f"/reports/view/{report.id}", status_code=303)
+    except (ValueError, json.JSONDecodeError) as e:
+        logger.error(f"Error generating report batch: {e}")
+        content = [
+            P(str(e), style="color:red"),
+            batch_report_form("/reports/batch")
+        ]
+        return page_view(req, "Generate Report Batch", content)
+
 async def view_report_view(req: Request, report_id: int):
     """Handles viewing a specific report."""
     report = Report.find_by_id(report_id)
@@ -85,6 +130,7 @@ async def view_report_view(req: Request, report_id: int):
     content = [
         H1(f"Report: {report.report_type}"),
         P(f"Generated At: {report.generated_at.strftime('%Y-%m-%d %H:%M:%S')}"),
+        P(f"Format: {report.export_format} ({report.file_size} bytes)"),
         Pre(f"Parameters:\n{json.dumps(report.parameters, indent=2)}"),
         A("Download Report", href=f"/reports/download/{report.id}", cls="button"),
         A("Delete Report", href=f"/reports/delete/{report.id}", cls="button danger")
@@ -92,15 +138,37 @@ async def view_report_view(req: Request, report_id: int):
     return page_view(req, f"View Report - {report.report_type}", content)
 
 async def download_report_view(req: Request, report_id: int):
-    """Handles downloading a report file."""
+    """
+    Handles downloading a report file.
+    Responses carry ETag/Last-Modified validators; conditional requests get a 304 and
+    Range/If-Range requests are served partially by FileResponse, so repeated or
+    resumed downloads never re-transfer data the client already has.
+    """
     report = Report.find_by_id(report_id)
     if not report or not os.path.exists(report.file_path):
         return page_view(req, "Error", [P("Report file not found.")])
-    return FileResponse(
+    response = FileResponse(
         path=report.file_path,
         filename=os.path.basename(report.file_path),
-        media_type='application/octet-stream'
+        media_type=media_type_for(report.export_format),
+        stat_result=os.stat(report.file_path),
+        headers={"Cache-Control": "private, max-age=0, must-revalidate"}
     )
+    report.touch()
+    if is_not_modified(req, response):
+        return NotModifiedResponse(response.headers)
+    return response
+
+def is_not_modified(req: Request, response: FileResponse) -> bool:
+    """Checks the request's conditional headers against the file response validators."""
+    if_none_match = req.headers.get("if-none-match")
+    if if_none_match:
+        etag = response.headers["etag"]
+        return etag in [tag.strip(" W/") for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+    if_modified_since = parsedate(req.headers.get("if-modified-since", ""))
+    last_modified = parsedate(response.headers["last-modified"])
+    return bool(if_modified_since and last_modified and if_modified_since >= last_modified)
 
 async def delete_report_view(req: Request, report_id: int):
     """Handles deleting a report."""
@@ -108,10 +176,8 @@ async def delete_report_view(req: Request, report_id: int):
     if not report:
         return page_view(req, "Error", [Div("Report not found.")])
     if req.method == "POST":
-        # Delete the report file
-        if os.path.exists(report.file_path):
-            os.remove(report.file_path)
-        report.delete()
+        # Delete the report file and its record
+        delete_report_file(report)
         return RedirectResponse("/reports", status_code=303)
     else:
         content = [
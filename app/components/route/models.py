@@ -47,11 +47,8 @@ class Route:
     @classmethod
     def find_by_id(cls, route_id: int) -> Optional['Route']:
         """Finds a route by ID."""
-        query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.fetch_one(query, (route_id,))
-        if row:
-            return cls(**row)
-        return None
+        rows = db.q(f"SELECT * FROM {cls.__tablename__} WHERE id = ?", (route_id,))
+        return cls(**rows[0]) if rows else None
 
     @classmethod
     def find_by_name_and_zone(cls, name: str, zone_id: int) -> Optional['Route']:
@@ -97,4 +94,83 @@ class Route:
                 A("Delete", href=f"/routes/delete/{self.id}", hx_post=f"/routes/delete/{self.id}",
                   hx_confirm="Are you sure?", hx_target="#route-list")
             )
-        )
\ No newline at end of file
+        )
+
+
+@dataclass
+class RouteStop:
+    id: int = field(default=None)
+    route_id: int = field(default=None)  # Relationship with the route
+    sequence: int = field(default=0)     # Position in the route, from 1
+    name: str = field(default="")
+    lat: float = field(default=0.0)
+    lon: float = field(default=0.0)
+    service_minutes: int = field(default=0)  # Time spent collecting at the stop
+
+    __tablename__ = 'route_stops'
+
+    @classmethod
+    def create_table(cls):
+        """Creates the route_stops table if it doesn't exist."""
+        query = f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            route_id INTEGER NOT NULL,
+            sequence INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            lat REAL NOT NULL,
+            lon REAL NOT NULL,
+            service_minutes INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(route_id) REFERENCES routes(id) ON DELETE CASCADE
+        )
+        '''
+        db.execute(query)
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.__tablename__}_route ON {cls.__tablename__} (route_id, sequence)")
+
+    @classmethod
+    def find_by_route(cls, route_id: int) -> List['RouteStop']:
+        """Fetches the stops of a route in visiting order."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE route_id = ? ORDER BY sequence, id"
+        rows = db.q(query, (route_id,))
+        return [cls(**row) for row in rows]
+
+    @classmethod
+    def find_by_id(cls, stop_id: int) -> Optional['RouteStop']:
+        """Finds a stop by ID."""
+        rows = db.q(f"SELECT * FROM {cls.__tablename__} WHERE id = ?", (stop_id,))
+        return cls(**rows[0]) if rows else None
+
+    @classmethod
+    def next_sequence(cls, route_id: int) -> int:
+        """Returns the sequence number for a stop appended to the route."""
+        rows = db.q(f"SELECT COALESCE(MAX(sequence), 0) + 1 AS next FROM {cls.__tablename__} WHERE route_id = ?", (route_id,))
+        return rows[0]['next']
+
+    @classmethod
+    def delete_for_route(cls, route_id: int):
+        """Deletes every stop of a route."""
+        db.execute(f"DELETE FROM {cls.__tablename__} WHERE route_id = ?", (route_id,))
+
+    def save(self):
+        """Inserts or updates the stop in the database."""
+        if self.id is None:
+            query = f'''
+            INSERT INTO {self.__tablename__} (route_id, sequence, name, lat, lon, service_minutes)
+            VALUES (?, ?, ?, ?, ?, ?)
+            '''
+            params = (self.route_id, self.sequence, self.name, self.lat, self.lon, self.service_minutes)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
+        else:
+            query = f'''
+            UPDATE {self.__tablename__}
+            SET route_id = ?, sequence = ?, name = ?, lat = ?, lon = ?, service_minutes = ?
+            WHERE id = ?
+            '''
+            params = (self.route_id, self.sequence, self.name, self.lat, self.lon, self.service_minutes, self.id)
+            db.execute(query, params)
+
+    def delete(self):
+        """Deletes the stop from the database."""
+        query = f"DELETE FROM {self.__tablename__} WHERE id = ?"
+        db.execute(query, (self.id,))
@@ -1,7 +1,10 @@
 # app/components/route/services.py
 
 from typing import List, Optional
-from app.components.route.models import Route
+from app.components.route.models import Route, RouteStop, db
+from app.service.spatial_service import spatial_index, STOP
+from app.service.sequencing_service import optimize_stop_sequences
+from app.service.hub_service import route_zones
 
 def get_all_routes() -> List[Route]:
     """Fetches all routes."""
@@ -79,9 +82,72 @@ def update_route(route_id: int, data):
     route.zone_id = int(zone_id)
     route.description = description
     route.save()
+    # Realtime updates for the route go to its new zone from now on
+    route_zones.invalidate(route_id)
 
 def delete_route(route_id: int):
-    """Deletes an existing route."""
+    """Deletes an existing route along with its stops."""
     route = get_route_by_id(route_id)
     if route:
-        route.delete()
\ No newline at end of file
+        stops = RouteStop.find_by_route(route_id)
+        # The stops are removed here rather than left to ON DELETE CASCADE, which only runs where
+        # the connection enforces foreign keys and never reaches the spatial index
+        with db.conn:
+            RouteStop.delete_for_route(route_id)
+            route.delete()
+        for stop in stops:
+            spatial_index.remove(STOP, stop.id)
+        route_zones.invalidate(route_id)
+
+def get_route_stops(route_id: int) -> List[RouteStop]:
+    """Fetches the stops of a route in visiting order."""
+    return RouteStop.find_by_route(route_id)
+
+def add_route_stop(route_id: int, data) -> RouteStop:
+    """
+    Appends a stop to a route.
+    Raises:
+        ValueError: If validation fails.
+    """
+    name = data.get('name')
+    try:
+        lat = float(data.get('lat'))
+        lon = float(data.get('lon'))
+        service_minutes = int(data.get('service_minutes') or 0)
+    except (TypeError, ValueError):
+        raise ValueError("Stop coordinates and service time must be numbers.")
+
+    if not name:
+        raise ValueError("Stop Name is required.")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Stop coordinates are out of range.")
+    if service_minutes < 0:
+        raise ValueError("Service time cannot be negative.")
+
+    stop = RouteStop(
+        route_id=route_id,
+        sequence=RouteStop.next_sequence(route_id),
+        name=name,
+        lat=lat,
+        lon=lon,
+        service_minutes=service_minutes
+    )
+    stop.save()
+    spatial_index.upsert_many(STOP, [(stop.id, stop.lat, stop.lon)])
+    return stop
+
+def delete_route_stop(stop_id: int):
+    """Deletes a stop from its route."""
+    stop = RouteStop.find_by_id(stop_id)
+    if stop:
+        stop.delete()
+        spatial_index.remove(STOP, stop.id)
+
+def optimize_stop_order(route_id: int):
+    """Reorders a route's stops to minimise drive time and returns the result, or None if it has too few stops."""
+    results = optimize_stop_sequences([route_id], workers=1)
+    return results[0] if results else None
+
+def optimize_all_stop_orders():
+    """Nightly job: reorders the stops of every route, spread over all CPU cores."""
+    optimize_stop_sequences()
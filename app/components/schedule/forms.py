@@ -66,4 +66,42 @@ def schedule_form(action_url, method="post", schedule=None, drivers=None, loader
         Button("Submit", type="submit"),
         action=action_url,
         method=method
-    )
\ No newline at end of file
+    )
+
+def week_generator_form(action_url, method="post", week_number=None, source_week=None):
+    """Generates a form for building a week's schedules from another week's roster."""
+    return Form(
+        Div(
+            Label("Week Number:", For="week_number"),
+            Input(
+                name="week_number",
+                type="number",
+                id="week_number",
+                value=week_number or "",
+                placeholder="Week to generate",
+                required=True,
+                min="1",
+                max="53"
+            )
+        ),
+        Div(
+            Label("Copy Roster From Week:", For="source_week"),
+            Input(
+                name="source_week",
+                type="number",
+                id="source_week",
+                value=source_week or "",
+                placeholder="Week to use as the template",
+                required=True,
+                min="1",
+                max="53"
+            )
+        ),
+        Div(
+            Input(name="replace", type="checkbox", value="1", id="replace"),
+            Label("Replace existing schedules for this week", For="replace")
+        ),
+        Button("Generate", type="submit"),
+        action=action_url,
+        method=method
+    )
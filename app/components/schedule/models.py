@@ -2,8 +2,9 @@
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from fastlite import Database
+from app.service.recurrence_service import RecurrenceRule, occurrence_cache
 
 # Initialize the FastLite database
 db = Database('app_data.db')
@@ -50,10 +51,40 @@ class Schedule:
     def find_by_id(cls, schedule_id: int) -> Optional['Schedule']:
         """Finds a schedule by ID."""
         query = f"SELECT * FROM {cls.__tablename__} WHERE id = ?"
-        row = db.fetch_one(query, (schedule_id,))
-        if row:
-            return cls(**cls._parse_row(row))
-        return None
+        rows = db.q(query, (schedule_id,))
+        return cls(**cls._parse_row(rows[0])) if rows else None
+
+    @classmethod
+    def find_by_week(cls, week_number: int) -> List['Schedule']:
+        """Fetches all schedules of a week."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE week_number = ? ORDER BY id"
+        rows = db.q(query, (week_number,))
+        return [cls(**cls._parse_row(row)) for row in rows]
+
+    @classmethod
+    def insert_many(cls, schedules: List['Schedule']):
+        """Inserts new schedules in one transaction and sets their IDs."""
+        query = f'''
+        INSERT INTO {cls.__tablename__} (
+            week_number, dow, driver_id, loader_ids, notification_sent, schedule_created_at, attendance_marked
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        with db.conn:
+            cursor = db.conn.cursor()
+            for schedule in schedules:
+                cursor.execute(query, (
+                    schedule.week_number, schedule.dow, schedule.driver_id,
+                    ",".join(map(str, schedule.loader_ids)) if schedule.loader_ids else "",
+                    int(schedule.notification_sent),
+                    schedule.schedule_created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    int(schedule.attendance_marked)
+                ))
+                schedule.id = db.conn.last_insert_rowid()
+
+    @classmethod
+    def delete_week(cls, week_number: int):
+        """Deletes all schedules of a week."""
+        db.execute(f"DELETE FROM {cls.__tablename__} WHERE week_number = ?", (week_number,))
 
     def save(self):
         """Inserts or updates the schedule in the database."""
@@ -71,7 +102,8 @@ class Schedule:
                 self.schedule_created_at.strftime("%Y-%m-%d %H:%M:%S"),
                 int(self.attendance_marked)
             )
-            self.id = db.insert(query, params)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing schedule
             query = f'''
@@ -136,6 +168,7 @@ class ServiceSchedule:
     schedule_time: datetime = field(default_factory=datetime.now)  # When the service is scheduled
     assigned_driver_id: int = field(default=None)         # Assigned Driver ID
     notification_sent: bool = field(default=False)        # Whether notifications have been sent
+    recurrence_rule: str = field(default="")              # RRULE-style recurrence, e.g. "FREQ=WEEKLY;BYDAY=MO,TH"; empty for one-off
 
     # Table name in the database
     __tablename__ = 'service_schedules'
@@ -149,11 +182,47 @@ class ServiceSchedule:
             service_name TEXT NOT NULL,
             schedule_time DATETIME NOT NULL,
             assigned_driver_id INTEGER,
-            notification_sent BOOLEAN DEFAULT 0
+            notification_sent BOOLEAN DEFAULT 0,
+            recurrence_rule TEXT NOT NULL DEFAULT ''
         )
         '''
         db.execute(query)
 
+        # Add columns introduced after the table was first created
+        existing_columns = {row['name'] for row in db.q(f"PRAGMA table_info({cls.__tablename__})")}
+        if 'recurrence_rule' not in existing_columns:
+            db.execute(f"ALTER TABLE {cls.__tablename__} ADD COLUMN recurrence_rule TEXT NOT NULL DEFAULT ''")
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.__tablename__}_time ON {cls.__tablename__} (schedule_time)")
+
+    @classmethod
+    def find_occurrences(cls, start: datetime, end: datetime,
+                         driver_ids: Optional[List[int]] = None) -> List[Tuple['ServiceSchedule', datetime]]:
+        """
+        Every service occurring in [start, end) as (schedule, occurrence time), in time order.
+        One-off schedules are found by the time index; recurring ones are expanded lazily for
+        the window only, through the occurrence cache, so nothing is materialised.
+        """
+        query = f'''
+        SELECT * FROM {cls.__tablename__}
+        WHERE ((recurrence_rule = '' AND schedule_time >= ? AND schedule_time < ?)
+           OR (recurrence_rule != '' AND schedule_time < ?))
+        '''
+        params = [start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")]
+        if driver_ids is not None:
+            query += f" AND assigned_driver_id IN ({','.join('?' * len(driver_ids))})"
+            params.extend(driver_ids)
+        occurrences = []
+        for row in db.q(query, tuple(params)):
+            schedule = cls(**cls._parse_row(row))
+            occurrences.extend((schedule, when) for when in schedule.occurrences(start, end))
+        return sorted(occurrences, key=lambda pair: (pair[1], pair[0].id))
+
+    def occurrences(self, start: datetime, end: datetime) -> List[datetime]:
+        """Times this service occurs in [start, end); schedule_time is the first occurrence."""
+        if not self.recurrence_rule:
+            return [self.schedule_time] if start <= self.schedule_time < end else []
+        return occurrence_cache.between(self.id, self.recurrence_rule, self.schedule_time, start, end)
+
     @classmethod
     def find_all(cls) -> List['ServiceSchedule']:
         """Fetches all service schedules from the database."""
@@ -172,25 +241,30 @@ class ServiceSchedule:
 
     def save(self):
         """Inserts or updates the service schedule in the database."""
+        if self.recurrence_rule:
+            # Normalised, so equal rules share cached occurrences; raises ValueError if invalid
+            self.recurrence_rule = str(RecurrenceRule.parse(self.recurrence_rule))
         if self.id is None:
             # Insert new service schedule
             query = f'''
             INSERT INTO {self.__tablename__} (
-                service_name, schedule_time, assigned_driver_id, notification_sent
-            ) VALUES (?, ?, ?, ?)
+                service_name, schedule_time, assigned_driver_id, notification_sent, recurrence_rule
+            ) VALUES (?, ?, ?, ?, ?)
             '''
             params = (
                 self.service_name,
                 self.schedule_time.strftime("%Y-%m-%d %H:%M:%S"),
                 self.assigned_driver_id,
-                int(self.notification_sent)
+                int(self.notification_sent),
+                self.recurrence_rule
             )
-            self.id = db.insert(query, params)
+            db.execute(query, params)
+            self.id = db.conn.last_insert_rowid()
         else:
             # Update existing service schedule
             query = f'''
             UPDATE {self.__tablename__}
-            SET service_name = ?, schedule_time = ?, assigned_driver_id = ?, notification_sent = ?
+            SET service_name = ?, schedule_time = ?, assigned_driver_id = ?, notification_sent = ?, recurrence_rule = ?
             WHERE id = ?
             '''
             params = (
@@ -198,14 +272,17 @@ class ServiceSchedule:
                 self.schedule_time.strftime("%Y-%m-%d %H:%M:%S"),
                 self.assigned_driver_id,
                 int(self.notification_sent),
+                self.recurrence_rule,
                 self.id
             )
             db.execute(query, params)
+            occurrence_cache.invalidate(self.id)
 
     def delete(self):
         """Deletes the service schedule from the database."""
         query = f"DELETE FROM {self.__tablename__} WHERE id = ?"
         db.execute(query, (self.id,))
+        occurrence_cache.invalidate(self.id)
 
     @staticmethod
     def _parse_row(row):
@@ -215,7 +292,8 @@ class ServiceSchedule:
             'service_name': row['service_name'],
             'schedule_time': datetime.strptime(row['schedule_time'], "%Y-%m-%d %H:%M:%S"),
             'assigned_driver_id': row['assigned_driver_id'],
-            'notification_sent': bool(row['notification_sent'])
+            'notification_sent': bool(row['notification_sent']),
+            'recurrence_rule': row.get('recurrence_rule') or ""
         }
 
     def __ft__(self):
@@ -225,6 +303,7 @@ class ServiceSchedule:
             Div(f"Service Schedule ID: {self.id}"),
             Div(f"Service Name: {self.service_name}"),
             Div(f"Scheduled Time: {self.schedule_time.strftime('%Y-%m-%d %H:%M:%S')}"),
+            Div(f"Repeats: {self.recurrence_rule}") if self.recurrence_rule else "",
             Div(f"Assigned Driver ID: {self.assigned_driver_id}"),
             Div(f"Notification Sent: {'Yes' if self.notification_sent else 'No'}"),
             Div(
@@ -7,7 +7,7 @@ from starlette.responses import RedirectResponse
 
 # Import views
 from app.components.schedule.views import (
-    schedule_list_view, schedule_add_view, schedule_edit_view, schedule_delete_view
+    schedule_list_view, schedule_add_view, schedule_edit_view, schedule_delete_view, schedule_generate_view
 )
 from app.components.dashboard.views import (
     admin_dashboard_view, supervisor_dashboard_view, dispatch_dashboard_view
@@ -53,6 +53,11 @@ def setup_routes(app):
     async def add_schedule(req):
         return await schedule_add_view(req)
 
+    @app.route("/schedules/generate", methods=["GET", "POST"])
+    @requires("Admin", redirect="/auth/login")
+    async def generate_schedules(req):
+        return await schedule_generate_view(req)
+
     @app.route("/schedules/edit/{schedule_id:int}", methods=["GET", "POST"])
     @requires("Admin", redirect="/auth/login")
     async def edit_schedule(req, schedule_id: int):
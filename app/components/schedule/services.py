@@ -1,38 +1,32 @@
 # components/schedule/services.py
 # services.py
 
-from app.components.schedule.models import Schedule
+from app.components.schedule.models import Schedule, ServiceSchedule, db
 from app.components.driver.models import Driver
 from app.components.loader.models import Loader
 from app.components.driver.services import get_driver_by_id
 from app.components.loader.services import get_loader_by_id
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
-import smtplib
-from email.mime.text import MIMEText
+from typing import List, Optional
+from app.service.outbox_service import Outbox, OutboxMessage
+from app.service.conflict_service import BookingIndex, schedule_bookings, describe_conflicts
 import logging
 
 logger = logging.getLogger(__name__)
 
-def send_notification(email: str, subject: str, message: str):
-    """Utility function to send email notifications."""
-    try:
-        smtp = smtplib.SMTP('smtp.example.com')
-        smtp.starttls()
-        smtp.login('username', 'password')
-        msg = MIMEText(message)
-        msg['Subject'] = subject
-        msg['From'] = 'no-reply@example.com'
-        msg['To'] = email
-        smtp.sendmail('no-reply@example.com', [email], msg.as_string())
-        smtp.quit()
-        logger.info(f"Email sent to {email}")
-    except Exception as e:
-        logger.error(f"Failed to send email to {email}: {e}")
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+@dataclass
+class RosterEntry:
+    """One driver's shift in a weekly roster template, with the loaders working alongside."""
+    dow: str
+    driver_id: int
+    loader_ids: List[int] = field(default_factory=list)
 
 def create_schedule(data):
     """
-    Creates a new schedule and sends notifications to assigned crew.
+    Creates a new schedule and queues notifications to assigned crew.
     Raises:
         ValueError: If validation fails.
     """
@@ -67,34 +61,144 @@ def create_schedule(data):
             loader_ids=loader_ids,
             schedule_created_at=datetime.now()
         )
-        new_schedule.save()
-
-        # Send notifications
-        send_schedule_notifications(new_schedule, driver, loaders)
-
-        # Update schedule to indicate notifications have been sent
-        new_schedule.notification_sent = True
-        new_schedule.save()
+        # The schedule, its bookings and its notifications commit together; the outbox worker delivers them
+        with db.conn:
+            bookings = BookingIndex(db)
+            conflicts = bookings.check(schedule_bookings(None, week_number, dow, driver_id, loader_ids))
+            if conflicts:
+                raise ValueError(describe_conflicts(conflicts))
+            new_schedule.save()
+            bookings.book(schedule_bookings(new_schedule.id, week_number, dow, driver_id, loader_ids))
+            queue_schedule_notifications(new_schedule, driver, loaders)
     except (ValueError, KeyError) as e:
         raise ValueError(f"Error creating schedule: {e}") from e
 
-def send_schedule_notifications(schedule: Schedule, driver: Driver, loaders: List[Loader]):
-    """Sends schedule notifications to the driver and loaders."""
+def queue_schedule_notifications(schedule: Schedule, driver: Driver, loaders: List[Loader]):
+    """
+    Records schedule notifications for the driver and loaders in the outbox, inside the
+    caller's transaction. Queuing the same schedule twice does not duplicate messages.
+    """
+    Outbox(db).add(schedule_notification_messages(schedule, driver, loaders))
+
+def schedule_notification_messages(schedule: Schedule, driver: Driver, loaders: List[Loader],
+                                   missing: Optional[set] = None) -> List[OutboxMessage]:
+    """
+    Builds one outbox message per crew member of the schedule who has an email address.
+    Crew without one are logged, or collected into `missing` for the caller to report.
+    """
     subject = f"Your Work Schedule for Week {schedule.week_number}"
     message = f"You are scheduled to work on {schedule.dow} in week {schedule.week_number}."
 
-    # Send email to driver
-    if driver.email:
-        send_notification(driver.email, subject, message)
-    else:
-        logger.warning(f"Driver {driver.id} does not have an email address.")
-
-    # Send emails to loaders
-    for loader in loaders:
-        if loader.email:
-            send_notification(loader.email, subject, message)
+    recipients = []
+    for role, member in [("Driver", driver)] + [("Loader", loader) for loader in loaders]:
+        if member.email:
+            recipients.append(member.email)
+        elif missing is not None:
+            missing.add(f"{role} {member.id}")
         else:
-            logger.warning(f"Loader {loader.id} does not have an email address.")
+            logger.warning(f"{role} {member.id} does not have an email address.")
+
+    return [
+        OutboxMessage(
+            idempotency_key=f"schedule:{schedule.id}:email:{recipient}",
+            recipient=recipient,
+            subject=subject,
+            body=message,
+            aggregate=Schedule.__tablename__,
+            aggregate_id=schedule.id
+        )
+        for recipient in recipients
+    ]
+
+def mark_schedules_notified(schedule_ids: List[int]):
+    """Marks schedules whose notifications have all been delivered; called by the outbox worker."""
+    placeholders = ",".join("?" * len(schedule_ids))
+    db.execute(
+        f"UPDATE {Schedule.__tablename__} SET notification_sent = 1 WHERE id IN ({placeholders})",
+        tuple(schedule_ids)
+    )
+    logger.info(f"Notifications delivered for schedules {schedule_ids}.")
+
+def roster_from_week(week_number: int) -> List[RosterEntry]:
+    """Returns the roster of an existing week, for use as the template of another."""
+    return [
+        RosterEntry(dow=schedule.dow, driver_id=schedule.driver_id, loader_ids=list(schedule.loader_ids))
+        for schedule in Schedule.find_by_week(week_number)
+    ]
+
+def validate_roster(roster: List[RosterEntry], drivers: dict, loaders: dict) -> List[str]:
+    """Returns every problem with a roster's days and crew; double bookings are checked against the booking index."""
+    errors = []
+    for entry in roster:
+        if entry.dow not in DAYS_OF_WEEK:
+            errors.append(f"Invalid day of week: {entry.dow}")
+        if entry.driver_id not in drivers:
+            errors.append(f"Invalid driver selected: {entry.driver_id}")
+        for loader_id in entry.loader_ids:
+            if loader_id not in loaders:
+                errors.append(f"Invalid loader selected: {loader_id}")
+    return list(dict.fromkeys(errors))
+
+def generate_week_schedules(week_number: int, roster: List[RosterEntry], replace: bool = False) -> List[Schedule]:
+    """
+    Creates every schedule of a week from a roster template in one transaction, with
+    their bookings and notifications recorded alongside. Drivers and loaders are validated
+    with one query each, double bookings in one pass over the booking index, and all
+    problems are reported together.
+    Raises:
+        ValueError: If the roster is invalid, or the week already has schedules and replace is False.
+    """
+    if not 1 <= week_number <= 53:
+        raise ValueError(f"Invalid week number: {week_number}")
+    if not roster:
+        raise ValueError("The roster is empty.")
+
+    drivers = {driver.id: driver for driver in Driver.find_by_ids(sorted({e.driver_id for e in roster}))}
+    loaders = {loader.id: loader for loader in Loader.find_by_ids(sorted({i for e in roster for i in e.loader_ids}))}
+    errors = validate_roster(roster, drivers, loaders)
+    if errors:
+        raise ValueError("Error generating schedules: " + " ".join(errors))
+
+    created_at = datetime.now()
+    schedules = [
+        Schedule(week_number=week_number, dow=entry.dow, driver_id=entry.driver_id,
+                 loader_ids=list(entry.loader_ids), schedule_created_at=created_at)
+        for entry in roster
+    ]
+    missing = set()
+    with db.conn:
+        bookings = BookingIndex(db)
+        existing = Schedule.find_by_week(week_number)
+        if existing:
+            if not replace:
+                raise ValueError(f"Week {week_number} already has schedules.")
+            # Replaced schedules must not still notify their crew
+            existing_ids = [schedule.id for schedule in existing]
+            Outbox(db).cancel(Schedule.__tablename__, existing_ids)
+            bookings.release(Schedule.__tablename__, existing_ids)
+            Schedule.delete_week(week_number)
+        conflicts = bookings.check_many(
+            booking for entry in roster
+            for booking in schedule_bookings(None, week_number, entry.dow, entry.driver_id, entry.loader_ids)
+        )
+        if conflicts:
+            raise ValueError("Error generating schedules: " + describe_conflicts(conflicts))
+        Schedule.insert_many(schedules)
+        bookings.book(
+            booking for schedule in schedules
+            for booking in schedule_bookings(schedule.id, week_number, schedule.dow, schedule.driver_id, schedule.loader_ids)
+        )
+        Outbox(db).add(
+            message
+            for schedule in schedules
+            for message in schedule_notification_messages(
+                schedule, drivers[schedule.driver_id], [loaders[i] for i in schedule.loader_ids], missing
+            )
+        )
+    if missing:
+        logger.warning(f"{len(missing)} crew members scheduled in week {week_number} have no email address.")
+    logger.info(f"Generated {len(schedules)} schedules for week {week_number}.")
+    return schedules
 
 def update_schedule(schedule_id: int, data):
     """
@@ -116,12 +220,20 @@ def update_schedule(schedule_id: int, data):
         if not dow or not driver_id:
             raise ValueError("Day of Week and Driver are required.")
 
-        # Update schedule
-        schedule.week_number = week_number
-        schedule.dow = dow
-        schedule.driver_id = driver_id
-        schedule.loader_ids = loader_ids
-        schedule.save()
+        new_bookings = schedule_bookings(schedule.id, week_number, dow, driver_id, loader_ids)
+        with db.conn:
+            bookings = BookingIndex(db)
+            conflicts = bookings.check(new_bookings)
+            if conflicts:
+                raise ValueError(describe_conflicts(conflicts))
+
+            # Update schedule
+            schedule.week_number = week_number
+            schedule.dow = dow
+            schedule.driver_id = driver_id
+            schedule.loader_ids = loader_ids
+            schedule.save()
+            bookings.book(new_bookings)
     except (ValueError, KeyError) as e:
         raise ValueError(f"Error updating schedule: {e}") from e
 
@@ -129,4 +241,12 @@ def delete_schedule(schedule_id: int):
     """Deletes an existing schedule."""
     schedule = Schedule.find_by_id(schedule_id)
     if schedule:
-        schedule.delete()
\ No newline at end of file
+        with db.conn:
+            schedule.delete()
+            BookingIndex(db).release(Schedule.__tablename__, [schedule.id])
+
+def get_service_calendar(start: datetime, end: datetime, driver_ids: Optional[List[int]] = None):
+    """Service visits between two times as (service schedule, occurrence time), recurring ones expanded for the window only."""
+    if end <= start:
+        raise ValueError("The calendar must end after it starts.")
+    return ServiceSchedule.find_occurrences(start, end, driver_ids)
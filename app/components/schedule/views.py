@@ -1,9 +1,9 @@
 # components/schedule/views.py
 
 from fasthtml.common import *
-from app.components.schedule.forms import schedule_form
+from app.components.schedule.forms import schedule_form, week_generator_form
 from app.components.schedule.services import (
-    create_schedule, update_schedule, delete_schedule
+    create_schedule, update_schedule, delete_schedule, generate_week_schedules, roster_from_week
 )
 from app.components.schedule.models import Schedule
 from app.components.driver.services import get_all_drivers
@@ -44,7 +44,9 @@ async def schedule_list_view(req: Request):
             ),
             cls="table-responsive"
         ),
-        A("Add New Schedule", href="/schedules/add", cls="button")
+        A("Add New Schedule", href="/schedules/add", cls="button"),
+        " ",
+        A("Generate Week", href="/schedules/generate", cls="button")
     ]
     return page_view(req, "Schedule List", content)
 
@@ -114,4 +116,30 @@ async def schedule_delete_view(req: Request, schedule_id: int):
                 method="post"
             )
         ]
-        return page_view(req, "Delete Schedule", content)
\ No newline at end of file
+        return page_view(req, "Delete Schedule", content)
+
+async def schedule_generate_view(req: Request):
+    """Handles generating a whole week of schedules from another week's roster."""
+    if req.method == "GET":
+        content = [
+            week_generator_form("/schedules/generate")
+        ]
+        return page_view(req, "Generate Week", content)
+    elif req.method == "POST":
+        data = await req.form()
+        try:
+            week_number = int(data['week_number'])
+            source_week = int(data['source_week'])
+            roster = roster_from_week(source_week)
+            if not roster:
+                raise ValueError(f"Week {source_week} has no schedules to copy.")
+            generate_week_schedules(week_number, roster, replace=bool(data.get('replace')))
+            return RedirectResponse("/schedules", status_code=303)
+        except (ValueError, KeyError) as e:
+            logger.error(f"Error generating schedules: {e}")
+            content = [
+                P(str(e), style="color:red"),
+                week_generator_form("/schedules/generate", week_number=data.get('week_number'),
+                                    source_week=data.get('source_week'))
+            ]
+            return page_view(req, "Generate Week", content)
@@ -6,15 +6,23 @@ from app.components.auth.models import User
 from app.components.client.models import Client
 from app.components.fleet.models import Truck
 from app.components.zone.models import Zone
-from app.components.route.models import Route
+from app.components.route.models import Route, RouteStop
 from app.components.crew.models import Crew
 from app.components.driver.models import Driver
 from app.components.loader.models import Loader
 from app.components.assignment.models import Assignment
-from app.components.schedule.models import Schedule
+from app.components.schedule.models import Schedule, ServiceSchedule
 from app.components.event.models import Event
 from app.components.issues.models import Issue
-from app.components.report.models import Report
+from app.components.report.models import Report, DailyZoneStats, DailyCrewStats, DailyIssueStats
+from app.components.report.services import backfill_daily_rollups
+from app.service.scheduler_service import JobRun
+from app.service.location_service import RoutePosition
+from app.service.spatial_service import spatial_index
+from app.service.eta_service import EtaModel
+from app.service.outbox_service import outbox
+from app.service.conflict_service import booking_index
+from app.service.event_impact_service import event_impact
 
 logger = logging.getLogger(__name__)
 
@@ -32,14 +40,22 @@ def initialize_database():
             Truck,
             Zone,
             Route,
+            RouteStop,
             Crew,
             Driver,
             Loader,
             Assignment,
             Schedule,
+            ServiceSchedule,
             Event,
             Issue,
-            Report
+            Report,
+            DailyZoneStats,
+            DailyCrewStats,
+            DailyIssueStats,
+            JobRun,
+            RoutePosition,
+            EtaModel
         ]
 
         # Create tables for each model
@@ -47,6 +63,23 @@ def initialize_database():
             model.create_table()
             logger.debug(f"Ensured table for model '{model.__name__}' exists.")
 
+        # Summary reports read only the rollups, so fill them from existing history on first run
+        backfill_daily_rollups()
+
+        # Spatial index over truck positions and stops
+        spatial_index.create_table()
+
+        # Notifications awaiting delivery
+        outbox.create_table()
+
+        # Resource bookings for double-booking checks, built from existing records on first run
+        booking_index.create_table()
+        if not booking_index.db.q(f"SELECT 1 FROM {booking_index.__tablename__} LIMIT 1"):
+            booking_index.rebuild()
+
+        # Log of assignment changes made by events, so edits and deletions can undo them
+        event_impact.create_table()
+
         # Create admin user if it doesn't exist
         create_admin_user()
 
@@ -0,0 +1,45 @@
+# app/lifespan.py
+
+from contextlib import asynccontextmanager
+
+from app.components.report.services import sweep_reports, run_nightly_rollup
+from app.components.schedule.services import mark_schedules_notified
+from app.components.route.services import optimize_all_stop_orders
+from app.service.scheduler_service import Scheduler, CronTrigger, IntervalTrigger
+from app.service.location_service import ingestor, LOCATION_FLUSH_INTERVAL_MS
+from app.service.eta_service import update_eta_model
+from app.service.mail_service import get_mailer
+from app.service.outbox_service import outbox, OutboxWorker, OUTBOX_POLL_INTERVAL
+from app.service.real_time_service import register_alert_jobs, start_broker, stop_broker, is_leader
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Runs the realtime broker and the job scheduler for the lifetime of the application."""
+    await start_broker()
+    outbox_worker = OutboxWorker(outbox)
+    outbox_worker.register_channel(
+        "email", lambda recipient, subject, body, message_id: get_mailer().send(recipient, subject, body, message_id)
+    )
+    outbox_worker.on_complete("schedules", mark_schedules_notified)
+
+    scheduler = Scheduler(persist_runs=True, is_leader=is_leader)
+    scheduler.add_job("report_retention_sweep", sweep_reports, CronTrigger("15 * * * *"), jitter=300, singleton=True)
+    scheduler.add_job("nightly_rollup", run_nightly_rollup, CronTrigger("5 0 * * *"), jitter=60, singleton=True)
+    scheduler.add_job("eta_model_update", update_eta_model, CronTrigger("30 20 * * *"), jitter=60, singleton=True)
+    scheduler.add_job("stop_sequencing", optimize_all_stop_orders, CronTrigger("30 1 * * *"), jitter=300, singleton=True)
+    scheduler.add_job("location_flush", ingestor.flush, IntervalTrigger(LOCATION_FLUSH_INTERVAL_MS / 1000),
+                      catch_up=False, persist=False)
+    scheduler.add_job("outbox_delivery", outbox_worker.deliver_pending, IntervalTrigger(OUTBOX_POLL_INTERVAL),
+                      catch_up=False, persist=False, singleton=True)
+    scheduler.add_job("outbox_purge", outbox_worker.purge_delivered, CronTrigger("45 3 * * *"), jitter=300, singleton=True)
+    register_alert_jobs(scheduler)
+    scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        # Write out positions still buffered
+        await ingestor.flush()
+        await stop_broker()
+        get_mailer().close()
@@ -22,6 +22,9 @@ from app.components.report.routes import setup_routes as setup_report_routes
 from app.components.route.routes import setup_routes as setup_route_routes
 from app.components.schedule.routes import setup_routes as setup_schedule_routes
 from app.components.zone.routes import setup_routes as setup_zone_routes
+from app.components.auth.utils import requires_websocket
+from app.lifespan import lifespan
+from app.service.real_time_service import track_route_progress, dashboard_updates
 
 from config.settings import SECRET_KEY, DEBUG, SESSION_COOKIE, CORS_ALLOWED_ORIGINS
 from app.utils.helpers.helpers import setup_logging, SecurityHeadersMiddleware
@@ -50,7 +53,7 @@ headers = [
     Link(rel="stylesheet", href="/static/css/pico.min.css", type="text/css")
 ]
 
-app = FastHTML(middleware=middleware, hdrs=headers)
+app = FastHTML(middleware=middleware, hdrs=headers, lifespan=lifespan)
 
 # Mount static files directory to serve CSS and other static assets
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -70,6 +73,18 @@ setup_route_routes(app)
 setup_schedule_routes(app)
 setup_zone_routes(app)
 
+# Realtime websockets for crew devices and dashboards; both need a logged-in staff session
+@requires_websocket(["Admin", "Supervisor", "Dispatch"])
+async def route_progress_socket(websocket):
+    await track_route_progress(websocket)
+
+@requires_websocket(["Admin", "Supervisor", "Dispatch"])
+async def dashboard_socket(websocket):
+    await dashboard_updates(websocket)
+
+app.add_websocket_route("/ws/route-progress", route_progress_socket)
+app.add_websocket_route("/ws/dashboard", dashboard_socket)
+
 # Add a route for favicon.ico
 @app.get("/favicon.ico")
 async def favicon():
@@ -0,0 +1,265 @@
+# allocation_service.py
+
+import logging
+import time as timer
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from fastlite import Database
+
+from app.service.optimizer_service import ROADWORTHY_SQL, suspended_and_event_clients
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Route tonnage assumed before any collection has been weighed, in kg
+DEFAULT_ROUTE_KG = 4000.0
+# Days of weighed collections route tonnage is estimated from
+TONNAGE_HISTORY_DAYS = 56
+# Pseudo-runs of the zone average mixed into each route's own average
+TONNAGE_PRIOR_STRENGTH = 3
+# Headroom planned on top of the expected tonnage, so an ordinary heavy day still fits
+TONNAGE_SAFETY_FACTOR = 1.1
+# Runs a truck can make in a day, tipping at the transfer station between runs
+MAX_RUNS_PER_TRUCK = 2
+
+
+@dataclass
+class RouteLoad:
+    route_id: int
+    kg: float                       # Planned tonnage, including headroom
+    runs: int = 0                   # Weighed collections the estimate is based on
+
+
+@dataclass
+class TruckBin:
+    truck_id: int
+    capacity: int                   # Truck capacity in kg
+    truck_number: str = ""
+
+
+@dataclass
+class TruckAllocation:
+    truck_id: int
+    truck_number: str
+    capacity: int
+    runs: List[List[int]] = field(default_factory=list)    # Route IDs collected on each run
+    run_loads: List[float] = field(default_factory=list)
+
+    @property
+    def overloaded_runs(self) -> int:
+        return sum(1 for load in self.run_loads if load > self.capacity)
+
+
+@dataclass
+class AllocationPlan:
+    day: date
+    allocations: List[TruckAllocation] = field(default_factory=list)
+    unallocated: List[int] = field(default_factory=list)   # Route IDs left without a truck
+    skipped: List[int] = field(default_factory=list)       # Route IDs suspended by events
+    excluded_trucks: List[int] = field(default_factory=list)  # Operational trucks overdue for inspection or brakes
+
+    @property
+    def trucks_dispatched(self) -> int:
+        return len(self.allocations)
+
+    @property
+    def overloaded_runs(self) -> int:
+        return sum(a.overloaded_runs for a in self.allocations)
+
+
+class TruckPacker:
+    """
+    Packs routes onto trucks as a variable-sized bin packing problem, each truck offering
+    up to max_runs runs of its capacity. Heaviest routes go first into the fullest run they
+    still fit (best fit decreasing), opening another run on a dispatched truck before a new
+    truck, and the largest idle truck when a new one is needed. A run is only overloaded
+    when no dispatched or idle truck has room. Afterwards lightly loaded trucks are emptied
+    into the others where their routes fit, and each dispatched truck is swapped for the
+    smallest idle truck that can carry its routes, keeping big trucks free.
+    """
+
+    def __init__(self, trucks: List[TruckBin], loads: List[RouteLoad], max_runs: int = MAX_RUNS_PER_TRUCK):
+        self.trucks = sorted(trucks, key=lambda t: -t.capacity)
+        self.loads = loads
+        self.max_runs = max_runs
+        self.runs: Dict[int, List[List[int]]] = {}          # Truck index -> runs of load indices
+
+    def _run_load(self, run: List[int]) -> float:
+        return sum(self.loads[i].kg for i in run)
+
+    def _slots(self):
+        """Yields (remaining kg, truck, run index) for every run of a dispatched truck, including a new run where allowed."""
+        for truck, runs in self.runs.items():
+            capacity = self.trucks[truck].capacity
+            for r, run in enumerate(runs):
+                yield capacity - self._run_load(run), truck, r
+            if len(runs) < self.max_runs:
+                yield capacity, truck, len(runs)
+
+    def _place(self, item: int, truck: int, run: int):
+        runs = self.runs.setdefault(truck, [])
+        if run == len(runs):
+            runs.append([])
+        runs[run].append(item)
+
+    def pack(self):
+        for item in sorted(range(len(self.loads)), key=lambda i: -self.loads[i].kg):
+            kg = self.loads[item].kg
+            fitting = [slot for slot in self._slots() if slot[0] >= kg]
+            if fitting:
+                _, truck, run = min(fitting)
+            else:
+                idle = next((t for t in range(len(self.trucks)) if t not in self.runs), None)
+                if idle is not None:
+                    truck, run = idle, 0
+                else:
+                    # Every truck is out: overload wherever the excess is smallest
+                    _, truck, run = max(self._slots())
+            self._place(item, truck, run)
+
+    def _try_empty(self, truck: int) -> bool:
+        """Moves every route of a truck onto the other dispatched trucks, if they all fit without overloading."""
+        saved = {t: [list(run) for run in runs] for t, runs in self.runs.items()}
+        items = sorted((i for run in self.runs.pop(truck) for i in run), key=lambda i: -self.loads[i].kg)
+        for item in items:
+            fitting = [slot for slot in self._slots() if slot[0] >= self.loads[item].kg]
+            if not fitting:
+                self.runs = saved
+                return False
+            _, t, r = min(fitting)
+            self._place(item, t, r)
+        return True
+
+    def consolidate(self):
+        """Empties the least loaded trucks into the others while that works."""
+        improved = True
+        while improved and len(self.runs) > 1:
+            improved = False
+            for truck in sorted(self.runs, key=lambda t: sum(self._run_load(run) for run in self.runs[t])):
+                if self._try_empty(truck):
+                    improved = True
+                    break
+
+    def _repack(self, items: List[int], capacity: int) -> Optional[List[List[int]]]:
+        """Splits routes over up to max_runs runs of the given capacity (first fit decreasing), or None if they don't fit."""
+        runs: List[List[int]] = []
+        loads: List[float] = []
+        for item in sorted(items, key=lambda i: -self.loads[i].kg):
+            kg = self.loads[item].kg
+            run = next((r for r, load in enumerate(loads) if load + kg <= capacity), None)
+            if run is None:
+                if len(runs) == self.max_runs or kg > capacity:
+                    return None
+                runs.append([])
+                loads.append(0.0)
+                run = len(runs) - 1
+            runs[run].append(item)
+            loads[run] += kg
+        return runs
+
+    def downsize(self):
+        """Swaps each dispatched truck for the smallest idle truck that can carry its routes."""
+        for truck in sorted(self.runs, key=lambda t: sum(self._run_load(run) for run in self.runs[t])):
+            runs = self.runs[truck]
+            if any(self._run_load(run) > self.trucks[truck].capacity for run in runs):
+                continue
+            items = [i for run in runs for i in run]
+            idle = sorted((t for t in range(len(self.trucks)) if t not in self.runs
+                           and self.trucks[t].capacity < self.trucks[truck].capacity),
+                          key=lambda t: self.trucks[t].capacity)
+            for smaller in idle:
+                repacked = self._repack(items, self.trucks[smaller].capacity)
+                if repacked is not None:
+                    del self.runs[truck]
+                    self.runs[smaller] = repacked
+                    break
+
+    def solve(self) -> List[TruckAllocation]:
+        """Returns the dispatched trucks with the routes of each run, fullest trucks first."""
+        if not self.trucks:
+            return []
+        self.pack()
+        self.consolidate()
+        self.downsize()
+        allocations = []
+        for truck, runs in self.runs.items():
+            bin_ = self.trucks[truck]
+            allocations.append(TruckAllocation(
+                truck_id=bin_.truck_id, truck_number=bin_.truck_number, capacity=bin_.capacity,
+                runs=[[self.loads[i].route_id for i in run] for run in runs],
+                run_loads=[round(self._run_load(run), 1) for run in runs]
+            ))
+        return sorted(allocations, key=lambda a: -sum(a.run_loads) / a.capacity if a.capacity else 0)
+
+
+def estimate_route_tonnage(route_ids: List[int], as_of: Optional[date] = None) -> Dict[int, RouteLoad]:
+    """
+    Planned tonnage of each route from its weighed collections over the last TONNAGE_HISTORY_DAYS,
+    shrunk towards its zone's average (and the fleet's where the zone has none) while history
+    is sparse, plus TONNAGE_SAFETY_FACTOR headroom.
+    """
+    as_of = as_of or date.today()
+    since = as_of - timedelta(days=TONNAGE_HISTORY_DAYS)
+    rows = db.q('''
+        SELECT a.route_id, r.zone_id, COUNT(*) AS runs, AVG(a.collected_kg) AS mean_kg
+        FROM assignments a JOIN routes r ON r.id = a.route_id
+        WHERE a.collected_kg > 0 AND a.doc >= ? AND a.doc < ?
+        GROUP BY a.route_id
+    ''', (since.isoformat(), as_of.isoformat()))
+    history = {row['route_id']: row for row in rows}
+
+    zone_totals: Dict[int, List[float]] = {}
+    for row in rows:
+        totals = zone_totals.setdefault(row['zone_id'], [0.0, 0])
+        totals[0] += row['mean_kg'] * row['runs']
+        totals[1] += row['runs']
+    all_runs = sum(row['runs'] for row in rows)
+    fleet_mean = sum(row['mean_kg'] * row['runs'] for row in rows) / all_runs if all_runs else DEFAULT_ROUTE_KG
+    zone_means = {zone: total / runs for zone, (total, runs) in zone_totals.items()}
+
+    zones = {row['id']: row['zone_id'] for row in db.q(
+        f"SELECT id, zone_id FROM routes WHERE id IN ({','.join('?' * len(route_ids))})", tuple(route_ids)
+    )} if route_ids else {}
+    estimates = {}
+    for route_id in route_ids:
+        prior = zone_means.get(zones.get(route_id), fleet_mean)
+        row = history.get(route_id)
+        runs = row['runs'] if row else 0
+        mean = (row['mean_kg'] * runs + prior * TONNAGE_PRIOR_STRENGTH) / (runs + TONNAGE_PRIOR_STRENGTH) if row else prior
+        estimates[route_id] = RouteLoad(route_id, mean * TONNAGE_SAFETY_FACTOR, runs)
+    return estimates
+
+
+def load_roadworthy_trucks(day: date) -> List[TruckBin]:
+    """Operational trucks whose inspection and brake check are not overdue on the day."""
+    rows = db.q(f"SELECT id, truck_number, capacity FROM trucks WHERE {ROADWORTHY_SQL} ORDER BY id",
+                (day.isoformat(), day.isoformat()))
+    return [TruckBin(row['id'], row['capacity'] or 0, row['truck_number']) for row in rows]
+
+
+def plan_truck_allocation(day: date) -> AllocationPlan:
+    """Packs every route collected on the day onto roadworthy trucks. Nothing is written."""
+    started = timer.monotonic()
+    suspended, _ = suspended_and_event_clients(day)
+    rows = db.q("SELECT r.id, z.client_id FROM routes r LEFT JOIN zones z ON z.id = r.zone_id ORDER BY r.id")
+    route_ids = [row['id'] for row in rows if row['client_id'] not in suspended]
+    plan = AllocationPlan(day=day, skipped=[row['id'] for row in rows if row['client_id'] in suspended])
+
+    trucks = load_roadworthy_trucks(day)
+    roadworthy = {t.truck_id for t in trucks}
+    plan.excluded_trucks = [row['id'] for row in db.q("SELECT id FROM trucks WHERE status = 'Operational' ORDER BY id")
+                            if row['id'] not in roadworthy]
+    if not trucks:
+        plan.unallocated = route_ids
+        return plan
+
+    estimates = estimate_route_tonnage(route_ids, day)
+    plan.allocations = TruckPacker(trucks, [estimates[r] for r in route_ids]).solve()
+    logger.info(f"Allocated {len(route_ids)} routes for {day} to {plan.trucks_dispatched} of {len(trucks)} trucks "
+                f"({plan.overloaded_runs} overloaded runs, {len(plan.excluded_trucks)} trucks overdue for checks) "
+                f"in {timer.monotonic() - started:.2f}s.")
+    return plan
@@ -0,0 +1,202 @@
+# broker_service.py
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import struct
+from typing import Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Frames waiting to be sent to other workers before the oldest are dropped
+BROKER_OUTBOX_SIZE = 10000
+# Bytes a peer may have queued on the relay before it is disconnected as too slow
+BROKER_PEER_BUFFER_LIMIT = 4 * 1024 * 1024
+# Seconds between attempts to reach (or become) the relay
+BROKER_RECONNECT_DELAY = 1.0
+
+_LENGTH = struct.Struct(">I")
+
+# Called with (topics, payload) for every message published by another worker
+MessageHandler = Callable[[List[str], str], None]
+
+
+def encode_frame(topics: List[str], payload: str) -> bytes:
+    body = json.dumps({"t": list(topics), "p": payload}).encode("utf-8")
+    return _LENGTH.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Reads one frame and returns (topics, payload); raises IncompleteReadError at EOF."""
+    header = await reader.readexactly(_LENGTH.size)
+    body = json.loads(await reader.readexactly(_LENGTH.unpack(header)[0]))
+    return body["t"], body["p"]
+
+
+class Broker:
+    """
+    Carries hub messages between the worker processes serving the app.
+    A worker's hub delivers its own messages locally and hands them to the broker,
+    which delivers them to the hubs of every other worker. One worker at a time is
+    the leader; jobs that must run once per deployment run only there.
+    """
+
+    is_leader = True
+
+    async def start(self, on_message: MessageHandler):
+        """Starts relaying; on_message receives messages from other workers."""
+
+    def publish(self, topics: List[str], payload: str):
+        """Sends a message to the other workers without blocking."""
+
+    async def stop(self):
+        """Stops relaying."""
+
+
+class LocalBroker(Broker):
+    """Single-worker stand-in: there is nobody to relay to and this worker always leads."""
+
+
+class UnixSocketBroker(Broker):
+    """
+    Relays messages between workers on one host through a unix socket.
+    Workers elect a relay by taking an exclusive lock on "<socket>.lock": the holder
+    listens on the socket and forwards every frame it receives to all other connected
+    workers, and the rest connect to it. The lock is released when its holder exits,
+    so another worker takes over the relay and the others reconnect to it.
+    """
+
+    def __init__(self, path: str, outbox_size: int = BROKER_OUTBOX_SIZE,
+                 reconnect_delay: float = BROKER_RECONNECT_DELAY):
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.is_leader = False
+        self.dropped = 0
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=outbox_size)
+        self._on_message: Optional[MessageHandler] = None
+        self._lock_fd: Optional[int] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._server = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, on_message: MessageHandler):
+        self._on_message = on_message
+        # Elect before returning so leader-only work knows its role from the start
+        self._try_lead()
+        self._task = asyncio.create_task(self._run())
+
+    def publish(self, topics: List[str], payload: str):
+        frame = encode_frame(topics, payload)
+        if self._outbox.full():
+            self._outbox.get_nowait()
+            self.dropped += 1
+        self._outbox.put_nowait(frame)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._server:
+            self._server.close()
+        for writer in list(self._peers):
+            writer.close()
+        if self._lock_fd is not None:
+            if self.is_leader and os.path.exists(self.path):
+                os.unlink(self.path)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.is_leader = False
+
+    def _try_lead(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        self.is_leader = True
+        return True
+
+    async def _run(self):
+        while True:
+            if self._try_lead():
+                await self._serve()
+                return
+            try:
+                await self._follow()
+            except (ConnectionError, FileNotFoundError, asyncio.IncompleteReadError, OSError) as e:
+                logger.info(f"Realtime relay unavailable ({e}); retrying.")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _serve(self):
+        # A socket file left by a relay that died is stale; we hold the lock now
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_peer, path=self.path)
+        logger.info(f"Realtime relay listening on {self.path}.")
+        while True:
+            frame = await self._outbox.get()
+            self._forward(frame, exclude=None)
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        try:
+            while True:
+                topics, payload = await read_frame(reader)
+                self._on_message(topics, payload)
+                self._forward(encode_frame(topics, payload), exclude=writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _forward(self, frame: bytes, exclude: Optional[asyncio.StreamWriter]):
+        for writer in list(self._peers):
+            if writer is exclude:
+                continue
+            if writer.transport.get_write_buffer_size() > BROKER_PEER_BUFFER_LIMIT:
+                logger.warning("Disconnecting realtime peer that stopped reading.")
+                self._peers.discard(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+
+    async def _follow(self):
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        logger.info(f"Connected to realtime relay at {self.path}.")
+
+        async def receive():
+            while True:
+                topics, payload = await read_frame(reader)
+                self._on_message(topics, payload)
+
+        async def send():
+            while True:
+                frame = await self._outbox.get()
+                writer.write(frame)
+                await writer.drain()
+
+        tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+def create_broker(kind: str, socket_path: str) -> Broker:
+    """Builds the broker named in settings: "local" or "unix"."""
+    if kind == "local":
+        return LocalBroker()
+    if kind == "unix":
+        return UnixSocketBroker(socket_path)
+    raise ValueError(f"Unknown realtime broker: {kind}")
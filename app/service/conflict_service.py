@@ -0,0 +1,298 @@
+# conflict_service.py
+
+import bisect
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastlite import Database
+
+from app.service.recurrence_service import occurrence_cache
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Resource kinds that can be double-booked
+DRIVER = "driver"
+LOADER = "loader"
+TRUCK = "truck"
+CREW = "crew"
+
+# Bookings only conflict within a layer: the weekly roster says who works which day,
+# the work layer holds timed jobs, and being rostered for a day is not a clash with a job on it
+ROSTER = "roster"
+WORK = "work"
+
+# Minutes in a day; roster shifts cover the whole day
+DAY_MINUTES = 24 * 60
+# Minutes an assignment is assumed to last while its end time is unknown
+DEFAULT_ASSIGNMENT_MINUTES = 8 * 60
+# Minutes a service visit is assumed to last
+DEFAULT_SERVICE_MINUTES = 60
+
+
+@dataclass(frozen=True)
+class Booking:
+    layer: str
+    resource_kind: str
+    resource_id: int
+    day: str             # Day key: "W12-Monday" for the roster, ISO date for timed work
+    start_min: int       # Minutes from midnight, end exclusive
+    end_min: int
+    source: str          # Table of the booked record, e.g. "schedules"
+    source_id: Optional[int] = None
+
+    def same_record(self, other: 'Booking') -> bool:
+        return self.source == other.source and self.source_id is not None and self.source_id == other.source_id
+
+
+@dataclass(frozen=True)
+class Conflict:
+    booking: Booking
+    existing: Booking
+
+    def describe(self) -> str:
+        b, e = self.booking, self.existing
+        where = f" ({e.source} {e.source_id})" if e.source_id is not None else ""
+        return f"{b.resource_kind.capitalize()} {b.resource_id} is already booked on {b.day}{where}."
+
+
+def roster_day(week_number: int, dow: str) -> str:
+    return f"W{week_number}-{dow}"
+
+
+def minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def schedule_bookings(schedule_id: Optional[int], week_number: int, dow: str, driver_id: int,
+                      loader_ids: Iterable[int]) -> List[Booking]:
+    """Roster bookings of a schedule: its driver and loaders for the whole day."""
+    day = roster_day(week_number, dow)
+    resources = [(DRIVER, driver_id)] + [(LOADER, loader_id) for loader_id in loader_ids]
+    return [Booking(ROSTER, kind, resource_id, day, 0, DAY_MINUTES, "schedules", schedule_id)
+            for kind, resource_id in resources]
+
+
+def assignment_bookings(assignment_id: Optional[int], doc: date, start_time: time, end_time: Optional[time],
+                        crew_id: int, driver_id: Optional[int], truck_id: Optional[int],
+                        loader_ids: Iterable[int]) -> List[Booking]:
+    """Work bookings of an assignment: its crew, the crew's driver, truck and loaders."""
+    start = minutes(start_time)
+    end = minutes(end_time) if end_time and minutes(end_time) > start else min(DAY_MINUTES, start + DEFAULT_ASSIGNMENT_MINUTES)
+    resources = [(CREW, crew_id), (DRIVER, driver_id), (TRUCK, truck_id)] + [(LOADER, loader_id) for loader_id in loader_ids]
+    return [Booking(WORK, kind, resource_id, doc.isoformat(), start, end, "assignments", assignment_id)
+            for kind, resource_id in resources if resource_id is not None]
+
+
+def service_schedule_bookings(service_schedule_id: Optional[int], schedule_time: datetime,
+                              driver_id: Optional[int]) -> List[Booking]:
+    """Work booking of a service visit for its assigned driver."""
+    if driver_id is None:
+        return []
+    start = minutes(schedule_time.time())
+    end = min(DAY_MINUTES, start + DEFAULT_SERVICE_MINUTES)
+    return [Booking(WORK, DRIVER, driver_id, schedule_time.date().isoformat(), start, end,
+                    "service_schedules", service_schedule_id)]
+
+
+class IntervalIndex:
+    """
+    In-memory bookings keyed by (layer, resource, day), each list sorted by start minute.
+    Used to validate a whole batch at once: existing bookings for the affected days are
+    loaded in one query, then every proposed booking is checked and added in turn, so
+    clashes inside the batch are caught as well as clashes with what is already booked.
+    """
+
+    def __init__(self):
+        self._intervals: Dict[tuple, List[Tuple[int, int, int, Booking]]] = defaultdict(list)
+        self._count = 0
+
+    @staticmethod
+    def _key(booking: Booking) -> tuple:
+        return booking.layer, booking.resource_kind, booking.resource_id, booking.day
+
+    def add(self, booking: Booking):
+        # The running count breaks ties so bookings themselves are never compared
+        self._count += 1
+        bisect.insort(self._intervals[self._key(booking)], (booking.start_min, booking.end_min, self._count, booking))
+
+    def conflicts(self, booking: Booking) -> List[Booking]:
+        """Returns the indexed bookings overlapping the given one, other than its own record's."""
+        intervals = self._intervals.get(self._key(booking), [])
+        # Only intervals starting before this one ends can overlap it
+        upper = bisect.bisect_left(intervals, (booking.end_min,))
+        return [other for start, end, _, other in intervals[:upper]
+                if end > booking.start_min and not booking.same_record(other)]
+
+
+class BookingIndex:
+    """
+    Interval index of resource bookings, kept in the bookings table alongside schedules,
+    service schedules and assignments. A composite index on (layer, resource, day, start)
+    turns a conflict check into one index seek instead of a scan of every schedule.
+    Writers call book()/release() inside the transaction that changes the booked record.
+    Recurring service visits are not stored: checks expand them for the days involved.
+    """
+
+    __tablename__ = 'bookings'
+
+    def __init__(self, database: Database = db):
+        self.db = database
+
+    def create_table(self):
+        """Creates the bookings table if it doesn't exist."""
+        self.db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {self.__tablename__} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            layer TEXT NOT NULL,
+            resource_kind TEXT NOT NULL,
+            resource_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            start_min INTEGER NOT NULL,
+            end_min INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            source_id INTEGER NOT NULL
+        )
+        ''')
+        self.db.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_{self.__tablename__}_resource
+        ON {self.__tablename__} (layer, resource_kind, resource_id, day, start_min)
+        ''')
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.__tablename__}_source ON {self.__tablename__} (source, source_id)")
+
+    def book(self, bookings: Iterable[Booking]):
+        """Records bookings of saved records, replacing what those records had booked before."""
+        bookings = [b for b in bookings if b.source_id is not None]
+        if not bookings:
+            return
+        with self.db.conn:
+            self.db.conn.executemany(
+                f"DELETE FROM {self.__tablename__} WHERE source = ? AND source_id = ?",
+                sorted({(b.source, b.source_id) for b in bookings})
+            )
+            self.db.conn.executemany(f'''
+                INSERT INTO {self.__tablename__} (layer, resource_kind, resource_id, day, start_min, end_min, source, source_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(b.layer, b.resource_kind, b.resource_id, b.day, b.start_min, b.end_min, b.source, b.source_id)
+                  for b in bookings])
+
+    def release(self, source: str, source_ids: Iterable[int]):
+        """Removes the bookings of deleted records."""
+        with self.db.conn:
+            self.db.conn.executemany(
+                f"DELETE FROM {self.__tablename__} WHERE source = ? AND source_id = ?",
+                [(source, source_id) for source_id in source_ids]
+            )
+
+    def conflicts(self, booking: Booking) -> List[Booking]:
+        """Returns existing bookings of the same resource overlapping the given one, other than its own record's."""
+        rows = self.db.q(f'''
+            SELECT * FROM {self.__tablename__}
+            WHERE layer = ? AND resource_kind = ? AND resource_id = ? AND day = ?
+              AND start_min < ? AND end_min > ?
+        ''', (booking.layer, booking.resource_kind, booking.resource_id, booking.day, booking.end_min, booking.start_min))
+        existing = list(map(self._from_row, rows))
+        if booking.layer == WORK and booking.resource_kind == DRIVER:
+            existing.extend(b for b in self.recurring_service_bookings([booking.resource_id], [booking.day])
+                            if b.start_min < booking.end_min and b.end_min > booking.start_min)
+        return [other for other in existing if not booking.same_record(other)]
+
+    def recurring_service_bookings(self, driver_ids: Iterable[int], days: Iterable[str]) -> List[Booking]:
+        """Work bookings of the drivers' recurring service visits on the given ISO days, expanded lazily."""
+        driver_ids, days = sorted(set(driver_ids)), sorted(set(days))
+        if not driver_ids or not days or not self._has_recurring_services():
+            return []
+        rows = self.db.q(f'''
+            SELECT id, schedule_time, assigned_driver_id, recurrence_rule FROM service_schedules
+            WHERE recurrence_rule != '' AND assigned_driver_id IN ({','.join('?' * len(driver_ids))})
+        ''', tuple(driver_ids))
+        bookings = []
+        for day in days:
+            start = datetime.fromisoformat(day)
+            for row in rows:
+                first = datetime.strptime(row['schedule_time'], "%Y-%m-%d %H:%M:%S")
+                for when in occurrence_cache.between(row['id'], row['recurrence_rule'], first, start, start + timedelta(days=1)):
+                    bookings.extend(service_schedule_bookings(row['id'], when, row['assigned_driver_id']))
+        return bookings
+
+    def _has_recurring_services(self) -> bool:
+        columns = {row['name'] for row in self.db.q("PRAGMA table_info(service_schedules)")}
+        return 'recurrence_rule' in columns
+
+    def check(self, bookings: Iterable[Booking]) -> List[Conflict]:
+        """Checks a few bookings (one record's) against the index."""
+        return [Conflict(booking, existing) for booking in bookings for existing in self.conflicts(booking)]
+
+    def check_many(self, bookings: Iterable[Booking]) -> List[Conflict]:
+        """
+        Bulk validation for many records at once, e.g. a generated week: loads the existing
+        bookings of every affected layer and day in one query and checks the batch in memory,
+        including clashes between the new bookings themselves.
+        """
+        bookings = list(bookings)
+        days = sorted({(b.layer, b.day) for b in bookings})
+        index = IntervalIndex()
+        if days:
+            clauses = " OR ".join(["(layer = ? AND day = ?)"] * len(days))
+            rows = self.db.q(f"SELECT * FROM {self.__tablename__} WHERE {clauses}",
+                             tuple(value for pair in days for value in pair))
+            # Records being rebooked replace their old bookings
+            rebooked = {(b.source, b.source_id) for b in bookings if b.source_id is not None}
+            for existing in map(self._from_row, rows):
+                if (existing.source, existing.source_id) not in rebooked:
+                    index.add(existing)
+            work_drivers = [b for b in bookings if b.layer == WORK and b.resource_kind == DRIVER]
+            for existing in self.recurring_service_bookings([b.resource_id for b in work_drivers],
+                                                            [b.day for b in work_drivers]):
+                if (existing.source, existing.source_id) not in rebooked:
+                    index.add(existing)
+
+        conflicts = []
+        for booking in bookings:
+            conflicts.extend(Conflict(booking, existing) for existing in index.conflicts(booking))
+            index.add(booking)
+        return conflicts
+
+    def rebuild(self):
+        """Rebuilds the index from schedules, one-off service schedules and assignments."""
+        bookings = []
+        for row in self.db.q("SELECT id, week_number, dow, driver_id, loader_ids FROM schedules"):
+            loader_ids = [int(i) for i in row['loader_ids'].split(",")] if row['loader_ids'] else []
+            bookings.extend(schedule_bookings(row['id'], row['week_number'], row['dow'], row['driver_id'], loader_ids))
+        if self.db.q("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'service_schedules'"):
+            one_off = " WHERE recurrence_rule = ''" if self._has_recurring_services() else ""
+            for row in self.db.q(f"SELECT id, schedule_time, assigned_driver_id FROM service_schedules{one_off}"):
+                bookings.extend(service_schedule_bookings(
+                    row['id'], datetime.strptime(row['schedule_time'], "%Y-%m-%d %H:%M:%S"), row['assigned_driver_id']
+                ))
+        for row in self.db.q('''
+            SELECT a.id, a.doc, a.start_time, a.end_time, a.crew_id, c.driver_id, c.truck_id, c.loaders
+            FROM assignments a LEFT JOIN crews c ON c.id = a.crew_id
+        '''):
+            loader_ids = [int(i) for i in row['loaders'].split(",")] if row['loaders'] else []
+            bookings.extend(assignment_bookings(
+                row['id'], date.fromisoformat(row['doc']), time.fromisoformat(row['start_time']),
+                time.fromisoformat(row['end_time']) if row['end_time'] else None,
+                row['crew_id'], row['driver_id'], row['truck_id'], loader_ids
+            ))
+        with self.db.conn:
+            self.db.execute(f"DELETE FROM {self.__tablename__}")
+            self.book(bookings)
+        logger.info(f"Rebuilt booking index with {len(bookings)} bookings.")
+
+    @staticmethod
+    def _from_row(row) -> Booking:
+        return Booking(row['layer'], row['resource_kind'], row['resource_id'], row['day'],
+                       row['start_min'], row['end_min'], row['source'], row['source_id'])
+
+
+def describe_conflicts(conflicts: List[Conflict]) -> str:
+    return " ".join(dict.fromkeys(conflict.describe() for conflict in conflicts))
+
+
+booking_index = BookingIndex()
@@ -0,0 +1,268 @@
+# eta_service.py
+
+import ast
+import logging
+import math
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastlite import Database
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Route duration assumed before any history exists, in hours
+DEFAULT_ROUTE_HOURS = 8.0
+DEFAULT_ROUTE_STD_HOURS = 1.5
+# Pseudo-samples of the broader estimate mixed into each more specific one
+PRIOR_STRENGTH = 5
+# Checkpoints in the order they are reported
+CHECKPOINT_ORDER = ["11AM", "1PM", "3PM", "EOD"]
+
+_PERCENT = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+
+
+@dataclass
+class RunningStats:
+    """Count, mean and sum of squared deviations, updated one sample at a time (Welford)."""
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+
+def stats_keys(route_id: int, crew_id: int, dow: str) -> List[str]:
+    """Keys the duration of one assignment is learned under, from broadest to most specific."""
+    return ["all", f"route:{route_id}", f"route:{route_id}:{dow}", f"route:{route_id}:crew:{crew_id}:{dow}"]
+
+
+class EtaModel:
+    """
+    Learns route durations per route, per route and weekday, and per route, crew and weekday.
+    Predictions start from the fleet-wide estimate and refine it level by level, each level
+    weighted by its sample count against PRIOR_STRENGTH, so sparse combinations fall back
+    gracefully to broader history.
+    """
+
+    __tablename__ = 'eta_duration_stats'
+    __statetable__ = 'eta_model_state'
+
+    def __init__(self):
+        self.stats: Dict[str, RunningStats] = {}
+        self.trained_through: Optional[date] = None
+
+    @classmethod
+    def create_table(cls):
+        """Creates the model tables if they don't exist."""
+        db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            key TEXT PRIMARY KEY,
+            n INTEGER NOT NULL,
+            mean REAL NOT NULL,
+            m2 REAL NOT NULL
+        )
+        ''')
+        db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {cls.__statetable__} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            trained_through DATE
+        )
+        ''')
+
+    @classmethod
+    def load(cls) -> 'EtaModel':
+        """Loads the stored model."""
+        model = cls()
+        for row in db.q(f"SELECT * FROM {cls.__tablename__}"):
+            model.stats[row['key']] = RunningStats(row['n'], row['mean'], row['m2'])
+        rows = db.q(f"SELECT trained_through FROM {cls.__statetable__} WHERE id = 1")
+        if rows and rows[0]['trained_through']:
+            model.trained_through = date.fromisoformat(rows[0]['trained_through'])
+        return model
+
+    def save(self):
+        """Stores the model in one transaction."""
+        with db.conn:
+            db.conn.executemany(
+                f"INSERT OR REPLACE INTO {self.__tablename__} (key, n, mean, m2) VALUES (?, ?, ?, ?)",
+                [(key, s.n, s.mean, s.m2) for key, s in self.stats.items()]
+            )
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.__statetable__} (id, trained_through) VALUES (1, ?)",
+                (self.trained_through.isoformat() if self.trained_through else None,)
+            )
+
+    def add_sample(self, route_id: int, crew_id: int, dow: str, hours: float):
+        """Folds one completed assignment into every level it belongs to."""
+        for key in stats_keys(route_id, crew_id, dow):
+            self.stats.setdefault(key, RunningStats()).add(hours)
+
+    def predict_duration(self, route_id: int, crew_id: int, dow: str) -> Tuple[float, float]:
+        """Returns the expected duration and its standard deviation, in hours."""
+        mean, variance = DEFAULT_ROUTE_HOURS, DEFAULT_ROUTE_STD_HOURS ** 2
+        for key in stats_keys(route_id, crew_id, dow):
+            s = self.stats.get(key)
+            if s is None or s.n == 0:
+                continue
+            weight = s.n / (s.n + PRIOR_STRENGTH)
+            level_variance = s.variance if s.n > 1 else variance
+            mean = weight * s.mean + (1 - weight) * mean
+            variance = weight * level_variance + (1 - weight) * variance
+        return mean, math.sqrt(variance)
+
+    def predict_hours_matrix(self, route_ids: List[int], crew_ids: List[int], dow: str) -> List[List[float]]:
+        """
+        Expected hours of every route for every crew on a weekday, as matrix[route][crew].
+        Same estimate as predict_duration, but the route-level prior is computed once per
+        route and only the crew-specific level is looked up per pair.
+        """
+        matrix = []
+        for route_id in route_ids:
+            keys = stats_keys(route_id, 0, dow)
+            mean, variance = DEFAULT_ROUTE_HOURS, DEFAULT_ROUTE_STD_HOURS ** 2
+            for key in keys[:-1]:
+                s = self.stats.get(key)
+                if s is None or s.n == 0:
+                    continue
+                weight = s.n / (s.n + PRIOR_STRENGTH)
+                mean = weight * s.mean + (1 - weight) * mean
+                variance = weight * (s.variance if s.n > 1 else variance) + (1 - weight) * variance
+            row = []
+            for crew_id in crew_ids:
+                s = self.stats.get(stats_keys(route_id, crew_id, dow)[-1])
+                if s is None or s.n == 0:
+                    row.append(mean)
+                else:
+                    weight = s.n / (s.n + PRIOR_STRENGTH)
+                    row.append(weight * s.mean + (1 - weight) * mean)
+            matrix.append(row)
+        return matrix
+
+
+def remaining_given_elapsed(mean: float, std: float, elapsed: float) -> float:
+    """
+    Expected total duration of a route still running after `elapsed` hours:
+    the mean of the duration distribution (taken as normal) truncated below at elapsed.
+    """
+    if std <= 0:
+        return max(mean, elapsed)
+    a = (elapsed - mean) / std
+    tail = 0.5 * math.erfc(a / math.sqrt(2))
+    if tail < 1e-9:
+        # Far past anything seen before; assume it is nearly done
+        return elapsed + std * 0.1
+    density = math.exp(-a * a / 2) / math.sqrt(2 * math.pi)
+    return mean + std * density / tail
+
+
+def progress_from_checkpoints(status_updates: dict) -> Optional[float]:
+    """Returns the latest progress reported at a checkpoint as a fraction, if a percentage was given."""
+    for label in reversed(CHECKPOINT_ORDER):
+        status = status_updates.get(label)
+        if status:
+            match = _PERCENT.search(str(status))
+            if match:
+                return min(float(match.group(1)) / 100, 1.0)
+    return None
+
+
+def predict_completion(model: EtaModel, start: datetime, route_id: int, crew_id: int, dow: str,
+                       now: datetime, progress: Optional[float] = None) -> datetime:
+    """
+    Predicts when a route will be completed.
+    Before the start this is the learned duration. Once running, the learned duration is
+    conditioned on the time already spent and, when the fraction done is known, blended with
+    the pace so far, trusting pace more as the route nears completion.
+    """
+    mean, std = model.predict_duration(route_id, crew_id, dow)
+    elapsed = (now - start).total_seconds() / 3600
+    if elapsed <= 0:
+        return start + timedelta(hours=mean)
+    expected = remaining_given_elapsed(mean, std, elapsed)
+    if progress is not None and 0 < progress < 1:
+        pace_total = elapsed / progress
+        expected = progress * pace_total + (1 - progress) * expected
+    elif progress is not None and progress >= 1:
+        expected = elapsed
+    return start + timedelta(hours=expected)
+
+
+def parse_status_updates(value) -> dict:
+    """Reads the status_updates column, which is stored as a Python dict literal."""
+    if isinstance(value, dict):
+        return value
+    try:
+        parsed = ast.literal_eval(value) if value else {}
+    except (ValueError, SyntaxError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def update_eta_model(through: Optional[date] = None) -> int:
+    """
+    Incrementally trains the stored model on assignments completed since the last run,
+    up to and including `through` (yesterday by default). Returns the number of samples added.
+    """
+    through = through or date.today() - timedelta(days=1)
+    model = EtaModel.load()
+    query = '''
+    SELECT route_id, crew_id, dow, completion_time FROM assignments
+    WHERE completion_time > 0 AND doc <= ? AND doc > ?
+    '''
+    since = model.trained_through.isoformat() if model.trained_through else ''
+    rows = db.q(query, (through.isoformat(), since))
+    for row in rows:
+        model.add_sample(row['route_id'], row['crew_id'], row['dow'], row['completion_time'])
+    model.trained_through = through
+    model.save()
+    global _model
+    _model = model
+    logger.info(f"ETA model updated with {len(rows)} completed assignments through {through}.")
+    return len(rows)
+
+
+_model: Optional[EtaModel] = None
+
+
+def get_eta_model() -> EtaModel:
+    """Returns the trained model, loading it on first use."""
+    global _model
+    if _model is None:
+        _model = EtaModel.load()
+    return _model
+
+
+def predict_open_assignments(day: date, now: datetime, live_progress: Optional[Dict[int, float]] = None) -> List[dict]:
+    """Predicts completion for every assignment of the day that has not been completed."""
+    live_progress = live_progress or {}
+    model = get_eta_model()
+    query = '''
+    SELECT id, route_id, crew_id, dow, start_time, status_updates FROM assignments
+    WHERE doc = ? AND end_time IS NULL
+    '''
+    predictions = []
+    for row in db.q(query, (day.isoformat(),)):
+        start = datetime.combine(day, time.fromisoformat(row['start_time']))
+        progress = live_progress.get(row['route_id'])
+        if progress is None:
+            progress = progress_from_checkpoints(parse_status_updates(row['status_updates']))
+        predictions.append({
+            "assignment_id": row['id'],
+            "route_id": row['route_id'],
+            "crew_id": row['crew_id'],
+            "eta": predict_completion(model, start, row['route_id'], row['crew_id'], row['dow'], now, progress),
+        })
+    return predictions
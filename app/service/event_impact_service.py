@@ -0,0 +1,298 @@
+# event_impact_service.py
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastlite import Database
+
+from app.service.conflict_service import (
+    BookingIndex, assignment_bookings, describe_conflicts, minutes, WORK, CREW, DAY_MINUTES, DEFAULT_ASSIGNMENT_MINUTES
+)
+from app.service.optimizer_service import SUSPENDING_EVENT_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Days no collection runs on; shifted work slides past them
+NON_COLLECTION_DAYS = {"Sunday"}
+# Week type of assignments affected by an event that doesn't suspend collection
+EVENT_WEEK_TYPE = "Event"
+
+SHIFT = "shift"
+MARK = "mark"
+REVERT = "revert"
+
+
+@dataclass(frozen=True)
+class AssignmentState:
+    doc: date
+    start_time: time
+    end_time: Optional[time]
+    week_type: str
+
+
+@dataclass
+class AssignmentChange:
+    assignment_id: int
+    crew_id: int
+    route_id: int
+    client_id: int
+    action: str                       # SHIFT, MARK or REVERT
+    before: AssignmentState           # As currently stored
+    after: AssignmentState
+    original: AssignmentState         # As before the event touched it
+
+
+@dataclass
+class EventImpact:
+    event_id: Optional[int]
+    changes: List[AssignmentChange] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    def count(self, action: str) -> int:
+        return sum(1 for change in self.changes if change.action == action)
+
+    def affected_days(self) -> List[date]:
+        """Days assignments were moved or marked on, before and after the change."""
+        return sorted({day for change in self.changes for day in (change.before.doc, change.after.doc)})
+
+
+def shift_date(doc: date, start_date: date, end_date: date) -> date:
+    """Moves a collection day by the length of the event, sliding past non-collection days."""
+    shifted = doc + timedelta(days=(end_date - start_date).days + 1)
+    while shifted.strftime("%A") in NON_COLLECTION_DAYS:
+        shifted += timedelta(days=1)
+    return shifted
+
+
+def _time(value: Optional[str]) -> Optional[time]:
+    return time.fromisoformat(value) if value else None
+
+
+def _state(row) -> AssignmentState:
+    return AssignmentState(date.fromisoformat(row['doc']), _time(row['start_time']), _time(row['end_time']), row['week_type'])
+
+
+class EventImpactEngine:
+    """
+    Applies events to the assignments of the clients they affect. Suspending events
+    (holidays) shift each affected assignment past the event, after whatever its crew
+    already has booked that day; other events mark the work as event work. Every change
+    is logged in event_changes with the assignment's original state, so editing an event
+    first reverts what it did and deleting one undoes it, leaving manual edits made
+    since then alone. plan() is a dry run; apply() writes a plan in one transaction.
+    """
+
+    __tablename__ = 'event_changes'
+
+    def __init__(self, database: Database = db):
+        self.db = database
+
+    def create_table(self):
+        """Creates the event change log and the index affected assignments are found by."""
+        self.db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {self.__tablename__} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            assignment_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            original_doc DATE NOT NULL,
+            original_start_time TIME NOT NULL,
+            original_end_time TIME,
+            original_week_type TEXT NOT NULL,
+            new_doc DATE NOT NULL,
+            new_start_time TIME NOT NULL,
+            new_week_type TEXT NOT NULL,
+            UNIQUE (event_id, assignment_id)
+        )
+        ''')
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.__tablename__}_assignment ON {self.__tablename__} (assignment_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_assignments_client_doc ON assignments (client_id, doc)")
+
+    def _previous_changes(self, event_id: Optional[int]) -> Dict[int, dict]:
+        """The event's logged changes still in effect, with the assignments' current rows."""
+        if event_id is None:
+            return {}
+        rows = self.db.q(f'''
+            SELECT c.*, a.crew_id, a.route_id, a.client_id, a.doc, a.start_time, a.end_time, a.week_type
+            FROM {self.__tablename__} c JOIN assignments a ON a.id = c.assignment_id
+            WHERE c.event_id = ?
+        ''', (event_id,))
+        return {row['assignment_id']: row for row in rows}
+
+    def plan(self, event_id: Optional[int], start_date: Optional[date], end_date: Optional[date],
+             client_ids: Iterable[int], event_type: str) -> EventImpact:
+        """
+        Works out what applying the event would change, reverting its earlier changes first.
+        Pass no dates to plan the event's removal. Nothing is written.
+        """
+        impact = EventImpact(event_id)
+        previous = self._previous_changes(event_id)
+        client_ids = sorted(set(client_ids))
+
+        # Assignments the event touched go back to their original state, unless edited since
+        base: Dict[int, Tuple[dict, AssignmentState, AssignmentState]] = {}
+        for assignment_id, row in previous.items():
+            current = _state(row)
+            untouched = (row['doc'] == row['new_doc'] and row['start_time'] == row['new_start_time']
+                         and row['week_type'] == row['new_week_type'])
+            original = AssignmentState(date.fromisoformat(row['original_doc']), _time(row['original_start_time']),
+                                       _time(row['original_end_time']), row['original_week_type'])
+            if untouched:
+                base[assignment_id] = (row, current, original)
+            else:
+                impact.warnings.append(f"Assignment {assignment_id} was edited after the event was applied and is left as it is.")
+
+        candidates: Dict[int, Tuple[dict, AssignmentState, AssignmentState]] = dict(base)
+        if start_date and end_date and client_ids:
+            # One index range scan per client over (client_id, doc)
+            rows = self.db.q(f'''
+                SELECT id, crew_id, route_id, client_id, doc, start_time, end_time, week_type FROM assignments
+                WHERE client_id IN ({','.join('?' * len(client_ids))}) AND doc BETWEEN ? AND ?
+            ''', (*client_ids, start_date.isoformat(), end_date.isoformat()))
+            for row in rows:
+                if row['id'] not in previous:
+                    state = _state(row)
+                    candidates[row['id']] = (row, state, state)
+
+        suspending = event_type in SUSPENDING_EVENT_TYPES
+        targets: Dict[int, AssignmentState] = {}
+        to_shift = []
+        for assignment_id, (row, current, original) in candidates.items():
+            in_event = (start_date and end_date and row['client_id'] in client_ids
+                        and start_date <= original.doc <= end_date)
+            if in_event and suspending:
+                to_shift.append(assignment_id)
+            elif in_event:
+                targets[assignment_id] = AssignmentState(original.doc, original.start_time, original.end_time, EVENT_WEEK_TYPE)
+            else:
+                targets[assignment_id] = original
+        targets.update(self._shift(to_shift, candidates, targets, start_date, end_date, impact))
+
+        for assignment_id, after in targets.items():
+            row, current, original = candidates[assignment_id]
+            if after == current:
+                continue
+            if after == original:
+                action = REVERT
+            else:
+                action = SHIFT if after.doc != original.doc else MARK
+            impact.changes.append(AssignmentChange(
+                assignment_id, row['crew_id'], row['route_id'], row['client_id'], action, current, after, original
+            ))
+        impact.changes.sort(key=lambda c: (c.before.doc, c.crew_id, c.before.start_time))
+        return impact
+
+    def _shift(self, assignment_ids: List[int], candidates, staying: Dict[int, AssignmentState],
+               start_date: date, end_date: date, impact: EventImpact) -> Dict[int, AssignmentState]:
+        """Moves assignments past the event, each after its crew's other work on the new day."""
+        if not assignment_ids:
+            return {}
+        days = sorted({shift_date(candidates[i][2].doc, start_date, end_date).isoformat() for i in assignment_ids})
+        booked_until: Dict[Tuple[int, str], int] = {}
+
+        def book(crew_id: int, day: str, end: int):
+            booked_until[(crew_id, day)] = max(booked_until.get((crew_id, day), 0), end)
+
+        # Candidates are booked where they end up, not where they are now
+        rows = self.db.q(f'''
+            SELECT resource_id, day, end_min, source, source_id FROM bookings
+            WHERE layer = ? AND resource_kind = ? AND day IN ({','.join('?' * len(days))})
+        ''', (WORK, CREW, *days)) if self._has_bookings() else []
+        for row in rows:
+            if not (row['source'] == 'assignments' and row['source_id'] in candidates):
+                book(row['resource_id'], row['day'], row['end_min'])
+        for assignment_id, state in staying.items():
+            start = minutes(state.start_time)
+            end = minutes(state.end_time) if state.end_time else start + DEFAULT_ASSIGNMENT_MINUTES
+            book(candidates[assignment_id][0]['crew_id'], state.doc.isoformat(), end)
+
+        shifted = {}
+        for assignment_id in sorted(assignment_ids, key=lambda i: (candidates[i][2].doc, candidates[i][2].start_time)):
+            row, _, original = candidates[assignment_id]
+            new_doc = shift_date(original.doc, start_date, end_date)
+            start = minutes(original.start_time)
+            duration = (minutes(original.end_time) - start if original.end_time and minutes(original.end_time) > start
+                        else DEFAULT_ASSIGNMENT_MINUTES)
+            start = max(start, booked_until.get((row['crew_id'], new_doc.isoformat()), 0))
+            end = start + duration
+            if end >= DAY_MINUTES:
+                impact.warnings.append(f"Crew {row['crew_id']} has more work on {new_doc} than fits in the day; "
+                                       f"assignment {assignment_id} is cut short at midnight.")
+                start, end = min(start, DAY_MINUTES - 2), DAY_MINUTES - 1
+            book(row['crew_id'], new_doc.isoformat(), end)
+            shifted[assignment_id] = AssignmentState(
+                new_doc, time(start // 60, start % 60),
+                time(end // 60, end % 60) if original.end_time else None, original.week_type
+            )
+        return shifted
+
+    def _has_bookings(self) -> bool:
+        return bool(self.db.q("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bookings'"))
+
+    def apply(self, impact: EventImpact):
+        """
+        Writes a planned impact: assignments, the change log and their bookings, in one transaction.
+        The daily rollups of impact.affected_days() are left to the caller, once the transaction commits.
+        Raises:
+            ValueError: If a moved assignment's driver, truck or loaders are booked elsewhere at the new time.
+        """
+        changes = impact.changes
+        with self.db.conn:
+            self.db.conn.executemany('''
+                UPDATE assignments SET doc = ?, week_number = ?, dow = ?, start_time = ?, end_time = ?, week_type = ?
+                WHERE id = ?
+            ''', [(c.after.doc.isoformat(), c.after.doc.isocalendar()[1], c.after.doc.strftime("%A"),
+                   c.after.start_time.strftime("%H:%M:%S"),
+                   c.after.end_time.strftime("%H:%M:%S") if c.after.end_time else None,
+                   c.after.week_type, c.assignment_id) for c in changes])
+            if impact.event_id is not None:
+                self.db.conn.executemany(
+                    f"DELETE FROM {self.__tablename__} WHERE event_id = ? AND assignment_id = ?",
+                    [(impact.event_id, c.assignment_id) for c in changes]
+                )
+                self.db.conn.executemany(f'''
+                    INSERT INTO {self.__tablename__} (event_id, assignment_id, action, original_doc, original_start_time,
+                        original_end_time, original_week_type, new_doc, new_start_time, new_week_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(impact.event_id, c.assignment_id, c.action, c.original.doc.isoformat(),
+                       c.original.start_time.strftime("%H:%M:%S"),
+                       c.original.end_time.strftime("%H:%M:%S") if c.original.end_time else None,
+                       c.original.week_type, c.after.doc.isoformat(), c.after.start_time.strftime("%H:%M:%S"),
+                       c.after.week_type) for c in changes if c.action != REVERT])
+            if self._has_bookings():
+                self._rebook(changes)
+        logger.info(f"Event {impact.event_id}: shifted {impact.count(SHIFT)}, marked {impact.count(MARK)} "
+                    f"and reverted {impact.count(REVERT)} assignments.")
+
+    def forget(self, event_id: int):
+        """Drops the change log of a deleted event."""
+        self.db.execute(f"DELETE FROM {self.__tablename__} WHERE event_id = ?", (event_id,))
+
+    def _rebook(self, changes: List[AssignmentChange]):
+        moved = [c for c in changes if (c.after.doc, c.after.start_time, c.after.end_time) !=
+                 (c.before.doc, c.before.start_time, c.before.end_time)]
+        if not moved:
+            return
+        crew_ids = sorted({c.crew_id for c in moved})
+        crews = {row['id']: row for row in self.db.q(
+            f"SELECT id, driver_id, truck_id, loaders FROM crews WHERE id IN ({','.join('?' * len(crew_ids))})", tuple(crew_ids)
+        )}
+        bookings = []
+        for c in moved:
+            crew = crews.get(c.crew_id) or {}
+            loader_ids = [int(i) for i in crew['loaders'].split(",") if i] if crew.get('loaders') else []
+            bookings.extend(assignment_bookings(c.assignment_id, c.after.doc, c.after.start_time, c.after.end_time,
+                                                c.crew_id, crew.get('driver_id'), crew.get('truck_id'), loader_ids))
+        index = BookingIndex(self.db)
+        conflicts = index.check_many(bookings)
+        if conflicts:
+            raise ValueError(describe_conflicts(conflicts))
+        index.book(bookings)
+
+
+event_impact = EventImpactEngine()
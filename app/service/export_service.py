@@ -0,0 +1,175 @@
+# export_service.py
+
+import csv
+import gzip
+import io
+import json
+import logging
+import struct
+import zlib
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Columnar file layout:
+#   MAGIC | uint32 header length | JSON header | one zlib-compressed block per column
+# The header lists each column's name, type and compressed block length.
+COLUMNAR_MAGIC = b"EZCOL1\n"
+
+# Column type codes used in the columnar header
+INT_TYPE = "int"
+FLOAT_TYPE = "float"
+STR_TYPE = "str"
+
+
+def write_csv(rows: Iterable[dict], file_path: str) -> None:
+    """Writes rows to a plain CSV file."""
+    with open(file_path, mode='w', newline='') as csv_file:
+        _write_csv_rows(rows, csv_file)
+
+
+def write_csv_gzip(rows: Iterable[dict], file_path: str) -> None:
+    """Streams rows into a gzip-compressed CSV file."""
+    with gzip.open(file_path, mode='wt', newline='') as csv_file:
+        _write_csv_rows(rows, csv_file)
+
+
+def write_ndjson(rows: Iterable[dict], file_path: str) -> None:
+    """Writes rows as newline-delimited JSON, one object per line."""
+    with open(file_path, mode='w') as ndjson_file:
+        for row in rows:
+            ndjson_file.write(json.dumps(dict(row), default=_json_default))
+            ndjson_file.write("\n")
+
+
+def write_columnar(rows: Iterable[dict], file_path: str) -> None:
+    """Writes rows in the compact typed columnar format (see COLUMNAR_MAGIC)."""
+    rows = [dict(row) for row in rows]
+    columns = list(rows[0].keys()) if rows else []
+    header = {"rows": len(rows), "columns": []}
+    blocks = []
+    for name in columns:
+        values = [row.get(name) for row in rows]
+        column_type = _infer_type(values)
+        block = zlib.compress(_encode_column(values, column_type))
+        header["columns"].append({"name": name, "type": column_type, "length": len(block)})
+        blocks.append(block)
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(file_path, mode='wb') as columnar_file:
+        columnar_file.write(COLUMNAR_MAGIC)
+        columnar_file.write(struct.pack("<I", len(header_bytes)))
+        columnar_file.write(header_bytes)
+        for block in blocks:
+            columnar_file.write(block)
+
+
+def read_columnar(file_path: str) -> List[dict]:
+    """Reads a columnar export back into a list of row dictionaries."""
+    with open(file_path, mode='rb') as columnar_file:
+        if columnar_file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError("Not a columnar report file.")
+        (header_length,) = struct.unpack("<I", columnar_file.read(4))
+        header = json.loads(columnar_file.read(header_length))
+        row_count = header["rows"]
+        data = {}
+        for column in header["columns"]:
+            raw = zlib.decompress(columnar_file.read(column["length"]))
+            data[column["name"]] = _decode_column(raw, column["type"], row_count)
+    return [{name: values[i] for name, values in data.items()} for i in range(row_count)]
+
+
+# Export format -> (file extension, writer, download media type)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "csv": (".csv", write_csv, "text/csv"),
+    "csv.gz": (".csv.gz", write_csv_gzip, "application/gzip"),
+    "ndjson": (".ndjson", write_ndjson, "application/x-ndjson"),
+    "columnar": (".ezcol", write_columnar, "application/octet-stream"),
+}
+
+
+def export_rows(rows: Iterable[dict], file_path_base: str, export_format: str = "csv") -> str:
+    """
+    Writes rows in the requested format and returns the final file path.
+    Raises:
+        ValueError: If the export format is unknown.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    extension, writer, _ = EXPORT_FORMATS[export_format]
+    file_path = f"{file_path_base}{extension}"
+    writer(rows, file_path)
+    logger.info(f"Report exported as {export_format} to {file_path}")
+    return file_path
+
+
+def media_type_for(export_format: str) -> str:
+    """Returns the download media type for an export format."""
+    if export_format == "zip":
+        return "application/zip"
+    return EXPORT_FORMATS.get(export_format, (None, None, "application/octet-stream"))[2]
+
+
+def _write_csv_rows(rows: Iterable[dict], csv_file) -> None:
+    writer = csv.writer(csv_file)
+    header_written = False
+    for row in rows:
+        if not header_written:
+            writer.writerow(row.keys())
+            header_written = True
+        writer.writerow(row.values())
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _infer_type(values: list) -> str:
+    """Picks the narrowest column type that holds every non-null value."""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, int) for v in present):
+        return INT_TYPE
+    if present and all(isinstance(v, (int, float)) for v in present):
+        return FLOAT_TYPE
+    return STR_TYPE
+
+
+def _encode_column(values: list, column_type: str) -> bytes:
+    """Encodes a column as a null bitmap followed by packed values."""
+    count = len(values)
+    bitmap = bytearray((count + 7) // 8)
+    for i, value in enumerate(values):
+        if value is None:
+            bitmap[i // 8] |= 1 << (i % 8)
+
+    buffer = io.BytesIO()
+    buffer.write(bytes(bitmap))
+    if column_type == INT_TYPE:
+        buffer.write(struct.pack(f"<{count}q", *[int(v) if v is not None else 0 for v in values]))
+    elif column_type == FLOAT_TYPE:
+        buffer.write(struct.pack(f"<{count}d", *[float(v) if v is not None else 0.0 for v in values]))
+    else:
+        encoded = [_json_default(v).encode("utf-8") if v is not None else b"" for v in values]
+        buffer.write(struct.pack(f"<{count}I", *[len(e) for e in encoded]))
+        buffer.write(b"".join(encoded))
+    return buffer.getvalue()
+
+
+def _decode_column(raw: bytes, column_type: str, count: int) -> list:
+    bitmap_length = (count + 7) // 8
+    bitmap, payload = raw[:bitmap_length], raw[bitmap_length:]
+    if column_type == INT_TYPE:
+        values = list(struct.unpack(f"<{count}q", payload[:8 * count]))
+    elif column_type == FLOAT_TYPE:
+        values = list(struct.unpack(f"<{count}d", payload[:8 * count]))
+    else:
+        lengths = struct.unpack(f"<{count}I", payload[:4 * count])
+        offset = 4 * count
+        values = []
+        for length in lengths:
+            values.append(payload[offset:offset + length].decode("utf-8"))
+            offset += length
+    return [None if bitmap[i // 8] & (1 << (i % 8)) else values[i] for i in range(count)]
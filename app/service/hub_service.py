@@ -0,0 +1,208 @@
+# hub_service.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastlite import Database
+
+from app.service.broker_service import Broker, LocalBroker
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Messages buffered per dashboard subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+# Messages a subscriber may lose without catching up before it is considered too slow and disconnected
+SLOW_CONSUMER_MAX_DROPS = 500
+# Seconds a route's zone is cached; edits made through another worker are picked up after this
+ROUTE_ZONE_CACHE_TTL = 300
+
+# Topic every route update is also published to
+ALL_ROUTES_TOPIC = "routes:all"
+
+
+def route_topic(route_id) -> str:
+    """Topic carrying updates for a single route."""
+    return f"route:{route_id}"
+
+
+def zone_topic(zone_id) -> str:
+    """Topic carrying updates for every route in a zone."""
+    return f"zone:{zone_id}"
+
+
+def relayed_route_update(topics: List[str], payload: str) -> Optional[dict]:
+    """The route update a message relayed from another worker carries, or None for other messages."""
+    if ALL_ROUTES_TOPIC not in topics:
+        return None
+    message = json.loads(payload)
+    return message if message.get("type") == "route_update" else None
+
+
+class Subscriber:
+    """
+    A dashboard connection's bounded inbox on the hub. `dropped` counts messages lost since
+    the subscriber last caught up with its queue; `total_dropped` counts all of them.
+    """
+
+    def __init__(self, topics: Iterable[str], queue_size: int):
+        self.topics: Set[str] = set(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.total_dropped = 0
+        self.closed = False
+
+    async def get(self, timeout: Optional[float] = None) -> str:
+        """
+        Waits for the next message. A subscriber that empties its queue has caught up,
+        so its drop count starts over.
+        Raises:
+            asyncio.TimeoutError: If no message arrives within the timeout.
+        """
+        payload = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        if self.queue.empty():
+            self.dropped = 0
+        return payload
+
+
+class RouteUpdateHub:
+    """
+    In-process publish/subscribe hub for route progress updates.
+    Publishing never blocks: each message is encoded once and put on every matching
+    subscriber's bounded queue; when a queue is full its oldest message is dropped, and
+    subscribers that keep falling behind are disconnected.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE, max_drops: int = SLOW_CONSUMER_MAX_DROPS,
+                 broker: Optional[Broker] = None):
+        self.queue_size = queue_size
+        self.max_drops = max_drops
+        self.broker = broker or LocalBroker()
+        self._topics: Dict[str, Set[Subscriber]] = defaultdict(set)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        """Registers a subscriber for the given topics."""
+        subscriber = Subscriber(topics, self.queue_size)
+        for topic in subscriber.topics:
+            self._topics[topic].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Removes a subscriber from all of its topics."""
+        subscriber.closed = True
+        for topic in subscriber.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def publish(self, topics: Iterable[str], message: dict) -> int:
+        """
+        Fans a message out to every subscriber of any of the topics, in this worker and,
+        through the broker, in all others. Returns the number of local subscribers reached.
+        """
+        topics = list(topics)
+        payload = json.dumps(message, default=str)
+        self.broker.publish(topics, payload)
+        return self.deliver(topics, payload)
+
+    def deliver(self, topics: Iterable[str], payload: str) -> int:
+        """Delivers an encoded message to this worker's subscribers only."""
+        recipients: Set[Subscriber] = set()
+        for topic in topics:
+            recipients.update(self._topics.get(topic, ()))
+        for subscriber in recipients:
+            self._deliver(subscriber, payload)
+        return len(recipients)
+
+    def subscriber_count(self) -> int:
+        """Returns the number of distinct live subscribers."""
+        return len({subscriber for subscribers in self._topics.values() for subscriber in subscribers})
+
+    def _deliver(self, subscriber: Subscriber, payload: str):
+        try:
+            subscriber.queue.put_nowait(payload)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        # Slow consumer: drop its oldest message to make room for the newest
+        subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(payload)
+        subscriber.dropped += 1
+        subscriber.total_dropped += 1
+        if subscriber.dropped >= self.max_drops:
+            logger.warning(f"Disconnecting slow dashboard subscriber after {subscriber.dropped} messages were "
+                           f"dropped without it catching up.")
+            self.unsubscribe(subscriber)
+
+
+class RouteZoneCache:
+    """
+    route_id -> zone_id, so publishing does not hit the database per message.
+    Entries expire after a TTL so a zone change made through another worker is picked up;
+    route edits in this worker invalidate their entry straight away.
+    """
+
+    def __init__(self, database: Optional[Database] = None, ttl: float = ROUTE_ZONE_CACHE_TTL):
+        self.db = database or db
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[Optional[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, route_id: int) -> Optional[int]:
+        """Returns the zone of a route, or None for an unknown route."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(route_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        rows = self.db.q("SELECT zone_id FROM routes WHERE id = ?", (route_id,))
+        zone_id = rows[0]['zone_id'] if rows else None
+        with self._lock:
+            self._entries[route_id] = (zone_id, now + self.ttl)
+        return zone_id
+
+    def invalidate(self, route_id: Optional[int] = None):
+        """Forgets a route's zone, or every cached zone when no route is given."""
+        with self._lock:
+            if route_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(route_id, None)
+
+
+class RouteProgress:
+    """
+    Latest completion fraction (0-1) crews reported for each route today, read by the ETA check.
+    Crews connect to any worker, so only the leader's copy is complete: it records the updates
+    of the other workers as the broker relays them.
+    """
+
+    def __init__(self):
+        # route_id -> (date, fraction)
+        self._progress: Dict[int, Tuple[date, float]] = {}
+
+    def record(self, route_id: Optional[int], progress, day: Optional[date] = None) -> bool:
+        """Remembers a reported fraction, clamped to 0-1. Returns False when there is nothing to record."""
+        if route_id is None or isinstance(progress, bool) or not isinstance(progress, (int, float)):
+            return False
+        self._progress[route_id] = (day or date.today(), min(max(float(progress), 0.0), 1.0))
+        return True
+
+    def for_day(self, day: Optional[date] = None) -> Dict[int, float]:
+        """Fractions reported on the day (today by default), by route."""
+        day = day or date.today()
+        return {route_id: value for route_id, (reported, value) in self._progress.items() if reported == day}
+
+
+route_zones = RouteZoneCache()
@@ -0,0 +1,252 @@
+# location_service.py
+
+import asyncio
+import logging
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastlite import Database
+
+from app.service.spatial_service import index_truck_positions
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Positions buffered per route between flushes; the oldest are overwritten when full
+POSITION_BUFFER_SIZE = 512
+# Milliseconds between batched writes of buffered positions
+LOCATION_FLUSH_INTERVAL_MS = 500
+
+# Coordinates are stored as integer microdegrees (about 0.1 m) to keep rows small
+COORDINATE_SCALE = 1_000_000
+
+# A position row: (route_id, recorded_at in epoch milliseconds, lat microdegrees, lon microdegrees)
+PositionRow = Tuple[int, int, int, int]
+
+# Decimal places coordinates are rounded to when grouping reports by place (about 11 m)
+LOCATION_KEY_PRECISION = 4
+
+
+def parse_location(location) -> Optional[Tuple[float, float]]:
+    """
+    Extracts (lat, lon) from a websocket location payload.
+    Accepts {"lat": .., "lon": ..} (or "lng"), [lat, lon] or "lat,lon"; anything else returns None.
+    """
+    try:
+        if isinstance(location, dict):
+            lat, lon = location["lat"], location.get("lon", location.get("lng"))
+        elif isinstance(location, (list, tuple)):
+            lat, lon = location
+        elif isinstance(location, str):
+            lat, lon = location.split(",")
+        else:
+            return None
+        lat, lon = float(lat), float(lon)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def location_key(location, precision: int = LOCATION_KEY_PRECISION):
+    """
+    Hashable key for grouping reports made at the same place: the coordinates rounded to
+    `precision` decimals, a free-text location as given, or None when there is neither.
+    """
+    point = parse_location(location)
+    if point is not None:
+        return round(point[0], precision), round(point[1], precision)
+    return location if isinstance(location, str) else None
+
+
+@dataclass
+class RoutePosition:
+    route_id: int = field(default=0)
+    recorded_at: int = field(default=0)     # Epoch milliseconds
+    lat: float = field(default=0.0)
+    lon: float = field(default=0.0)
+
+    # Table name in the database
+    __tablename__ = 'route_positions'
+
+    @classmethod
+    def create_table(cls):
+        """Creates the route_positions table if it doesn't exist."""
+        query = f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            route_id INTEGER NOT NULL,
+            recorded_at INTEGER NOT NULL,
+            lat_e6 INTEGER NOT NULL,
+            lon_e6 INTEGER NOT NULL,
+            PRIMARY KEY (route_id, recorded_at)
+        ) WITHOUT ROWID
+        '''
+        db.execute(query)
+
+    @classmethod
+    def insert_many(cls, rows: List[PositionRow]):
+        """Writes a batch of position rows in one transaction; duplicate timestamps are ignored."""
+        if not rows:
+            return
+        with db.conn:
+            db.conn.executemany(
+                f"INSERT OR IGNORE INTO {cls.__tablename__} (route_id, recorded_at, lat_e6, lon_e6) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    @classmethod
+    def find_track(cls, route_id: int, since: Optional[int] = None, until: Optional[int] = None) -> List['RoutePosition']:
+        """Returns the positions recorded for a route, oldest first, optionally bounded in epoch milliseconds."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE route_id = ? AND recorded_at >= ? AND recorded_at <= ? ORDER BY recorded_at"
+        rows = db.q(query, (route_id, since or 0, until if until is not None else 2 ** 62))
+        return [cls._parse_row(row) for row in rows]
+
+    @classmethod
+    def find_latest(cls, route_id: int) -> Optional['RoutePosition']:
+        """Returns the last stored position of a route."""
+        query = f"SELECT * FROM {cls.__tablename__} WHERE route_id = ? ORDER BY recorded_at DESC LIMIT 1"
+        rows = db.q(query, (route_id,))
+        return cls._parse_row(rows[0]) if rows else None
+
+    @classmethod
+    def _parse_row(cls, row: dict) -> 'RoutePosition':
+        return cls(
+            route_id=row['route_id'],
+            recorded_at=row['recorded_at'],
+            lat=row['lat_e6'] / COORDINATE_SCALE,
+            lon=row['lon_e6'] / COORDINATE_SCALE
+        )
+
+
+class PositionRingBuffer:
+    """
+    Fixed-size ring buffer of one route's positions, held in typed arrays rather
+    than per-point objects. When it fills up between flushes the oldest points are overwritten.
+    """
+
+    def __init__(self, size: int = POSITION_BUFFER_SIZE):
+        self.size = size
+        self.timestamps = array('q', bytes(8 * size))
+        self.lats = array('i', bytes(4 * size))
+        self.lons = array('i', bytes(4 * size))
+        self.start = 0
+        self.count = 0
+        self.dropped = 0
+
+    def append(self, recorded_at: int, lat_e6: int, lon_e6: int):
+        index = (self.start + self.count) % self.size
+        self.timestamps[index] = recorded_at
+        self.lats[index] = lat_e6
+        self.lons[index] = lon_e6
+        if self.count < self.size:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.size
+            self.dropped += 1
+
+    def drain(self, route_id: int) -> List[PositionRow]:
+        """Returns the buffered points as rows, oldest first, and empties the buffer."""
+        rows = []
+        for i in range(self.count):
+            index = (self.start + i) % self.size
+            rows.append((route_id, self.timestamps[index], self.lats[index], self.lons[index]))
+        self.start = 0
+        self.count = 0
+        return rows
+
+
+class LocationIngestor:
+    """
+    Buffers GPS pings per route and writes them in batches, so a fleet can send
+    thousands of pings a second without a database write per message. Keeps an
+    in-memory index of each route's latest position. After each write, on_flush receives
+    the latest position of every route that moved in the batch.
+    """
+
+    def __init__(self, writer: Callable[[List[PositionRow]], None] = RoutePosition.insert_many,
+                 buffer_size: int = POSITION_BUFFER_SIZE,
+                 on_flush: Optional[Callable[[Dict[int, Tuple[int, float, float]]], object]] = None):
+        self.writer = writer
+        self.on_flush = on_flush
+        self.buffer_size = buffer_size
+        self._buffers: Dict[int, PositionRingBuffer] = {}
+        # route_id -> (recorded_at ms, lat, lon)
+        self._latest: Dict[int, Tuple[int, float, float]] = {}
+
+    def ingest(self, route_id: int, location, recorded_at=None) -> bool:
+        """Buffers one ping. Returns False if the location could not be parsed."""
+        coordinates = parse_location(location)
+        if route_id is None or coordinates is None:
+            return False
+        lat, lon = coordinates
+        # Device timestamps are epoch milliseconds; anything else is stamped on arrival
+        recorded_at = int(recorded_at) if isinstance(recorded_at, (int, float)) else int(time.time() * 1000)
+        buffer = self._buffers.get(route_id)
+        if buffer is None:
+            buffer = self._buffers[route_id] = PositionRingBuffer(self.buffer_size)
+        buffer.append(recorded_at, round(lat * COORDINATE_SCALE), round(lon * COORDINATE_SCALE))
+        latest = self._latest.get(route_id)
+        if latest is None or recorded_at >= latest[0]:
+            self._latest[route_id] = (recorded_at, lat, lon)
+        return True
+
+    def latest(self, route_id: int) -> Optional[Tuple[int, float, float]]:
+        """Returns the latest known (recorded_at ms, lat, lon) of a route."""
+        return self._latest.get(route_id)
+
+    def latest_positions(self) -> Dict[int, Tuple[int, float, float]]:
+        """Returns the latest known position of every route seen since startup."""
+        return dict(self._latest)
+
+    def pending_count(self) -> int:
+        """Returns the number of buffered points not yet written."""
+        return sum(buffer.count for buffer in self._buffers.values())
+
+    def drain(self) -> List[PositionRow]:
+        """Takes every buffered point out of the ring buffers."""
+        rows = []
+        for route_id, buffer in self._buffers.items():
+            if buffer.dropped:
+                logger.warning(f"Position buffer for route {route_id} overflowed; {buffer.dropped} points dropped.")
+                buffer.dropped = 0
+            rows.extend(buffer.drain(route_id))
+        return rows
+
+    async def flush(self) -> int:
+        """
+        Writes all buffered points in one batch off the event loop. Returns the number written.
+        If the write fails the batch goes back into the buffers, ahead of points received since,
+        so the next flush retries it.
+        """
+        rows = self.drain()
+        if not rows:
+            return 0
+        moved = {route_id: self._latest[route_id] for route_id in {row[0] for row in rows}}
+        try:
+            await asyncio.to_thread(self.writer, rows)
+        except Exception:
+            self._requeue(rows)
+            raise
+        if self.on_flush:
+            await asyncio.to_thread(self.on_flush, moved)
+        return len(rows)
+
+    def _requeue(self, rows: List[PositionRow]):
+        # Runs on the event loop, like ingest(), so the buffers are never touched from two threads
+        failed: Dict[int, List[PositionRow]] = {}
+        for row in rows:
+            failed.setdefault(row[0], []).append(row)
+        for route_id, route_rows in failed.items():
+            buffer = self._buffers.get(route_id)
+            if buffer is None:
+                buffer = self._buffers[route_id] = PositionRingBuffer(self.buffer_size)
+            for _, recorded_at, lat_e6, lon_e6 in route_rows + buffer.drain(route_id):
+                buffer.append(recorded_at, lat_e6, lon_e6)
+
+
+ingestor = LocationIngestor(on_flush=index_truck_positions)
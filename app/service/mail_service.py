@@ -0,0 +1,177 @@
+# mail_service.py
+
+import asyncio
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAIL_FROM = "no-reply@example.com"
+# Connections kept open to the mail server
+DEFAULT_SMTP_POOL_SIZE = 4
+
+# Seconds an idle connection is kept before it is checked with NOOP on reuse
+SMTP_IDLE_CHECK_AFTER = 30
+# Seconds after which an idle connection is closed instead of reused
+SMTP_IDLE_TIMEOUT = 240
+SMTP_TIMEOUT = 30
+
+
+def build_message(sender: str, recipient: str, subject: str, body: str, message_id: Optional[str] = None) -> str:
+    msg = MIMEText(body)
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = recipient
+    if message_id:
+        msg['Message-ID'] = message_id
+    return msg.as_string()
+
+
+class SmtpPool:
+    """
+    Pool of persistent, authenticated SMTP connections.
+    Each connection pays for connect, STARTTLS and login once and then carries many
+    messages; up to `size` messages are in flight at once, one per connection. smtplib is
+    blocking, so the async API hands each send to a worker thread and the event loop never
+    waits on the mail server.
+    """
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "", use_tls: bool = True,
+                 sender: str = DEFAULT_MAIL_FROM, size: int = DEFAULT_SMTP_POOL_SIZE, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.sender = sender
+        self.size = size
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._background: set = set()
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self.connections_opened += 1
+        return smtp
+
+    def _checkout(self) -> smtplib.SMTP:
+        # Most recently used first, so surplus connections age out instead of all staying warm
+        while True:
+            try:
+                smtp, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            idle = time.monotonic() - last_used
+            if idle > SMTP_IDLE_TIMEOUT:
+                self._close(smtp)
+                continue
+            if idle > SMTP_IDLE_CHECK_AFTER:
+                try:
+                    if smtp.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP failed")
+                except (smtplib.SMTPException, OSError):
+                    self._close(smtp)
+                    continue
+            return smtp
+
+    def _checkin(self, smtp: smtplib.SMTP):
+        self._idle.put((smtp, time.monotonic()))
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def send_sync(self, recipient: str, subject: str, body: str, message_id: Optional[str] = None):
+        """Sends one message over a pooled connection, reconnecting once if the server dropped it."""
+        message = build_message(self.sender, recipient, subject, body, message_id)
+        with self._slots:
+            smtp = self._checkout()
+            try:
+                try:
+                    smtp.sendmail(self.sender, [recipient], message)
+                except smtplib.SMTPServerDisconnected:
+                    self._close(smtp)
+                    smtp = self._connect()
+                    smtp.sendmail(self.sender, [recipient], message)
+            except Exception:
+                self._close(smtp)
+                raise
+            self._checkin(smtp)
+
+    async def send(self, recipient: str, subject: str, body: str, message_id: Optional[str] = None):
+        """Sends one message without blocking the event loop."""
+        await asyncio.to_thread(self.send_sync, recipient, subject, body, message_id)
+
+    async def send_many(self, recipients: Iterable[str], subject: str, body: str) -> List[bool]:
+        """Sends the same message to many recipients concurrently. Returns which sends succeeded."""
+        async def attempt(recipient):
+            try:
+                await self.send(recipient, subject, body)
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                logger.error(f"Failed to send email to {recipient}: {e}")
+                return False
+
+        return await asyncio.gather(*[attempt(recipient) for recipient in recipients])
+
+    def send_in_background(self, recipients: Iterable[str], subject: str, body: str,
+                           on_done: Optional[Callable[[List[bool]], None]] = None):
+        """
+        Sends without making the caller wait: as a task when called from the event loop,
+        otherwise synchronously. on_done receives which sends succeeded.
+        """
+        recipients = list(recipients)
+
+        async def deliver():
+            results = await self.send_many(recipients, subject, body)
+            if on_done:
+                on_done(results)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(deliver())
+            return
+        task = loop.create_task(deliver())
+        # Keep a reference so the task is not garbage collected mid-send
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(smtp)
+
+
+_mailer: Optional[SmtpPool] = None
+
+
+def get_mailer() -> SmtpPool:
+    """Returns the application's SMTP pool, configured from settings on first use."""
+    global _mailer
+    if _mailer is None:
+        # Imported here so the pool can be used without app settings
+        from config.settings import (
+            SMTP_SERVER, SMTP_PORT, EMAIL_USERNAME, EMAIL_PASSWORD, EMAIL_USE_TLS, MAIL_FROM, SMTP_POOL_SIZE
+        )
+        _mailer = SmtpPool(SMTP_SERVER, SMTP_PORT, EMAIL_USERNAME, EMAIL_PASSWORD, EMAIL_USE_TLS,
+                           sender=MAIL_FROM, size=SMTP_POOL_SIZE)
+    return _mailer
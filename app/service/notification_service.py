@@ -0,0 +1,185 @@
+# notification_service.py
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sends concurrently in flight across all channels
+MAX_CONCURRENT_SENDS = 20
+# Attempts per message before giving up
+MAX_SEND_ATTEMPTS = 3
+# Base delay in seconds for exponential retry backoff
+RETRY_BACKOFF_BASE = 0.5
+
+# A channel sender delivers one message: sender(recipient, subject, message)
+Sender = Callable[[str, str, str], Awaitable[None]]
+
+
+class RateLimiter:
+    """Token bucket limiting how many sends per second a channel may start."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class NotificationDispatcher:
+    """
+    Sends notifications over registered channels (email, SMS, ...) concurrently.
+    A shared semaphore bounds the number of sends in flight, each channel has its own
+    rate limit, and failed sends are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_SENDS, max_attempts: int = MAX_SEND_ATTEMPTS,
+                 backoff_base: float = RETRY_BACKOFF_BASE):
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self._channels: Dict[str, Sender] = {}
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def register_channel(self, name: str, sender: Sender, rate_per_second: Optional[float] = None):
+        """Registers a channel sender, optionally rate limited."""
+        self._channels[name] = sender
+        if rate_per_second:
+            self._limiters[name] = RateLimiter(rate_per_second)
+
+    async def send(self, channel: str, recipient: str, subject: str, message: str) -> bool:
+        """Sends one notification, retrying on failure. Returns whether it was delivered."""
+        sender = self._channels.get(channel)
+        if sender is None:
+            raise ValueError(f"Unknown notification channel: {channel}")
+        if not recipient:
+            return False
+
+        # Created lazily so the semaphore binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        for attempt in range(1, self.max_attempts + 1):
+            limiter = self._limiters.get(channel)
+            if limiter:
+                await limiter.acquire()
+            try:
+                async with self._semaphore:
+                    await sender(recipient, subject, message)
+                return True
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Giving up on {channel} notification to {recipient} after {attempt} attempts: {e}")
+                    return False
+                delay = self.backoff_base * 2 ** (attempt - 1) * (1 + random.random())
+                logger.warning(f"{channel} notification to {recipient} failed ({e}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        return False
+
+    async def send_many(self, channel: str, recipients: Iterable[str], subject: str, message: str) -> List[bool]:
+        """Sends the same notification to many recipients concurrently."""
+        return await asyncio.gather(*[self.send(channel, recipient, subject, message) for recipient in recipients])
+
+
+# Seconds during which repeats of the same alert are suppressed, per alert type
+ALERT_COALESCE_WINDOWS = {
+    "Delayed": 900,
+    "Issue": 300,
+    "Late ETA": 3600,
+}
+DEFAULT_COALESCE_WINDOW = 300
+# Seconds non-urgent alerts are collected before each recipient gets one digest
+DIGEST_WINDOW = 600
+
+
+class AlertCoalescer:
+    """
+    Deduplicates alerts keyed by (subject id, alert type): the first alert in a window goes
+    out, repeats inside the window are only counted, and that count can be reported with
+    the next alert that does go out.
+    """
+
+    def __init__(self, windows: Optional[Dict[str, float]] = None, default_window: float = DEFAULT_COALESCE_WINDOW,
+                 clock: Callable[[], float] = time.monotonic):
+        self.windows = windows if windows is not None else dict(ALERT_COALESCE_WINDOWS)
+        self.default_window = default_window
+        self.clock = clock
+        # (key, alert type) -> [window opened at, repeats suppressed in this window, repeats suppressed in the last one]
+        self._state: Dict[tuple, list] = {}
+
+    def should_send(self, key, alert_type: str) -> bool:
+        """Records an occurrence and returns whether it should be sent."""
+        now = self.clock()
+        window = self.windows.get(alert_type, self.default_window)
+        state = self._state.get((key, alert_type))
+        if state is not None and now - state[0] < window:
+            state[1] += 1
+            return False
+        self._prune(now)
+        self._state[(key, alert_type)] = [now, 0, state[1] if state else 0]
+        return True
+
+    def suppressed_before(self, key, alert_type: str) -> int:
+        """Returns how many repeats were suppressed in the window before the current one."""
+        state = self._state.get((key, alert_type))
+        return state[2] if state else 0
+
+    def _prune(self, now: float):
+        # Forget keys idle for two full windows so the state does not grow with every route ever alerted on
+        horizon = 2 * max([self.default_window, *self.windows.values()])
+        expired = [k for k, state in self._state.items() if now - state[0] >= horizon]
+        for k in expired:
+            del self._state[k]
+
+
+class DigestBatcher:
+    """Collects non-urgent alerts per recipient and sends each recipient one combined message per window."""
+
+    def __init__(self, dispatcher: NotificationDispatcher, channel: str = "email", window: float = DIGEST_WINDOW):
+        self.dispatcher = dispatcher
+        self.channel = channel
+        self.window = window
+        self._pending: Dict[str, List[tuple]] = {}
+
+    def add(self, recipient: str, subject: str, message: str):
+        """Queues an alert for the recipient's next digest; identical alerts are merged."""
+        if not recipient:
+            return
+        items = self._pending.setdefault(recipient, [])
+        if (subject, message) not in items:
+            items.append((subject, message))
+
+    def pending_count(self) -> int:
+        """Returns the number of alerts waiting across all recipients."""
+        return sum(len(items) for items in self._pending.values())
+
+    async def flush(self) -> int:
+        """Sends one digest per recipient with everything queued. Returns the number of digests sent."""
+        pending, self._pending = self._pending, {}
+        sends = []
+        for recipient, items in pending.items():
+            if len(items) == 1:
+                subject, message = items[0]
+            else:
+                subject = f"Alert Digest: {len(items)} alerts"
+                message = "\n\n".join(f"{item_subject}\n{item_message}" for item_subject, item_message in items)
+            sends.append(self.dispatcher.send(self.channel, recipient, subject, message))
+        await asyncio.gather(*sends)
+        return len(sends)
@@ -0,0 +1,298 @@
+# optimizer_service.py
+
+import logging
+import time as timer
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from fastlite import Database
+
+from app.service.conflict_service import ROSTER, WORK, CREW, DRIVER, roster_day, minutes
+from app.service.eta_service import get_eta_model
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Hours of work a crew may be planned for in one day
+MAX_CREW_HOURS = 10.0
+# When the first route of the day starts
+DAY_START = time(6, 30)
+# Seconds the local search may spend improving the greedy plan
+LOCAL_SEARCH_SECONDS = 0.5
+# Event types that suspend collection for the clients they affect; other events mark the work as "Event"
+SUSPENDING_EVENT_TYPES = {"Holiday"}
+# Condition for a truck that may be dispatched on a day (bound to the day twice)
+ROADWORTHY_SQL = '''
+    status = 'Operational'
+    AND (next_inspection_due IS NULL OR next_inspection_due >= ?)
+    AND (brake_check_due IS NULL OR brake_check_due >= ?)
+'''
+
+
+@dataclass
+class CrewSlot:
+    crew_id: int
+    driver_id: Optional[int] = None
+    truck_id: Optional[int] = None
+    loader_ids: List[int] = field(default_factory=list)
+    capacity: int = 0               # Truck capacity in kg
+    booked_hours: float = 0.0       # Work already assigned for the day
+
+
+@dataclass
+class RouteJob:
+    route_id: int
+    zone_id: Optional[int] = None
+    client_id: Optional[int] = None
+    week_type: str = "Regular"
+
+
+@dataclass
+class PlannedAssignment:
+    crew_id: int
+    route_id: int
+    zone_id: Optional[int]
+    client_id: Optional[int]
+    week_type: str
+    start_time: time
+    end_time: time
+    hours: float
+
+
+@dataclass
+class AssignmentPlan:
+    day: date
+    assignments: List[PlannedAssignment] = field(default_factory=list)
+    unassigned: List[int] = field(default_factory=list)     # Route IDs no crew had room for
+    skipped: List[int] = field(default_factory=list)        # Route IDs suspended by events
+    crew_hours: Dict[int, float] = field(default_factory=dict)
+
+
+class AssignmentSolver:
+    """
+    Spreads routes over crews so expected workload is balanced.
+    Each crew is weighted by its truck's capacity relative to the fleet average, and the
+    plan minimises the sum of load² / weight, which is lowest when every crew carries
+    work in proportion to its weight, so bigger trucks take proportionally more.
+    A greedy pass places the longest routes first on the crew where they add least;
+    local search then relocates and swaps routes away from the most loaded crews until
+    nothing improves or the time budget runs out.
+    """
+
+    def __init__(self, crews: List[CrewSlot], hours: List[List[float]], max_hours: float = MAX_CREW_HOURS,
+                 time_budget: float = LOCAL_SEARCH_SECONDS):
+        self.crews = crews
+        self.hours = hours              # hours[route][crew]
+        self.max_hours = max_hours
+        self.time_budget = time_budget
+        capacities = [c.capacity for c in crews if c.capacity > 0]
+        average = sum(capacities) / len(capacities) if capacities else 1
+        self.weights = [c.capacity / average if c.capacity > 0 else 1.0 for c in crews]
+        self.loads = [c.booked_hours for c in crews]
+        self.owner: List[Optional[int]] = [None] * len(hours)
+
+    def _cost(self, crew: int, load: float) -> float:
+        return load * load / self.weights[crew]
+
+    def _delta_add(self, route: int, crew: int) -> Optional[float]:
+        new_load = self.loads[crew] + self.hours[route][crew]
+        if new_load > self.max_hours:
+            return None
+        return self._cost(crew, new_load) - self._cost(crew, self.loads[crew])
+
+    def _assign(self, route: int, crew: Optional[int]):
+        previous = self.owner[route]
+        if previous is not None:
+            self.loads[previous] -= self.hours[route][previous]
+        if crew is not None:
+            self.loads[crew] += self.hours[route][crew]
+        self.owner[route] = crew
+
+    def greedy(self):
+        order = sorted(range(len(self.hours)), key=lambda r: -sum(self.hours[r]) / max(1, len(self.crews)))
+        for route in order:
+            best, best_delta = None, None
+            for crew in range(len(self.crews)):
+                delta = self._delta_add(route, crew)
+                if delta is not None and (best_delta is None or delta < best_delta):
+                    best, best_delta = crew, delta
+            if best is not None:
+                self._assign(route, best)
+
+    def _try_relocate(self, route: int) -> bool:
+        source = self.owner[route]
+        source_hours = self.hours[route][source]
+        gain = self._cost(source, self.loads[source]) - self._cost(source, self.loads[source] - source_hours)
+        best, best_delta = None, 0.0
+        for crew in range(len(self.crews)):
+            if crew == source:
+                continue
+            delta = self._delta_add(route, crew)
+            if delta is not None and delta - gain < best_delta - 1e-9:
+                best, best_delta = crew, delta - gain
+        if best is None:
+            return False
+        self._assign(route, best)
+        return True
+
+    def _try_swap(self, route: int, by_crew: List[List[int]]) -> bool:
+        a = self.owner[route]
+        for b in range(len(self.crews)):
+            if b == a:
+                continue
+            for other in by_crew[b]:
+                load_a = self.loads[a] - self.hours[route][a] + self.hours[other][a]
+                load_b = self.loads[b] - self.hours[other][b] + self.hours[route][b]
+                if load_a > self.max_hours or load_b > self.max_hours:
+                    continue
+                before = self._cost(a, self.loads[a]) + self._cost(b, self.loads[b])
+                if self._cost(a, load_a) + self._cost(b, load_b) < before - 1e-9:
+                    self._assign(route, b)
+                    self._assign(other, a)
+                    return True
+        return False
+
+    def local_search(self):
+        deadline = timer.monotonic() + self.time_budget
+        improved = True
+        while improved and timer.monotonic() < deadline:
+            improved = False
+            # Unplaced routes may fit once the plan has been rebalanced
+            for route, crew in enumerate(self.owner):
+                if crew is None:
+                    best = min((c for c in range(len(self.crews)) if self._delta_add(route, c) is not None),
+                               key=lambda c: self._delta_add(route, c), default=None)
+                    if best is not None:
+                        self._assign(route, best)
+                        improved = True
+            by_crew = [[] for _ in self.crews]
+            for route, crew in enumerate(self.owner):
+                if crew is not None:
+                    by_crew[crew].append(route)
+            # Work from the most loaded crews down, where balancing gains most
+            for crew in sorted(range(len(self.crews)), key=lambda c: -self.loads[c] / self.weights[c]):
+                for route in list(by_crew[crew]):
+                    if timer.monotonic() >= deadline:
+                        return
+                    if self.owner[route] != crew:
+                        continue
+                    if self._try_relocate(route) or self._try_swap(route, by_crew):
+                        improved = True
+                        break
+                if improved:
+                    break
+
+    def solve(self) -> List[Optional[int]]:
+        """Returns the crew index of every route, or None where no crew had room."""
+        self.greedy()
+        self.local_search()
+        return self.owner
+
+
+def suspended_and_event_clients(day: date):
+    """Returns the clients whose collection is suspended on the day, and those affected by other events."""
+    suspended, affected = set(), set()
+    rows = db.q("SELECT affected_clients, event_type FROM events WHERE start_date <= ? AND end_date >= ?",
+                (day.isoformat(), day.isoformat()))
+    for row in rows:
+        clients = {int(c) for c in row['affected_clients'].split(",") if c} if row['affected_clients'] else set()
+        (suspended if row['event_type'] in SUSPENDING_EVENT_TYPES else affected).update(clients)
+    return suspended, affected
+
+
+def load_route_jobs(day: date):
+    """Returns the routes still to be assigned on the day, and those suspended by events."""
+    suspended, affected = suspended_and_event_clients(day)
+    rows = db.q('''
+        SELECT r.id, r.zone_id, z.client_id FROM routes r
+        LEFT JOIN zones z ON z.id = r.zone_id
+        WHERE r.id NOT IN (SELECT route_id FROM assignments WHERE doc = ?)
+        ORDER BY r.id
+    ''', (day.isoformat(),))
+    jobs, skipped = [], []
+    for row in rows:
+        if row['client_id'] in suspended:
+            skipped.append(row['id'])
+            continue
+        week_type = "Event" if row['client_id'] in affected else "Regular"
+        jobs.append(RouteJob(row['id'], row['zone_id'], row['client_id'], week_type))
+    return jobs, skipped
+
+
+def load_available_crews(day: date) -> List[CrewSlot]:
+    """
+    Crews able to work on the day: their truck is operational and not overdue for inspection
+    or a brake check and, when the week has a roster for that day, their driver is on it.
+    Work already booked counts towards their hours.
+    """
+    rows = db.q(f'''
+        SELECT c.id, c.driver_id, c.truck_id, c.loaders, t.capacity FROM crews c
+        JOIN (SELECT id, capacity FROM trucks WHERE {ROADWORTHY_SQL}) t ON t.id = c.truck_id
+        ORDER BY c.id
+    ''', (day.isoformat(), day.isoformat()))
+    rostered = {row['resource_id'] for row in db.q(
+        "SELECT resource_id FROM bookings WHERE layer = ? AND resource_kind = ? AND day = ?",
+        (ROSTER, DRIVER, roster_day(day.isocalendar()[1], day.strftime("%A")))
+    )}
+    booked_until = {row['resource_id']: row['until'] for row in db.q(
+        "SELECT resource_id, MAX(end_min) AS until FROM bookings WHERE layer = ? AND resource_kind = ? AND day = ? GROUP BY resource_id",
+        (WORK, CREW, day.isoformat())
+    )}
+    crews = []
+    for row in rows:
+        if rostered and row['driver_id'] not in rostered:
+            continue
+        booked = max(0, booked_until.get(row['id'], 0) - minutes(DAY_START)) / 60
+        crews.append(CrewSlot(
+            crew_id=row['id'], driver_id=row['driver_id'], truck_id=row['truck_id'],
+            loader_ids=[int(i) for i in row['loaders'].split(",") if i] if row['loaders'] else [],
+            capacity=row['capacity'] or 0, booked_hours=booked
+        ))
+    return crews
+
+
+def build_plan(day: date, jobs: List[RouteJob], crews: List[CrewSlot], hours: List[List[float]],
+               owners: List[Optional[int]]) -> AssignmentPlan:
+    """Orders each crew's routes into back-to-back time windows from the start of the day."""
+    plan = AssignmentPlan(day=day)
+    by_crew: Dict[int, List[int]] = {}
+    for route, crew in enumerate(owners):
+        if crew is None:
+            plan.unassigned.append(jobs[route].route_id)
+        else:
+            by_crew.setdefault(crew, []).append(route)
+    for crew, routes in by_crew.items():
+        slot = crews[crew]
+        start = datetime.combine(day, DAY_START) + timedelta(hours=slot.booked_hours)
+        # Longest routes first, while crews are fresh
+        for route in sorted(routes, key=lambda r: -hours[r][crew]):
+            job = jobs[route]
+            end = start + timedelta(hours=hours[route][crew])
+            plan.assignments.append(PlannedAssignment(
+                crew_id=slot.crew_id, route_id=job.route_id, zone_id=job.zone_id, client_id=job.client_id,
+                week_type=job.week_type, start_time=start.time().replace(second=0, microsecond=0),
+                end_time=end.time().replace(second=0, microsecond=0), hours=hours[route][crew]
+            ))
+            start = end
+        plan.crew_hours[slot.crew_id] = round(slot.booked_hours + sum(hours[r][crew] for r in routes), 2)
+    return plan
+
+
+def plan_assignments(day: date, time_budget: float = LOCAL_SEARCH_SECONDS) -> AssignmentPlan:
+    """Plans crew-to-route assignments for every unassigned route of the day. Nothing is written."""
+    started = timer.monotonic()
+    jobs, skipped = load_route_jobs(day)
+    crews = load_available_crews(day)
+    if not jobs or not crews:
+        return AssignmentPlan(day=day, unassigned=[job.route_id for job in jobs], skipped=skipped)
+
+    hours = get_eta_model().predict_hours_matrix([j.route_id for j in jobs], [c.crew_id for c in crews], day.strftime("%A"))
+    owners = AssignmentSolver(crews, hours, time_budget=time_budget).solve()
+    plan = build_plan(day, jobs, crews, hours, owners)
+    plan.skipped = skipped
+    logger.info(f"Planned {len(plan.assignments)} assignments for {day} over {len(crews)} crews "
+                f"({len(plan.unassigned)} unassigned, {len(skipped)} suspended) in {timer.monotonic() - started:.2f}s.")
+    return plan
@@ -0,0 +1,311 @@
+# outbox_service.py
+
+import asyncio
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastlite import Database
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Messages claimed and sent per delivery round
+OUTBOX_BATCH_SIZE = 50
+# Seconds between delivery rounds
+OUTBOX_POLL_INTERVAL = 5
+# Attempts per message before it is marked Failed
+OUTBOX_MAX_ATTEMPTS = 6
+# Base delay in seconds for exponential retry backoff
+OUTBOX_RETRY_BACKOFF = 30
+# Seconds a claimed message stays reserved; a worker that died mid-send releases it on expiry
+OUTBOX_CLAIM_LEASE = 300
+# Days delivered messages are kept before they are purged
+OUTBOX_RETENTION_DAYS = 30
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# A channel sender delivers one message: sender(recipient, subject, body, message_id)
+OutboxSender = Callable[[str, str, str, str], Awaitable[None]]
+
+
+@dataclass
+class OutboxMessage:
+    id: Optional[int] = field(default=None)
+    idempotency_key: str = field(default="")     # Unique per logical notification; repeats are ignored
+    channel: str = field(default="email")
+    recipient: str = field(default="")
+    subject: str = field(default="")
+    body: str = field(default="")
+    aggregate: str = field(default="")            # Table of the record the message is about, e.g. "schedules"
+    aggregate_id: Optional[int] = field(default=None)
+    status: str = field(default="Pending")        # Pending, Sending, Sent, Failed
+    attempts: int = field(default=0)
+    next_attempt_at: datetime = field(default_factory=datetime.now)
+    last_error: str = field(default="")
+
+    @property
+    def message_id(self) -> str:
+        """Stable Message-ID, so a message re-sent after a crash can be recognised downstream."""
+        return f"<outbox-{self.id}.{self.idempotency_key.replace(':', '.')}@ezzday>"
+
+
+class Outbox:
+    """
+    Transactional outbox: messages are written to the outbox table in the same
+    transaction as the change that causes them, so they are recorded if and only
+    if the change commits. OutboxWorker delivers them afterwards.
+    """
+
+    __tablename__ = 'outbox'
+
+    def __init__(self, database: Database = db):
+        self.db = database
+
+    def create_table(self):
+        """Creates the outbox table if it doesn't exist."""
+        self.db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {self.__tablename__} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            channel TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            subject TEXT,
+            body TEXT,
+            aggregate TEXT,
+            aggregate_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'Pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME
+        )
+        ''')
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.__tablename__}_due ON {self.__tablename__} (status, next_attempt_at)")
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.__tablename__}_aggregate ON {self.__tablename__} (aggregate, aggregate_id)")
+
+    def add(self, messages: Iterable[OutboxMessage]):
+        """
+        Records messages for delivery. Joins the caller's transaction when called inside
+        `with db.conn:` on the same database; messages whose idempotency key was already
+        recorded are ignored.
+        """
+        rows = [
+            (m.idempotency_key, m.channel, m.recipient, m.subject, m.body, m.aggregate, m.aggregate_id,
+             m.next_attempt_at.strftime(TIME_FORMAT))
+            for m in messages
+        ]
+        if not rows:
+            return
+        with self.db.conn:
+            self.db.conn.executemany(f'''
+                INSERT OR IGNORE INTO {self.__tablename__} (
+                    idempotency_key, channel, recipient, subject, body, aggregate, aggregate_id, next_attempt_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    def claim(self, now: datetime, limit: int = OUTBOX_BATCH_SIZE, lease: float = OUTBOX_CLAIM_LEASE) -> List[OutboxMessage]:
+        """
+        Reserves up to `limit` due messages, oldest first, and returns them. Messages left
+        in Sending by a worker that stopped mid-round become due again once their lease ends.
+        """
+        now_str = now.strftime(TIME_FORMAT)
+        with self.db.conn:
+            rows = self.db.q(f'''
+                SELECT * FROM {self.__tablename__}
+                WHERE status IN ('Pending', 'Sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            ''', (now_str, limit))
+            if not rows:
+                return []
+            lease_until = (now + timedelta(seconds=lease)).strftime(TIME_FORMAT)
+            self.db.conn.executemany(
+                f"UPDATE {self.__tablename__} SET status = 'Sending', next_attempt_at = ? WHERE id = ?",
+                [(lease_until, row['id']) for row in rows]
+            )
+        return [self._from_row(row) for row in rows]
+
+    def mark_sent(self, message_ids: List[int], now: datetime):
+        with self.db.conn:
+            self.db.conn.executemany(
+                f"UPDATE {self.__tablename__} SET status = 'Sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                [(now.strftime(TIME_FORMAT), message_id) for message_id in message_ids]
+            )
+
+    def mark_failed(self, failures: List[tuple]):
+        """Records failed attempts given as (message_id, status, next_attempt_at, error)."""
+        with self.db.conn:
+            self.db.conn.executemany(
+                f"UPDATE {self.__tablename__} SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                [(status, next_attempt_at.strftime(TIME_FORMAT), error, message_id)
+                 for message_id, status, next_attempt_at, error in failures]
+            )
+
+    def record_outcomes(self, sent_ids: List[int], now: datetime, failures: List[tuple]):
+        """Records the outcome of a delivery batch, successes and failures, in one transaction."""
+        with self.db.conn:
+            if sent_ids:
+                self.mark_sent(sent_ids, now)
+            if failures:
+                self.mark_failed(failures)
+
+    def cancel(self, aggregate: str, aggregate_ids: Iterable[int]):
+        """Drops messages about the given records that have not been sent yet, e.g. when the records are deleted."""
+        aggregate_ids = sorted(set(aggregate_ids))
+        if not aggregate_ids:
+            return
+        placeholders = ",".join("?" * len(aggregate_ids))
+        with self.db.conn:
+            self.db.execute(f'''
+                DELETE FROM {self.__tablename__}
+                WHERE aggregate = ? AND aggregate_id IN ({placeholders}) AND status IN ('Pending', 'Failed')
+            ''', (aggregate, *aggregate_ids))
+
+    def completed_aggregates(self, aggregate: str, aggregate_ids: Iterable[int]) -> List[int]:
+        """Returns which of the given records have had every one of their messages delivered."""
+        aggregate_ids = sorted(set(aggregate_ids))
+        if not aggregate_ids:
+            return []
+        placeholders = ",".join("?" * len(aggregate_ids))
+        rows = self.db.q(f'''
+            SELECT aggregate_id FROM {self.__tablename__}
+            WHERE aggregate = ? AND aggregate_id IN ({placeholders})
+            GROUP BY aggregate_id
+            HAVING SUM(status != 'Sent') = 0
+        ''', (aggregate, *aggregate_ids))
+        return [row['aggregate_id'] for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of messages per status."""
+        rows = self.db.q(f"SELECT status, COUNT(*) AS total FROM {self.__tablename__} GROUP BY status")
+        return {row['status']: row['total'] for row in rows}
+
+    def purge_sent(self, older_than: datetime) -> int:
+        """Deletes delivered messages sent before the given time. Returns how many were deleted."""
+        with self.db.conn:
+            self.db.execute(
+                f"DELETE FROM {self.__tablename__} WHERE status = 'Sent' AND sent_at < ?",
+                (older_than.strftime(TIME_FORMAT),)
+            )
+            return self.db.conn.changes()
+
+    @staticmethod
+    def _from_row(row) -> OutboxMessage:
+        return OutboxMessage(
+            id=row['id'],
+            idempotency_key=row['idempotency_key'],
+            channel=row['channel'],
+            recipient=row['recipient'],
+            subject=row['subject'] or "",
+            body=row['body'] or "",
+            aggregate=row['aggregate'] or "",
+            aggregate_id=row['aggregate_id'],
+            status=row['status'],
+            attempts=row['attempts'],
+            next_attempt_at=datetime.strptime(row['next_attempt_at'], TIME_FORMAT),
+            last_error=row['last_error'] or ""
+        )
+
+
+class OutboxWorker:
+    """
+    Drains the outbox in rounds: claims a batch of due messages, sends them concurrently
+    over their channels and records every outcome in one transaction. Failed sends are
+    retried with exponential backoff until OUTBOX_MAX_ATTEMPTS. When every message about
+    a record has been delivered, that aggregate's completion handler runs once.
+    Delivery is at-least-once; each message carries a stable Message-ID for the rare
+    resend after a crash between sending and recording.
+    """
+
+    def __init__(self, outbox: Outbox, batch_size: int = OUTBOX_BATCH_SIZE, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 backoff_base: float = OUTBOX_RETRY_BACKOFF, clock: Callable[[], datetime] = datetime.now):
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.clock = clock
+        self._senders: Dict[str, OutboxSender] = {}
+        self._on_complete: Dict[str, Callable[[List[int]], None]] = {}
+
+    def register_channel(self, name: str, sender: OutboxSender):
+        self._senders[name] = sender
+
+    def on_complete(self, aggregate: str, handler: Callable[[List[int]], None]):
+        """Registers handler(aggregate_ids), called when all messages about those records are delivered."""
+        self._on_complete[aggregate] = handler
+
+    async def deliver_pending(self) -> int:
+        """Runs delivery rounds until no full batch is due. Returns how many messages were delivered."""
+        delivered = 0
+        while True:
+            batch = await asyncio.to_thread(self.outbox.claim, self.clock(), self.batch_size)
+            if not batch:
+                return delivered
+            delivered += await self._deliver(batch)
+            if len(batch) < self.batch_size:
+                return delivered
+
+    async def _deliver(self, batch: List[OutboxMessage]) -> int:
+        results = await asyncio.gather(*[self._send(message) for message in batch])
+        now = self.clock()
+
+        sent, failures = [], []
+        for message, error in zip(batch, results):
+            if error is None:
+                sent.append(message)
+                continue
+            attempts = message.attempts + 1
+            if attempts >= self.max_attempts:
+                logger.error(f"Giving up on outbox message {message.id} to {message.recipient} after {attempts} attempts: {error}")
+                failures.append((message.id, "Failed", now, error))
+            else:
+                delay = self.backoff_base * 2 ** (attempts - 1) * (1 + random.random())
+                logger.warning(f"Outbox message {message.id} to {message.recipient} failed ({error}); retrying in {delay:.0f}s")
+                failures.append((message.id, "Pending", now + timedelta(seconds=delay), error))
+
+        if sent or failures:
+            await asyncio.to_thread(self.outbox.record_outcomes, [message.id for message in sent], now, failures)
+        await self._complete(sent)
+        return len(sent)
+
+    async def _send(self, message: OutboxMessage) -> Optional[str]:
+        """Sends one message. Returns None on success, otherwise the error."""
+        sender = self._senders.get(message.channel)
+        if sender is None:
+            return f"Unknown outbox channel: {message.channel}"
+        try:
+            await sender(message.recipient, message.subject, message.body, message.message_id)
+            return None
+        except Exception as e:
+            return str(e) or type(e).__name__
+
+    async def _complete(self, sent: List[OutboxMessage]):
+        touched = defaultdict(set)
+        for message in sent:
+            if message.aggregate in self._on_complete and message.aggregate_id is not None:
+                touched[message.aggregate].add(message.aggregate_id)
+        for aggregate, aggregate_ids in touched.items():
+            completed = await asyncio.to_thread(self.outbox.completed_aggregates, aggregate, aggregate_ids)
+            if not completed:
+                continue
+            try:
+                await asyncio.to_thread(self._on_complete[aggregate], completed)
+            except Exception:
+                logger.exception(f"Outbox completion handler for {aggregate} failed.")
+
+    def purge_delivered(self, retention_days: int = OUTBOX_RETENTION_DAYS) -> int:
+        """Deletes messages delivered more than retention_days ago."""
+        deleted = self.outbox.purge_sent(self.clock() - timedelta(days=retention_days))
+        if deleted:
+            logger.info(f"Purged {deleted} delivered outbox messages.")
+        return deleted
+
+
+outbox = Outbox()
@@ -0,0 +1,168 @@
+# protocol_service.py
+
+import asyncio
+import struct
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+# Websocket subprotocol crew devices offer to use the binary format
+BINARY_SUBPROTOCOL = "ezzday.bin.v1"
+
+# Frame types (first byte of every binary frame)
+FRAME_UPDATES = 0x01   # Device -> server: batch of route updates
+FRAME_ACK = 0x02       # Server -> device: every update up to this sequence number was processed
+FRAME_ERROR = 0x03     # Server -> device: frame rejected
+
+# Error codes carried by FRAME_ERROR
+ERROR_MALFORMED = 1
+ERROR_UNKNOWN_FRAME = 2
+ERROR_PROCESSING = 3   # Frame decoded but its updates could not be processed; not acknowledged
+
+# Status codes on the wire
+STATUS_CODES = {
+    "On Track": 0,
+    "Delayed": 1,
+    "Issue": 2,
+    "Completed": 3,
+}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+UNKNOWN_STATUS = 255
+UNKNOWN_PROGRESS = 255
+
+# Coordinates travel as integer microdegrees
+COORDINATE_SCALE = 1_000_000
+
+# Updates frame: type, update count; then per update:
+# sequence, route_id, status code, progress percent, lat microdegrees, lon microdegrees, recorded_at epoch ms
+_UPDATES_HEADER = struct.Struct("<BH")
+_UPDATE = struct.Struct("<IIBBiiq")
+_ACK = struct.Struct("<BI")
+_ERROR = struct.Struct("<BB")
+
+# Updates per frame; keeps frames well under typical websocket message limits
+MAX_UPDATES_PER_FRAME = 1000
+# Outgoing frames a connection may queue before its reader stops taking new updates
+SEND_QUEUE_SIZE = 64
+
+
+@dataclass
+class RouteUpdate:
+    sequence: int
+    route_id: int
+    status: Optional[str]
+    lat: float
+    lon: float
+    recorded_at: int
+    progress: Optional[float] = None
+
+
+class ProtocolError(ValueError):
+    """A binary frame could not be decoded."""
+
+
+def encode_updates(updates: Iterable[RouteUpdate]) -> bytes:
+    """Packs route updates into one frame (26 bytes per update)."""
+    updates = list(updates)
+    if len(updates) > MAX_UPDATES_PER_FRAME:
+        raise ProtocolError(f"At most {MAX_UPDATES_PER_FRAME} updates fit in one frame")
+    parts = [_UPDATES_HEADER.pack(FRAME_UPDATES, len(updates))]
+    for update in updates:
+        try:
+            parts.append(_UPDATE.pack(
+                update.sequence, update.route_id,
+                STATUS_CODES.get(update.status, UNKNOWN_STATUS),
+                # Progress is a fraction; percentages past 100 would not fit the byte
+                UNKNOWN_PROGRESS if update.progress is None else round(min(max(update.progress, 0.0), 1.0) * 100),
+                round(update.lat * COORDINATE_SCALE), round(update.lon * COORDINATE_SCALE),
+                update.recorded_at
+            ))
+        except struct.error as e:
+            raise ProtocolError(f"Update {update.sequence} does not fit the frame format: {e}") from e
+    return b"".join(parts)
+
+
+def decode_updates(frame: bytes) -> List[RouteUpdate]:
+    """Unpacks an updates frame."""
+    if len(frame) < _UPDATES_HEADER.size:
+        raise ProtocolError("Frame too short")
+    frame_type, count = _UPDATES_HEADER.unpack_from(frame)
+    if frame_type != FRAME_UPDATES:
+        raise ProtocolError(f"Unexpected frame type {frame_type}")
+    if len(frame) != _UPDATES_HEADER.size + count * _UPDATE.size or count > MAX_UPDATES_PER_FRAME:
+        raise ProtocolError("Frame length does not match update count")
+    updates = []
+    for sequence, route_id, status, progress, lat_e6, lon_e6, recorded_at in _UPDATE.iter_unpack(frame[_UPDATES_HEADER.size:]):
+        updates.append(RouteUpdate(
+            sequence=sequence,
+            route_id=route_id,
+            status=STATUS_NAMES.get(status),
+            lat=lat_e6 / COORDINATE_SCALE,
+            lon=lon_e6 / COORDINATE_SCALE,
+            recorded_at=recorded_at,
+            progress=None if progress == UNKNOWN_PROGRESS else min(progress, 100) / 100
+        ))
+    return updates
+
+
+def encode_ack(sequence: int) -> bytes:
+    return _ACK.pack(FRAME_ACK, sequence)
+
+
+def decode_ack(frame: bytes) -> int:
+    try:
+        frame_type, sequence = _ACK.unpack(frame)
+    except struct.error as e:
+        raise ProtocolError(f"Malformed ack frame: {e}") from e
+    if frame_type != FRAME_ACK:
+        raise ProtocolError(f"Unexpected frame type {frame_type}")
+    return sequence
+
+
+def encode_error(code: int) -> bytes:
+    return _ERROR.pack(FRAME_ERROR, code)
+
+
+class FrameSender:
+    """
+    Per-connection outgoing queue drained by one writer task.
+    Acknowledgements are cumulative, so while the link is slow a newer ack simply
+    replaces the pending one instead of queueing behind it. Other frames go on a
+    bounded queue; when it is full, send() waits, which stops the connection's
+    reader and pushes backpressure back to the device over TCP.
+    """
+
+    def __init__(self, send_bytes, queue_size: int = SEND_QUEUE_SIZE):
+        self.send_bytes = send_bytes
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._pending_ack: Optional[int] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def ack(self, sequence: int):
+        """Schedules an acknowledgement up to `sequence`, merging with one not yet sent."""
+        if self._pending_ack is None or sequence > self._pending_ack:
+            self._pending_ack = sequence
+        self._wakeup.set()
+
+    async def send(self, frame: bytes):
+        """Queues a frame, waiting while the queue is full."""
+        await self._queue.put(frame)
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._queue.empty():
+                await self.send_bytes(self._queue.get_nowait())
+            if self._pending_ack is not None:
+                sequence, self._pending_ack = self._pending_ack, None
+                await self.send_bytes(encode_ack(sequence))
@@ -3,23 +3,139 @@
 import asyncio
 import json
 import logging
-from datetime import datetime, date
-from typing import List
+import struct
+from datetime import datetime, date, time
+from typing import List, Optional
 
 from fastlite import Database
 from starlette.websockets import WebSocket, WebSocketDisconnect
 from email.mime.text import MIMEText
 
 from app.components.assignment.models import Assignment
-from app.components.supervisor.models import Supervisor
-from app.components.dispatch.models import Dispatch
-from app.components.notification.services import send_email_async, send_sms_async
+from app.components.auth.models import User
+from app.components.issues.models import Issue
+from app.components.issues.services import create_issue
+from app.service.notification_service import NotificationDispatcher, AlertCoalescer, DigestBatcher
+from app.service.scheduler_service import Scheduler, CronTrigger, IntervalTrigger
+from app.service.broker_service import create_broker
+from app.service.hub_service import (
+    RouteUpdateHub, RouteProgress, ALL_ROUTES_TOPIC, relayed_route_update, route_topic, zone_topic, route_zones
+)
+from app.service.protocol_service import (
+    BINARY_SUBPROTOCOL, ERROR_MALFORMED, ERROR_PROCESSING, ERROR_UNKNOWN_FRAME, FrameSender, ProtocolError, decode_updates, encode_error
+)
+from config.settings import REALTIME_BROKER, REALTIME_BROKER_SOCKET
+from app.service.location_service import ingestor, location_key
+from app.service.mail_service import get_mailer
+from app.service.eta_service import predict_open_assignments
 
 logger = logging.getLogger(__name__)
 
 # Initialize the FastLite database
 db = Database('app_data.db')
 
+# Process-wide hub shared by crew and dashboard websockets; the broker links the hubs of all workers
+hub = RouteUpdateHub(broker=create_broker(REALTIME_BROKER, REALTIME_BROKER_SOCKET))
+
+
+async def start_broker():
+    """Connects this worker's hub to the other workers."""
+    await hub.broker.start(deliver_peer_message)
+
+
+async def stop_broker():
+    """Disconnects this worker's hub from the other workers."""
+    await hub.broker.stop()
+
+
+def is_leader() -> bool:
+    """Whether this worker runs the once-per-deployment jobs."""
+    return hub.broker.is_leader
+
+
+def deliver_peer_message(topics: List[str], payload: str):
+    """
+    Handles a message relayed from another worker: it goes to this worker's dashboards and,
+    on the leader, route updates also feed the progress the ETA check reads and the alerts,
+    so that state lives in one place however many workers crews are connected to.
+    """
+    hub.deliver(topics, payload)
+    if not is_leader():
+        return
+    update = relayed_route_update(topics, payload)
+    if update is not None:
+        route_progress.record(update['route_id'], update.get('progress'))
+        spawn_alert(raise_route_alerts(update['route_id'], update.get('status'), update.get('location')))
+
+# Per-channel send rates (messages per second) accepted by the providers
+EMAIL_RATE_PER_SECOND = 10
+SMS_RATE_PER_SECOND = 5
+
+# Alerts go out through one dispatcher so sends run concurrently but within provider limits
+dispatcher = NotificationDispatcher()
+dispatcher.register_channel("email", lambda recipient, subject, message: get_mailer().send(recipient, subject, message),
+                            rate_per_second=EMAIL_RATE_PER_SECOND)
+dispatcher.register_channel("sms", lambda phone_number, subject, message: send_sms(phone_number, message),
+                            rate_per_second=SMS_RATE_PER_SECOND)
+
+
+# Repeated alerts for the same route are coalesced; routine alerts are batched into digests.
+# Route alerts are raised on the leader only, so one coalescer sees every report.
+coalescer = AlertCoalescer()
+digest = DigestBatcher(dispatcher, channel="email")
+# Alerts raised for relayed updates, held so they are not garbage collected while running
+_alert_tasks = set()
+
+
+def spawn_alert(coroutine):
+    """Runs an alert in the background; the broker delivers messages synchronously."""
+    task = asyncio.create_task(coroutine)
+    _alert_tasks.add(task)
+    task.add_done_callback(_alert_tasks.discard)
+
+
+def find_supervisors() -> List[User]:
+    """Supervisor accounts alerts can be emailed to; accounts without an email are skipped."""
+    supervisors = User.find_by_role("Supervisor")
+    missing = [supervisor.username for supervisor in supervisors if not supervisor.email]
+    if missing:
+        logger.warning(f"Supervisors without an email address get no alerts: {', '.join(missing)}")
+    return [supervisor for supervisor in supervisors if supervisor.email]
+
+
+def queue_supervisor_digest(subject: str, message: str, supervisors=None):
+    """Queues a non-urgent alert for every supervisor's next digest email."""
+    supervisors = supervisors if supervisors is not None else find_supervisors()
+    for supervisor in supervisors:
+        digest.add(supervisor.email, subject, message)
+
+
+async def notify_supervisors(subject: str, message: str, supervisors=None):
+    """Emails every supervisor concurrently through the dispatcher."""
+    supervisors = supervisors if supervisors is not None else find_supervisors()
+    await dispatcher.send_many("email", [supervisor.email for supervisor in supervisors], subject, message)
+    # Optionally, send SMS alerts as well
+    # await dispatcher.send_many("sms", [s.phone_number for s in supervisors if s.phone_number], subject, message)
+
+def publish_route_update(route_id: int, status: str, location, zone_id: Optional[int] = None,
+                         recorded_at: Optional[int] = None, progress: Optional[float] = None) -> int:
+    """Publishes a route progress update to its route, zone and all-routes topics."""
+    zone_id = zone_id if zone_id is not None else route_zones.get(route_id)
+    topics = [ALL_ROUTES_TOPIC, route_topic(route_id)]
+    if zone_id is not None:
+        topics.append(zone_topic(zone_id))
+    message = {
+        "type": "route_update",
+        "route_id": route_id,
+        "zone_id": zone_id,
+        "status": status,
+        "location": location,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "recorded_at": recorded_at,
+        "progress": progress,
+    }
+    return hub.publish(topics, message)
+
 
 async def send_sms(phone_number: str, message: str):
     """
@@ -44,20 +160,56 @@ async def notify_repeat_offenders(address_list: List[str]):
     Notify supervisors or admins about repeat offender addresses.
     """
     subject = "Repeat Offender Notification"
-    supervisors = Supervisor.find_all()
+    supervisors = find_supervisors()
     for address in address_list:
-        message = f"The address {address} has been marked as a repeat offender."
-        for supervisor in supervisors:
-            await send_email_async(supervisor.email, subject, message)
-            # Optionally, send SMS alerts as well
-            # if supervisor.phone_number:
-            #     await send_sms(supervisor.phone_number, message)
+        queue_supervisor_digest(subject, f"The address {address} has been marked as a repeat offender.", supervisors)
+
+
+async def process_route_update(route_id: int, status: Optional[str], location, zone_id: Optional[int] = None,
+                               recorded_at=None, progress=None):
+    """
+    Records and broadcasts one route update from a crew device. Alerts are raised here on
+    the leader; other workers' updates reach the leader through the broker.
+    """
+    # Buffer the GPS fix; positions are written in batches by the location flush job
+    ingestor.ingest(route_id, location, recorded_at)
+    has_progress = route_progress.record(route_id, progress)
+
+    # Broadcast the update to dashboards watching this route or zone, and to the other workers
+    publish_route_update(route_id, status, location, zone_id,
+                         recorded_at if isinstance(recorded_at, (int, float)) else None,
+                         progress if has_progress else None)
+
+    if status == "Issue":
+        # A failed write must not hold back the alert
+        try:
+            log_issue(route_id, location, issue_message(route_id, location))
+        except Exception as e:
+            logger.exception(f"Failed to log issue for Route {route_id}: {e}")
+
+    if is_leader():
+        await raise_route_alerts(route_id, status, location)
+
+
+async def raise_route_alerts(route_id: int, status: Optional[str], location):
+    """Alerts supervisors about delayed routes and reported issues."""
+    if status == "Delayed":
+        await handle_delayed_route(route_id, location)
+    elif status == "Issue":
+        await handle_issue_reported(route_id, location)
 
 
 async def track_route_progress(websocket: WebSocket):
     """
     Track route progress in real-time, providing updates and handling alerts.
+    Devices offering the binary subprotocol send batched, struct-packed updates and get
+    cumulative sequence-number acks; other devices keep the JSON text format.
     """
+    if BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        await websocket.accept(subprotocol=BINARY_SUBPROTOCOL)
+        await track_route_progress_binary(websocket)
+        return
+
     await websocket.accept()
     try:
         while True:
@@ -68,11 +220,8 @@ async def track_route_progress(websocket: WebSocket):
                 location = data_dict.get('location')
                 status = data_dict.get('status')  # e.g., "On Track", "Delayed", "Issue"
 
-                # Handle different statuses for alerts
-                if status == "Delayed":
-                    await handle_delayed_route(route_id, location)
-                elif status == "Issue":
-                    await handle_issue_reported(route_id, location)
+                await process_route_update(route_id, status, location, data_dict.get('zone_id'),
+                                           data_dict.get('recorded_at'), data_dict.get('progress'))
 
                 # Send a response back to confirm receipt
                 await websocket.send_text(
@@ -82,63 +231,181 @@ async def track_route_progress(websocket: WebSocket):
             except json.JSONDecodeError:
                 logger.error("Invalid JSON received from WebSocket.")
                 await websocket.send_text("Error: Invalid data format. Please send JSON.")
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                # One bad update must not close the crew's connection
+                logger.exception(f"Failed to process route update: {e}")
+                await websocket.send_text("Error: Update could not be processed.")
+
+    except WebSocketDisconnect:
+        logger.info("WebSocket disconnected")
 
+
+async def track_route_progress_binary(websocket: WebSocket):
+    """
+    Binary protocol loop: each frame carries a batch of updates and is acknowledged with
+    the sequence number of its last update once all of them have been processed.
+    """
+    sender = FrameSender(websocket.send_bytes)
+    sender.start()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("bytes")
+            if frame is None:
+                await sender.send(encode_error(ERROR_UNKNOWN_FRAME))
+                continue
+            try:
+                updates = decode_updates(frame)
+            except (ProtocolError, struct.error, ValueError) as e:
+                logger.error(f"Invalid binary frame received from WebSocket: {e}")
+                await sender.send(encode_error(ERROR_MALFORMED))
+                continue
+
+            # A frame that cannot be processed is reported to the device rather than closing its connection
+            try:
+                for update in updates:
+                    await process_route_update(update.route_id, update.status, f"{update.lat:.6f},{update.lon:.6f}",
+                                               recorded_at=update.recorded_at, progress=update.progress)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.exception(f"Failed to process binary frame: {e}")
+                await sender.send(encode_error(ERROR_PROCESSING))
+                continue
+            if updates:
+                sender.ack(updates[-1].sequence)
     except WebSocketDisconnect:
+        pass
+    finally:
+        await sender.stop()
         logger.info("WebSocket disconnected")
 
 
+async def dashboard_updates(websocket: WebSocket):
+    """
+    Streams route progress updates to a dashboard.
+    Topics are chosen with query parameters, e.g. ?route=3&route=4&zone=2;
+    with none given the dashboard receives every route update.
+    """
+    await websocket.accept()
+    params = websocket.query_params
+    topics = [route_topic(r) for r in params.getlist("route")] + [zone_topic(z) for z in params.getlist("zone")]
+    subscriber = hub.subscribe(topics or [ALL_ROUTES_TOPIC])
+    try:
+        while not subscriber.closed:
+            try:
+                payload = await subscriber.get(timeout=30)
+            except asyncio.TimeoutError:
+                continue
+            await websocket.send_text(payload)
+        # The hub dropped us for falling behind
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        logger.info("Dashboard WebSocket disconnected")
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+# Latest fraction of each route completed as reported by crews
+route_progress = RouteProgress()
+# Routes predicted to finish after this time trigger a late-completion alert
+ETA_ALERT_DEADLINE = time(18, 0)
+
+
+async def check_route_etas():
+    """
+    Predicts completion of today's open routes, publishes the ETAs to dashboards
+    and alerts supervisors about routes expected to finish after the EOD checkpoint.
+    """
+    today = date.today()
+    progress = route_progress.for_day(today)
+    predictions = await asyncio.to_thread(predict_open_assignments, today, datetime.now(), progress)
+    deadline = datetime.combine(today, ETA_ALERT_DEADLINE)
+    late = []
+    for prediction in predictions:
+        route_id = prediction['route_id']
+        hub.publish([ALL_ROUTES_TOPIC, route_topic(route_id)], {
+            "type": "route_eta",
+            "route_id": route_id,
+            "eta": prediction['eta'].isoformat(timespec="minutes"),
+        })
+        if prediction['eta'] > deadline and coalescer.should_send(route_id, "Late ETA"):
+            late.append(prediction)
+
+    for prediction in late:
+        await notify_supervisors(
+            f"Route {prediction['route_id']} Predicted Late",
+            f"Route {prediction['route_id']} (Crew ID: {prediction['crew_id']}) is predicted to finish at "
+            f"{prediction['eta'].strftime('%H:%M')}, after the {ETA_ALERT_DEADLINE.strftime('%H:%M')} EOD checkpoint."
+        )
+
+
 async def handle_delayed_route(route_id: int, location: str):
     """
     Handle scenarios where a route is reported as delayed.
     Send alerts to dispatch and supervisors.
     """
+    # Crews resend "Delayed" while the delay lasts; alert once per window
+    if not coalescer.should_send(route_id, "Delayed"):
+        return
+
     subject = f"Route {route_id} Delayed Alert"
     message = (
         f"Route {route_id} has been reported as delayed at location: {location}. "
         "Please investigate."
     )
+    repeats = coalescer.suppressed_before(route_id, "Delayed")
+    if repeats:
+        message += f" ({repeats} further delay reports were received in the previous alert window.)"
 
-    supervisors = Supervisor.find_all()
-    for supervisor in supervisors:
-        await send_email_async(supervisor.email, subject, message)
-        # Optionally, send SMS alerts as well
-        # if supervisor.phone_number:
-        #     await send_sms(supervisor.phone_number, message)
+    await notify_supervisors(subject, message)
 
 
 async def handle_issue_reported(route_id: int, location: str):
     """
     Handle scenarios where an issue is reported during the route collection.
-    Send alerts and ensure the issue is logged.
+    Send alerts; the worker that received the report has logged the issue.
     """
     subject = f"Issue Reported on Route {route_id}"
-    message = (
+    message = issue_message(route_id, location)
+
+    # Locations arrive as dicts, lists or text; key on the rounded coordinates so repeats from one spot coalesce
+    if coalescer.should_send((route_id, location_key(location)), "Issue"):
+        await notify_supervisors(subject, message)
+
+
+def issue_message(route_id: int, location) -> str:
+    return (
         f"An issue has been reported on Route {route_id} at location: {location}. "
         "Please review and take necessary actions."
     )
 
-    supervisors = Supervisor.find_all()
-    for supervisor in supervisors:
-        await send_email_async(supervisor.email, subject, message)
-        # Optionally, send SMS alerts as well
-        # if supervisor.phone_number:
-        #     await send_sms(supervisor.phone_number, message)
-
-    # Log the issue in the database (optional)
-    log_issue(route_id, location, message)
-
 
-def log_issue(route_id: int, location: str, description: str):
+def log_issue(route_id: int, location, description: str) -> Optional[Issue]:
     """
-    Logs an issue in the database.
+    Logs a crew-reported issue against the crew assigned to the route today.
+    Returns None when no crew is assigned, as every issue belongs to a crew.
     """
-    query = '''
-    INSERT INTO issues (route_id, location, description, date_reported)
-    VALUES (?, ?, ?, ?)
-    '''
-    params = (route_id, location, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    db.execute(query, params)
+    if not isinstance(location, str):
+        location = json.dumps(location)
+    rows = db.q("SELECT crew_id FROM assignments WHERE route_id = ? AND doc = ? ORDER BY start_time LIMIT 1",
+                (route_id, date.today().isoformat()))
+    if not rows:
+        logger.warning(f"Issue on Route {route_id} at {location} not logged: no crew is assigned to the route today.")
+        return None
+    issue = create_issue({
+        'crew_id': rows[0]['crew_id'],
+        'route_id': route_id,
+        'address': location,
+        'issue_type': "Other",
+        'description': description,
+    })
     logger.info(f"Issue logged for Route {route_id} at {location}")
+    return issue
 
 
 async def notify_attendance_ppe_missing(assignment_id: int, crew_id: int):
@@ -151,50 +418,32 @@ async def notify_attendance_ppe_missing(assignment_id: int, crew_id: int):
         "or PPE compliance by 8 AM. Please follow up immediately."
     )
 
-    supervisors = Supervisor.find_all()
-    for supervisor in supervisors:
-        await send_email_async(supervisor.email, subject, message)
-        # Optionally, send SMS alerts as well
-        # if supervisor.phone_number:
-        #     await send_sms(supervisor.phone_number, message)
-
-
-async def periodic_alert_checker():
-    """
-    Periodically check all assignments to ensure updates are being provided at key points.
-    """
-    while True:
-        now = datetime.now()
-        current_time = now.strftime("%H:%M")
-        check_times = {
-            "11:00": "11AM",
-            "13:00": "1PM",
-            "15:00": "3PM",
-            "18:00": "EOD"
-        }
-
-        if current_time in check_times:
-            time_label = check_times[current_time]
-            assignments = Assignment.find_all_for_date(date.today())
-            for assignment in assignments:
-                if assignment.status_updates.get(time_label) is None:
-                    alert_message = (
-                        f"Status update missing for Crew ID: {assignment.crew_id} on Assignment ID: {assignment.id} "
-                        f"at checkpoint: {time_label}. Please follow up."
-                    )
-                    supervisors = Supervisor.find_all()
-                    for supervisor in supervisors:
-                        await send_email_async(supervisor.email, "Status Update Missing", alert_message)
-                        # Optionally, send SMS alerts as well
-                        # if supervisor.phone_number:
-                        #     await send_sms(supervisor.phone_number, alert_message)
-
-        # Check for attendance and PPE compliance at 8 AM
-        if current_time == "08:00":
-            await check_attendance_ppe_compliance()
-
-        # Wait for the next minute before checking again
-        await asyncio.sleep(60)
+    await notify_supervisors(subject, message)
+
+
+# Status checkpoints ("HH:MM" -> label stored in assignment.status_updates)
+STATUS_CHECKPOINTS = {
+    "11:00": "11AM",
+    "13:00": "1PM",
+    "15:00": "3PM",
+    "18:00": "EOD"
+}
+
+
+async def check_status_checkpoint(time_label: str):
+    """
+    Checks that every assignment for today has provided its update for the given checkpoint.
+    """
+    assignments = Assignment.find_all_for_date(date.today())
+    supervisors = find_supervisors()
+    for assignment in assignments:
+        if assignment.status_updates.get(time_label) is None:
+            queue_supervisor_digest(
+                "Status Update Missing",
+                f"Status update missing for Crew ID: {assignment.crew_id} on Assignment ID: {assignment.id} "
+                f"at checkpoint: {time_label}. Please follow up.",
+                supervisors
+            )
 
 
 async def check_attendance_ppe_compliance():
@@ -202,16 +451,29 @@ async def check_attendance_ppe_compliance():
     Checks attendance and PPE compliance for all assignments at 8 AM.
     """
     assignments = Assignment.find_all_for_date(date.today())
-    for assignment in assignments:
-        if not assignment.attendance_confirmed or not assignment.ppe_compliant:
-            await notify_attendance_ppe_missing(assignment.id, assignment.crew_id)
+    await asyncio.gather(*[
+        notify_attendance_ppe_missing(assignment.id, assignment.crew_id)
+        for assignment in assignments
+        if not assignment.attendance_confirmed or not assignment.ppe_compliance
+    ])
 
 
-def start_dispatch_alerts():
+def register_alert_jobs(scheduler: Scheduler):
     """
-    Start the periodic alert system for dispatch.
-    Run the periodic alert checker as a background task.
+    Registers the dispatch alert jobs with the application scheduler:
+    the status checkpoints, the 8 AM attendance/PPE check, the ETA check and the digest flush.
     """
-    loop = asyncio.get_event_loop()
-    asyncio.ensure_future(periodic_alert_checker())
-    loop.run_forever()
\ No newline at end of file
+    for check_time, time_label in STATUS_CHECKPOINTS.items():
+        hour, minute = check_time.split(":")
+
+        async def run_checkpoint(time_label=time_label):
+            await check_status_checkpoint(time_label)
+
+        scheduler.add_job(f"status_checkpoint_{time_label}", run_checkpoint,
+                          CronTrigger(f"{int(minute)} {int(hour)} * * *"), catch_up=False, singleton=True)
+    scheduler.add_job("attendance_ppe_check", check_attendance_ppe_compliance, CronTrigger("0 8 * * *"),
+                      catch_up=False, singleton=True)
+    scheduler.add_job("route_eta_check", check_route_etas, CronTrigger("*/15 7-17 * * *"), catch_up=False,
+                      persist=False, singleton=True)
+    # Not a singleton: every worker sends the digest entries it queued itself
+    scheduler.add_job("alert_digest_flush", digest.flush, IntervalTrigger(digest.window))
@@ -0,0 +1,240 @@
+# recurrence_service.py
+
+import calendar
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Month buckets of expanded occurrences kept in memory
+OCCURRENCE_CACHE_SIZE = 4096
+# Occurrences one rule may produce in a single month; guards against runaway rules
+MAX_OCCURRENCES_PER_MONTH = 31 * 24
+
+DAILY = "DAILY"
+WEEKLY = "WEEKLY"
+MONTHLY = "MONTHLY"
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """
+    The subset of an iCalendar RRULE service schedules use: FREQ (DAILY, WEEKLY or MONTHLY),
+    INTERVAL, BYDAY (weekdays, with an ordinal such as 1MO or -1FR for monthly rules),
+    BYMONTHDAY, COUNT and UNTIL. Occurrences keep the time of day of the first one.
+    """
+    freq: str
+    interval: int = 1
+    by_day: Tuple[Tuple[int, int], ...] = ()      # (ordinal or 0, weekday 0-6)
+    by_month_day: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+
+    @classmethod
+    def parse(cls, text: str) -> 'RecurrenceRule':
+        """
+        Parses e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;UNTIL=20241231".
+        Raises:
+            ValueError: If the rule is malformed or uses an unsupported part.
+        """
+        parts = {}
+        for part in text.strip().removeprefix("RRULE:").split(";"):
+            if not part:
+                continue
+            name, sep, value = part.partition("=")
+            if not sep or not value:
+                raise ValueError(f"Malformed recurrence rule part: {part}")
+            parts[name.upper()] = value.upper()
+
+        freq = parts.pop("FREQ", None)
+        if freq not in (DAILY, WEEKLY, MONTHLY):
+            raise ValueError("Recurrence FREQ must be DAILY, WEEKLY or MONTHLY.")
+        try:
+            interval = int(parts.pop("INTERVAL", 1))
+            count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+            by_month_day = tuple(int(d) for d in parts.pop("BYMONTHDAY").split(",")) if "BYMONTHDAY" in parts else ()
+            by_day = tuple(cls._parse_day(d) for d in parts.pop("BYDAY").split(",")) if "BYDAY" in parts else ()
+            until = cls._parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+        except ValueError as e:
+            raise ValueError(f"Invalid recurrence rule: {e}") from e
+        if parts:
+            raise ValueError(f"Unsupported recurrence rule parts: {', '.join(sorted(parts))}")
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError("Recurrence INTERVAL and COUNT must be positive.")
+        if count is not None and until is not None:
+            raise ValueError("A recurrence rule cannot have both COUNT and UNTIL.")
+        if any(d == 0 or not -31 <= d <= 31 for d in by_month_day):
+            raise ValueError("BYMONTHDAY must be between 1 and 31, or -31 and -1.")
+        if freq != MONTHLY and (by_month_day or any(ordinal for ordinal, _ in by_day)):
+            raise ValueError("BYMONTHDAY and numbered BYDAY are only supported for MONTHLY rules.")
+        return cls(freq, interval, by_day, by_month_day, count, until)
+
+    @staticmethod
+    def _parse_day(value: str) -> Tuple[int, int]:
+        weekday = value[-2:]
+        if weekday not in WEEKDAYS:
+            raise ValueError(f"unknown weekday {value}")
+        return (int(value[:-2]) if value[:-2] else 0), WEEKDAYS.index(weekday)
+
+    @staticmethod
+    def _parse_until(value: str) -> datetime:
+        value = value.rstrip("Z")
+        if "T" in value:
+            return datetime.strptime(value, "%Y%m%dT%H%M%S")
+        return datetime.strptime(value, "%Y%m%d").replace(hour=23, minute=59, second=59)
+
+    def __str__(self) -> str:
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.by_day:
+            parts.append("BYDAY=" + ",".join(f"{ordinal or ''}{WEEKDAYS[weekday]}" for ordinal, weekday in self.by_day))
+        if self.by_month_day:
+            parts.append("BYMONTHDAY=" + ",".join(map(str, self.by_month_day)))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%S')}")
+        return ";".join(parts)
+
+    def _period_starts(self, dtstart: datetime, skip_to: Optional[datetime]) -> Iterator[date]:
+        """First day of every period the rule recurs in, jumping straight to the one containing skip_to."""
+        first = dtstart.date()
+        if self.freq == WEEKLY:
+            first -= timedelta(days=first.weekday())
+        elif self.freq == MONTHLY:
+            first = first.replace(day=1)
+        k = 0
+        if skip_to is not None and skip_to.date() > first:
+            if self.freq == MONTHLY:
+                months = (skip_to.year - first.year) * 12 + skip_to.month - first.month
+                k = months // self.interval
+            else:
+                days = 7 if self.freq == WEEKLY else 1
+                k = (skip_to.date() - first).days // (days * self.interval)
+        while True:
+            if self.freq == MONTHLY:
+                month = first.month - 1 + k * self.interval
+                yield date(first.year + month // 12, month % 12 + 1, 1)
+            else:
+                yield first + timedelta(days=k * self.interval * (7 if self.freq == WEEKLY else 1))
+            k += 1
+
+    def _days_in_period(self, period: date, dtstart: datetime) -> List[date]:
+        if self.freq == DAILY:
+            weekdays = {weekday for _, weekday in self.by_day}
+            return [period] if not weekdays or period.weekday() in weekdays else []
+        if self.freq == WEEKLY:
+            weekdays = sorted({weekday for _, weekday in self.by_day}) or [dtstart.weekday()]
+            return [period + timedelta(days=weekday) for weekday in weekdays]
+
+        last = calendar.monthrange(period.year, period.month)[1]
+        days = set()
+        for day in self.by_month_day:
+            day = day if day > 0 else last + day + 1
+            if 1 <= day <= last:
+                days.add(day)
+        for ordinal, weekday in self.by_day:
+            matching = [d for d in range(1, last + 1) if date(period.year, period.month, d).weekday() == weekday]
+            if not ordinal:
+                days.update(matching)
+            elif -len(matching) <= ordinal <= len(matching):
+                days.add(matching[ordinal - 1 if ordinal > 0 else ordinal])
+        if not self.by_month_day and not self.by_day and dtstart.day <= last:
+            days.add(dtstart.day)
+        return [period.replace(day=d) for d in sorted(days)]
+
+    def between(self, dtstart: datetime, start: datetime, end: datetime) -> Iterator[datetime]:
+        """
+        Lazily yields occurrences in [start, end), in order. Without COUNT, expansion jumps
+        straight to the period containing `start`, so a window years after dtstart costs
+        the same as the first one; with COUNT it has to count from dtstart.
+        """
+        seen = 0
+        for period in self._period_starts(dtstart, None if self.count else start):
+            if datetime.combine(period, datetime.min.time()) >= end:
+                return
+            for day in self._days_in_period(period, dtstart):
+                occurrence = datetime.combine(day, dtstart.time())
+                if occurrence < dtstart:
+                    continue
+                if self.until is not None and occurrence > self.until:
+                    return
+                seen += 1
+                if self.count is not None and seen > self.count:
+                    return
+                if occurrence >= end:
+                    return
+                if occurrence >= start:
+                    yield occurrence
+
+
+def month_windows(start: datetime, end: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """Splits [start, end) into calendar month windows, widened to whole months."""
+    month = datetime(start.year, start.month, 1)
+    while month < end:
+        following = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        yield month, following
+        month = following
+
+
+class OccurrenceCache:
+    """
+    Expanded occurrences of recurring schedules, cached per schedule and calendar month
+    in a thread-safe LRU. Keys include the rule and the first occurrence, so editing a
+    schedule misses the cache rather than serving stale dates; invalidate() frees the
+    entries of a changed or deleted schedule early.
+    """
+
+    def __init__(self, max_entries: int = OCCURRENCE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, Tuple[datetime, ...]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def between(self, schedule_id: int, rule: str, dtstart: datetime, start: datetime, end: datetime) -> List[datetime]:
+        """Occurrences of a schedule's rule in [start, end), expanding only months not cached yet."""
+        parsed = None
+        occurrences = []
+        for month_start, month_end in month_windows(start, end):
+            key = (schedule_id, rule, dtstart, month_start)
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+            if cached is None:
+                parsed = parsed or RecurrenceRule.parse(rule)
+                cached = []
+                for occurrence in parsed.between(dtstart, month_start, month_end):
+                    cached.append(occurrence)
+                    if len(cached) >= MAX_OCCURRENCES_PER_MONTH:
+                        logger.warning(f"Schedule {schedule_id} recurs more than {MAX_OCCURRENCES_PER_MONTH} times in "
+                                       f"{month_start:%Y-%m}; later occurrences that month are ignored.")
+                        break
+                cached = tuple(cached)
+                with self._lock:
+                    self.misses += 1
+                    self._entries[key] = cached
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            occurrences.extend(o for o in cached if start <= o < end)
+        return occurrences
+
+    def invalidate(self, schedule_id: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == schedule_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+occurrence_cache = OccurrenceCache()
@@ -0,0 +1,290 @@
+# scheduler_service.py
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastlite import Database
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+# Runs kept in memory per job
+JOB_HISTORY_SIZE = 50
+# Seconds a job may start late before the run counts as missed and is caught up
+MISFIRE_GRACE_SECONDS = 30
+
+
+class CronTrigger:
+    """
+    Cron-style trigger: "minute hour day-of-month month day-of-week", e.g. "0 11,13,15 * * *".
+    Fields accept "*", lists, ranges and steps ("*/15", "1-5"); day-of-week runs 0-6 from Monday.
+    """
+
+    _FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self._FIELD_RANGES)
+        ]
+
+    @staticmethod
+    def _parse_field(part: str, low: int, high: int) -> List[int]:
+        values = set()
+        for item in part.split(","):
+            step = 1
+            if "/" in item:
+                item, step_str = item.split("/")
+                step = int(step_str)
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = map(int, item.split("-"))
+            else:
+                start = end = int(item)
+            if start < low or end > high or step < 1:
+                raise ValueError(f"Cron field out of range: {part}")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def next_after(self, after: datetime) -> datetime:
+        """Returns the first matching minute strictly after the given time."""
+        candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Walk day by day, then only over the matching hours and minutes of that day
+        for _ in range(366 * 5):
+            if candidate.month in self.months and candidate.day in self.days and candidate.weekday() in self.weekdays:
+                for hour in self.hours:
+                    if hour < candidate.hour:
+                        continue
+                    for minute in self.minutes:
+                        if hour == candidate.hour and minute < candidate.minute:
+                            continue
+                        return candidate.replace(hour=hour, minute=minute)
+            candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+
+class IntervalTrigger:
+    """Fires every fixed number of seconds."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def next_after(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds)
+
+
+@dataclass
+class JobRun:
+    id: Optional[int] = field(default=None)
+    job_name: str = field(default="")
+    scheduled_for: datetime = field(default_factory=datetime.now)  # When the trigger fired
+    started_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = field(default=None)
+    status: str = field(default="Running")        # Running, Succeeded, Failed, Skipped
+    error: str = field(default="")
+
+    # Table name in the database
+    __tablename__ = 'job_runs'
+
+    @classmethod
+    def create_table(cls):
+        """Creates the job_runs table if it doesn't exist."""
+        query = f'''
+        CREATE TABLE IF NOT EXISTS {cls.__tablename__} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_name TEXT NOT NULL,
+            scheduled_for DATETIME NOT NULL,
+            started_at DATETIME NOT NULL,
+            finished_at DATETIME,
+            status TEXT NOT NULL,
+            error TEXT
+        )
+        '''
+        db.execute(query)
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.__tablename__}_job ON {cls.__tablename__} (job_name, scheduled_for)")
+
+    @classmethod
+    def last_scheduled_for(cls, job_name: str) -> Optional[datetime]:
+        """Returns when the job's most recent run was scheduled for, if it ever ran."""
+        rows = db.q(f"SELECT MAX(scheduled_for) AS last FROM {cls.__tablename__} WHERE job_name = ?", (job_name,))
+        return datetime.strptime(rows[0]['last'], "%Y-%m-%d %H:%M:%S") if rows and rows[0]['last'] else None
+
+    def save(self):
+        """Inserts the run record."""
+        query = f'''
+        INSERT INTO {self.__tablename__} (job_name, scheduled_for, started_at, finished_at, status, error)
+        VALUES (?, ?, ?, ?, ?, ?)
+        '''
+        params = (
+            self.job_name, self.scheduled_for.strftime("%Y-%m-%d %H:%M:%S"),
+            self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            self.finished_at.strftime("%Y-%m-%d %H:%M:%S") if self.finished_at else None,
+            self.status, self.error
+        )
+        db.execute(query, params)
+
+
+class Job:
+    """A scheduled callable with its trigger, jitter, catch-up policy and recent run history."""
+
+    def __init__(self, name: str, func: Callable, trigger, jitter: float = 0, catch_up: bool = True,
+                 persist: bool = True, singleton: bool = False):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.persist = persist
+        self.singleton = singleton
+        self.history: deque = deque(maxlen=JOB_HISTORY_SIZE)
+        self.running = False
+
+
+class Scheduler:
+    """
+    Heap-based async job scheduler.
+    The heap holds (due time, sequence, job, scheduled time); the loop sleeps until the
+    earliest job is due, runs it as its own task and re-arms it from its scheduled time,
+    so slow ticks never drift or double-fire. Runs missed while the app was down or the
+    loop was late are caught up once rather than replayed one by one.
+    """
+
+    def __init__(self, persist_runs: bool = False, misfire_grace: float = MISFIRE_GRACE_SECONDS,
+                 clock: Callable[[], datetime] = datetime.now, is_leader: Callable[[], bool] = lambda: True):
+        self.persist_runs = persist_runs
+        self.is_leader = is_leader
+        self.misfire_grace = misfire_grace
+        self.clock = clock
+        self.jobs: Dict[str, Job] = {}
+        self._heap: list = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running_tasks: set = set()
+
+    def add_job(self, name: str, func: Callable, trigger, jitter: float = 0, catch_up: bool = True,
+                persist: bool = True, singleton: bool = False) -> Job:
+        """
+        Registers a job; it is armed immediately if the scheduler is already running.
+        High-frequency jobs can pass persist=False to keep their runs out of the job_runs table.
+        Singleton jobs run only in the leader worker when the app runs several workers.
+        """
+        job = Job(name, func, trigger, jitter, catch_up, persist, singleton)
+        self.jobs[name] = job
+        self._arm_initial(job)
+        return job
+
+    def history(self, name: str) -> List[JobRun]:
+        """Returns the recent runs of a job, oldest first."""
+        return list(self.jobs[name].history)
+
+    def start(self):
+        """Starts the scheduler loop on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs.")
+
+    async def stop(self):
+        """Stops the loop and cancels runs still in progress."""
+        if self._task:
+            self._task.cancel()
+        for task in list(self._running_tasks):
+            task.cancel()
+        await asyncio.gather(*self._running_tasks, return_exceptions=True)
+        logger.info("Scheduler stopped.")
+
+    def _arm_initial(self, job: Job):
+        now = self.clock()
+        last = JobRun.last_scheduled_for(job.name) if self.persist_runs and job.persist else None
+        if last is not None:
+            missed = job.trigger.next_after(last)
+            if missed <= now and job.catch_up:
+                logger.info(f"Job {job.name} missed its run at {missed}; catching up.")
+                self._push(job, missed, now)
+                return
+        self._push(job, job.trigger.next_after(now))
+
+    def _push(self, job: Job, scheduled_for: datetime, due: Optional[datetime] = None):
+        due = due or scheduled_for
+        if job.jitter:
+            due += timedelta(seconds=random.uniform(0, job.jitter))
+        heapq.heappush(self._heap, (due, next(self._sequence), job, scheduled_for))
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _run_loop(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, _, job, scheduled_for = self._heap[0]
+            delay = (due - self.clock()).total_seconds()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # Wake early if a job with an earlier due time is added
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            now = self.clock()
+            task = asyncio.create_task(self._execute(job, scheduled_for))
+            self._running_tasks.add(task)
+            task.add_done_callback(self._running_tasks.discard)
+
+            # Re-arm from the scheduled time; if further runs were missed, coalesce them
+            next_run = job.trigger.next_after(scheduled_for)
+            if next_run <= now:
+                if (now - next_run).total_seconds() > self.misfire_grace:
+                    logger.warning(f"Job {job.name} fell behind; skipping missed runs up to {now}.")
+                next_run = job.trigger.next_after(now)
+            self._push(job, next_run)
+
+    async def _execute(self, job: Job, scheduled_for: datetime):
+        if job.singleton and not self.is_leader():
+            return
+        run = JobRun(job_name=job.name, scheduled_for=scheduled_for, started_at=self.clock())
+        if job.running:
+            run.status = "Skipped"
+            run.error = "Previous run still in progress."
+        else:
+            job.running = True
+            try:
+                result = job.func() if inspect.iscoroutinefunction(job.func) else asyncio.to_thread(job.func)
+                await result
+                run.status = "Succeeded"
+            except asyncio.CancelledError:
+                run.status = "Failed"
+                run.error = "Cancelled"
+                raise
+            except Exception as e:
+                run.status = "Failed"
+                run.error = str(e)
+                logger.exception(f"Scheduled job {job.name} failed: {e}")
+            finally:
+                job.running = False
+        run.finished_at = self.clock()
+        job.history.append(run)
+        if self.persist_runs and job.persist:
+            try:
+                run.save()
+            except Exception as e:
+                logger.error(f"Could not record run of job {job.name}: {e}")
@@ -0,0 +1,212 @@
+# sequencing_service.py
+
+import logging
+import multiprocessing
+import os
+import time as timer
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastlite import Database
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+EARTH_RADIUS_M = 6_371_000
+# Road distance relative to straight-line distance in a street grid
+ROAD_DETOUR_FACTOR = 1.3
+# Average truck speed between stops, metres per second (about 25 km/h)
+AVERAGE_SPEED_MPS = 7.0
+# Seconds the improvement phase may spend on one route
+SEQUENCING_SECONDS_PER_ROUTE = 2.0
+# Longest run of consecutive stops Or-opt moves at once
+OR_OPT_MAX_SEGMENT = 3
+
+
+@dataclass
+class SequenceResult:
+    route_id: int
+    stop_ids: List[int]              # Stops in the new order
+    drive_seconds_before: float
+    drive_seconds_after: float
+
+
+def drive_time_matrix(lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Estimated drive seconds between every pair of points: haversine distance over the whole grid at once."""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    metres = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return metres * ROAD_DETOUR_FACTOR / AVERAGE_SPEED_MPS
+
+
+def path_cost(matrix: np.ndarray, order: Sequence[int]) -> float:
+    """Drive seconds along an open path visiting the points in order."""
+    order = np.asarray(order)
+    return float(matrix[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+
+def nearest_neighbour(matrix: np.ndarray, start: int = 0) -> List[int]:
+    """Builds a path from `start` by always driving to the closest unvisited point."""
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        distances = np.where(visited, np.inf, matrix[order[-1]])
+        nearest = int(np.argmin(distances))
+        order.append(nearest)
+        visited[nearest] = True
+    return order
+
+
+def two_opt(matrix: np.ndarray, order: List[int], deadline: float) -> List[int]:
+    """
+    Reverses segments of the path while that shortens it; the first point stays fixed
+    and the path is open at the end. For each segment start, the gain of every possible
+    segment end is computed in one vectorised step.
+    """
+    path = np.asarray(order)
+    n = len(path)
+    improved = True
+    while improved and timer.monotonic() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = path[i - 1], path[i]
+            c = path[i + 1:]                     # Candidate segment ends j = i+1 .. n-1
+            nxt = np.append(path[i + 2:], -1)    # Point after each candidate end, -1 past the end
+            removed = matrix[a, b] + np.where(nxt >= 0, matrix[c, np.maximum(nxt, 0)], 0.0)
+            added = matrix[a, c] + np.where(nxt >= 0, matrix[b, np.maximum(nxt, 0)], 0.0)
+            gains = removed - added
+            best = int(np.argmax(gains))
+            if gains[best] > 1e-6:
+                j = i + 1 + best
+                path[i:j + 1] = path[i:j + 1][::-1]
+                improved = True
+            if timer.monotonic() >= deadline:
+                break
+    return path.tolist()
+
+
+def or_opt(matrix: np.ndarray, order: List[int], deadline: float, max_segment: int = OR_OPT_MAX_SEGMENT) -> List[int]:
+    """Moves runs of up to max_segment consecutive points to wherever they shorten the path most."""
+    path = list(order)
+    n = len(path)
+    improved = True
+    while improved and timer.monotonic() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, n - length + 1):
+                segment = path[i:i + length]
+                prev, after = path[i - 1], path[i + length] if i + length < n else None
+                removal_gain = matrix[prev, segment[0]] - (matrix[prev, after] if after is not None else 0.0)
+                if after is not None:
+                    removal_gain += matrix[segment[-1], after]
+                rest = np.asarray(path[:i] + path[i + length:])
+                # Insert between rest[k] and rest[k+1], or after the last point
+                left = rest
+                right = np.append(rest[1:], -1)
+                insert_cost = matrix[left, segment[0]] + np.where(
+                    right >= 0, matrix[segment[-1], np.maximum(right, 0)] - matrix[left, np.maximum(right, 0)], 0.0
+                )
+                insert_cost[i - 1] = np.inf      # Putting it back where it was
+                k = int(np.argmin(insert_cost))
+                if removal_gain - insert_cost[k] > 1e-6:
+                    rest_list = rest.tolist()
+                    path = rest_list[:k + 1] + segment + rest_list[k + 1:]
+                    improved = True
+                    break
+                if timer.monotonic() >= deadline:
+                    return path
+            if improved:
+                break
+    return path
+
+
+def sequence_points(lats: Sequence[float], lons: Sequence[float],
+                    time_budget: float = SEQUENCING_SECONDS_PER_ROUTE) -> Tuple[List[int], float, float]:
+    """
+    Orders points to minimise drive time, starting from the first one: nearest-neighbour
+    construction, then 2-opt and Or-opt until neither improves or time runs out.
+    Returns the new order as indices, and the drive seconds of the given and new orders.
+    """
+    n = len(lats)
+    if n < 3:
+        return list(range(n)), 0.0, 0.0
+    matrix = drive_time_matrix(lats, lons)
+    before = path_cost(matrix, range(n))
+    deadline = timer.monotonic() + time_budget
+    order = nearest_neighbour(matrix)
+    while timer.monotonic() < deadline:
+        cost = path_cost(matrix, order)
+        order = or_opt(matrix, two_opt(matrix, order, deadline), deadline)
+        if path_cost(matrix, order) >= cost - 1e-6:
+            break
+    after = path_cost(matrix, order)
+    # Never hand back something worse than the current order
+    if after > before:
+        return list(range(n)), before, before
+    return order, before, after
+
+
+def _sequence_route(args) -> SequenceResult:
+    """Process pool entry point: sequences one route's stops given as (stop_id, lat, lon)."""
+    route_id, stops, time_budget = args
+    order, before, after = sequence_points([s[1] for s in stops], [s[2] for s in stops], time_budget)
+    return SequenceResult(route_id, [stops[i][0] for i in order], before, after)
+
+
+def load_route_stops(route_ids: Optional[List[int]] = None) -> Dict[int, List[Tuple[int, float, float]]]:
+    """Returns each route's stops as (stop_id, lat, lon) in their current order."""
+    query = "SELECT id, route_id, lat, lon FROM route_stops"
+    params = ()
+    if route_ids is not None:
+        query += f" WHERE route_id IN ({','.join('?' * len(route_ids))})"
+        params = tuple(route_ids)
+    stops: Dict[int, List[Tuple[int, float, float]]] = {}
+    for row in db.q(query + " ORDER BY route_id, sequence, id", params):
+        stops.setdefault(row['route_id'], []).append((row['id'], row['lat'], row['lon']))
+    return stops
+
+
+def save_sequences(results: List[SequenceResult]):
+    """Writes the new stop orders in one transaction."""
+    with db.conn:
+        db.conn.executemany(
+            "UPDATE route_stops SET sequence = ? WHERE id = ?",
+            [(sequence, stop_id) for result in results for sequence, stop_id in enumerate(result.stop_ids, start=1)]
+        )
+
+
+def optimize_stop_sequences(route_ids: Optional[List[int]] = None, workers: Optional[int] = None,
+                            time_budget: float = SEQUENCING_SECONDS_PER_ROUTE) -> List[SequenceResult]:
+    """
+    Re-sequences the stops of the given routes (all by default), one route per task on a
+    process pool so every core is used, and stores the orders that got shorter.
+    """
+    started = timer.monotonic()
+    routes = load_route_stops(route_ids)
+    tasks = [(route_id, stops, time_budget) for route_id, stops in routes.items() if len(stops) >= 3]
+    if not tasks:
+        return []
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = [_sequence_route(task) for task in tasks]
+    else:
+        # Spawned rather than forked: the workers must not inherit the server's open database
+        # connections, sockets and threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+            results = list(pool.map(_sequence_route, tasks))
+    improved = [r for r in results if r.drive_seconds_after < r.drive_seconds_before]
+    save_sequences(improved)
+    saved = sum(r.drive_seconds_before - r.drive_seconds_after for r in improved)
+    logger.info(f"Sequenced stops of {len(results)} routes in {timer.monotonic() - started:.1f}s; "
+                f"{len(improved)} improved, saving {saved / 60:.0f} drive minutes in total.")
+    return results
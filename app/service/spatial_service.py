@@ -0,0 +1,184 @@
+# spatial_service.py
+
+import logging
+import math
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastlite import Database
+
+logger = logging.getLogger(__name__)
+
+# Initialize the FastLite database
+db = Database('app_data.db')
+
+EARTH_RADIUS_M = 6_371_000
+# One degree of latitude on the sphere haversine_m measures on, so bounding boxes never cut a radius short
+METERS_PER_DEGREE_LAT = EARTH_RADIUS_M * math.pi / 180
+# First search radius for nearest-neighbour lookups; doubled until enough points are found
+NEAREST_INITIAL_RADIUS_M = 500
+NEAREST_MAX_RADIUS_M = 200_000
+
+# Point kinds held in the index
+TRUCK = "truck"
+STOP = "stop"
+
+# A query result: (kind, ref_id, lat, lon, distance in meters)
+SpatialMatch = Tuple[str, int, float, float, float]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Returns (min_lat, max_lat, min_lon, max_lon) enclosing a circle around the point."""
+    d_lat = radius_m / METERS_PER_DEGREE_LAT
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by ~0
+    d_lon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon
+
+
+class SpatialIndex:
+    """
+    Spatial index over the latest truck positions and route stops.
+    Points live in `spatial_points`; an SQLite R*Tree virtual table over the same ids
+    narrows radius and nearest-neighbour queries to a bounding box before exact
+    haversine distances are computed for the few candidates left.
+    """
+
+    __tablename__ = 'spatial_points'
+    __rtree__ = 'spatial_points_rtree'
+
+    def __init__(self, database: Database = db):
+        self.db = database
+
+    def create_table(self):
+        """Creates the point table and its R*Tree index if they don't exist."""
+        self.db.execute(f'''
+        CREATE TABLE IF NOT EXISTS {self.__tablename__} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            ref_id INTEGER NOT NULL,
+            lat REAL NOT NULL,
+            lon REAL NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (kind, ref_id)
+        )
+        ''')
+        self.db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.__rtree__} USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+
+    def upsert_many(self, kind: str, points: Iterable[Tuple[int, float, float]]):
+        """Adds or moves points given as (ref_id, lat, lon), in one transaction."""
+        points = list(points)
+        if not points:
+            return
+        with self.db.conn:
+            self.db.conn.executemany(f'''
+                INSERT INTO {self.__tablename__} (kind, ref_id, lat, lon, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (kind, ref_id) DO UPDATE SET lat = excluded.lat, lon = excluded.lon, updated_at = excluded.updated_at
+            ''', [(kind, ref_id, lat, lon) for ref_id, lat, lon in points])
+            self.db.conn.executemany(f'''
+                INSERT OR REPLACE INTO {self.__rtree__} (id, min_lat, max_lat, min_lon, max_lon)
+                SELECT id, lat, lat, lon, lon FROM {self.__tablename__} WHERE kind = ? AND ref_id = ?
+            ''', [(kind, ref_id) for ref_id, _, _ in points])
+
+    def remove(self, kind: str, ref_id: int):
+        """Removes a point from the index."""
+        with self.db.conn:
+            self.db.execute(f'''
+                DELETE FROM {self.__rtree__} WHERE id IN (SELECT id FROM {self.__tablename__} WHERE kind = ? AND ref_id = ?)
+            ''', (kind, ref_id))
+            self.db.execute(f"DELETE FROM {self.__tablename__} WHERE kind = ? AND ref_id = ?", (kind, ref_id))
+
+    def count(self, kind: Optional[str] = None) -> int:
+        """Returns the number of indexed points, optionally of one kind."""
+        if kind is None:
+            rows = self.db.q(f"SELECT COUNT(*) AS total FROM {self.__tablename__}")
+        else:
+            rows = self.db.q(f"SELECT COUNT(*) AS total FROM {self.__tablename__} WHERE kind = ?", (kind,))
+        return rows[0]['total']
+
+    def within_radius(self, lat: float, lon: float, radius_m: float, kind: Optional[str] = None) -> List[SpatialMatch]:
+        """Returns the points within radius_m of (lat, lon), nearest first."""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_m)
+        query = f'''
+        SELECT p.kind, p.ref_id, p.lat, p.lon
+        FROM {self.__rtree__} r
+        JOIN {self.__tablename__} p ON p.id = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+        '''
+        params = [min_lat, max_lat, min_lon, max_lon]
+        if kind is not None:
+            query += " AND p.kind = ?"
+            params.append(kind)
+        matches = []
+        for row in self.db.q(query, params):
+            distance = haversine_m(lat, lon, row['lat'], row['lon'])
+            if distance <= radius_m:
+                matches.append((row['kind'], row['ref_id'], row['lat'], row['lon'], distance))
+        matches.sort(key=lambda match: match[4])
+        return matches
+
+    def nearest(self, lat: float, lon: float, k: int = 1, kind: Optional[str] = None,
+                max_radius_m: float = NEAREST_MAX_RADIUS_M) -> List[SpatialMatch]:
+        """
+        Returns up to k points nearest to (lat, lon).
+        The search box doubles from NEAREST_INITIAL_RADIUS_M until it holds k points,
+        so dense areas are answered from a handful of R*Tree pages.
+        """
+        total = self.count(kind)
+        radius = NEAREST_INITIAL_RADIUS_M
+        while True:
+            matches = self.within_radius(lat, lon, radius, kind)
+            # A circle of this radius holding k points guarantees nothing outside it is closer
+            if len(matches) >= min(k, total) or radius >= max_radius_m:
+                return matches[:k]
+            radius = min(radius * 2, max_radius_m)
+
+
+spatial_index = SpatialIndex()
+
+
+def truck_ids_for_routes(route_ids: Iterable[int], day: Optional[date] = None) -> Dict[int, int]:
+    """Maps routes to the truck of the crew assigned to them on the given day (today by default)."""
+    route_ids = list(route_ids)
+    if not route_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in route_ids)
+    query = f'''
+    SELECT a.route_id, c.truck_id
+    FROM assignments a
+    JOIN crews c ON c.id = a.crew_id
+    WHERE a.doc = ? AND a.route_id IN ({placeholders})
+    '''
+    rows = db.q(query, [(day or date.today()).isoformat(), *route_ids])
+    return {row['route_id']: row['truck_id'] for row in rows}
+
+
+def index_truck_positions(latest_by_route: Dict[int, Tuple[int, float, float]]) -> int:
+    """
+    Moves trucks in the spatial index to the latest positions reported on their routes.
+    Returns the number of trucks updated.
+    """
+    trucks = truck_ids_for_routes(latest_by_route.keys())
+    points = [(truck_id, latest_by_route[route_id][1], latest_by_route[route_id][2])
+              for route_id, truck_id in trucks.items()]
+    spatial_index.upsert_many(TRUCK, points)
+    return len(points)
+
+
+def trucks_within(lat: float, lon: float, radius_m: float) -> List[SpatialMatch]:
+    """Returns the trucks within radius_m of a point, nearest first."""
+    return spatial_index.within_radius(lat, lon, radius_m, TRUCK)
+
+
+def nearest_trucks(lat: float, lon: float, k: int = 1) -> List[SpatialMatch]:
+    """Returns the k trucks nearest to a point."""
+    return spatial_index.nearest(lat, lon, k, TRUCK)
@@ -19,6 +19,12 @@ DATABASE_URL = config("DATABASE_URL", cast=str)
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the environment variables or .env file.")
 
+# Server Configuration
+WORKERS = config("WORKERS", cast=int, default=1)
+# Realtime broker linking the websocket hubs of all workers: "local" for a single worker, "unix" for several
+REALTIME_BROKER = config("REALTIME_BROKER", cast=str, default="unix" if WORKERS > 1 else "local")
+REALTIME_BROKER_SOCKET = config("REALTIME_BROKER_SOCKET", cast=str, default="/tmp/ezzday_realtime.sock")
+
 # Logging Configuration
 LOG_LEVEL = config("LOG_LEVEL", cast=str, default="INFO")
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -30,6 +36,8 @@ SMTP_PORT = config("SMTP_PORT", cast=int, default=587)
 EMAIL_USERNAME = config("EMAIL_USERNAME", cast=str)
 EMAIL_PASSWORD = config("EMAIL_PASSWORD", cast=str)
 EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool, default=True)
+MAIL_FROM = config("MAIL_FROM", cast=str, default="no-reply@example.com")
+SMTP_POOL_SIZE = config("SMTP_POOL_SIZE", cast=int, default=4)
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config(
@@ -38,7 +38,8 @@ def start_app():
             port=8000,
             reload=settings.DEBUG,  # Assuming DEBUG is a boolean
             log_level=settings.LOG_LEVEL.lower(),
-            workers=1  # Adjust as needed
+            # Websocket updates reach every worker through the realtime broker
+            workers=settings.WORKERS
         )
     except Exception as e:
         logger.error(f"Failed to start application: {e}")
@@ -0,0 +1,8 @@
+# tests/conftest.py
+
+import os
+
+# config.settings requires these on import; fall back to throwaway values outside a configured environment
+for name in ("SECRET_KEY", "SMTP_SERVER", "EMAIL_USERNAME", "EMAIL_PASSWORD", "JWT_SECRET"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
@@ -0,0 +1,222 @@
+# tests/load/websocket_load.py
+"""
+Load generator for the realtime websockets of a locally running instance.
+
+Simulates crews sending route updates at a fixed rate and dashboards subscribed
+to every route, then reports end-to-end latency (crew send -> dashboard receive),
+message loss and, given the server's pid, its CPU and memory use. The sockets need a
+staff session, so the generator logs in first with the given account.
+
+    python run.py &
+    PYTHONPATH=. python tests/load/websocket_load.py --username dispatch --password ... \
+        --crews 500 --rate 2 --dashboards 20 --duration 30 --server-pid $!
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+import websockets
+
+from app.service.protocol_service import BINARY_SUBPROTOCOL, RouteUpdate, encode_updates
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.acked = 0
+        self.send_errors = 0
+        self.received = 0
+        self.latencies_ms = []
+        self.dashboards_connected = 0
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def login(url: str, username: str, password: str) -> str:
+    """Logs in over HTTP and returns the session cookie to present on every websocket handshake."""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    try:
+        connection.request("POST", "/auth/login", body=urlencode({"username": username, "password": password}),
+                           headers={"Content-Type": "application/x-www-form-urlencoded"})
+        response = connection.getresponse()
+        cookies = [header.split(";", 1)[0] for header in response.headers.get_all("Set-Cookie") or []]
+    finally:
+        connection.close()
+    # A successful login redirects; a failed one re-renders the form
+    if response.status != 303 or not cookies:
+        raise SystemExit(f"login as {username!r} failed (HTTP {response.status})")
+    return "; ".join(cookies)
+
+
+async def crew(url: str, cookie: str, route_id: int, rate: float, batch: int, binary: bool, stop: asyncio.Event,
+               stats: Stats):
+    """One crew device sending `rate` updates per second, `batch` updates per frame in binary mode."""
+    interval = batch / rate
+    lat, lon = 51.3 + random.random() * 0.4, -0.4 + random.random() * 0.6
+    sequence = 0
+    subprotocols = [BINARY_SUBPROTOCOL] if binary else None
+    try:
+        async with websockets.connect(url, subprotocols=subprotocols, additional_headers={"Cookie": cookie},
+                                      max_queue=None) as ws:
+            async def drain_replies():
+                # Acks (binary) or confirmation strings (JSON); read so the server never blocks on us
+                async for _ in ws:
+                    stats.acked += 1
+
+            reader = asyncio.create_task(drain_replies())
+            # Spread crews over the interval so they do not all send at once
+            await asyncio.sleep(random.random() * interval)
+            next_send = time.monotonic()
+            while not stop.is_set():
+                lat += random.uniform(-1e-4, 1e-4)
+                lon += random.uniform(-1e-4, 1e-4)
+                if binary:
+                    updates = []
+                    for _ in range(batch):
+                        sequence += 1
+                        updates.append(RouteUpdate(sequence, route_id, "On Track", lat, lon, now_ms()))
+                    await ws.send(encode_updates(updates))
+                    stats.sent += batch
+                else:
+                    await ws.send(json.dumps({
+                        "route_id": route_id, "status": "On Track",
+                        "location": {"lat": lat, "lon": lon}, "recorded_at": now_ms()
+                    }))
+                    stats.sent += 1
+                next_send += interval
+                await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+            reader.cancel()
+    except (OSError, websockets.WebSocketException):
+        stats.send_errors += 1
+
+
+async def dashboard(url: str, cookie: str, stop: asyncio.Event, stats: Stats):
+    """One dashboard subscribed to every route, recording latency from each update's recorded_at."""
+    try:
+        async with websockets.connect(url, additional_headers={"Cookie": cookie}, max_queue=None) as ws:
+            stats.dashboards_connected += 1
+            while not stop.is_set():
+                try:
+                    payload = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                message = json.loads(payload)
+                if message.get("type") != "route_update":
+                    continue
+                stats.received += 1
+                if message.get("recorded_at"):
+                    stats.latencies_ms.append(now_ms() - message["recorded_at"])
+    except (OSError, websockets.WebSocketException):
+        pass
+
+
+class ProcessSampler:
+    """Samples CPU time and resident memory of a local process from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.peak_rss_kb = 0
+        self.start_cpu = self.cpu_seconds()
+        self.start_wall = time.monotonic()
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15 of the full line
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def sample(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    self.peak_rss_kb = max(self.peak_rss_kb, int(line.split()[1]))
+
+    def cpu_percent(self) -> float:
+        return 100 * (self.cpu_seconds() - self.start_cpu) / (time.monotonic() - self.start_wall)
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            self.sample()
+            await asyncio.sleep(1)
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def main(args):
+    stats = Stats()
+    cookie = login(args.url, args.username, args.password)
+    stop_crews, stop_dashboards, stop_sampler = asyncio.Event(), asyncio.Event(), asyncio.Event()
+    sampler = ProcessSampler(args.server_pid) if args.server_pid else None
+    sampler_task = asyncio.create_task(sampler.run(stop_sampler)) if sampler else None
+
+    dashboards = [asyncio.create_task(dashboard(f"{args.url}/ws/dashboard", cookie, stop_dashboards, stats))
+                  for _ in range(args.dashboards)]
+    # Dashboards subscribe before crews start so every update should reach every dashboard
+    await asyncio.sleep(1)
+
+    crews = [
+        asyncio.create_task(crew(f"{args.url}/ws/route-progress", cookie, args.first_route + i, args.rate, args.batch,
+                                 args.binary, stop_crews, stats))
+        for i in range(args.crews)
+    ]
+    await asyncio.sleep(args.duration)
+    stop_crews.set()
+    await asyncio.gather(*crews)
+    # Let in-flight updates reach the dashboards
+    await asyncio.sleep(args.drain)
+    stop_dashboards.set()
+    await asyncio.gather(*dashboards)
+    stop_sampler.set()
+    if sampler_task:
+        await sampler_task
+
+    expected = stats.sent * stats.dashboards_connected
+    loss = 1 - stats.received / expected if expected else 0.0
+    print(f"crews: {args.crews} at {args.rate}/s ({'binary' if args.binary else 'json'}), "
+          f"dashboards: {stats.dashboards_connected}/{args.dashboards}, duration: {args.duration}s")
+    print(f"updates sent: {stats.sent} ({stats.sent / args.duration:.0f}/s), replies: {stats.acked}, "
+          f"connection errors: {stats.send_errors}")
+    print(f"dashboard messages: {stats.received} of {expected} expected, loss: {loss:.2%}")
+    print(f"latency ms: p50 {percentile(stats.latencies_ms, 0.5):.1f}, p95 {percentile(stats.latencies_ms, 0.95):.1f}, "
+          f"p99 {percentile(stats.latencies_ms, 0.99):.1f}, max {max(stats.latencies_ms, default=float('nan')):.1f}")
+    if sampler:
+        print(f"server cpu: {sampler.cpu_percent():.1f}%, peak rss: {sampler.peak_rss_kb / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Websocket load test for the realtime service (local instances only).")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000")
+    parser.add_argument("--username", default=os.environ.get("LOAD_TEST_USERNAME"),
+                        help="staff account the sockets authenticate as (default: $LOAD_TEST_USERNAME)")
+    parser.add_argument("--password", default=os.environ.get("LOAD_TEST_PASSWORD"),
+                        help="its password (default: $LOAD_TEST_PASSWORD)")
+    parser.add_argument("--crews", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1.0, help="updates per second per crew")
+    parser.add_argument("--batch", type=int, default=1, help="updates per binary frame")
+    parser.add_argument("--binary", action="store_true", help="use the binary crew protocol")
+    parser.add_argument("--dashboards", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--drain", type=float, default=2, help="seconds to wait for in-flight updates")
+    parser.add_argument("--first-route", type=int, default=1)
+    parser.add_argument("--server-pid", type=int, help="pid of the local server, for CPU and memory figures")
+    args = parser.parse_args()
+    if not args.url.startswith(("ws://127.", "ws://localhost", "ws://[::1]")):
+        parser.error("the load test only runs against local instances")
+    if not (args.username and args.password):
+        parser.error("the websockets need a staff session; give --username and --password")
+    asyncio.run(main(args))
@@ -0,0 +1,125 @@
+# tests/unit/debug_smtp_server.py
+"""
+Debug SMTP server used by the mail tests. Run on its own it listens on port 1025 and
+prints what it receives, for trying out emails locally:
+
+    SMTP_SERVER=localhost SMTP_PORT=1025 EMAIL_USE_TLS=False EMAIL_USERNAME= python run.py
+    python tests/unit/debug_smtp_server.py
+"""
+
+import asyncio
+import email
+import threading
+import time
+from typing import List, Optional
+
+
+class DebugSmtpServer:
+    """
+    Local SMTP stand-in for development and tests: accepts every message and keeps it
+    in memory instead of delivering it. Speaks plain SMTP (no STARTTLS or AUTH), so point
+    the app at it with EMAIL_USE_TLS=False and no EMAIL_USERNAME.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.messages: List[dict] = []
+        self.connections = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'DebugSmtpServer':
+        """Starts serving on a background thread; port 0 picks a free port."""
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        mail_from, rcpt_to = None, []
+
+        def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 localhost debug SMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line[:4].decode(errors="replace").upper()
+                argument = line[5:].decode(errors="replace").strip()
+                if command == "EHLO":
+                    reply("250-localhost")
+                    reply("250 8BITMIME")
+                elif command == "HELO":
+                    reply("250 localhost")
+                elif command == "MAIL":
+                    mail_from, rcpt_to = argument.split(":", 1)[1].strip().strip("<>"), []
+                    reply("250 OK")
+                elif command == "RCPT":
+                    rcpt_to.append(argument.split(":", 1)[1].strip().strip("<>"))
+                    reply("250 OK")
+                elif command == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                    self.messages.append({
+                        "from": mail_from,
+                        "to": rcpt_to,
+                        "message": email.message_from_bytes(b"".join(lines)),
+                    })
+                    mail_from, rcpt_to = None, []
+                    reply("250 OK")
+                elif command == "RSET":
+                    mail_from, rcpt_to = None, []
+                    reply("250 OK")
+                elif command == "NOOP":
+                    reply("250 OK")
+                elif command == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    server = DebugSmtpServer(port=1025).start()
+    print(f"Debug SMTP server listening on {server.host}:{server.port}")
+    seen = 0
+    try:
+        while True:
+            time.sleep(1)
+            for entry in server.messages[seen:]:
+                print(f"--- {entry['from']} -> {', '.join(entry['to'])}: {entry['message']['Subject']}")
+                print(entry['message'].get_payload())
+            seen = len(server.messages)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,81 @@
+import unittest
+import random
+import time
+from datetime import date
+from fastlite import Database
+from app.service import allocation_service
+from app.service.allocation_service import TruckPacker, TruckBin, RouteLoad, estimate_route_tonnage, load_roadworthy_trucks
+
+def loads(*kgs):
+    return [RouteLoad(route_id, kg) for route_id, kg in enumerate(kgs, start=1)]
+
+class TestTruckPacker(unittest.TestCase):
+
+    def test_uses_fewest_trucks_and_keeps_big_ones_free(self):
+        trucks = [TruckBin(1, 10000), TruckBin(2, 6000), TruckBin(3, 6000)]
+        allocations = TruckPacker(trucks, loads(3000, 2500, 2000, 2000, 1500)).solve()
+        # 11 t fits in two runs of one 6 t truck, leaving the 10 t truck idle
+        self.assertEqual(len(allocations), 1)
+        self.assertEqual(allocations[0].capacity, 6000)
+        self.assertEqual(allocations[0].overloaded_runs, 0)
+        self.assertEqual(sorted(r for run in allocations[0].runs for r in run), [1, 2, 3, 4, 5])
+
+    def test_only_overloads_when_the_fleet_is_full(self):
+        trucks = [TruckBin(1, 5000), TruckBin(2, 5000)]
+        allocations = TruckPacker(trucks, loads(4000, 4000, 4000, 4000), max_runs=2).solve()
+        self.assertEqual(sum(a.overloaded_runs for a in allocations), 0)
+        allocations = TruckPacker(trucks, loads(4000, 4000, 4000, 4000, 3000), max_runs=2).solve()
+        self.assertEqual(sum(a.overloaded_runs for a in allocations), 1)
+        self.assertEqual(sorted(r for a in allocations for run in a.runs for r in run), [1, 2, 3, 4, 5])
+
+    def test_hundreds_of_routes(self):
+        rng = random.Random(11)
+        trucks = [TruckBin(i, rng.choice([8000, 12000, 16000])) for i in range(120)]
+        routes = [RouteLoad(i, rng.uniform(1500, 7000)) for i in range(400)]
+        started = time.monotonic()
+        allocations = TruckPacker(trucks, routes).solve()
+        self.assertLess(time.monotonic() - started, 5.0)
+        self.assertEqual(sum(a.overloaded_runs for a in allocations), 0)
+        # Close to the lower bound of total tonnage over the biggest trucks' two runs
+        bound = sum(r.kg for r in routes) / (2 * 16000)
+        self.assertLess(len(allocations), bound * 1.5)
+
+
+class TestTonnageAndTrucks(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.db.execute("CREATE TABLE routes (id INTEGER PRIMARY KEY, zone_id INTEGER)")
+        self.db.execute("CREATE TABLE assignments (id INTEGER PRIMARY KEY, route_id INTEGER, doc DATE, collected_kg REAL)")
+        self.db.execute('''CREATE TABLE trucks (id INTEGER PRIMARY KEY, truck_number TEXT, capacity INTEGER, status TEXT,
+                           next_inspection_due DATE, brake_check_due DATE)''')
+        self.original_db = allocation_service.db
+        allocation_service.db = self.db
+
+    def tearDown(self):
+        allocation_service.db = self.original_db
+
+    def test_estimates_shrink_towards_zone_average(self):
+        self.db.execute("INSERT INTO routes VALUES (1, 1), (2, 1), (3, 2)")
+        for day in range(1, 21):
+            self.db.execute("INSERT INTO assignments (route_id, doc, collected_kg) VALUES (1, ?, 5000)", (f"2024-05-{day:02d}",))
+        self.db.execute("INSERT INTO assignments (route_id, doc, collected_kg) VALUES (2, '2024-05-20', 1000)")
+        estimates = estimate_route_tonnage([1, 2, 3], date(2024, 5, 21))
+        factor = allocation_service.TONNAGE_SAFETY_FACTOR
+        zone = (5000 * 20 + 1000) / 21
+        self.assertAlmostEqual(estimates[1].kg / factor, (5000 * 20 + zone * 3) / 23)
+        self.assertAlmostEqual(estimates[2].kg / factor, (1000 + zone * 3) / 4)
+        # No history in its zone: the fleet average
+        self.assertAlmostEqual(estimates[3].kg / factor, zone)
+
+    def test_excludes_trucks_overdue_for_checks(self):
+        self.db.execute('''INSERT INTO trucks VALUES
+            (1, 'T1', 8000, 'Operational', NULL, NULL),
+            (2, 'T2', 8000, 'Operational', '2024-05-01', NULL),
+            (3, 'T3', 8000, 'Operational', '2024-06-01', '2024-05-05'),
+            (4, 'T4', 8000, 'Out of Service', NULL, NULL),
+            (5, 'T5', 8000, 'Operational', '2024-05-06', '2024-05-06')''')
+        self.assertEqual([t.truck_id for t in load_roadworthy_trucks(date(2024, 5, 6))], [1, 5])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import unittest
+from datetime import date, time
+from unittest import mock
+from fastlite import Database
+from starlette.datastructures import FormData
+from app.components.assignment import models as assignment_models
+from app.components.assignment import services as assignment_services
+from app.components.assignment.models import Assignment
+from app.components.crew import models as crew_models
+from app.components.event import models as event_models
+from app.components.event.models import Event
+from app.service import allocation_service
+from app.service.conflict_service import Booking, BookingIndex, WORK, TRUCK
+from app.service.event_impact_service import EventImpactEngine
+
+class TestAssignmentCompletion(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (assignment_models, assignment_services, allocation_service, crew_models):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(assignment_services, "refresh_daily_rollups")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+        Assignment.create_table()
+        BookingIndex(self.db).create_table()
+        self.db.execute("CREATE TABLE crews (id INTEGER PRIMARY KEY, driver_id INTEGER, truck_id INTEGER, loaders TEXT)")
+        self.db.execute("INSERT INTO crews VALUES (1, 10, 20, '30')")
+        self.db.execute("CREATE TABLE routes (id INTEGER PRIMARY KEY, zone_id INTEGER)")
+        self.db.execute("INSERT INTO routes VALUES (4, 1)")
+        self.db.execute('''INSERT INTO assignments (crew_id, route_id, client_id, zone_id, week_number, doc, dow, week_type,
+                           start_time, completion_time, attendance_confirmed, ppe_compliance, status_updates)
+                           VALUES (1, 4, 1, 1, 19, '2024-05-06', 'Monday', 'Regular', '06:30:00', 0, 1, 0, ?)''',
+                        (str(Assignment().status_updates),))
+        BookingIndex(self.db).book(assignment_services.bookings_for_assignment(Assignment.find_by_id(1), 1))
+
+    def booked_until(self):
+        return {row['end_min'] for row in self.db.q("SELECT end_min FROM bookings WHERE source_id = 1")}
+
+    def test_completion_records_end_time_and_weight(self):
+        assignment = assignment_services.complete_assignment(1, {"end_time": "14:30", "collected_kg": "8250"})
+        self.assertEqual((assignment.end_time, assignment.completion_time), (time(14, 30), 8.0))
+
+        stored = Assignment.find_by_id(1)
+        self.assertEqual((stored.doc, stored.end_time, stored.collected_kg), (date(2024, 5, 6), time(14, 30), 8250.0))
+        self.assertTrue(stored.attendance_confirmed)
+        self.assertEqual(stored.status_updates["EOD"], None)
+        # The weight is what truck allocation plans the route's tonnage from
+        estimate = allocation_service.estimate_route_tonnage([4], as_of=date(2024, 5, 7))[4]
+        self.assertEqual(estimate.runs, 1)
+        # The crew is booked for the hours worked rather than the default shift, and the rollups see the weight
+        self.assertEqual(self.booked_until(), {14 * 60 + 30})
+        self.refresh.assert_called_once_with(date(2024, 5, 6))
+
+    def test_invalid_completion_is_rejected(self):
+        shift = self.booked_until()
+        for data in ({"end_time": "14:30", "collected_kg": "-5"}, {"end_time": "late", "collected_kg": "100"},
+                     {"end_time": "05:00", "collected_kg": "100"}):
+            with self.assertRaises(ValueError):
+                assignment_services.complete_assignment(1, data)
+        with self.assertRaises(ValueError):
+            assignment_services.complete_assignment(99, {"end_time": "14:30"})
+        self.assertIsNone(Assignment.find_by_id(1).collected_kg)
+        self.assertEqual(self.booked_until(), shift)
+        self.refresh.assert_not_called()
+
+class TestAssignmentBooking(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (assignment_models, assignment_services, crew_models):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(assignment_services, "refresh_daily_rollups")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+        Assignment.create_table()
+        self.db.execute("CREATE TABLE crews (id INTEGER PRIMARY KEY, driver_id INTEGER, truck_id INTEGER, loaders TEXT)")
+        self.db.execute("INSERT INTO crews VALUES (1, 10, 20, '30'), (2, 11, 20, '31')")
+        BookingIndex(self.db).create_table()
+
+    def create(self, crew_id, route_id, doc="2024-05-06"):
+        assignment_services.create_assignment(FormData({"crew_id": str(crew_id), "route_id": str(route_id),
+                                                        "client_id": "5", "zone_id": "1", "doc": doc}))
+
+    def test_create_assignment_writes_the_row_and_its_bookings(self):
+        self.create(1, 4)
+        [assignment] = Assignment.find_all_for_date(date(2024, 5, 6))
+        self.assertEqual((assignment.crew_id, assignment.route_id, assignment.week_number, assignment.dow),
+                         (1, 4, 19, "Monday"))
+        self.assertEqual(len(self.db.q("SELECT 1 FROM bookings WHERE source_id = ?", (assignment.id,))), 4)
+        self.refresh.assert_called_once_with(date(2024, 5, 6))
+
+    def test_double_booking_is_rejected(self):
+        self.create(1, 4)
+        # Crew 2 shares crew 1's truck
+        with self.assertRaises(ValueError) as clash:
+            self.create(2, 5)
+        self.assertIn("Truck 20", str(clash.exception))
+        self.assertEqual([a.route_id for a in Assignment.find_all_for_date(date(2024, 5, 6))], [4])
+        self.assertEqual(self.refresh.call_count, 1)
+        # Another day is free
+        self.create(2, 5, doc="2024-05-07")
+        self.assertEqual(len(Assignment.find_all_for_date(date(2024, 5, 7))), 1)
+
+class TestAssignmentCloning(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (assignment_models, assignment_services, event_models):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(assignment_services, "refresh_daily_rollups")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Assignment.create_table()
+        Event.create_table()
+        self.db.execute("CREATE TABLE crews (id INTEGER PRIMARY KEY, driver_id INTEGER, truck_id INTEGER, loaders TEXT)")
+        self.db.execute("INSERT INTO crews VALUES (1, 10, 20, '30'), (2, 11, 21, '31')")
+        BookingIndex(self.db).create_table()
+        EventImpactEngine(self.db).create_table()
+
+        # Monday 6 May 2024, already worked: crew 1 on route 1 (client 5), crew 2 on route 2 (client 6)
+        self.add(1, 1, 5, date(2024, 5, 6))
+        self.add(2, 2, 6, date(2024, 5, 6))
+        self.db.execute('''UPDATE assignments SET end_time = '14:30:00', completion_time = 8.0, attendance_confirmed = 1,
+                           ppe_compliance = 1, week_type = 'Event', collected_kg = 8250, status_updates = ?
+                           WHERE route_id = 1''', (str({"11AM": "On track", "1PM": None, "3PM": None, "EOD": None}),))
+
+    def add(self, crew_id, route_id, client_id, doc):
+        self.db.execute('''INSERT INTO assignments (crew_id, route_id, client_id, zone_id, week_number, doc, dow, week_type,
+                           start_time, completion_time, attendance_confirmed, ppe_compliance, status_updates)
+                           VALUES (?, ?, ?, 1, ?, ?, ?, 'Regular', '06:30:00', 0, 0, 0, ?)''',
+                        (crew_id, route_id, client_id, doc.isocalendar()[1], doc.isoformat(), doc.strftime("%A"),
+                         str(Assignment().status_updates)))
+
+    def on(self, day):
+        rows = self.db.q("SELECT id FROM assignments WHERE doc = ? ORDER BY route_id", (day.isoformat(),))
+        return [Assignment.find_by_id(row['id']) for row in rows]
+
+    def test_copies_get_the_target_week_and_start_fresh(self):
+        new_ids = assignment_services.clone_day(date(2024, 5, 6), [date(2024, 5, 14)])
+        copies = self.on(date(2024, 5, 14))
+        self.assertEqual(sorted(c.id for c in copies), new_ids)
+        self.assertEqual([c.route_id for c in copies], [1, 2])
+        copy = copies[0]
+        self.assertEqual((copy.week_number, copy.dow, copy.start_time), (20, "Tuesday", time(6, 30)))
+        self.assertEqual((copy.week_type, copy.end_time, copy.completion_time, copy.collected_kg), ("Regular", None, 0, None))
+        self.assertFalse(copy.attendance_confirmed or copy.ppe_compliance)
+        self.assertEqual(copy.status_updates, Assignment().status_updates)
+        # Crew, driver, truck and loader of each copy are booked
+        self.assertEqual(len(self.db.q("SELECT 1 FROM bookings WHERE source_id IN (?, ?)", tuple(new_ids))), 8)
+        self.refresh.assert_called_once_with(date(2024, 5, 14), date(2024, 5, 14))
+
+    def test_routes_the_target_already_has_are_skipped(self):
+        self.add(1, 1, 5, date(2024, 5, 13))
+        first = assignment_services.clone_week(date(2024, 5, 8), date(2024, 5, 15))
+        self.assertEqual(len(first), 1)
+        self.assertEqual([(c.route_id, c.crew_id) for c in self.on(date(2024, 5, 13))], [(1, 1), (2, 2)])
+        # Running the same copy again inserts nothing
+        self.assertEqual(assignment_services.clone_week(date(2024, 5, 8), date(2024, 5, 15)), [])
+        self.assertEqual(len(self.on(date(2024, 5, 13))), 2)
+
+    def test_a_conflict_rolls_back_the_whole_clone(self):
+        # Crew 2's truck is out on other work on the second target day
+        BookingIndex(self.db).book([Booking(WORK, TRUCK, 21, "2024-05-14", 7 * 60, 9 * 60, "assignments", 99)])
+        with self.assertRaises(ValueError) as clash:
+            assignment_services.clone_day(date(2024, 5, 6), [date(2024, 5, 13), date(2024, 5, 14)])
+        self.assertIn("Truck 21", str(clash.exception))
+        self.assertEqual((self.on(date(2024, 5, 13)), self.on(date(2024, 5, 14))), ([], []))
+        self.assertEqual(len(self.db.q("SELECT 1 FROM bookings")), 1)
+        self.refresh.assert_not_called()
+
+    def test_holidays_on_the_target_shift_the_copies(self):
+        self.db.execute('''INSERT INTO events (name, start_date, end_date, affected_clients, event_type)
+                           VALUES ('Bank Holiday', '2024-05-13', '2024-05-13', '5', 'Holiday')''')
+        assignment_services.clone_day(date(2024, 5, 6), [date(2024, 5, 13)])
+        self.assertEqual([c.route_id for c in self.on(date(2024, 5, 13))], [2])
+        self.assertEqual([(c.route_id, c.dow) for c in self.on(date(2024, 5, 14))], [(1, "Tuesday")])
+        self.assertEqual(self.db.q("SELECT action FROM event_changes")[0]['action'], "shift")
+        # The rollups cover the day the holiday pushed the copy onto
+        self.refresh.assert_called_once_with(date(2024, 5, 13), date(2024, 5, 14))
+
+if __name__ == "__main__":
+    unittest.main()
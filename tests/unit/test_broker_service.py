@@ -0,0 +1,66 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from app.service.broker_service import UnixSocketBroker
+
+class TestUnixSocketBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "realtime.sock")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def _wait_for(self, condition, timeout=2.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            if asyncio.get_running_loop().time() > deadline:
+                raise AssertionError("Timed out waiting for broker")
+            await asyncio.sleep(0.01)
+
+    def test_messages_reach_every_other_worker(self):
+        async def run():
+            received = {name: [] for name in "abc"}
+            brokers = {name: UnixSocketBroker(self.path, reconnect_delay=0.02) for name in "abc"}
+            for name, broker in brokers.items():
+                await broker.start(lambda topics, payload, name=name: received[name].append((topics, payload)))
+            await asyncio.sleep(0.1)
+
+            brokers["b"].publish(["route:1"], '{"status": "On Track"}')
+            brokers["a"].publish(["zone:2"], '{"status": "Delayed"}')
+            await self._wait_for(lambda: len(received["c"]) == 2 and len(received["a"]) == 1)
+            leaders = [name for name, broker in brokers.items() if broker.is_leader]
+            for broker in brokers.values():
+                await broker.stop()
+            return received, leaders
+
+        received, leaders = asyncio.run(run())
+        self.assertEqual(leaders, ["a"])
+        self.assertEqual(received["a"], [(["route:1"], '{"status": "On Track"}')])
+        self.assertEqual(received["b"], [(["zone:2"], '{"status": "Delayed"}')])
+        self.assertCountEqual([topics for topics, _ in received["c"]], [["route:1"], ["zone:2"]])
+
+    def test_another_worker_takes_over_the_relay(self):
+        async def run():
+            received = {name: [] for name in "abc"}
+            brokers = {name: UnixSocketBroker(self.path, reconnect_delay=0.02) for name in "abc"}
+            for name, broker in brokers.items():
+                await broker.start(lambda topics, payload, name=name: received[name].append(payload))
+            await asyncio.sleep(0.1)
+
+            await brokers["a"].stop()
+            await self._wait_for(lambda: brokers["b"].is_leader or brokers["c"].is_leader)
+            await asyncio.sleep(0.1)
+            brokers["b"].publish(["route:1"], "after failover")
+            await self._wait_for(lambda: received["c"] == ["after failover"])
+            await brokers["b"].stop()
+            await brokers["c"].stop()
+            return received
+
+        received = asyncio.run(run())
+        self.assertEqual(received["a"], [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from datetime import date, datetime, time
+from fastlite import Database
+from app.service.conflict_service import (
+    BookingIndex, schedule_bookings, assignment_bookings, service_schedule_bookings, DRIVER, LOADER, TRUCK
+)
+
+class TestBookingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.index = BookingIndex(self.db)
+        self.index.create_table()
+        self.doc = date(2024, 5, 6)
+
+    def assignment(self, assignment_id, start, end, crew_id=1, driver_id=10, truck_id=20, loader_ids=(30,)):
+        return assignment_bookings(assignment_id, self.doc, start, end, crew_id, driver_id, truck_id, list(loader_ids))
+
+    def test_schedule_double_booking(self):
+        self.index.book(schedule_bookings(1, 12, "Monday", 10, [30, 31]))
+        conflicts = self.index.check(schedule_bookings(None, 12, "Monday", 11, [31]))
+        self.assertEqual([(c.booking.resource_kind, c.booking.resource_id) for c in conflicts], [(LOADER, 31)])
+        self.assertEqual(self.index.check(schedule_bookings(None, 12, "Tuesday", 10, [31])), [])
+        self.assertEqual(self.index.check(schedule_bookings(None, 13, "Monday", 10, [31])), [])
+        # A record never conflicts with its own bookings, so updates can be checked in place
+        self.assertEqual(self.index.check(schedule_bookings(1, 12, "Monday", 10, [30])), [])
+
+    def test_timed_work_only_conflicts_when_overlapping(self):
+        self.index.book(self.assignment(1, time(6, 30), time(10, 0)))
+        morning = self.index.check(self.assignment(None, time(9, 0), time(12, 0), crew_id=2, driver_id=11, loader_ids=()))
+        self.assertEqual([c.booking.resource_kind for c in morning], [TRUCK])
+        self.assertEqual(self.index.check(self.assignment(None, time(10, 0), time(12, 0))), [])
+        # A service visit for the same driver during the assignment clashes; being rostered that day does not
+        visit = service_schedule_bookings(None, datetime(2024, 5, 6, 9, 30), 10)
+        self.assertEqual([c.existing.source_id for c in self.index.check(visit)], [1])
+        self.assertEqual(self.index.check(schedule_bookings(None, 19, "Monday", 10, [30])), [])
+
+    def test_release_and_rebook(self):
+        self.index.book(self.assignment(1, time(6, 30), time(10, 0)))
+        self.index.book(self.assignment(1, time(13, 0), time(15, 0)))
+        self.assertEqual(self.index.check(self.assignment(None, time(7, 0), time(8, 0))), [])
+        self.index.release("assignments", [1])
+        self.assertEqual(self.index.check(self.assignment(None, time(13, 0), time(14, 0))), [])
+
+    def test_check_many_finds_clashes_within_the_batch_and_with_existing(self):
+        self.index.book(schedule_bookings(1, 12, "Monday", 10, [30]))
+        week = [b for driver_id in range(100, 150) for dow in ("Monday", "Tuesday")
+                for b in schedule_bookings(None, 12, dow, driver_id, [driver_id + 1000])]
+        self.assertEqual(self.index.check_many(week), [])
+
+        clashing = week + schedule_bookings(None, 12, "Tuesday", 100, []) + schedule_bookings(None, 12, "Monday", 12, [30])
+        conflicts = self.index.check_many(clashing)
+        self.assertEqual(sorted((c.booking.resource_kind, c.booking.resource_id, c.existing.source_id) for c in conflicts),
+                         [(DRIVER, 100, None), (LOADER, 30, 1)])
+
+if __name__ == "__main__":
+    unittest.main()
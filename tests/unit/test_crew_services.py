@@ -0,0 +1,55 @@
+import unittest
+from datetime import date, time, timedelta
+from unittest import mock
+from fastlite import Database
+from starlette.datastructures import FormData
+from app.components.crew import models as crew_models
+from app.components.crew import services as crew_services
+from app.components.crew.models import Crew
+from app.service.conflict_service import BookingIndex, DRIVER, LOADER, TRUCK, assignment_bookings
+
+class TestCrewRebooking(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (crew_models, crew_services):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.db.execute("CREATE TABLE drivers (id INTEGER PRIMARY KEY)")
+        self.db.execute("CREATE TABLE trucks (id INTEGER PRIMARY KEY)")
+        self.db.execute("INSERT INTO drivers VALUES (10), (11), (12)")
+        self.db.execute("INSERT INTO trucks VALUES (20), (21), (22)")
+        Crew.create_table()
+        self.db.execute("CREATE TABLE assignments (id INTEGER PRIMARY KEY, crew_id INTEGER, doc DATE, start_time TIME, end_time TIME)")
+        self.index = BookingIndex(self.db)
+        self.index.create_table()
+
+        self.db.execute("INSERT INTO crews (id, driver_id, truck_id, loaders) VALUES (1, 10, 20, '30'), (2, 11, 21, '31')")
+        self.yesterday, self.tomorrow = date.today() - timedelta(days=1), date.today() + timedelta(days=1)
+        assignments = [(1, 1, self.yesterday, 10, 20, [30]), (2, 1, self.tomorrow, 10, 20, [30]),
+                       (3, 2, self.tomorrow, 11, 21, [31])]
+        for assignment_id, crew_id, doc, driver_id, truck_id, loader_ids in assignments:
+            self.db.execute("INSERT INTO assignments VALUES (?, ?, ?, '06:30:00', NULL)", (assignment_id, crew_id, doc.isoformat()))
+            self.index.book(assignment_bookings(assignment_id, doc, time(6, 30), None, crew_id, driver_id, truck_id, loader_ids))
+
+    def booked(self, assignment_id):
+        rows = self.db.q("SELECT resource_kind, resource_id FROM bookings WHERE source_id = ? AND resource_kind != 'crew'",
+                         (assignment_id,))
+        return sorted((row['resource_kind'], row['resource_id']) for row in rows)
+
+    def test_upcoming_assignments_book_the_new_members(self):
+        crew_services.update_crew(1, FormData([("driver_id", "12"), ("truck_id", "22"), ("loaders", "32"), ("loaders", "33")]))
+        self.assertEqual(self.booked(2), [(DRIVER, 12), (LOADER, 32), (LOADER, 33), (TRUCK, 22)])
+        # Work already done stays booked to whoever did it
+        self.assertEqual(self.booked(1), [(DRIVER, 10), (LOADER, 30), (TRUCK, 20)])
+
+    def test_clash_with_another_crew_rolls_the_update_back(self):
+        with self.assertRaises(ValueError) as clash:
+            crew_services.update_crew(1, FormData([("driver_id", "11"), ("truck_id", "20"), ("loaders", "30")]))
+        self.assertIn("Driver 11", str(clash.exception))
+        self.assertEqual(Crew.find_by_id(1).driver_id, 10)
+        self.assertEqual(self.booked(2), [(DRIVER, 10), (LOADER, 30), (TRUCK, 20)])
+
+if __name__ == "__main__":
+    unittest.main()
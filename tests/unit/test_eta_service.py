@@ -0,0 +1,57 @@
+import unittest
+import statistics
+from datetime import datetime, timedelta
+from app.service.eta_service import (
+    EtaModel, RunningStats, remaining_given_elapsed, progress_from_checkpoints, predict_completion,
+    parse_status_updates, DEFAULT_ROUTE_HOURS
+)
+
+class TestEtaService(unittest.TestCase):
+
+    def test_running_stats_match_batch_statistics(self):
+        samples = [7.5, 8.0, 9.25, 6.75, 8.5]
+        stats = RunningStats()
+        for sample in samples:
+            stats.add(sample)
+        self.assertAlmostEqual(stats.mean, statistics.mean(samples))
+        self.assertAlmostEqual(stats.variance, statistics.variance(samples))
+
+    def test_specific_history_refines_broader_estimate(self):
+        model = EtaModel()
+        self.assertEqual(model.predict_duration(1, 1, "Monday")[0], DEFAULT_ROUTE_HOURS)
+        for _ in range(20):
+            model.add_sample(1, 1, "Monday", 6.0)
+            model.add_sample(1, 2, "Friday", 9.0)
+        monday, _ = model.predict_duration(1, 1, "Monday")
+        friday, _ = model.predict_duration(1, 2, "Friday")
+        unseen_crew, _ = model.predict_duration(1, 3, "Monday")
+        self.assertLess(monday, 6.5)
+        self.assertGreater(friday, 8.5)
+        # A new crew on Monday leans on the route's Monday history
+        self.assertLess(unseen_crew, 7.0)
+
+    def test_remaining_given_elapsed(self):
+        self.assertAlmostEqual(remaining_given_elapsed(8.0, 1.0, 0.0), 8.0, places=3)
+        # Already past the mean: expected finish moves beyond elapsed time, not back to the mean
+        self.assertGreater(remaining_given_elapsed(8.0, 1.0, 9.0), 9.0)
+
+    def test_checkpoint_progress(self):
+        updates = parse_status_updates("{'11AM': 'On Track 40%', '1PM': '65% done', '3PM': None, 'EOD': None}")
+        self.assertAlmostEqual(progress_from_checkpoints(updates), 0.65)
+        self.assertIsNone(progress_from_checkpoints({"11AM": "On Track"}))
+        self.assertEqual(parse_status_updates("not a dict"), {})
+
+    def test_slow_pace_pushes_eta_out(self):
+        model = EtaModel()
+        for _ in range(10):
+            model.add_sample(1, 1, "Monday", 8.0)
+        start = datetime(2024, 5, 6, 6, 30)
+        now = start + timedelta(hours=4)
+        on_pace = predict_completion(model, start, 1, 1, "Monday", now, progress=0.5)
+        behind = predict_completion(model, start, 1, 1, "Monday", now, progress=0.25)
+        self.assertAlmostEqual((on_pace - start).total_seconds() / 3600, 8.0, delta=0.1)
+        self.assertGreater(behind, on_pace + timedelta(hours=1))
+        self.assertEqual(predict_completion(model, start, 1, 1, "Monday", now, progress=1.0), now)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from datetime import date
+from fastlite import Database
+from app.service.conflict_service import Booking, BookingIndex, WORK, CREW, DRIVER
+from app.service.event_impact_service import EventImpactEngine, shift_date, SHIFT, MARK, REVERT
+
+class TestEventImpact(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.db.execute('''CREATE TABLE assignments (id INTEGER PRIMARY KEY, crew_id INTEGER, route_id INTEGER,
+                           client_id INTEGER, zone_id INTEGER, week_number INTEGER, doc DATE, dow TEXT, week_type TEXT,
+                           start_time TIME, end_time TIME)''')
+        self.db.execute("CREATE TABLE crews (id INTEGER PRIMARY KEY, driver_id INTEGER, truck_id INTEGER, loaders TEXT)")
+        self.db.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, week_number INTEGER, dow TEXT, driver_id INTEGER, loader_ids TEXT)")
+        self.db.execute("INSERT INTO crews VALUES (1, 10, 20, '30'), (2, 11, 21, '')")
+        self.bookings = BookingIndex(self.db)
+        self.bookings.create_table()
+        self.engine = EventImpactEngine(self.db)
+        self.engine.create_table()
+        # Monday 6 May: crew 1 works client 5; Tuesday it already has a morning route for client 6
+        self.add(1, 1, 5, "2024-05-06", "06:30:00", "10:30:00")
+        self.add(2, 1, 6, "2024-05-07", "06:30:00", "09:00:00")
+        self.add(3, 2, 5, "2024-05-06", "07:00:00", None)
+        self.add(4, 2, 7, "2024-05-06", "15:30:00", None)
+        self.bookings.rebuild()
+
+    def add(self, assignment_id, crew_id, client_id, doc, start, end):
+        self.db.execute("INSERT INTO assignments VALUES (?, ?, 1, ?, 1, 19, ?, 'Monday', 'Regular', ?, ?)",
+                        (assignment_id, crew_id, client_id, doc, start, end))
+
+    def row(self, assignment_id):
+        return self.db.q("SELECT doc, start_time, end_time, week_type FROM assignments WHERE id = ?", (assignment_id,))[0]
+
+    def test_shift_date_skips_non_collection_days(self):
+        self.assertEqual(shift_date(date(2024, 5, 6), date(2024, 5, 6), date(2024, 5, 6)), date(2024, 5, 7))
+        # Saturday slides past Sunday to Monday
+        self.assertEqual(shift_date(date(2024, 5, 11), date(2024, 5, 11), date(2024, 5, 11)), date(2024, 5, 13))
+
+    def test_holiday_shifts_after_existing_work(self):
+        impact = self.engine.plan(1, date(2024, 5, 6), date(2024, 5, 6), [5], "Holiday")
+        self.assertEqual(sorted((c.assignment_id, c.action) for c in impact.changes), [(1, SHIFT), (3, SHIFT)])
+        # Dry run: nothing written yet
+        self.assertEqual(self.row(1)['doc'], "2024-05-06")
+
+        self.engine.apply(impact)
+        self.assertEqual(dict(self.row(1)), {"doc": "2024-05-07", "start_time": "09:00:00", "end_time": "13:00:00",
+                                             "week_type": "Regular"})
+        self.assertEqual(self.row(3)['doc'], "2024-05-07")
+        self.assertEqual(self.row(4)['doc'], "2024-05-06")
+        moved = self.db.q("SELECT day, start_min FROM bookings WHERE layer = ? AND resource_kind = ? AND source_id = 1",
+                          (WORK, CREW))
+        self.assertEqual([dict(b) for b in moved], [{"day": "2024-05-07", "start_min": 9 * 60}])
+
+    def test_editing_reverts_then_reapplies_and_delete_undoes(self):
+        self.engine.apply(self.engine.plan(1, date(2024, 5, 6), date(2024, 5, 6), [5], "Holiday"))
+        # The event becomes a special collection for client 7 only
+        impact = self.engine.plan(1, date(2024, 5, 6), date(2024, 5, 6), [7], "Leaf Collection")
+        self.assertEqual(sorted((c.assignment_id, c.action) for c in impact.changes), [(1, REVERT), (3, REVERT), (4, MARK)])
+        self.engine.apply(impact)
+        self.assertEqual(dict(self.row(1)), {"doc": "2024-05-06", "start_time": "06:30:00", "end_time": "10:30:00",
+                                             "week_type": "Regular"})
+        self.assertEqual(self.row(4)['week_type'], "Event")
+
+        # Manual edits made since are left alone when the event is removed
+        self.db.execute("UPDATE assignments SET start_time = '08:00:00' WHERE id = 4")
+        impact = self.engine.plan(1, None, None, [], "Leaf Collection")
+        self.assertEqual(impact.changes, [])
+        self.assertEqual(len(impact.warnings), 1)
+
+    def test_moves_that_double_book_a_driver_are_rolled_back(self):
+        # Crew 1's driver already has other work on Tuesday at 10:00
+        self.bookings.book([Booking(WORK, DRIVER, 10, "2024-05-07", 10 * 60, 11 * 60, "assignments", 99)])
+        impact = self.engine.plan(1, date(2024, 5, 6), date(2024, 5, 6), [5], "Holiday")
+        self.assertEqual(impact.affected_days(), [date(2024, 5, 6), date(2024, 5, 7)])
+        with self.assertRaises(ValueError) as clash:
+            self.engine.apply(impact)
+        self.assertIn("Driver 10", str(clash.exception))
+        self.assertEqual((self.row(1)['doc'], self.row(3)['doc']), ("2024-05-06", "2024-05-06"))
+        self.assertEqual(self.db.q("SELECT COUNT(*) AS n FROM event_changes")[0]['n'], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from datetime import date
+from unittest import mock
+from fastlite import Database
+from starlette.datastructures import FormData
+from app.components.event import models as event_models
+from app.components.event import services as event_services
+from app.components.event.models import Event
+from app.service.conflict_service import BookingIndex
+from app.service.event_impact_service import EventImpactEngine
+
+class TestEventRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (event_models, event_services):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(event_services, "refresh_daily_rollups")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Event.create_table()
+        self.db.execute('''CREATE TABLE assignments (id INTEGER PRIMARY KEY, crew_id INTEGER, route_id INTEGER,
+                           client_id INTEGER, zone_id INTEGER, week_number INTEGER, doc DATE, dow TEXT, week_type TEXT,
+                           start_time TIME, end_time TIME)''')
+        self.db.execute("CREATE TABLE crews (id INTEGER PRIMARY KEY, driver_id INTEGER, truck_id INTEGER, loaders TEXT)")
+        self.db.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, week_number INTEGER, dow TEXT, driver_id INTEGER, loader_ids TEXT)")
+        self.db.execute("INSERT INTO crews VALUES (1, 10, 20, '')")
+        self.db.execute("INSERT INTO assignments VALUES (1, 1, 1, 5, 1, 19, '2024-05-06', 'Monday', 'Regular', '06:30:00', NULL)")
+        BookingIndex(self.db).create_table()
+        BookingIndex(self.db).rebuild()
+        EventImpactEngine(self.db).create_table()
+
+    def holiday(self, start, end):
+        return FormData([("name", "Bank Holiday"), ("event_type", "Holiday"), ("start_date", start),
+                         ("end_date", end), ("affected_clients", "5")])
+
+    def test_rollups_follow_the_assignments_an_event_moves(self):
+        event_services.create_event(self.holiday("2024-05-06", "2024-05-06"))
+        self.refresh.assert_called_once_with(date(2024, 5, 6), date(2024, 5, 7))
+
+        # Widening the event moves the work again, from Tuesday on to Wednesday
+        event_services.update_event(1, self.holiday("2024-05-06", "2024-05-07"))
+        self.assertEqual(self.refresh.call_args, mock.call(date(2024, 5, 7), date(2024, 5, 8)))
+
+        event_services.delete_event(1)
+        self.assertEqual(self.refresh.call_args, mock.call(date(2024, 5, 6), date(2024, 5, 8)))
+        self.assertEqual(self.db.q("SELECT doc FROM assignments")[0]['doc'], "2024-05-06")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import gzip
+import json
+import os
+import tempfile
+from app.service.export_service import export_rows, read_columnar
+
+class TestExportService(unittest.TestCase):
+
+    def setUp(self):
+        """Set up sample report rows and a scratch directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.tmp_dir.name, "report")
+        self.rows = [
+            {'id': 1, 'route_id': 4, 'completion_time': 5.5, 'address': '12 Main St'},
+            {'id': 2, 'route_id': None, 'completion_time': 3, 'address': None},
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_csv_gzip_export(self):
+        file_path = export_rows(self.rows, self.base_path, "csv.gz")
+        self.assertTrue(file_path.endswith(".csv.gz"))
+        with gzip.open(file_path, "rt") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "id,route_id,completion_time,address")
+        self.assertEqual(len(lines), 3)
+
+    def test_ndjson_export(self):
+        file_path = export_rows(self.rows, self.base_path, "ndjson")
+        with open(file_path) as f:
+            parsed = [json.loads(line) for line in f]
+        self.assertEqual(parsed, self.rows)
+
+    def test_columnar_round_trip(self):
+        file_path = export_rows(self.rows, self.base_path, "columnar")
+        self.assertEqual(read_columnar(file_path), self.rows)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export_rows(self.rows, self.base_path, "xlsx")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import unittest
+from datetime import date
+from fastlite import Database
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.service.broker_service import Broker
+from app.service.hub_service import (
+    RouteUpdateHub, RouteZoneCache, RouteProgress, ALL_ROUTES_TOPIC, relayed_route_update, route_topic, zone_topic
+)
+from app.components.auth.utils import requires_websocket
+
+class RecordingBroker(Broker):
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topics, payload):
+        self.published.append((topics, payload))
+
+def drain(subscriber):
+    return [json.loads(subscriber.queue.get_nowait())["n"] for _ in range(subscriber.queue.qsize())]
+
+class TestRouteUpdateHub(unittest.TestCase):
+
+    def test_fan_out_reaches_each_matching_subscriber_once(self):
+        broker = RecordingBroker()
+        hub = RouteUpdateHub(broker=broker)
+        everything = hub.subscribe([ALL_ROUTES_TOPIC])
+        route_and_zone = hub.subscribe([route_topic(1), zone_topic(2)])
+        other_route = hub.subscribe([route_topic(7)])
+
+        self.assertEqual(hub.publish([ALL_ROUTES_TOPIC, route_topic(1), zone_topic(2)], {"n": 1}), 2)
+        self.assertEqual((drain(everything), drain(route_and_zone), drain(other_route)), ([1], [1], []))
+        # Encoded once, and handed to the broker for the other workers
+        self.assertEqual(broker.published, [([ALL_ROUTES_TOPIC, route_topic(1), zone_topic(2)], '{"n": 1}')])
+        # Messages from other workers are delivered locally only
+        self.assertEqual(hub.deliver([route_topic(7)], '{"n": 2}'), 1)
+        self.assertEqual((drain(other_route), len(broker.published)), ([2], 1))
+
+        hub.unsubscribe(route_and_zone)
+        self.assertEqual(hub.subscriber_count(), 2)
+        self.assertEqual(hub.publish([zone_topic(2)], {"n": 3}), 0)
+
+    def test_full_queue_drops_oldest_messages(self):
+        hub = RouteUpdateHub(queue_size=3, max_drops=100)
+        subscriber = hub.subscribe([ALL_ROUTES_TOPIC])
+        for n in range(5):
+            hub.publish([ALL_ROUTES_TOPIC], {"n": n})
+        self.assertEqual((subscriber.dropped, subscriber.total_dropped), (2, 2))
+        self.assertEqual(drain(subscriber), [2, 3, 4])
+
+    def test_drop_count_resets_once_the_subscriber_catches_up(self):
+        async def run():
+            hub = RouteUpdateHub(queue_size=2, max_drops=3)
+            subscriber = hub.subscribe([ALL_ROUTES_TOPIC])
+            # Falls behind by two messages twice, but reads its queue empty in between
+            for _ in range(2):
+                for n in range(4):
+                    hub.publish([ALL_ROUTES_TOPIC], {"n": n})
+                self.assertEqual(subscriber.dropped, 2)
+                await subscriber.get(timeout=1)
+                self.assertEqual(subscriber.dropped, 2)
+                await subscriber.get(timeout=1)
+                self.assertEqual(subscriber.dropped, 0)
+            self.assertFalse(subscriber.closed)
+            self.assertEqual(subscriber.total_dropped, 4)
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscriber.get(timeout=0.01)
+
+        asyncio.run(run())
+
+    def test_subscriber_that_never_catches_up_is_disconnected(self):
+        hub = RouteUpdateHub(queue_size=2, max_drops=3)
+        slow = hub.subscribe([route_topic(1)])
+        fast = hub.subscribe([route_topic(1)])
+        for n in range(5):
+            hub.publish([route_topic(1)], {"n": n})
+            drain(fast)
+        self.assertTrue(slow.closed)
+        self.assertFalse(fast.closed)
+        self.assertEqual(hub.subscriber_count(), 1)
+
+class TestRouteProgress(unittest.TestCase):
+
+    def test_leader_records_progress_relayed_from_other_workers(self):
+        # A crew on another worker publishes; its broker carries the message to the leader
+        relay = RecordingBroker()
+        worker = RouteUpdateHub(broker=relay)
+        worker.publish([ALL_ROUTES_TOPIC, route_topic(5)],
+                       {"type": "route_update", "route_id": 5, "status": "On Track", "progress": 1.4})
+        worker.publish([ALL_ROUTES_TOPIC], {"type": "route_eta", "route_id": 5})
+        worker.publish([route_topic(5)], {"type": "route_update", "route_id": 5, "progress": 0.1})
+
+        progress = RouteProgress()
+        for topics, payload in relay.published:
+            update = relayed_route_update(topics, payload)
+            if update is not None:
+                progress.record(update["route_id"], update.get("progress"))
+        self.assertEqual(progress.for_day(), {5: 1.0})
+
+    def test_only_todays_numeric_progress_is_kept(self):
+        progress = RouteProgress()
+        self.assertTrue(progress.record(1, 0.25, day=date(2024, 5, 6)))
+        self.assertTrue(progress.record(2, -1))
+        for route_id, value in ((None, 0.5), (3, None), (3, "half"), (3, True)):
+            self.assertFalse(progress.record(route_id, value))
+        self.assertEqual(progress.for_day(), {2: 0.0})
+        self.assertEqual(progress.for_day(date(2024, 5, 6)), {1: 0.25})
+
+class TestRouteZoneCache(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.db.execute("CREATE TABLE routes (id INTEGER PRIMARY KEY, zone_id INTEGER)")
+        self.db.execute("INSERT INTO routes VALUES (1, 10)")
+
+    def test_invalidate_picks_up_a_zone_change(self):
+        cache = RouteZoneCache(self.db)
+        self.assertEqual((cache.get(1), cache.get(2)), (10, None))
+        self.db.execute("UPDATE routes SET zone_id = 20 WHERE id = 1")
+        self.assertEqual(cache.get(1), 10)
+        cache.invalidate(1)
+        self.assertEqual(cache.get(1), 20)
+
+    def test_entries_expire(self):
+        cache = RouteZoneCache(self.db, ttl=0)
+        self.assertEqual(cache.get(1), 10)
+        self.db.execute("UPDATE routes SET zone_id = 20 WHERE id = 1")
+        self.assertEqual(cache.get(1), 20)
+
+class TestRealtimeSocketAuth(unittest.TestCase):
+
+    def setUp(self):
+        @requires_websocket(["Admin", "Supervisor", "Dispatch"])
+        async def socket(websocket):
+            await websocket.accept()
+            await websocket.send_text("connected")
+            await websocket.close()
+
+        async def login(request):
+            request.session["user_role"] = request.query_params["role"]
+            return PlainTextResponse("ok")
+
+        app = Starlette(routes=[Route("/login", login), WebSocketRoute("/ws/dashboard", socket)],
+                        middleware=[Middleware(SessionMiddleware, secret_key="test")])
+        self.client = TestClient(app)
+
+    def test_connections_without_a_staff_session_are_rejected(self):
+        with self.assertRaises(WebSocketDisconnect) as rejected:
+            with self.client.websocket_connect("/ws/dashboard"):
+                pass
+        self.assertEqual(rejected.exception.code, 1008)
+
+        self.client.get("/login", params={"role": "Guest"})
+        with self.assertRaises(WebSocketDisconnect):
+            with self.client.websocket_connect("/ws/dashboard"):
+                pass
+
+    def test_staff_sessions_are_accepted(self):
+        self.client.get("/login", params={"role": "Dispatch"})
+        with self.client.websocket_connect("/ws/dashboard") as websocket:
+            self.assertEqual(websocket.receive_text(), "connected")
+
+if __name__ == "__main__":
+    unittest.main()
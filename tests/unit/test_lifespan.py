@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+from fastlite import Database
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+from app.lifespan import lifespan
+from app.service import real_time_service
+from app.service import scheduler_service
+from app.service.scheduler_service import JobRun, Scheduler
+
+class TestLifespan(unittest.TestCase):
+
+    def setUp(self):
+        # Job runs are persisted; keep them out of the application database
+        patcher = mock.patch.object(scheduler_service, "db", Database(':memory:'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        JobRun.create_table()
+
+    def test_startup_runs_the_broker_and_every_job(self):
+        schedulers = []
+        start = Scheduler.start
+
+        def record_start(scheduler):
+            schedulers.append(scheduler)
+            start(scheduler)
+
+        with mock.patch.object(Scheduler, "start", record_start):
+            with TestClient(Starlette(lifespan=lifespan)):
+                # A single local worker leads
+                self.assertTrue(real_time_service.is_leader())
+
+        self.assertEqual(len(schedulers), 1)
+        self.assertLessEqual({
+            "report_retention_sweep", "nightly_rollup", "location_flush", "outbox_delivery", "status_checkpoint_11AM",
+            "status_checkpoint_EOD", "attendance_ppe_check", "route_eta_check", "alert_digest_flush",
+        }, set(schedulers[0].jobs))
+
+if __name__ == "__main__":
+    unittest.main()
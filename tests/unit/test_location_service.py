@@ -0,0 +1,76 @@
+import unittest
+import asyncio
+from app.service.location_service import LocationIngestor, PositionRingBuffer, location_key, parse_location
+from app.service.notification_service import AlertCoalescer
+
+class TestLocationService(unittest.TestCase):
+
+    def test_parse_location_formats(self):
+        self.assertEqual(parse_location({"lat": 51.5, "lng": -0.12}), (51.5, -0.12))
+        self.assertEqual(parse_location([51.5, -0.12]), (51.5, -0.12))
+        self.assertEqual(parse_location("51.5,-0.12"), (51.5, -0.12))
+        self.assertIsNone(parse_location("Main Street"))
+        self.assertIsNone(parse_location({"lat": 95, "lon": 0}))
+        self.assertIsNone(parse_location(None))
+
+    def test_issue_alerts_with_dict_locations_coalesce_by_place(self):
+        coalescer = AlertCoalescer(clock=lambda: 0.0)
+        report = {"lat": 51.50001, "lon": -0.12001}
+        self.assertTrue(coalescer.should_send((3, location_key(report)), "Issue"))
+        # Same spot in another format, then a different spot on the same route
+        self.assertFalse(coalescer.should_send((3, location_key([51.50002, -0.12002])), "Issue"))
+        self.assertTrue(coalescer.should_send((3, location_key({"lat": 51.51, "lon": -0.12})), "Issue"))
+        self.assertEqual(location_key("Main Street"), "Main Street")
+        self.assertIsNone(location_key({"street": "Main Street"}))
+
+    def test_ring_buffer_keeps_newest_points(self):
+        buffer = PositionRingBuffer(size=3)
+        for i in range(5):
+            buffer.append(i, i, -i)
+        self.assertEqual(buffer.dropped, 2)
+        self.assertEqual(buffer.drain(7), [(7, 2, 2, -2), (7, 3, 3, -3), (7, 4, 4, -4)])
+        self.assertEqual(buffer.count, 0)
+
+    def test_flush_writes_one_batch_and_tracks_latest(self):
+        batches = []
+        ingestor = LocationIngestor(writer=batches.append)
+        ingestor.ingest(1, {"lat": 10.0, "lon": 20.0}, recorded_at=1000)
+        ingestor.ingest(1, {"lat": 10.5, "lon": 20.5}, recorded_at=2000)
+        ingestor.ingest(1, {"lat": 9.0, "lon": 19.0}, recorded_at=1500)  # Late arrival
+        ingestor.ingest(2, "1.25,2.5", recorded_at=1000)
+        self.assertFalse(ingestor.ingest(3, "unknown"))
+        self.assertEqual(ingestor.pending_count(), 4)
+
+        written = asyncio.run(ingestor.flush())
+        self.assertEqual(written, 4)
+        self.assertEqual(len(batches), 1)
+        self.assertIn((2, 1000, 1250000, 2500000), batches[0])
+        self.assertEqual(ingestor.latest(1), (2000, 10.5, 20.5))
+        self.assertEqual(ingestor.pending_count(), 0)
+        self.assertEqual(asyncio.run(ingestor.flush()), 0)
+        self.assertEqual(len(batches), 1)
+
+    def test_failed_write_is_buffered_again(self):
+        batches = []
+
+        def flaky_writer(rows):
+            if not batches:
+                batches.append(None)
+                raise OSError("database is locked")
+            batches.append(rows)
+
+        ingestor = LocationIngestor(writer=flaky_writer, buffer_size=3)
+        ingestor.ingest(1, "10,20", recorded_at=1000)
+        ingestor.ingest(1, "10,20", recorded_at=2000)
+        with self.assertRaises(OSError):
+            asyncio.run(ingestor.flush())
+        self.assertEqual(ingestor.pending_count(), 2)
+
+        # Points received since queue up behind the failed batch; the buffer still keeps only the newest
+        ingestor.ingest(1, "10,20", recorded_at=3000)
+        ingestor.ingest(1, "10,20", recorded_at=4000)
+        self.assertEqual(asyncio.run(ingestor.flush()), 3)
+        self.assertEqual([row[1] for row in batches[1]], [2000, 3000, 4000])
+
+if __name__ == "__main__":
+    unittest.main()
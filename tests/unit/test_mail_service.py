@@ -0,0 +1,49 @@
+import unittest
+import asyncio
+from app.service.mail_service import SmtpPool
+from debug_smtp_server import DebugSmtpServer
+
+class TestSmtpPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = DebugSmtpServer().start()
+        self.pool = SmtpPool("127.0.0.1", self.server.port, use_tls=False, size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def test_connections_are_reused_across_sends(self):
+        crew = [f"crew{i}@example.com" for i in range(6)]
+
+        async def run():
+            first = await self.pool.send_many(crew, "Your Work Schedule for Week 12", "You are scheduled on Monday.")
+            second = await self.pool.send_many(crew, "Schedule Update", "No changes.")
+            return first + second
+
+        results = asyncio.run(run())
+        self.assertTrue(all(results))
+        self.assertEqual(len(self.server.messages), 12)
+        self.assertLessEqual(self.pool.connections_opened, 2)
+        self.assertEqual(self.server.connections, self.pool.connections_opened)
+        message = self.server.messages[0]["message"]
+        self.assertEqual(message["Subject"], "Your Work Schedule for Week 12")
+        self.assertEqual(message["From"], "no-reply@example.com")
+
+    def test_reconnects_when_server_drops_connection(self):
+        self.pool.send_sync("a@example.com", "First", "Body")
+        smtp, _ = self.pool._idle.get_nowait()
+        smtp.close()
+        self.pool._checkin(smtp)
+        self.pool.send_sync("b@example.com", "Second", "Body")
+        self.assertEqual([m["to"] for m in self.server.messages], [["a@example.com"], ["b@example.com"]])
+        self.assertEqual(self.pool.connections_opened, 2)
+
+    def test_send_in_background_outside_event_loop(self):
+        done = []
+        self.pool.send_in_background(["a@example.com", "b@example.com"], "Subject", "Body", on_done=done.append)
+        self.assertEqual(done, [[True, True]])
+        self.assertEqual(len(self.server.messages), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import time
+from app.service.notification_service import NotificationDispatcher, RateLimiter, AlertCoalescer, DigestBatcher
+
+class TestNotificationDispatcher(unittest.TestCase):
+
+    def test_sends_to_all_recipients_concurrently(self):
+        """Sends overlap instead of running one after another."""
+        sent = []
+
+        async def slow_sender(recipient, subject, message):
+            await asyncio.sleep(0.05)
+            sent.append(recipient)
+
+        async def run():
+            dispatcher = NotificationDispatcher(max_concurrency=50)
+            dispatcher.register_channel("email", slow_sender)
+            start = time.monotonic()
+            results = await dispatcher.send_many("email", [f"s{i}@example.com" for i in range(20)], "Subject", "Body")
+            return results, time.monotonic() - start
+
+        results, elapsed = asyncio.run(run())
+        self.assertTrue(all(results))
+        self.assertEqual(len(sent), 20)
+        self.assertLess(elapsed, 0.5)
+
+    def test_retries_failed_sends(self):
+        attempts = []
+
+        async def flaky_sender(recipient, subject, message):
+            attempts.append(recipient)
+            if len(attempts) < 3:
+                raise ConnectionError("SMTP unavailable")
+
+        async def run():
+            dispatcher = NotificationDispatcher(max_attempts=3, backoff_base=0.001)
+            dispatcher.register_channel("email", flaky_sender)
+            return await dispatcher.send("email", "a@example.com", "Subject", "Body")
+
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(len(attempts), 3)
+
+    def test_gives_up_after_max_attempts(self):
+        async def failing_sender(recipient, subject, message):
+            raise ConnectionError("SMTP unavailable")
+
+        async def run():
+            dispatcher = NotificationDispatcher(max_attempts=2, backoff_base=0.001)
+            dispatcher.register_channel("email", failing_sender)
+            return await dispatcher.send("email", "a@example.com", "Subject", "Body")
+
+        self.assertFalse(asyncio.run(run()))
+
+    def test_unknown_channel(self):
+        dispatcher = NotificationDispatcher()
+        with self.assertRaises(ValueError):
+            asyncio.run(dispatcher.send("fax", "a@example.com", "Subject", "Body"))
+
+    def test_rate_limiter_spaces_out_sends(self):
+        async def run():
+            limiter = RateLimiter(rate_per_second=20, burst=1)
+            start = time.monotonic()
+            for _ in range(5):
+                await limiter.acquire()
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.15)
+
+class TestAlertCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.coalescer = AlertCoalescer(windows={"Delayed": 900}, clock=lambda: self.now)
+
+    def test_repeats_within_window_are_suppressed(self):
+        self.assertTrue(self.coalescer.should_send(7, "Delayed"))
+        self.now = 100
+        self.assertFalse(self.coalescer.should_send(7, "Delayed"))
+        self.assertFalse(self.coalescer.should_send(7, "Delayed"))
+        # A different route is keyed separately
+        self.assertTrue(self.coalescer.should_send(8, "Delayed"))
+
+    def test_new_window_reports_suppressed_count(self):
+        self.coalescer.should_send(7, "Delayed")
+        self.coalescer.should_send(7, "Delayed")
+        self.coalescer.should_send(7, "Delayed")
+        self.now = 901
+        self.assertTrue(self.coalescer.should_send(7, "Delayed"))
+        self.assertEqual(self.coalescer.suppressed_before(7, "Delayed"), 2)
+
+    def test_digest_sends_one_message_per_recipient(self):
+        sent = []
+
+        async def sender(recipient, subject, message):
+            sent.append((recipient, subject, message))
+
+        async def run():
+            dispatcher = NotificationDispatcher()
+            dispatcher.register_channel("email", sender)
+            digest = DigestBatcher(dispatcher)
+            for i in range(5):
+                digest.add("sup@example.com", "Status Update Missing", f"Assignment {i}")
+            digest.add("sup@example.com", "Status Update Missing", "Assignment 0")
+            digest.add("other@example.com", "Repeat Offender Notification", "1 Main St")
+            return await digest.flush()
+
+        self.assertEqual(asyncio.run(run()), 2)
+        by_recipient = {recipient: (subject, message) for recipient, subject, message in sent}
+        self.assertEqual(by_recipient["sup@example.com"][0], "Alert Digest: 5 alerts")
+        self.assertEqual(by_recipient["other@example.com"][0], "Repeat Offender Notification")
+
+if __name__ == "__main__":
+    unittest.main()
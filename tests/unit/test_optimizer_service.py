@@ -0,0 +1,76 @@
+import unittest
+import random
+from datetime import date
+from app.service.optimizer_service import AssignmentSolver, CrewSlot, RouteJob, build_plan
+from app.service.eta_service import EtaModel
+
+class TestAssignmentSolver(unittest.TestCase):
+
+    def test_balances_workload_by_truck_capacity(self):
+        crews = [CrewSlot(1, capacity=10000), CrewSlot(2, capacity=10000), CrewSlot(3, capacity=20000)]
+        hours = [[2.0] * 3 for _ in range(8)]
+        owners = AssignmentSolver(crews, hours, max_hours=12).solve()
+        counts = [owners.count(crew) for crew in range(3)]
+        self.assertEqual(counts, [2, 2, 4])
+
+    def test_respects_crew_hours_and_existing_work(self):
+        crews = [CrewSlot(1, booked_hours=8.0), CrewSlot(2)]
+        hours = [[3.0, 3.0], [3.0, 3.0], [3.0, 3.0], [3.0, 3.0]]
+        owners = AssignmentSolver(crews, hours, max_hours=10).solve()
+        self.assertEqual(owners.count(0), 0)
+        self.assertEqual(owners.count(1), 3)
+        self.assertEqual(owners.count(None), 1)
+
+    def test_prefers_faster_crews(self):
+        crews = [CrewSlot(1), CrewSlot(2)]
+        # Route 0 is quick for crew 1 only, route 1 for crew 2 only
+        hours = [[1.0, 5.0], [5.0, 1.0]]
+        self.assertEqual(AssignmentSolver(crews, hours).solve(), [0, 1])
+
+    def test_hundreds_of_routes_feasible_and_no_worse_than_greedy(self):
+        rng = random.Random(3)
+        crews = [CrewSlot(i, capacity=rng.choice([8000, 12000, 16000])) for i in range(120)]
+        hours = [[rng.uniform(1.5, 4.5) for _ in crews] for _ in range(400)]
+        baseline = AssignmentSolver(crews, hours)
+        baseline.greedy()
+        solver = AssignmentSolver(crews, hours, time_budget=0.5)
+        owners = solver.solve()
+        self.assertEqual(owners.count(None), 0)
+        # Loads must agree with the routes actually placed on each crew
+        loads = [0.0] * len(crews)
+        for route, crew in enumerate(owners):
+            loads[crew] += hours[route][crew]
+        for load, expected in zip(solver.loads, loads):
+            self.assertAlmostEqual(load, expected)
+        self.assertTrue(all(load <= 10.0 for load in loads))
+        # Local search only ever accepts moves that lower the cost, however much of its budget it gets
+        self.assertLessEqual(self._plan_cost(solver), self._plan_cost(baseline) + 1e-6)
+
+    @staticmethod
+    def _plan_cost(solver):
+        return sum(solver._cost(crew, load) for crew, load in enumerate(solver.loads))
+
+    def test_build_plan_chains_time_windows(self):
+        crews = [CrewSlot(7, booked_hours=1.0)]
+        jobs = [RouteJob(11, 1, 1), RouteJob(12, 1, 1, "Event")]
+        plan = build_plan(date(2024, 5, 6), jobs, crews, [[2.0], [3.0]], [0, 0])
+        windows = [(a.route_id, a.start_time.strftime("%H:%M"), a.end_time.strftime("%H:%M"), a.week_type)
+                   for a in plan.assignments]
+        self.assertEqual(windows, [(12, "07:30", "10:30", "Event"), (11, "10:30", "12:30", "Regular")])
+        self.assertEqual(plan.crew_hours, {7: 6.0})
+
+
+class TestHoursMatrix(unittest.TestCase):
+
+    def test_matrix_matches_single_predictions(self):
+        model = EtaModel()
+        rng = random.Random(5)
+        for _ in range(300):
+            model.add_sample(rng.randint(1, 5), rng.randint(1, 4), "Monday", rng.uniform(4, 9))
+        matrix = model.predict_hours_matrix([1, 2, 3, 9], [1, 2, 3, 4, 8], "Monday")
+        for i, route_id in enumerate([1, 2, 3, 9]):
+            for j, crew_id in enumerate([1, 2, 3, 4, 8]):
+                self.assertAlmostEqual(matrix[i][j], model.predict_duration(route_id, crew_id, "Monday")[0])
+
+if __name__ == "__main__":
+    unittest.main()
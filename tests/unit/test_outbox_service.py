@@ -0,0 +1,99 @@
+import unittest
+import asyncio
+from unittest import mock
+from datetime import datetime, timedelta
+from fastlite import Database
+from app.service.outbox_service import Outbox, OutboxMessage, OutboxWorker
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.db.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, notification_sent BOOLEAN DEFAULT 0)")
+        self.outbox = Outbox(self.db)
+        self.outbox.create_table()
+        self.now = datetime(2024, 5, 6, 8, 0, 0)
+        self.worker = OutboxWorker(self.outbox, batch_size=2, max_attempts=3, backoff_base=10, clock=lambda: self.now)
+        self.sent = []
+        self.failing = set()
+
+        async def send(recipient, subject, body, message_id):
+            if recipient in self.failing:
+                raise ConnectionError("mail server unavailable")
+            self.sent.append((recipient, message_id))
+
+        self.worker.register_channel("email", send)
+        self.worker.on_complete("schedules", self.mark_notified)
+
+    def mark_notified(self, schedule_ids):
+        for schedule_id in schedule_ids:
+            self.db.execute("UPDATE schedules SET notification_sent = 1 WHERE id = ?", (schedule_id,))
+
+    def queue(self, schedule_id, recipients):
+        with self.db.conn:
+            self.db.execute("INSERT INTO schedules (id) VALUES (?)", (schedule_id,))
+            self.outbox.add(
+                OutboxMessage(idempotency_key=f"schedule:{schedule_id}:email:{r}", recipient=r, subject="Week 12",
+                              body="Monday", aggregate="schedules", aggregate_id=schedule_id, next_attempt_at=self.now)
+                for r in recipients
+            )
+
+    def notified(self, schedule_id):
+        return bool(self.db.q("SELECT notification_sent FROM schedules WHERE id = ?", (schedule_id,))[0]['notification_sent'])
+
+    def test_messages_roll_back_with_the_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.conn:
+                self.queue(1, ["a@example.com"])
+                raise RuntimeError("schedule insert failed")
+        self.assertEqual(self.outbox.counts(), {})
+
+    def test_delivers_in_batches_and_marks_aggregate(self):
+        self.queue(1, ["a@example.com", "b@example.com", "c@example.com"])
+        # Queuing the same notifications again is a no-op
+        with self.db.conn:
+            self.outbox.add([OutboxMessage(idempotency_key="schedule:1:email:a@example.com", recipient="a@example.com",
+                                           aggregate="schedules", aggregate_id=1, next_attempt_at=self.now)])
+        delivered = asyncio.run(self.worker.deliver_pending())
+        self.assertEqual(delivered, 3)
+        self.assertEqual(sorted(r for r, _ in self.sent), ["a@example.com", "b@example.com", "c@example.com"])
+        self.assertEqual(self.outbox.counts(), {"Sent": 3})
+        self.assertTrue(self.notified(1))
+        self.assertEqual(asyncio.run(self.worker.deliver_pending()), 0)
+
+    def test_failed_sends_are_retried_with_backoff_then_given_up(self):
+        self.queue(1, ["a@example.com", "b@example.com"])
+        self.failing.add("b@example.com")
+        asyncio.run(self.worker.deliver_pending())
+        self.assertEqual(self.outbox.counts(), {"Sent": 1, "Pending": 1})
+        self.assertFalse(self.notified(1))
+
+        # Not due again until the backoff has passed
+        self.assertEqual(self.outbox.claim(self.now), [])
+        for _ in range(2):
+            self.now += timedelta(hours=1)
+            asyncio.run(self.worker.deliver_pending())
+        self.assertEqual(self.outbox.counts(), {"Sent": 1, "Failed": 1})
+        self.assertFalse(self.notified(1))
+
+    def test_batch_outcomes_are_recorded_together(self):
+        self.queue(1, ["a@example.com", "b@example.com"])
+        self.failing.add("b@example.com")
+        # Recording the failure breaks; the success in the same batch must not be recorded on its own
+        with mock.patch.object(self.outbox, "mark_failed", side_effect=RuntimeError("disk I/O error")):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(self.worker.deliver_pending())
+        self.assertNotIn("Sent", self.outbox.counts())
+
+    def test_claimed_messages_are_released_after_lease(self):
+        self.queue(1, ["a@example.com"])
+        self.assertEqual(len(self.outbox.claim(self.now, lease=60)), 1)
+        # A second worker round does not see the reserved message
+        self.assertEqual(self.outbox.claim(self.now), [])
+        self.now += timedelta(seconds=61)
+        asyncio.run(self.worker.deliver_pending())
+        self.assertEqual(self.outbox.counts(), {"Sent": 1})
+        self.assertTrue(self.notified(1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import asyncio
+import json
+from app.service.protocol_service import (
+    RouteUpdate, FrameSender, ProtocolError, encode_updates, decode_updates, encode_ack, decode_ack
+)
+
+class TestBinaryProtocol(unittest.TestCase):
+
+    def test_round_trip(self):
+        updates = [
+            RouteUpdate(1, 42, "On Track", 51.507351, -0.127758, 1715000000000, 0.4),
+            RouteUpdate(2, 42, "Delayed", -33.868820, 151.209290, 1715000005000),
+            RouteUpdate(3, 7, None, 0.0, 0.0, 1715000009000, 1.0),
+        ]
+        decoded = decode_updates(encode_updates(updates))
+        self.assertEqual(decoded, updates)
+        self.assertEqual(decode_ack(encode_ack(3)), 3)
+
+    def test_frames_are_smaller_than_json(self):
+        update = RouteUpdate(1, 42, "On Track", 51.507351, -0.127758, 1715000000000, 0.4)
+        as_json = json.dumps({"route_id": 42, "status": "On Track", "location": {"lat": 51.507351, "lon": -0.127758},
+                              "recorded_at": 1715000000000, "progress": 0.4})
+        batch = encode_updates([update] * 50)
+        self.assertLess(len(batch), len(as_json) * 50 / 3)
+
+    def test_malformed_frames_are_rejected(self):
+        frame = encode_updates([RouteUpdate(1, 42, "On Track", 1.0, 2.0, 0)])
+        with self.assertRaises(ProtocolError):
+            decode_updates(frame[:-1])
+        with self.assertRaises(ProtocolError):
+            decode_updates(b"\x02" + frame[1:])
+        with self.assertRaises(ProtocolError):
+            decode_updates(b"")
+        with self.assertRaises(ProtocolError):
+            decode_ack(b"\x02")
+
+    def test_out_of_range_values_are_clamped_or_rejected(self):
+        updates = [RouteUpdate(1, 42, "On Track", 1.0, 2.0, 0, 3.0), RouteUpdate(2, 42, "On Track", 1.0, 2.0, 0, -0.5)]
+        self.assertEqual([u.progress for u in decode_updates(encode_updates(updates))], [1.0, 0.0])
+        with self.assertRaises(ProtocolError):
+            encode_updates([RouteUpdate(-1, 42, "On Track", 1.0, 2.0, 0)])
+
+
+class TestFrameSender(unittest.TestCase):
+
+    def test_acks_coalesce_while_link_is_slow(self):
+        sent = []
+
+        async def slow_send(frame):
+            await asyncio.sleep(0.02)
+            sent.append(frame)
+
+        async def run():
+            sender = FrameSender(slow_send)
+            sender.start()
+            sender.ack(1)
+            await asyncio.sleep(0)
+            for sequence in range(2, 10):
+                sender.ack(sequence)
+            await asyncio.sleep(0.1)
+            await sender.stop()
+
+        asyncio.run(run())
+        self.assertEqual([decode_ack(frame) for frame in sent], [1, 9])
+
+    def test_full_queue_applies_backpressure(self):
+        async def run():
+            release = asyncio.Event()
+
+            async def blocked_send(frame):
+                await release.wait()
+
+            sender = FrameSender(blocked_send, queue_size=2)
+            sender.start()
+            for _ in range(3):
+                await sender.send(b"x")
+            await asyncio.sleep(0)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.gather(sender.send(b"x"), sender.send(b"x")), timeout=0.05)
+            release.set()
+            await sender.stop()
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import unittest
+from datetime import date
+from unittest import mock
+from fastlite import Database
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.testclient import TestClient
+from app.components.assignment.models import Assignment
+from app.components.auth.utils import requires_websocket
+from app.components.issues import models as issues_models
+from app.components.issues import services as issues_services
+from app.components.issues.models import Issue
+from app.database import db as auth_db
+from app.components.auth.models import User
+from app.service import real_time_service
+from app.service.hub_service import ALL_ROUTES_TOPIC
+from app.service.location_service import LocationIngestor
+from app.service.notification_service import AlertCoalescer
+from app.service.protocol_service import (
+    BINARY_SUBPROTOCOL, ERROR_MALFORMED, ERROR_PROCESSING, RouteUpdate, decode_ack, encode_error, encode_updates
+)
+
+class TestSupervisorAlerts(unittest.TestCase):
+
+    def setUp(self):
+        User.create_table()
+        self.addCleanup(auth_db.execute, "DELETE FROM users")
+        for username, role, email in (("ana", "Supervisor", "ana@example.com"), ("ben", "Supervisor", ""),
+                                      ("cat", "Dispatch", "cat@example.com")):
+            User(username=username, password_hash="x", role=role, email=email).save()
+
+    def test_alerts_go_to_supervisors_with_an_email(self):
+        with self.assertLogs(real_time_service.logger, "WARNING") as logs:
+            supervisors = real_time_service.find_supervisors()
+        self.assertEqual([supervisor.email for supervisor in supervisors], ["ana@example.com"])
+        self.assertIn("ben", logs.output[0])
+
+class TestRealtimeSockets(unittest.TestCase):
+
+    def setUp(self):
+        # Positions stay buffered in a throwaway ingestor rather than the process-wide one
+        patcher = mock.patch.object(real_time_service, "ingestor", LocationIngestor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        staff = requires_websocket(["Admin", "Supervisor", "Dispatch"])
+
+        async def login(request):
+            request.session["user_role"] = "Dispatch"
+            return PlainTextResponse("ok")
+
+        # Wired the way app/main.py wires them
+        app = Starlette(routes=[Route("/login", login),
+                                WebSocketRoute("/ws/route-progress", staff(real_time_service.track_route_progress)),
+                                WebSocketRoute("/ws/dashboard", staff(real_time_service.dashboard_updates))],
+                        middleware=[Middleware(SessionMiddleware, secret_key="test")])
+        self.client = TestClient(app)
+        self.client.get("/login")
+
+    def test_crew_updates_reach_dashboards_watching_the_zone(self):
+        with self.client.websocket_connect("/ws/dashboard?zone=7") as dashboard, \
+                self.client.websocket_connect("/ws/route-progress") as crew:
+            crew.send_text(json.dumps({"route_id": 3, "zone_id": 7, "status": "On Track", "location": "51.5,-0.1"}))
+            self.assertEqual(crew.receive_text(),
+                             "Update received for Route 3: Status - On Track, Location - 51.5,-0.1")
+            update = json.loads(dashboard.receive_text())
+        self.assertEqual((update["type"], update["route_id"], update["status"]), ("route_update", 3, "On Track"))
+
+    def test_binary_socket_survives_bad_frames(self):
+        frame = encode_updates([RouteUpdate(1, 3, "On Track", 51.5, -0.1, 1715000000000, 0.5)])
+        with self.client.websocket_connect("/ws/route-progress", subprotocols=[BINARY_SUBPROTOCOL]) as crew:
+            crew.send_bytes(frame[:-3])
+            self.assertEqual(crew.receive_bytes(), encode_error(ERROR_MALFORMED))
+            with mock.patch.object(real_time_service, "process_route_update", side_effect=RuntimeError("boom")):
+                crew.send_bytes(frame)
+                self.assertEqual(crew.receive_bytes(), encode_error(ERROR_PROCESSING))
+            crew.send_bytes(frame)
+            self.assertEqual(decode_ack(crew.receive_bytes()), 1)
+
+class TestIssueReports(unittest.TestCase):
+
+    def setUp(self):
+        patches = {"ingestor": LocationIngestor(), "coalescer": AlertCoalescer(),
+                   "notify_supervisors": mock.AsyncMock()}
+        for name, value in patches.items():
+            patcher = mock.patch.object(real_time_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.subscriber = real_time_service.hub.subscribe([ALL_ROUTES_TOPIC])
+        self.addCleanup(real_time_service.hub.unsubscribe, self.subscriber)
+
+        self.db = Database(':memory:')
+        for module in (issues_models, real_time_service):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(issues_services, "refresh_daily_rollups")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+        Issue.create_table()
+        self.db.execute("CREATE TABLE assignments (id INTEGER PRIMARY KEY, crew_id INTEGER, route_id INTEGER, doc DATE, start_time TIME)")
+        self.db.execute("INSERT INTO assignments VALUES (1, 4, 8, ?, '06:30:00')", (date.today().isoformat(),))
+
+    def report_issue(self, route_id, location):
+        asyncio.run(real_time_service.process_route_update(route_id, "Issue", location, zone_id=1))
+
+    def test_each_issue_is_logged_and_repeats_from_one_spot_alert_once(self):
+        self.report_issue(8, {"lat": 51.500001, "lon": -0.1})
+        rows = self.db.q("SELECT crew_id, route_id, address, issue_type FROM issues")
+        self.assertEqual(rows, [{"crew_id": 4, "route_id": 8, "address": '{"lat": 51.500001, "lon": -0.1}',
+                                 "issue_type": "Other"}])
+        self.refresh.assert_called_once_with(date.today())
+        real_time_service.notify_supervisors.assert_awaited_once()
+
+        # The crew reports again a few metres away: logged, but coalesced into the first alert
+        self.report_issue(8, {"lat": 51.500002, "lon": -0.1})
+        self.assertEqual(len(self.db.q("SELECT 1 FROM issues")), 2)
+        real_time_service.notify_supervisors.assert_awaited_once()
+
+    def test_issues_on_unassigned_routes_are_alerted_but_not_logged(self):
+        self.report_issue(9, "51.5,-0.1")
+        self.assertEqual(self.db.q("SELECT 1 FROM issues"), [])
+        real_time_service.notify_supervisors.assert_awaited_once()
+
+    def test_issue_is_broadcast_and_alerted_when_logging_fails(self):
+        with mock.patch.object(real_time_service, "log_issue", side_effect=RuntimeError("database is locked")):
+            self.report_issue(8, "51.5,-0.1")
+        update = json.loads(self.subscriber.queue.get_nowait())
+        self.assertEqual((update["route_id"], update["status"]), (8, "Issue"))
+        real_time_service.notify_supervisors.assert_awaited_once()
+
+class TestAttendanceCheck(unittest.TestCase):
+
+    def test_crews_missing_attendance_or_ppe_are_reported(self):
+        assignments = [Assignment(id=1, crew_id=1, attendance_confirmed=True, ppe_compliance=True),
+                       Assignment(id=2, crew_id=2, attendance_confirmed=False, ppe_compliance=True),
+                       Assignment(id=3, crew_id=3, attendance_confirmed=True, ppe_compliance=False)]
+        with mock.patch.object(Assignment, "find_all_for_date", return_value=assignments), \
+                mock.patch.object(real_time_service, "notify_supervisors", mock.AsyncMock()) as notify:
+            asyncio.run(real_time_service.check_attendance_ppe_compliance())
+        self.assertEqual(notify.await_count, 2)
+        self.assertIn("Crew ID: 2 for Assignment ID: 2", notify.await_args_list[0].args[1])
+        self.assertIn("Crew ID: 3 for Assignment ID: 3", notify.await_args_list[1].args[1])
+
+if __name__ == "__main__":
+    unittest.main()
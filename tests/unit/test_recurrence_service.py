@@ -0,0 +1,102 @@
+import unittest
+import time
+from datetime import datetime, timedelta
+from fastlite import Database
+from app.service.recurrence_service import RecurrenceRule, OccurrenceCache
+from app.service.conflict_service import BookingIndex, service_schedule_bookings, assignment_bookings, DRIVER
+
+def days(occurrences):
+    return [o.strftime("%Y-%m-%d %H:%M") for o in occurrences]
+
+class TestRecurrenceRule(unittest.TestCase):
+
+    def test_weekly_by_day_with_interval(self):
+        rule = RecurrenceRule.parse("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH")
+        first = datetime(2024, 5, 6, 9, 0)  # A Monday
+        self.assertEqual(days(rule.between(first, datetime(2024, 5, 1), datetime(2024, 5, 25))),
+                         ["2024-05-06 09:00", "2024-05-09 09:00", "2024-05-20 09:00", "2024-05-23 09:00"])
+
+    def test_monthly_rules(self):
+        last_friday = RecurrenceRule.parse("FREQ=MONTHLY;BYDAY=-1FR")
+        self.assertEqual(days(last_friday.between(datetime(2024, 1, 1, 7), datetime(2024, 1, 1), datetime(2024, 4, 1))),
+                         ["2024-01-26 07:00", "2024-02-23 07:00", "2024-03-29 07:00"])
+        # Months without the 31st are skipped, as in iCalendar
+        the_31st = RecurrenceRule.parse("FREQ=MONTHLY")
+        self.assertEqual(days(the_31st.between(datetime(2024, 1, 31, 8), datetime(2024, 1, 1), datetime(2024, 6, 1))),
+                         ["2024-01-31 08:00", "2024-03-31 08:00", "2024-05-31 08:00"])
+
+    def test_count_and_until(self):
+        first = datetime(2024, 5, 6, 9, 0)
+        counted = RecurrenceRule.parse("FREQ=DAILY;COUNT=3")
+        self.assertEqual(len(list(counted.between(first, datetime(2024, 1, 1), datetime(2025, 1, 1)))), 3)
+        # COUNT counts from the first occurrence even when the window starts later
+        self.assertEqual(days(counted.between(first, datetime(2024, 5, 7), datetime(2025, 1, 1))),
+                         ["2024-05-07 09:00", "2024-05-08 09:00"])
+        until = RecurrenceRule.parse("FREQ=WEEKLY;UNTIL=20240520")
+        self.assertEqual(days(until.between(first, first, datetime(2025, 1, 1))),
+                         ["2024-05-06 09:00", "2024-05-13 09:00", "2024-05-20 09:00"])
+
+    def test_round_trip_and_rejects_bad_rules(self):
+        text = "FREQ=MONTHLY;INTERVAL=3;BYDAY=1MO;UNTIL=20251231T235959"
+        self.assertEqual(str(RecurrenceRule.parse(text)), text)
+        for bad in ["FREQ=YEARLY", "FREQ=WEEKLY;BYDAY=XX", "FREQ=WEEKLY;BYMONTHDAY=3", "FREQ=DAILY;COUNT=2;UNTIL=20240101",
+                    "FREQ=DAILY;BYHOUR=5", "FREQ=DAILY;INTERVAL=0"]:
+            with self.assertRaises(ValueError):
+                RecurrenceRule.parse(bad)
+
+    def test_far_window_is_expanded_lazily(self):
+        rule = RecurrenceRule.parse("FREQ=DAILY")
+        started = time.monotonic()
+        window = list(rule.between(datetime(2000, 1, 1, 6), datetime(2090, 3, 1), datetime(2090, 3, 8)))
+        self.assertEqual(len(window), 7)
+        self.assertLess(time.monotonic() - started, 0.05)
+
+
+class TestOccurrenceCache(unittest.TestCase):
+
+    def test_reuses_cached_months_and_invalidates(self):
+        cache = OccurrenceCache(max_entries=10)
+        first = datetime(2024, 1, 1, 9)
+        march = cache.between(1, "FREQ=WEEKLY;BYDAY=MO", first, datetime(2024, 3, 1), datetime(2024, 4, 1))
+        self.assertEqual(len(march), 4)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        # A narrower window in the same month comes from the cache
+        self.assertEqual(cache.between(1, "FREQ=WEEKLY;BYDAY=MO", first, datetime(2024, 3, 10), datetime(2024, 3, 20)),
+                         [datetime(2024, 3, 11, 9), datetime(2024, 3, 18, 9)])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.invalidate(1)
+        cache.between(1, "FREQ=WEEKLY;BYDAY=MO", first, datetime(2024, 3, 10), datetime(2024, 3, 20))
+        self.assertEqual(cache.misses, 2)
+        # Older months are evicted past the limit
+        cache.between(1, "FREQ=WEEKLY;BYDAY=MO", first, datetime(2024, 1, 1), datetime(2025, 1, 1))
+        self.assertLessEqual(len(cache._entries), 10)
+
+
+class TestRecurringServiceConflicts(unittest.TestCase):
+
+    def test_recurring_visits_are_checked_without_being_stored(self):
+        db = Database(':memory:')
+        db.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, week_number INTEGER, dow TEXT, driver_id INTEGER, loader_ids TEXT)")
+        db.execute("CREATE TABLE assignments (id INTEGER PRIMARY KEY, doc DATE, start_time TIME, end_time TIME, crew_id INTEGER)")
+        db.execute("CREATE TABLE crews (id INTEGER PRIMARY KEY, driver_id INTEGER, truck_id INTEGER, loaders TEXT)")
+        db.execute('''CREATE TABLE service_schedules (id INTEGER PRIMARY KEY, service_name TEXT, schedule_time DATETIME,
+                      assigned_driver_id INTEGER, notification_sent BOOLEAN, recurrence_rule TEXT NOT NULL DEFAULT '')''')
+        db.execute("INSERT INTO service_schedules VALUES (1, 'Bins', '2024-01-01 09:00:00', 10, 0, 'FREQ=WEEKLY;BYDAY=MO')")
+        db.execute("INSERT INTO service_schedules VALUES (2, 'Skip', '2024-05-07 09:00:00', 10, 0, '')")
+        index = BookingIndex(db)
+        index.create_table()
+        index.rebuild()
+        # Only the one-off visit is stored
+        self.assertEqual([row['source_id'] for row in db.q("SELECT source_id FROM bookings")], [2])
+
+        monday = datetime(2024, 9, 2)
+        clash = index.check(assignment_bookings(None, monday.date(), (monday + timedelta(hours=8)).time(),
+                                                (monday + timedelta(hours=12)).time(), 1, 10, 20, []))
+        self.assertEqual([(c.booking.resource_kind, c.existing.source_id) for c in clash], [(DRIVER, 1)])
+        self.assertEqual(index.check_many(service_schedule_bookings(None, monday + timedelta(hours=9, minutes=30), 10))[0]
+                         .existing.source_id, 1)
+        self.assertEqual(index.check(assignment_bookings(None, monday.date(), (monday + timedelta(hours=10)).time(),
+                                                         None, 1, 10, 20, [])), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from datetime import date, datetime, timedelta
+from unittest import mock
+from fastlite import Database
+from app.components.report import models as report_models
+from app.components.report import services as report_services
+from app.components.report.models import Report
+
+class TestDailyRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for patcher in (mock.patch.object(report_models, "db", self.db), mock.patch.object(report_services, "db", self.db)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.db.execute('''CREATE TABLE assignments (id INTEGER PRIMARY KEY, crew_id INTEGER, zone_id INTEGER, doc DATE,
+                           end_time TIME, completion_time REAL, attendance_confirmed BOOLEAN, ppe_compliance BOOLEAN)''')
+        self.db.execute('''CREATE TABLE issues (id INTEGER PRIMARY KEY, route_id INTEGER, issue_type TEXT,
+                           date_reported DATETIME, repeat_offender BOOLEAN)''')
+        self.db.execute("CREATE TABLE routes (id INTEGER PRIMARY KEY, zone_id INTEGER)")
+        self.db.execute("INSERT INTO routes VALUES (1, 1), (2, 2)")
+        for model in (report_models.DailyZoneStats, report_models.DailyCrewStats, report_models.DailyIssueStats):
+            model.create_table()
+
+        # History written before the rollup tables existed: two zones over two weeks in May 2024
+        rows = []
+        for day in range(14):
+            doc = (date(2024, 5, 6) + timedelta(days=day)).isoformat()
+            for crew_id, zone_id in ((1, 1), (2, 1), (3, 2)):
+                done = (day + crew_id) % 3 != 0
+                rows.append((crew_id, zone_id, doc, "14:00:00" if done else None, 7.5 if done else None,
+                             int(day % 4 != crew_id), int(day % 5 != crew_id)))
+        self.db.conn.executemany('''INSERT INTO assignments (crew_id, zone_id, doc, end_time, completion_time,
+                                    attendance_confirmed, ppe_compliance) VALUES (?, ?, ?, ?, ?, ?, ?)''', rows)
+        self.db.conn.executemany("INSERT INTO issues (route_id, issue_type, date_reported, repeat_offender) VALUES (?, ?, ?, ?)", [
+            (1, "Contamination", "2024-05-06 09:15:00", 0), (1, "Contamination", "2024-05-06 16:40:00", 1),
+            (2, "Missed Bin", "2024-05-13 23:59:59", 0), (2, "Missed Bin", "2024-05-14 00:00:00", 0),
+        ])
+
+    def raw_zone_totals(self, start, end):
+        return [dict(row) for row in self.db.q('''
+            SELECT zone_id, COUNT(*) AS assignments, COUNT(end_time) AS completed,
+                   SUM(attendance_confirmed) AS attendance_confirmed, SUM(ppe_compliance) AS ppe_compliant
+            FROM assignments WHERE doc BETWEEN ? AND ? GROUP BY zone_id ORDER BY zone_id''', (start, end))]
+
+    def test_backfill_matches_raw_aggregates(self):
+        self.assertTrue(report_services.backfill_daily_rollups())
+
+        crew_rollups = self.db.q('''SELECT stat_date, crew_id, assignments, completed, total_completion_hours
+                                    FROM daily_crew_stats ORDER BY stat_date, crew_id''')
+        crew_raw = self.db.q('''SELECT doc AS stat_date, crew_id, COUNT(*) AS assignments, COUNT(end_time) AS completed,
+                                       COALESCE(SUM(completion_time), 0) AS total_completion_hours
+                                FROM assignments GROUP BY doc, crew_id ORDER BY doc, crew_id''')
+        self.assertEqual([dict(row) for row in crew_rollups], [dict(row) for row in crew_raw])
+
+        week = report_services.get_weekly_summary_report({"week_start": "2024-05-06"})
+        self.assertEqual([{k: row[k] for k in ("zone_id", "assignments", "completed", "attendance_confirmed", "ppe_compliant")}
+                          for row in week], self.raw_zone_totals("2024-05-06", "2024-05-12"))
+        # Issues are bucketed by the day they were reported on
+        self.assertEqual([(row['zone_id'], row['issues']) for row in week], [(1, 2), (2, 0)])
+        month = report_services.get_monthly_summary_report({"month": "2024-05"})
+        self.assertEqual([row['assignments'] for row in month], [28, 14])
+        self.assertEqual([row['issues'] for row in month], [2, 2])
+
+    def test_backfill_runs_only_while_rollups_are_empty(self):
+        self.assertTrue(report_services.backfill_daily_rollups())
+        self.db.execute("UPDATE assignments SET end_time = NULL")
+        self.assertFalse(report_services.backfill_daily_rollups())
+        # Later changes reach the rollups through the per-change refresh instead
+        report_services.refresh_daily_rollups("2024-05-06", "2024-05-19")
+        self.assertEqual([row['completed'] for row in report_services.get_zone_summary("2024-05-06", "2024-05-19")], [0, 0])
+
+    def test_backfill_without_history_does_nothing(self):
+        self.db.execute("DELETE FROM assignments")
+        self.db.execute("DELETE FROM issues")
+        self.assertFalse(report_services.backfill_daily_rollups())
+        self.assertEqual(self.db.q("SELECT COUNT(*) AS n FROM daily_zone_stats")[0]['n'], 0)
+
+
+class TestReportRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.reports_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.reports_dir)
+        for patcher in (mock.patch.object(report_models, "db", self.db), mock.patch.object(report_services, "db", self.db),
+                        mock.patch.object(report_services, "REPORTS_DIR", self.reports_dir)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        Report.create_table()
+        self.now = datetime(2024, 6, 1, 12, 0)
+
+    def add_report(self, name, report_type="End of Day", age_days=0, size=100, accessed_days_ago=None):
+        path = self.write_file(name, size, age_days)
+        report = Report(report_type=report_type, generated_at=self.now - timedelta(days=age_days), file_path=path, file_size=size)
+        report.save()
+        if accessed_days_ago is not None:
+            self.db.execute("UPDATE reports SET last_accessed_at = ? WHERE id = ?",
+                            ((self.now - timedelta(days=accessed_days_ago)).strftime("%Y-%m-%d %H:%M:%S"), report.id))
+        return report
+
+    def write_file(self, name, size=100, age_days=0):
+        path = os.path.join(self.reports_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        written = (self.now - timedelta(days=age_days)).timestamp()
+        os.utime(path, (written, written))
+        return path
+
+    def remaining(self):
+        return sorted(os.path.basename(report.file_path) for report in Report.find_all())
+
+    def test_reports_expire_after_their_type_retention(self):
+        self.add_report("eod_old.csv", age_days=31)
+        self.add_report("eod_new.csv", age_days=29)
+        self.add_report("monthly.csv", report_type="Monthly Summary", age_days=400)
+        self.add_report("untyped.csv", report_type="Legacy", age_days=91)
+        self.assertEqual(report_services.expire_reports(self.now), 2)
+        self.assertEqual(self.remaining(), ["eod_new.csv", "monthly.csv"])
+        self.assertEqual(sorted(os.listdir(self.reports_dir)), ["eod_new.csv", "monthly.csv"])
+
+    def test_quota_evicts_least_recently_downloaded_first(self):
+        self.add_report("oldest_but_popular.csv", age_days=20, accessed_days_ago=0)
+        self.add_report("old.csv", age_days=10)
+        self.add_report("downloaded_last_week.csv", age_days=1, accessed_days_ago=7)
+        self.add_report("new.csv", age_days=0)
+        self.assertEqual(report_services.enforce_disk_quota(quota_bytes=250), 2)
+        self.assertEqual(self.remaining(), ["new.csv", "oldest_but_popular.csv"])
+        self.assertEqual(report_services.enforce_disk_quota(quota_bytes=250), 0)
+
+    def test_orphans_are_reconciled_after_the_grace_period(self):
+        self.add_report("kept.csv")
+        self.add_report("missing.csv")
+        os.remove(os.path.join(self.reports_dir, "missing.csv"))
+        self.write_file("abandoned.csv", age_days=1)
+        # Written moments ago; its report row may not be saved yet
+        self.write_file("in_progress.zip", age_days=0)
+
+        self.assertEqual(report_services.reconcile_report_files(self.now), (1, 1))
+        self.assertEqual(sorted(os.listdir(self.reports_dir)), ["in_progress.zip", "kept.csv"])
+        self.assertEqual(self.remaining(), ["kept.csv"])
+        self.assertEqual(report_services.reconcile_report_files(self.now + timedelta(days=1)), (1, 0))
+
+
+class TestReportBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        self.reports_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.reports_dir)
+        for patcher in (mock.patch.object(report_models, "db", self.db), mock.patch.object(report_services, "db", self.db),
+                        mock.patch.object(report_services, "REPORTS_DIR", self.reports_dir)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        Report.create_table()
+        self.db.execute("CREATE TABLE assignments (id INTEGER PRIMARY KEY, crew_id INTEGER, doc DATE)")
+        self.db.execute("INSERT INTO assignments (crew_id, doc) VALUES (1, '2024-05-06'), (2, '2024-05-06'), (1, '2024-05-07')")
+
+    def test_failing_entries_are_skipped_without_failing_the_batch(self):
+        specs = [
+            {"report_type": "End of Day", "parameters": {"date": "2024-05-06"}},
+            {"report_type": "End of Day", "parameters": {"date": "2024-05-07"}, "export_format": "ndjson"},
+            {"report_type": "End of Day", "parameters": {"date": "2024-05-08"}},
+            {"report_type": "Custom Report", "parameters": {"query": "SELECT * FROM no_such_table"}},
+            "End of Day",
+            {"report_type": "Unknown"},
+        ]
+        report = report_services.generate_report_batch(specs, max_workers=2)
+
+        self.assertEqual(Report.find_by_id(report.id).report_type, "Batch")
+        with zipfile.ZipFile(report.file_path) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["000_end_of_day_2024-05-06.csv", "001_end_of_day_2024-05-07.ndjson"])
+            # Workers read the snapshot of the patched database, not app_data.db
+            self.assertEqual(archive.read("000_end_of_day_2024-05-06.csv").decode().count("2024-05-06"), 2)
+        skipped = report.parameters["skipped"]
+        self.assertEqual([entry["report_type"] for entry in skipped], ["End of Day", "Custom Report", None, "Unknown"])
+        self.assertEqual(skipped[0]["error"], "No data found for the given parameters.")
+        self.assertIn("no_such_table", skipped[1]["error"])
+        self.assertEqual(skipped[3]["error"], "Invalid report type.")
+
+    def test_entry_names_are_sanitized(self):
+        specs = [{"report_type": "End of Day", "parameters": {"date": "2024-05-06", "note": "../../etc/passwd"}},
+                 {"report_type": "End of Day", "parameters": {"date": "2024-05-07", "note": "..\\..\\x:y / z"}}]
+        report = report_services.generate_report_batch(specs, max_workers=1)
+
+        with zipfile.ZipFile(report.file_path) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["000_end_of_day_2024-05-06_etc_passwd.csv",
+                                                          "001_end_of_day_2024-05-07_x_y_z.csv"])
+
+    def test_batch_without_any_data_is_rejected(self):
+        with self.assertRaises(ValueError):
+            report_services.generate_report_batch([{"report_type": "End of Day", "parameters": {"date": "2024-01-01"}}],
+                                                  max_workers=1)
+        self.assertEqual(os.listdir(self.reports_dir), [])
+        self.assertEqual(Report.find_all(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest import mock
+from fastlite import Database
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from app.components.report import models as report_models
+from app.components.report.models import Report
+from app.components.report.views import download_report_view
+
+class TestReportDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        patcher = mock.patch.object(report_models, "db", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Report.create_table()
+
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        file_path = os.path.join(self.work_dir, "end_of_day_20240506.csv")
+        with open(file_path, "w") as f:
+            f.write("id,crew_id,doc\n1,4,2024-05-06\n")
+        # A file last written an hour ago, so If-Modified-Since can fall either side of it
+        self.modified = datetime.now(timezone.utc) - timedelta(hours=1)
+        os.utime(file_path, (self.modified.timestamp(), self.modified.timestamp()))
+        self.db.execute("INSERT INTO reports (id, report_type, parameters, generated_at, file_path, file_size) VALUES (1, 'End of Day', '', ?, ?, ?)",
+                        (self.modified.strftime("%Y-%m-%d %H:%M:%S"), file_path, os.path.getsize(file_path)))
+
+        async def download(request):
+            return await download_report_view(request, request.path_params["report_id"])
+
+        self.client = TestClient(Starlette(routes=[Route("/reports/download/{report_id:int}", download)]))
+
+    def get(self, **headers):
+        return self.client.get("/reports/download/1", headers=headers)
+
+    def test_etag_revalidation(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.text, "id,crew_id,doc\n1,4,2024-05-06\n")
+        etag = first.headers["etag"]
+
+        cached = self.get(**{"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached.headers["etag"], etag)
+        # Weak comparison and lists of tags match as well
+        self.assertEqual(self.get(**{"If-None-Match": f'"other", W/{etag}'}).status_code, 304)
+
+        stale = self.get(**{"If-None-Match": '"other"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.text, first.text)
+
+    def test_if_modified_since(self):
+        last_modified = self.get().headers["last-modified"]
+        self.assertEqual(self.get(**{"If-Modified-Since": last_modified}).status_code, 304)
+        earlier = format_datetime(self.modified - timedelta(minutes=5), usegmt=True)
+        self.assertEqual(self.get(**{"If-Modified-Since": earlier}).status_code, 200)
+        # A matching ETag takes precedence over the date
+        self.assertEqual(self.get(**{"If-None-Match": '"other"', "If-Modified-Since": last_modified}).status_code, 200)
+
+    def test_downloads_are_recorded_for_eviction(self):
+        self.assertEqual(self.get(**{"If-None-Match": self.get().headers["etag"]}).status_code, 304)
+        self.assertIsNotNone(Report.find_by_id(1).last_accessed_at)
+
+if __name__ == "__main__":
+    unittest.main()
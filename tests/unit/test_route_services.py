@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+from fastlite import Database
+from starlette.datastructures import FormData
+from app.components.route import models as route_models
+from app.components.route import services as route_services
+from app.components.route.models import Route, RouteStop
+from app.service import sequencing_service
+from app.service.spatial_service import SpatialIndex, STOP
+
+class TestRouteServices(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (route_models, route_services, sequencing_service):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.index = SpatialIndex(self.db)
+        patcher = mock.patch.object(route_services, "spatial_index", self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Route.create_table()
+        RouteStop.create_table()
+        self.index.create_table()
+        self.db.execute("INSERT INTO routes (id, name, zone_id) VALUES (1, 'North', 1), (2, 'South', 1)")
+
+    def add_stops(self, route_id, points):
+        for n, (lat, lon) in enumerate(points):
+            route_services.add_route_stop(route_id, FormData({"name": f"Stop {n}", "lat": str(lat), "lon": str(lon)}))
+
+    def test_deleting_a_route_removes_its_stops_from_the_table_and_the_index(self):
+        self.add_stops(1, [(51.50, -0.10), (51.51, -0.10)])
+        self.add_stops(2, [(51.60, -0.20)])
+        self.assertEqual(self.index.count(STOP), 3)
+
+        route_services.delete_route(1)
+        self.assertIsNone(Route.find_by_id(1))
+        self.assertEqual(route_services.get_route_stops(1), [])
+        self.assertEqual(len(route_services.get_route_stops(2)), 1)
+        self.assertEqual(self.index.count(STOP), 1)
+        self.assertEqual([match[1] for match in self.index.nearest(51.50, -0.10, k=5, kind=STOP)],
+                         [route_services.get_route_stops(2)[0].id])
+
+    def test_stop_orders_are_optimised_on_spawned_workers(self):
+        # Visited out of order: 51.50 -> 51.52 -> 51.51
+        for route_id in (1, 2):
+            self.add_stops(route_id, [(51.50, -0.10), (51.52, -0.10), (51.51, -0.10)])
+        with mock.patch.object(sequencing_service.multiprocessing, "get_context",
+                               wraps=sequencing_service.multiprocessing.get_context) as get_context:
+            results = sequencing_service.optimize_stop_sequences(workers=2, time_budget=0.5)
+        get_context.assert_called_once_with("spawn")
+        self.assertEqual(len(results), 2)
+        for route_id in (1, 2):
+            self.assertEqual([stop.lat for stop in route_services.get_route_stops(route_id)], [51.50, 51.51, 51.52])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest import mock
+from fastlite import Database
+from starlette.datastructures import FormData
+from app.components.driver import models as driver_models
+from app.components.loader import models as loader_models
+from app.components.schedule import models as schedule_models
+from app.components.schedule import services as schedule_services
+from app.components.driver.models import Driver
+from app.components.driver.services import create_driver
+from app.components.loader.services import create_loader
+from app.components.loader.models import Loader
+from app.components.schedule.models import Schedule
+from app.components.schedule.services import (
+    RosterEntry, create_schedule, generate_week_schedules, mark_schedules_notified, roster_from_week
+)
+from app.service.conflict_service import BookingIndex
+from app.service.outbox_service import Outbox
+
+class TestWeekGeneration(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database(':memory:')
+        for module in (driver_models, loader_models, schedule_models, schedule_services):
+            patcher = mock.patch.object(module, "db", self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        Driver.create_table()
+        Loader.create_table()
+        Schedule.create_table()
+        BookingIndex(self.db).create_table()
+        Outbox(self.db).create_table()
+        self.db.execute('''INSERT INTO drivers (id, name, license_number, license_expiry, email) VALUES
+                           (1, 'Ann', 'L-1', '2030-01-01', 'driver1@example.com'),
+                           (2, 'Bob', 'L-2', '2030-01-01', 'driver2@example.com')''')
+        # Loaders without an email address are reported rather than notified
+        self.db.execute("INSERT INTO loaders (id, name, pickup_spot) VALUES (7, 'Cy', 'Depot'), (8, 'Di', 'Depot')")
+
+        self.roster = [RosterEntry("Monday", 1, [7]), RosterEntry("Tuesday", 1, [7, 8]), RosterEntry("Monday", 2, [8])]
+
+    def count(self, query, params=()):
+        return self.db.q(f"SELECT COUNT(*) AS n FROM {query}", params)[0]['n']
+
+    def test_all_validation_errors_are_reported_together(self):
+        roster = [RosterEntry("Funday", 1, [7]), RosterEntry("Monday", 99, [98])]
+        with self.assertRaises(ValueError) as invalid:
+            generate_week_schedules(10, roster)
+        for problem in ("Invalid day of week: Funday", "Invalid driver selected: 99", "Invalid loader selected: 98"):
+            self.assertIn(problem, str(invalid.exception))
+        self.assertEqual(self.count("schedules"), 0)
+
+    def test_existing_week_is_kept_unless_replaced(self):
+        generate_week_schedules(10, self.roster)
+        with self.assertRaises(ValueError) as exists:
+            generate_week_schedules(10, self.roster[:1])
+        self.assertIn("already has schedules", str(exists.exception))
+        self.assertEqual(self.count("schedules WHERE week_number = 10"), 3)
+
+    def test_replacing_a_week_cancels_the_old_schedules_pending_messages(self):
+        old = generate_week_schedules(10, self.roster)
+        self.assertEqual(self.count("outbox WHERE status = 'Pending'"), 3)
+        # The Monday message for driver 2 has gone out already
+        self.db.execute("UPDATE outbox SET status = 'Sent' WHERE aggregate_id = ?", (old[2].id,))
+
+        new = generate_week_schedules(10, self.roster[:2], replace=True)
+        old_ids, new_ids = [s.id for s in old], [s.id for s in new]
+        self.assertEqual([s.id for s in Schedule.find_by_week(10)], new_ids)
+        rows = self.db.q("SELECT aggregate_id, status FROM outbox ORDER BY id")
+        self.assertEqual([(r['aggregate_id'], r['status']) for r in rows],
+                         [(old_ids[2], "Sent")] + [(i, "Pending") for i in new_ids])
+        self.assertEqual(self.count("bookings WHERE source_id IN (?, ?, ?)", tuple(old_ids)), 0)
+
+    def test_notifications_commit_with_the_schedules(self):
+        with self.assertLogs(schedule_services.logger, "WARNING") as logs:
+            schedules = generate_week_schedules(10, self.roster)
+        self.assertIn("2 crew members scheduled in week 10 have no email address.", logs.output[0])
+        rows = self.db.q("SELECT aggregate, aggregate_id, recipient FROM outbox ORDER BY id")
+        self.assertEqual([(r['aggregate'], r['aggregate_id'], r['recipient']) for r in rows],
+                         [("schedules", s.id, f"driver{s.driver_id}@example.com") for s in schedules])
+
+        with mock.patch.object(Outbox, "add", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                generate_week_schedules(11, self.roster)
+        self.assertEqual(self.count("schedules WHERE week_number = 11"), 0)
+        self.assertEqual(self.count("bookings WHERE day LIKE 'W11-%'"), 0)
+
+    def test_roster_from_week_copies_an_existing_week(self):
+        generate_week_schedules(10, self.roster)
+        roster = roster_from_week(10)
+        self.assertEqual(roster, self.roster)
+        generate_week_schedules(11, roster)
+        self.assertEqual([(s.dow, s.driver_id, s.loader_ids) for s in Schedule.find_by_week(11)],
+                         [(e.dow, e.driver_id, e.loader_ids) for e in self.roster])
+        self.assertEqual(roster_from_week(12), [])
+
+    def test_crew_emails_entered_on_the_forms_are_notified(self):
+        create_driver({"name": "Eve", "license_number": "L-3", "license_expiry": "2030-01-01", "email": " eve@example.com "})
+        create_loader({"name": "Flo", "pickup_spot": "Depot", "email": "flo@example.com"})
+        driver, loader = Driver.find_by_license_number("L-3"), Loader.find_by_name("Flo")
+        schedules = generate_week_schedules(12, [RosterEntry("Friday", driver.id, [loader.id])])
+        rows = self.db.q("SELECT recipient FROM outbox WHERE aggregate_id = ? ORDER BY id", (schedules[0].id,))
+        self.assertEqual([r['recipient'] for r in rows], ["eve@example.com", "flo@example.com"])
+
+    def test_create_schedule_books_the_crew_and_queues_their_notification(self):
+        self.db.execute("UPDATE loaders SET email = 'cy@example.com' WHERE id = 7")
+        create_schedule(FormData([("week_number", "14"), ("dow", "Wednesday"), ("driver_id", "1"), ("loader_ids", "7")]))
+        [schedule] = Schedule.find_by_week(14)
+        self.assertEqual(Schedule.find_by_id(schedule.id), schedule)
+        self.assertEqual((schedule.driver_id, schedule.loader_ids, schedule.notification_sent), (1, [7], False))
+        self.assertEqual(self.count("bookings WHERE source_id = ?", (schedule.id,)), 2)
+        rows = self.db.q("SELECT recipient FROM outbox WHERE aggregate_id = ? ORDER BY id", (schedule.id,))
+        self.assertEqual([r['recipient'] for r in rows], ["driver1@example.com", "cy@example.com"])
+
+        # The outbox worker marks the schedule once both messages are delivered
+        mark_schedules_notified([schedule.id])
+        self.assertTrue(Schedule.find_by_id(schedule.id).notification_sent)
+
+    def test_create_schedule_rejects_a_double_booked_driver(self):
+        create_schedule(FormData([("week_number", "14"), ("dow", "Wednesday"), ("driver_id", "1"), ("loader_ids", "7")]))
+        with self.assertRaises(ValueError) as clash:
+            create_schedule(FormData([("week_number", "14"), ("dow", "Wednesday"), ("driver_id", "1"), ("loader_ids", "8")]))
+        self.assertIn("Driver 1", str(clash.exception))
+        self.assertEqual(self.count("schedules WHERE week_number = 14"), 1)
+        self.assertEqual(self.count("outbox"), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import asyncio
+from datetime import datetime, timedelta
+from app.service.scheduler_service import Scheduler, CronTrigger, IntervalTrigger
+
+class TestCronTrigger(unittest.TestCase):
+
+    def test_next_daily_checkpoint(self):
+        trigger = CronTrigger("0 11,13,15 * * *")
+        self.assertEqual(trigger.next_after(datetime(2024, 5, 6, 12, 30)), datetime(2024, 5, 6, 13, 0))
+        self.assertEqual(trigger.next_after(datetime(2024, 5, 6, 15, 0)), datetime(2024, 5, 7, 11, 0))
+
+    def test_steps_ranges_and_weekdays(self):
+        trigger = CronTrigger("*/15 8-9 * * 0-4")
+        # Saturday rolls over to Monday morning
+        self.assertEqual(trigger.next_after(datetime(2024, 5, 11, 9, 50)), datetime(2024, 5, 13, 8, 0))
+        self.assertEqual(trigger.next_after(datetime(2024, 5, 13, 8, 1)), datetime(2024, 5, 13, 8, 15))
+
+    def test_invalid_expression(self):
+        with self.assertRaises(ValueError):
+            CronTrigger("0 25 * * *")
+        with self.assertRaises(ValueError):
+            CronTrigger("0 11 * *")
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_runs_interval_jobs_and_records_history(self):
+        calls = []
+
+        async def run():
+            scheduler = Scheduler()
+            scheduler.add_job("tick", lambda: calls.append(1), IntervalTrigger(0.02))
+            scheduler.start()
+            await asyncio.sleep(0.15)
+            await scheduler.stop()
+            return scheduler.history("tick")
+
+        history = asyncio.run(run())
+        self.assertGreaterEqual(len(calls), 3)
+        self.assertTrue(all(r.status == "Succeeded" for r in history))
+
+    def test_missed_runs_are_coalesced(self):
+        """After the clock jumps past many runs, the job fires once and is re-armed from now."""
+        now = [datetime(2024, 5, 6, 10, 0, 30)]
+        calls = []
+
+        async def job():
+            calls.append(now[0])
+
+        async def run():
+            scheduler = Scheduler(clock=lambda: now[0])
+            scheduler.add_job("every_minute", job, CronTrigger("* * * * *"))
+            now[0] += timedelta(hours=3)
+            scheduler.start()
+            await asyncio.sleep(0.05)
+            await scheduler.stop()
+            return scheduler
+
+        scheduler = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        due, _, _, scheduled_for = scheduler._heap[0]
+        self.assertEqual(scheduled_for, datetime(2024, 5, 6, 13, 1))
+
+    def test_failures_are_recorded_and_overlaps_skipped(self):
+        async def slow():
+            await asyncio.sleep(0.1)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        async def run():
+            scheduler = Scheduler()
+            scheduler.add_job("slow", slow, IntervalTrigger(0.03))
+            scheduler.add_job("broken", broken, IntervalTrigger(0.03))
+            scheduler.start()
+            await asyncio.sleep(0.12)
+            await scheduler.stop()
+            return scheduler
+
+        scheduler = asyncio.run(run())
+        self.assertIn("Skipped", [r.status for r in scheduler.history("slow")])
+        self.assertEqual(scheduler.history("broken")[0].status, "Failed")
+        self.assertEqual(scheduler.history("broken")[0].error, "boom")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import itertools
+import random
+from app.service.sequencing_service import (
+    drive_time_matrix, path_cost, nearest_neighbour, sequence_points, _sequence_route,
+    ROAD_DETOUR_FACTOR, AVERAGE_SPEED_MPS
+)
+from app.service.spatial_service import haversine_m
+
+def random_stops(seed, count):
+    rng = random.Random(seed)
+    return [rng.uniform(51.45, 51.55) for _ in range(count)], [rng.uniform(-0.2, 0.0) for _ in range(count)]
+
+class TestStopSequencing(unittest.TestCase):
+
+    def test_matrix_matches_haversine(self):
+        lats, lons = random_stops(1, 6)
+        matrix = drive_time_matrix(lats, lons)
+        for i, j in itertools.product(range(6), repeat=2):
+            expected = haversine_m(lats[i], lons[i], lats[j], lons[j]) * ROAD_DETOUR_FACTOR / AVERAGE_SPEED_MPS
+            self.assertAlmostEqual(matrix[i][j], expected, delta=0.01)
+
+    def test_matches_brute_force_on_small_routes(self):
+        for seed in range(5):
+            lats, lons = random_stops(seed, 8)
+            matrix = drive_time_matrix(lats, lons)
+            best = min(path_cost(matrix, (0,) + rest) for rest in itertools.permutations(range(1, 8)))
+            order, _, after = sequence_points(lats, lons)
+            self.assertEqual(order[0], 0)
+            self.assertEqual(sorted(order), list(range(8)))
+            self.assertLessEqual(after, best * 1.02)
+
+    def test_improves_on_nearest_neighbour(self):
+        lats, lons = random_stops(7, 120)
+        matrix = drive_time_matrix(lats, lons)
+        order, before, after = sequence_points(lats, lons, time_budget=2.0)
+        self.assertAlmostEqual(after, path_cost(matrix, order))
+        self.assertLessEqual(after, path_cost(matrix, nearest_neighbour(matrix)))
+        self.assertLess(after, before / 3)
+
+    def test_route_result_uses_stop_ids(self):
+        stops = [(10, 51.50, -0.10), (11, 51.52, -0.10), (12, 51.51, -0.10)]
+        result = _sequence_route((4, stops, 1.0))
+        self.assertEqual(result.route_id, 4)
+        self.assertEqual(result.stop_ids, [10, 12, 11])
+        self.assertLess(result.drive_seconds_after, result.drive_seconds_before)
+
+if __name__ == "__main__":
+    unittest.main()
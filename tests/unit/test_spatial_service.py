@@ -0,0 +1,53 @@
+import unittest
+import math
+import random
+from fastlite import Database
+from app.service.spatial_service import SpatialIndex, haversine_m, EARTH_RADIUS_M, TRUCK, STOP
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SpatialIndex(Database(':memory:'))
+        self.index.create_table()
+        rng = random.Random(7)
+        # 2,000 trucks scattered over roughly 40 x 40 km
+        self.trucks = [(i, 51.3 + rng.random() * 0.36, -0.4 + rng.random() * 0.58) for i in range(2000)]
+        self.index.upsert_many(TRUCK, self.trucks)
+        self.index.upsert_many(STOP, [(1, 51.5, -0.12)])
+
+    def test_haversine(self):
+        # One degree of latitude is about 111 km
+        self.assertAlmostEqual(haversine_m(51.0, 0.0, 52.0, 0.0), 111_195, delta=50)
+
+    def test_within_radius_matches_brute_force(self):
+        lat, lon = 51.5, -0.12
+        expected = sorted(
+            (haversine_m(lat, lon, t_lat, t_lon), truck_id) for truck_id, t_lat, t_lon in self.trucks
+            if haversine_m(lat, lon, t_lat, t_lon) <= 2000
+        )
+        matches = self.index.within_radius(lat, lon, 2000, TRUCK)
+        self.assertEqual([m[1] for m in matches], [truck_id for _, truck_id in expected])
+        self.assertTrue(all(m[0] == TRUCK for m in matches))
+
+    def test_within_radius_keeps_points_at_the_edge(self):
+        # 999.9 m due north sits at the very edge of the 1 km bounding box
+        edge_lat = 10.0 + math.degrees(999.9 / EARTH_RADIUS_M)
+        self.index.upsert_many(TRUCK, [(5000, edge_lat, 10.0)])
+        self.assertLess(haversine_m(10.0, 10.0, edge_lat, 10.0), 1000)
+        self.assertEqual([m[1] for m in self.index.within_radius(10.0, 10.0, 1000, TRUCK)], [5000])
+
+    def test_nearest_matches_brute_force(self):
+        lat, lon = 51.42, -0.3
+        expected = sorted(self.trucks, key=lambda t: haversine_m(lat, lon, t[1], t[2]))[:5]
+        self.assertEqual([m[1] for m in self.index.nearest(lat, lon, 5, TRUCK)], [t[0] for t in expected])
+
+    def test_moving_and_removing_points(self):
+        self.index.upsert_many(TRUCK, [(0, 10.0, 10.0)])
+        self.assertEqual(self.index.nearest(10.0, 10.0, 1)[0][:2], (TRUCK, 0))
+        self.assertEqual(self.index.count(TRUCK), 2000)
+        self.index.remove(TRUCK, 0)
+        self.assertEqual(self.index.count(TRUCK), 1999)
+        self.assertEqual(self.index.within_radius(10.0, 10.0, 1000), [])
+
+if __name__ == "__main__":
+    unittest.main()